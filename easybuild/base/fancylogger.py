@@ -29,6 +29,7 @@ It adds:
  - custom specifiers for mpi logging (the mpirank) with autodetection of mpi
  - custom specifier for always showing the calling function's name
  - rotating file handler
+ - asynchronous logging to file (via a background writer thread that writes log records in batches)
  - a default formatter.
  - logging to an UDP server (vsc.logging.logdaemon.py f.ex.)
  - easily setting loglevel
@@ -85,7 +86,7 @@ import traceback
 import weakref
 from distutils.version import LooseVersion
 
-from easybuild.tools.py2vs3 import raise_with_traceback, string_type
+from easybuild.tools.py2vs3 import queue, raise_with_traceback, string_type
 
 
 def _env_to_boolean(varname, default=False):
@@ -180,6 +181,10 @@ FANCYLOG_FANCYRECORD = None
 MAX_BYTES = 100 * 1024 * 1024  # max bytes in a file with rotating file handler
 BACKUPCOUNT = 10  # number of rotating log files to save
 
+# log to file asynchronously (see AsyncFileHandler)
+FANCYLOG_ASYNC = False
+ASYNC_BATCH_SIZE = 1000  # max. number of log records written by asynchronous file handler before flushing
+
 DEFAULT_UDP_PORT = 5005
 
 # poor man's enum
@@ -241,6 +246,89 @@ class FancyStreamHandler(logging.StreamHandler):
         self.stream = stream
 
 
+class AsyncFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that writes log records asynchronously, via a queue that is processed by a background thread;
+    the log file is only flushed after each batch of records that were queued in the meantime,
+    rather than after every single record.
+
+    Pending records are always written (and flushed) before a record with level ERROR (or higher) is handled,
+    when the handler is flushed or closed, and on exit (via logging.shutdown).
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize handler, and start background thread that writes log records."""
+        logging.handlers.RotatingFileHandler.__init__(self, *args, **kwargs)
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write_records, name='AsyncLogWriter')
+        self.writer.daemon = True
+        self.writer.start()
+
+    def prepare(self, record):
+        """
+        Prepare log record to be queued: merge message and arguments,
+        since arguments may be mutable objects that change before the record is written.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        """Queue log record, to be written by background thread (or write it directly if handler was closed)."""
+        if not self.writer.is_alive():
+            logging.handlers.RotatingFileHandler.emit(self, record)
+            return
+
+        try:
+            self.queue.put(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+        if record.levelno >= logging.ERROR:
+            self.flush()
+
+    def _write_records(self):
+        """Write queued log records in batches (runs in background thread), until None is queued."""
+        done = False
+        while not done:
+            records = [self.queue.get()]
+            while len(records) < ASYNC_BATCH_SIZE:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for record in records:
+                if record is None:
+                    done = True
+                else:
+                    logging.handlers.RotatingFileHandler.emit(self, record)
+
+            # lock is not acquired here, since it may be held by a thread that is waiting in flush
+            if self.stream is not None:
+                self.stream.flush()
+
+            for _ in records:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until all queued log records are written and flushed (no-op in background thread itself)."""
+        if not self.writer.is_alive():
+            logging.handlers.RotatingFileHandler.flush(self)
+        elif threading.current_thread() is not self.writer:
+            self.queue.join()
+
+    def close(self):
+        """Write all queued log records, stop background thread and close log file."""
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        logging.handlers.RotatingFileHandler.close(self)
+
+
 class FancyLogRecord(logging.LogRecord):
     """
     This class defines a custom log record.
@@ -570,6 +658,8 @@ def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_
     this will let the file grow to MAX_BYTES and then rotate it
     saving the last BACKUPCOUNT files.
 
+    if asynchronous logging is enabled (see setAsyncLogging), an AsyncFileHandler is used instead
+
     returns the filehandler (this can be used to later disable logging to file)
 
     if you want to disable logging to file, pass the earlier obtained filehandler
@@ -589,8 +679,13 @@ def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_
             exc, detail, tb = sys.exc_info()
             raise_with_traceback(exc, "Cannot create logdirectory %s: %s \n detail: %s" % (directory, ex, detail), tb)
 
+    if FANCYLOG_ASYNC:
+        handlerclass = AsyncFileHandler
+    else:
+        handlerclass = logging.handlers.RotatingFileHandler
+
     return _logToSomething(
-        logging.handlers.RotatingFileHandler,
+        handlerclass,
         handleropts,
         loggeroption='logtofile_%s' % filename,
         name=name,
@@ -807,6 +902,12 @@ def setLogFormat(f_format):
     FANCYLOG_LOGGING_FORMAT = f_format
 
 
+def setAsyncLogging(enable=True):
+    """Enable (or disable) asynchronous logging to file. (Has to be set before logToFile is called)."""
+    global FANCYLOG_ASYNC
+    FANCYLOG_ASYNC = enable
+
+
 def setTestLogFormat():
     """Set the log format to the test format (i.e. without timestamp)."""
     setLogFormat(TEST_LOGGING_FORMAT)
@@ -39,9 +39,11 @@ The EasyBlock class should serve as a base class for all easyblocks.
 :author: Davide Vanzo (Vanderbilt University)
 """
 
+import ast
 import copy
 import glob
 import inspect
+import json
 import os
 import re
 import stat
@@ -50,11 +52,13 @@ import time
 import traceback
 from datetime import datetime
 from distutils.version import LooseVersion
+from multiprocessing.pool import ThreadPool
 
 import easybuild.tools.environment as env
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
-from easybuild.framework.easyconfig.easyconfig import ITERATE_OPTIONS, EasyConfig, ActiveMNS, get_easyblock_class
+from easybuild.framework.easyconfig.easyconfig import ITERATE_OPTIONS, EasyConfig, ActiveMNS, disable_templating
+from easybuild.framework.easyconfig.easyconfig import get_easyblock_class
 from easybuild.framework.easyconfig.easyconfig import get_module_path, letter_dir_for, resolve_template
 from easybuild.framework.easyconfig.format.format import SANITY_CHECK_PATHS_DIRS, SANITY_CHECK_PATHS_FILES
 from easybuild.framework.easyconfig.parser import fetch_parameters_from_easyconfig
@@ -63,15 +67,19 @@ from easybuild.framework.easyconfig.tools import get_paths_for
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RUN_STEP, template_constant_dict
 from easybuild.framework.extension import resolve_exts_filter_template
 from easybuild.tools import config, run
+from easybuild.tools.build_cache import det_build_cache_key, restore_from_build_cache, store_in_build_cache
 from easybuild.tools.build_details import get_build_stats
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, dry_run_warning, dry_run_set_dirs
 from easybuild.tools.build_log import print_error, print_msg, print_warning
+from easybuild.tools.cache import det_cache_key
 from easybuild.tools.config import FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_PATCHES, FORCE_DOWNLOAD_SOURCES
 from easybuild.tools.config import build_option, build_path, get_log_filename, get_repository, get_repositorypath
-from easybuild.tools.config import install_path, log_path, package_path, source_paths
+from easybuild.tools.config import PROFILE_FORMAT_TRACE, install_path, log_path, package_path, source_paths
+from easybuild.tools.elf import find_missing_libs, read_elf_info
 from easybuild.tools.environment import restore_env, sanitize_env
 from easybuild.tools.filetools import CHECKSUM_TYPE_MD5, CHECKSUM_TYPE_SHA256
-from easybuild.tools.filetools import adjust_permissions, apply_patch, back_up_file, change_dir, convert_name
+from easybuild.tools.filetools import adjust_permissions, apply_patch, apply_permissions_plan, back_up_file
+from easybuild.tools.filetools import change_dir, convert_name, det_permissions_plan
 from easybuild.tools.filetools import compute_checksum, copy_file, check_lock, create_lock, derive_alt_pypi_url
 from easybuild.tools.filetools import diff_files, dir_contains_files, download_file, encode_class_name, extract_file
 from easybuild.tools.filetools import find_backup_name_candidate, get_source_tarball_from_git, is_alt_pypi_url
@@ -83,22 +91,39 @@ from easybuild.tools.hooks import PREPARE_STEP, READY_STEP, SANITYCHECK_STEP, SO
 from easybuild.tools.hooks import load_hooks, run_hook
 from easybuild.tools.run import run_cmd
 from easybuild.tools.jenkins import write_to_xml
-from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, module_generator, dependencies_for
+from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, dependency_graph, module_generator
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.modules import ROOT_ENV_VAR_NAME_PREFIX, VERSION_ENV_VAR_NAME_PREFIX, DEVEL_ENV_VAR_NAME_PREFIX
 from easybuild.tools.modules import Lmod, curr_module_paths, invalidate_module_caches_for, get_software_root
 from easybuild.tools.modules import get_software_root_env_var_name, get_software_version_env_var_name
 from easybuild.tools.package.utilities import package
+from easybuild.tools.profiling import StepProfiler
 from easybuild.tools.py2vs3 import extract_method_name, string_type
 from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.source_store import get_source_store
 from easybuild.tools.systemtools import det_parallelism, use_group
 from easybuild.tools.utilities import INDENT_4SPACES, get_class_for, quote_str
-from easybuild.tools.utilities import remove_unwanted_chars, time2str, trace_msg
+from easybuild.tools.utilities import remove_unwanted_chars, stable_repr, time2str, trace_msg
 from easybuild.tools.version import this_is_easybuild, VERBOSE_VERSION, VERSION
 
 
 MODULE_ONLY_STEPS = [MODULE_STEP, PREPARE_STEP, READY_STEP, POSTITER_STEP, SANITYCHECK_STEP]
 
+# steps that are still performed when installation is restored from build cache
+BUILD_CACHE_STEPS = [CLEANUP_STEP, MODULE_STEP, PERMISSIONS_STEP, POSTITER_STEP, PREPARE_STEP, READY_STEP,
+                     SANITYCHECK_STEP]
+
+# steps that are performed again when resuming an installation (see --resume), since they set up the build environment
+RESUME_STEPS = [POSTITER_STEP, PREPARE_STEP, READY_STEP]
+
+# subdirectory of build path where checkpoints for installations are stored (see --resume)
+CHECKPOINTS_SUBDIR = '.checkpoints'
+
+# types of instance attributes that are included in checkpoints (as Python literals)
+CHECKPOINT_ATTRIBUTE_TYPES = (bool, dict, float, int, list, string_type, tuple, type(None))
+# instance attributes that are never included in checkpoints
+CHECKPOINT_EXCLUDED_ATTRIBUTES = ['checkpoint', 'checkpoint_initial_state', 'resuming']
+
 # string part of URL for Python packages on PyPI that indicates needs to be rewritten (see derive_alt_pypi_url)
 PYPI_PKG_URL_PATTERN = 'pypi.python.org/packages/source/'
 
@@ -207,6 +232,20 @@ class EasyBlock(object):
         self.postmsg = ''  # allow a post message to be set, which can be shown as last output
         self.current_step = None
 
+        # profiler for steps & commands being run (only when --profile is used)
+        self.profiler = None
+
+        # key for build cache entry, and contents of module file if installation was restored from build cache
+        # (only when --use-build-cache is used)
+        self.build_cache_key = None
+        self.build_cache_module_txt = None
+
+        # checkpoint with state after each completed step, and initial state of installation (see --resume);
+        # resuming indicates whether steps that were completed in a previous session are being skipped
+        self.checkpoint = None
+        self.checkpoint_initial_state = None
+        self.resuming = False
+
         # list of loaded modules
         self.loaded_modules = []
 
@@ -295,6 +334,24 @@ class EasyBlock(object):
         self.log.info("Closing log for application name %s version %s" % (self.name, self.version))
         fancylogger.logToFile(self.logfile, enable=False)
 
+    def dump_profile(self, log_file):
+        """
+        Dump profile of installation (if any) next to specified log file.
+        :return: path to file profile was dumped to (None if no profile is available)
+        """
+        profile_path = None
+        if self.profiler is not None:
+            profile_format = build_option('profile_format')
+            if profile_format == PROFILE_FORMAT_TRACE:
+                suffix = 'trace'
+            else:
+                suffix = 'profile'
+            profile_path = '%s-%s.json' % (os.path.splitext(log_file)[0], suffix)
+            write_file(profile_path, self.profiler.to_json(fmt=profile_format))
+            _log.info("Profile of installation dumped to %s", profile_path)
+
+        return profile_path
+
     #
     # DRY RUN UTILITIES
     #
@@ -377,7 +434,8 @@ class EasyBlock(object):
         # check if the sources can be located
         force_download = build_option('force_download') in [FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_SOURCES]
         path = self.obtain_file(filename, extension=extension, download_filename=download_filename,
-                                force_download=force_download, urls=source_urls, git_config=git_config)
+                                force_download=force_download, urls=source_urls, git_config=git_config,
+                                checksum=checksum)
         if path is None:
             raise EasyBuildError('No file found for source %s', filename)
 
@@ -394,6 +452,35 @@ class EasyBlock(object):
 
         return src
 
+    def run_fetch_tasks(self, fetch_func, items, sequential=False):
+        """
+        Run specified function to fetch files for each of the specified items, and return list of results
+        (in the same order as the items).
+
+        Up to the number of concurrent downloads specified via --parallel-downloads are done at the same time,
+        using a pool of threads; in dry run mode, files are always fetched one at a time (to retain the order of
+        the output that is produced).
+
+        :param fetch_func: function to call for each item
+        :param items: list of items to fetch files for
+        :param sequential: fetch files one at a time, regardless of the value for --parallel-downloads
+        """
+        parallel_downloads = min(build_option('parallel_downloads') or 1, len(items))
+
+        if sequential or self.dry_run or parallel_downloads <= 1:
+            res = [fetch_func(item) for item in items]
+        else:
+            self.log.info("Fetching files for %d items using %d threads", len(items), parallel_downloads)
+            pool = ThreadPool(parallel_downloads)
+            try:
+                # map re-raises the first exception raised by a task (e.g. an EasyBuildError) in the main thread
+                res = pool.map(fetch_func, items, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+
+        return res
+
     def fetch_sources(self, sources=None, checksums=None):
         """
         Add a list of source files (can be tarballs, isos, urls).
@@ -413,12 +500,21 @@ class EasyBlock(object):
         if isinstance(checksums, string_type):
             checksums = [checksums]
 
-        # Loop over the list of sources; list of checksums must match >= in size
+        # check list of sources; list of checksums must match >= in size
         for index, source in enumerate(sources):
             if source is None:
                 raise EasyBuildError("Empty source in sources list at index %d", index)
 
-            src_spec = self.fetch_source(source, self.get_checksum_for(checksums=checksums, index=index))
+        def fetch_source_at(index):
+            """Fetch source at specified index in list of sources."""
+            return self.fetch_source(sources[index], self.get_checksum_for(checksums=checksums, index=index))
+
+        # sources obtained from a git repository are created in the current working directory,
+        # which is shared by all threads, so those can not be fetched concurrently
+        git_sources = any(isinstance(source, dict) and source.get('git_config') for source in sources)
+
+        src_specs = self.run_fetch_tasks(fetch_source_at, list(range(len(sources))), sequential=git_sources)
+        for source, src_spec in zip(sources, src_specs):
             if src_spec:
                 self.src.append(src_spec)
             else:
@@ -434,8 +530,9 @@ class EasyBlock(object):
         if patch_specs is None:
             patch_specs = self.cfg['patches']
 
-        patches = []
-        for index, patch_spec in enumerate(patch_specs):
+        def fetch_patch_at(index):
+            """Locate patch at specified index in list of patches, and return corresponding patch spec."""
+            patch_spec = patch_specs[index]
 
             # check if the patches can be located
             copy_file = False
@@ -463,13 +560,14 @@ class EasyBlock(object):
                 patch_file = patch_spec
 
             force_download = build_option('force_download') in [FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_PATCHES]
-            path = self.obtain_file(patch_file, extension=extension, force_download=force_download)
+            checksum = self.get_checksum_for(checksums, index=index)
+            path = self.obtain_file(patch_file, extension=extension, force_download=force_download, checksum=checksum)
             if path:
                 self.log.debug('File %s found for patch %s' % (path, patch_spec))
                 patchspec = {
                     'name': patch_file,
                     'path': path,
-                    'checksum': self.get_checksum_for(checksums, index=index),
+                    'checksum': checksum,
                 }
                 if suff:
                     if copy_file:
@@ -478,25 +576,24 @@ class EasyBlock(object):
                         patchspec['sourcepath'] = suff
                 if level is not None:
                     patchspec['level'] = level
-
-                if extension:
-                    patches.append(patchspec)
-                else:
-                    self.patches.append(patchspec)
             else:
                 raise EasyBuildError('No file found for patch %s', patch_spec)
 
+            return patchspec
+
+        patches = self.run_fetch_tasks(fetch_patch_at, list(range(len(patch_specs))))
+
         if extension:
             self.log.info("Fetched extension patches: %s", patches)
             return patches
         else:
+            self.patches.extend(patches)
             self.log.info("Added patches: %s" % self.patches)
 
     def fetch_extension_sources(self, skip_checksums=False):
         """
         Find source file for extensions.
         """
-        exts_sources = []
         exts_list = self.cfg.get_ref('exts_list')
 
         if self.dry_run:
@@ -504,14 +601,15 @@ class EasyBlock(object):
 
         force_download = build_option('force_download') in [FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_SOURCES]
 
-        for ext in exts_list:
+        def fetch_ext_sources(ext):
+            """Locate sources/patches for specified extension, and verify checksums."""
             if (isinstance(ext, list) or isinstance(ext, tuple)) and ext:
 
                 # expected format: (name, version, options (dict))
 
                 ext_name = ext[0]
                 if len(ext) == 1:
-                    exts_sources.append({'name': ext_name})
+                    ext_sources = {'name': ext_name}
                 else:
                     ext_version = ext[1]
 
@@ -574,7 +672,7 @@ class EasyBlock(object):
                         if 'source_urls' not in source:
                             source['source_urls'] = source_urls
 
-                        src = self.fetch_source(source, checksums, extension=True)
+                        src = self.fetch_source(source, self.get_checksum_for(checksums, index=0), extension=True)
 
                         # copy 'path' entry to 'src' for use with extensions
                         ext_src.update({'src': src['path']})
@@ -586,7 +684,8 @@ class EasyBlock(object):
                         # if no sources are specified via 'sources', fall back to 'source_tmpl'
                         src_fn = ext_options.get('source_tmpl', default_source_tmpl)
                         src_path = self.obtain_file(src_fn, extension=True, urls=source_urls,
-                                                    force_download=force_download)
+                                                    force_download=force_download,
+                                                    checksum=self.get_checksum_for(checksums, index=0))
                         if src_path:
                             ext_src.update({'src': src_path})
                         else:
@@ -644,31 +743,58 @@ class EasyBlock(object):
                     else:
                         self.log.debug('No patches found for extension %s.' % ext_name)
 
-                    exts_sources.append(ext_src)
+                    ext_sources = ext_src
 
             elif isinstance(ext, string_type):
-                exts_sources.append({'name': ext})
+                ext_sources = {'name': ext}
 
             else:
                 raise EasyBuildError("Extension specified in unknown format (not a string/list/tuple)")
 
+            return ext_sources
+
+        def uses_git_config(ext):
+            """Determine whether source for specified extension is obtained from a git repository."""
+            ext_options = self.cfg.get_ref('exts_default_options')
+            if isinstance(ext, (list, tuple)) and len(ext) == 3 and isinstance(ext[2], dict):
+                ext_options = dict(ext_options, **ext[2])
+
+            sources = ext_options.get('sources') if isinstance(ext_options, dict) else None
+            if not isinstance(sources, list):
+                sources = [sources]
+
+            return any(isinstance(source, dict) and 'git_config' in source for source in sources)
+
+        # sources obtained from a git repository are created in the current working directory,
+        # which is shared by all threads, so those can not be fetched concurrently
+        git_sources = any(uses_git_config(ext) for ext in exts_list)
+
+        exts_sources = self.run_fetch_tasks(fetch_ext_sources, exts_list, sequential=git_sources)
+
         return exts_sources
 
     def obtain_file(self, filename, extension=False, urls=None, download_filename=None, force_download=False,
-                    git_config=None):
+                    git_config=None, checksum=None):
         """
         Locate the file with the given name
         - searches in different subdirectories of source path
         - supports fetching file from the web if path is specified as an url (i.e. starts with "http://:")
+        - if --use-source-store is enabled, file is first looked up in the content-addressed source store,
+          and files that are found in or downloaded to the (first) source path are added to it
         :param filename: filename of source
         :param extension: indicates whether locations for extension sources should also be considered
         :param urls: list of source URLs where this file may be available
         :param download_filename: filename with which the file should be downloaded, and then renamed to <filename>
         :param force_download: always try to download file, even if it's already available in source path
         :param git_config: dictionary to define how to download a git repository
+        :param checksum: expected checksum for file (used to look up file in source store)
         """
         srcpaths = source_paths()
 
+        source_store = None
+        if build_option('use_source_store') and not self.dry_run:
+            source_store = get_source_store(srcpaths[0])
+
         # should we download or just try and find it?
         if re.match(r"^(https?|ftp)://", filename):
             # URL detected, so let's try and download it
@@ -686,21 +812,40 @@ class EasyBlock(object):
             try:
                 fullpath = os.path.join(filepath, filename)
 
+                if source_store and not force_download and source_store.provide(fullpath, checksum=checksum):
+                    self.log.info("Found file %s in source store, no need to download it", filename)
+                    return fullpath
+
                 # only download when it's not there yet
                 if os.path.exists(fullpath):
                     if force_download:
                         print_warning("Found file %s at %s, but re-downloading it anyway..." % (filename, filepath))
                     else:
                         self.log.info("Found file %s at %s, no need to download it", filename, filepath)
+                        if source_store:
+                            source_store.add(fullpath)
                         return fullpath
 
                 if download_file(filename, url, fullpath):
+                    if source_store:
+                        source_store.add(fullpath)
                     return fullpath
 
             except IOError as err:
                 raise EasyBuildError("Downloading file %s from url %s to %s failed: %s", filename, url, fullpath, err)
 
         else:
+            targetdir = os.path.join(srcpaths[0], self.name.lower()[0], self.name)
+            if extension:
+                targetpath = os.path.join(targetdir, "extensions", filename)
+            else:
+                targetpath = os.path.join(targetdir, filename)
+
+            # file in source store can be located via a single lookup in its index (or via expected checksum)
+            if source_store and not force_download and source_store.provide(targetpath, checksum=checksum):
+                self.log.info("Found file %s in source store: %s", filename, targetpath)
+                return targetpath
+
             # try and find file in various locations
             foundfile = None
             failedpaths = []
@@ -756,11 +901,12 @@ class EasyBlock(object):
 
                     break  # no need to try other source paths
 
-            targetdir = os.path.join(srcpaths[0], self.name.lower()[0], self.name)
-
             if foundfile:
                 if self.dry_run:
                     self.dry_run_msg("  * %s found at %s", filename, foundfile)
+                elif source_store:
+                    # only files in (first) source path are added to source store
+                    source_store.add(foundfile)
                 return foundfile
             elif git_config:
                 return get_source_tarball_from_git(filename, targetdir, git_config)
@@ -776,11 +922,6 @@ class EasyBlock(object):
 
                 for url in source_urls:
 
-                    if extension:
-                        targetpath = os.path.join(targetdir, "extensions", filename)
-                    else:
-                        targetpath = os.path.join(targetdir, filename)
-
                     url_filename = download_filename or filename
 
                     if isinstance(url, string_type):
@@ -828,6 +969,8 @@ class EasyBlock(object):
                     if downloaded:
                         # if fetching from source URL worked, we're done
                         self.log.info("Successfully downloaded source file %s from %s" % (filename, fullurl))
+                        if source_store:
+                            source_store.add(targetpath)
                         return targetpath
                     else:
                         failedpaths.append(fullurl)
@@ -908,11 +1051,15 @@ class EasyBlock(object):
         # make sure build dir is unique if cleanupoldbuild is False or not set
         if not self.cfg.get('cleanupoldbuild', False):
             uniq_builddir = builddir
+            # when resuming an installation, use most recent existing build dir for which a checkpoint is available
+            resume_builddir = None
             suff = 0
             while(os.path.isdir(uniq_builddir)):
+                if build_option('resume') and os.path.exists(det_checkpoint_path(uniq_builddir)):
+                    resume_builddir = uniq_builddir
                 uniq_builddir = "%s.%d" % (builddir, suff)
                 suff += 1
-            builddir = uniq_builddir
+            builddir = resume_builddir or uniq_builddir
 
         self.builddir = builddir
         self.log.info("Build dir set to %s" % self.builddir)
@@ -946,8 +1093,11 @@ class EasyBlock(object):
         # always make build dir,
         # unless we're building in installation directory and we iterating over a list of (pre)config/build/installopts,
         # otherwise we wipe the already partially populated installation directory,
-        # see https://github.com/easybuilders/easybuild-framework/issues/2556
-        if not (self.build_in_installdir and self.iter_idx > 0):
+        # see https://github.com/easybuilders/easybuild-framework/issues/2556;
+        # existing build dir must be retained as well when resuming an installation
+        if self.resuming:
+            self.log.info("Retaining build dir %s, since installation is being resumed", self.builddir)
+        elif not (self.build_in_installdir and self.iter_idx > 0):
             # make sure we no longer sit in the build directory before cleaning it.
             change_dir(self.orig_workdir)
             self.make_dir(self.builddir, self.cfg['cleanupoldbuild'])
@@ -1171,10 +1321,10 @@ class EasyBlock(object):
         # load modules that open up the module tree before checking deps of deps (in reverse order)
         self.modules_tool.load(excluded_deps[::-1], allow_reload=False)
 
-        for excluded_dep in excluded_deps:
-            excluded_dep_deps = dependencies_for(excluded_dep, self.modules_tool)
-            self.log.debug("List of dependencies for excluded dependency %s: %s" % (excluded_dep, excluded_dep_deps))
-            deps = [d for d in deps if d not in excluded_dep_deps]
+        excluded_deps_graph = dependency_graph(excluded_deps, self.modules_tool)
+        self.log.debug("Dependencies for excluded dependencies: %s", excluded_deps_graph)
+        excluded_deps_deps = set().union(*excluded_deps_graph.values())
+        deps = [d for d in deps if d not in excluded_deps_deps]
 
         self.log.debug("List of retained deps to load in generated module: %s", deps)
 
@@ -1575,14 +1725,17 @@ class EasyBlock(object):
         res = []
         for ext_inst in self.ext_instances:
             cmd, stdin = resolve_exts_filter_template(exts_filter, ext_inst)
-            (cmdstdouterr, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False)
-            self.log.info("exts_filter result %s %s", cmdstdouterr, ec)
-            if ec:
-                self.log.info("Not skipping %s", ext_inst.name)
-                self.log.debug("exit code: %s, stdout/err: %s", ec, cmdstdouterr)
-                res.append(ext_inst)
-            else:
-                print_msg("skipping extension %s" % ext_inst.name, silent=self.silent, log=self.log)
+            # only exit code matters, output is only logged (which only requires last part of it to be in memory)
+            (cmdstdouterr, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False,
+                                         output_handle=True)
+            with cmdstdouterr:
+                self.log.info("exts_filter result %s %s", cmdstdouterr, ec)
+                if ec:
+                    self.log.info("Not skipping %s", ext_inst.name)
+                    self.log.debug("exit code: %s, stdout/err: %s", ec, cmdstdouterr)
+                    res.append(ext_inst)
+                else:
+                    print_msg("skipping extension %s" % ext_inst.name, silent=self.silent, log=self.log)
 
         self.ext_instances = res
 
@@ -2125,8 +2278,9 @@ class EasyBlock(object):
             self.log.info("Loading extra modules: %s", extra_modules)
             self.modules_tool.load(extra_modules)
 
-        # guess directory to start configure/build/install process in, and move there
-        if start_dir:
+        # guess directory to start configure/build/install process in, and move there;
+        # not done when resuming an installation, since then start dir is restored from checkpoint
+        if start_dir and not self.resuming:
             self.guess_start_dir()
 
     def configure_step(self):
@@ -2445,7 +2599,60 @@ class EasyBlock(object):
         self.log.debug("List of loaded modules: %s", self.modules_tool.list())
 
         not_found_regex = re.compile('not found', re.M)
-        readelf_rpath_regex = re.compile('(RPATH)', re.M)
+
+        # cache for ELF information of shared libraries, shared across all checked files
+        elf_info_cache = {}
+
+        def check_rpath(path):
+            """Check specified file w.r.t. RPATH linking, return list of failure messages."""
+            path_fails = []
+
+            self.log.debug("Sanity checking RPATH for %s", path)
+
+            # symlinks and non-regular files (like directories) are not checked
+            if os.path.islink(path) or not os.path.isfile(path):
+                self.log.debug("%s is not a regular file, so skipping it in RPATH sanity check", path)
+                return path_fails
+
+            try:
+                elf_info = read_elf_info(path)
+            except EasyBuildError as err:
+                path_fails.append("Failed to inspect %s: %s" % (path, err))
+                return path_fails
+
+            # only check dynamically linked executables/libraries
+            if elf_info and elf_info['dynamic']:
+                # check whether all required libraries can be found;
+                # only resort to 'ldd' if that can't be determined or if some libraries were not found,
+                # since 'ldd' also takes into account libraries that were already loaded, for example
+                missing_libs = find_missing_libs(path, elf_info=elf_info, cache=elf_info_cache)
+                if missing_libs == []:
+                    self.log.debug("All required libraries found for %s: %s", path, elf_info['needed'])
+                else:
+                    self.log.debug("Missing libraries for %s (%s), checking with 'ldd'", path, missing_libs)
+                    out, ec = run_cmd("ldd %s" % path, simple=False, trace=False)
+                    if ec:
+                        fail_msg = "Failed to run 'ldd %s': %s" % (path, out)
+                        self.log.warning(fail_msg)
+                        path_fails.append(fail_msg)
+                    elif not_found_regex.search(out):
+                        fail_msg = "One or more required libraries not found for %s: %s" % (path, out)
+                        self.log.warning(fail_msg)
+                        path_fails.append(fail_msg)
+                    else:
+                        self.log.debug("Output of 'ldd %s' checked, looks OK", path)
+
+                # check whether RPATH entry is there in dynamic section
+                if elf_info['rpath']:
+                    self.log.debug("RPATH for %s: %s", path, elf_info['rpath'])
+                else:
+                    fail_msg = "No RPATH found in dynamic section of %s (RUNPATH: %s)" % (path, elf_info['runpath'])
+                    self.log.warning(fail_msg)
+                    path_fails.append(fail_msg)
+            else:
+                self.log.debug("%s is not dynamically linked, so skipping it in RPATH sanity check", path)
+
+            return path_fails
 
         if rpath_dirs is None:
             rpath_dirs = ['bin', 'lib', 'lib64']
@@ -2453,53 +2660,24 @@ class EasyBlock(object):
         else:
             self.log.info("Using specified subdirs for binaries/libraries to verify RPATH linking: %s", rpath_dirs)
 
+        paths = []
         for dirpath in [os.path.join(self.installdir, d) for d in rpath_dirs]:
             if os.path.exists(dirpath):
                 self.log.debug("Sanity checking RPATH for files in %s", dirpath)
-
-                for path in [os.path.join(dirpath, x) for x in os.listdir(dirpath)]:
-                    self.log.debug("Sanity checking RPATH for %s", path)
-
-                    out, ec = run_cmd("file %s" % path, simple=False)
-                    if ec:
-                        fails.append("Failed to run 'file %s': %s" % (path, out))
-
-                    # only run ldd/readelf on dynamically linked executables/libraries
-                    # example output:
-                    # ELF 64-bit LSB executable, x86-64, version 1 (SYSV), dynamically linked (uses shared libs), ...
-                    # ELF 64-bit LSB shared object, x86-64, version 1 (SYSV), dynamically linked, not stripped
-                    if "dynamically linked" in out:
-                        # check whether all required libraries are found via 'ldd'
-                        out, ec = run_cmd("ldd %s" % path, simple=False)
-                        if ec:
-                            fail_msg = "Failed to run 'ldd %s': %s" % (path, out)
-                            self.log.warning(fail_msg)
-                            fails.append(fail_msg)
-                        elif not_found_regex.search(out):
-                            fail_msg = "One or more required libraries not found for %s: %s" % (path, out)
-                            self.log.warning(fail_msg)
-                            fails.append(fail_msg)
-                        else:
-                            self.log.debug("Output of 'ldd %s' checked, looks OK", path)
-
-                        # check whether RPATH section in 'readelf -d' output is there
-                        out, ec = run_cmd("readelf -d %s" % path, simple=False)
-                        if ec:
-                            fail_msg = "Failed to run 'readelf %s': %s" % (path, out)
-                            self.log.warning(fail_msg)
-                            fails.append(fail_msg)
-                        elif not readelf_rpath_regex.search(out):
-                            fail_msg = "No '(RPATH)' found in 'readelf -d' output for %s: %s" % (path, out)
-                            self.log.warning(fail_msg)
-                            fails.append(fail_msg)
-                        else:
-                            self.log.debug("Output of 'readelf -d %s' checked, looks OK", path)
-
-                    else:
-                        self.log.debug("%s is not dynamically linked, so skipping it in RPATH sanity check", path)
+                paths.extend(os.path.join(dirpath, x) for x in sorted(os.listdir(dirpath)))
             else:
                 self.log.debug("Not sanity checking files in non-existing directory %s", dirpath)
 
+        # files are checked concurrently, using a pool of threads
+        if paths:
+            pool = ThreadPool(min(self.cfg['parallel'] or 1, len(paths)))
+            try:
+                for path_fails in pool.map(check_rpath, paths):
+                    fails.extend(path_fails)
+            finally:
+                pool.close()
+                pool.join()
+
         env.restore_env_vars(orig_env)
 
         return fails
@@ -2870,21 +3048,25 @@ class EasyBlock(object):
         else:
             trace_msg("generating module file @ %s" % self.mod_filepath)
 
-        txt = self.module_generator.MODULE_SHEBANG
-        if txt:
-            txt += '\n'
-
-        if self.modules_header:
-            txt += self.modules_header + '\n'
-
-        txt += self.make_module_description()
-        txt += self.make_module_group_check()
-        txt += self.make_module_deppaths()
-        txt += self.make_module_dep()
-        txt += self.make_module_extend_modpath()
-        txt += self.make_module_req()
-        txt += self.make_module_extra()
-        txt += self.make_module_footer()
+        if self.build_cache_module_txt is not None and not fake:
+            # use module file that was restored from build cache (see run_all_steps)
+            txt = self.build_cache_module_txt
+        else:
+            txt = self.module_generator.MODULE_SHEBANG
+            if txt:
+                txt += '\n'
+
+            if self.modules_header:
+                txt += self.modules_header + '\n'
+
+            txt += self.make_module_description()
+            txt += self.make_module_group_check()
+            txt += self.make_module_deppaths()
+            txt += self.make_module_dep()
+            txt += self.make_module_extend_modpath()
+            txt += self.make_module_req()
+            txt += self.make_module_extra()
+            txt += self.make_module_footer()
 
         if self.dry_run:
             # only report generating actual module file during dry run, don't mention temporary module files
@@ -2933,33 +3115,31 @@ class EasyBlock(object):
         Finalize installation procedure: adjust permissions as configured, change group ownership (if requested).
         Installing user must be member of the group that it is changed to.
         """
+        # all permission changes are combined into a single plan, which is applied in a single pass over install dir;
+        # each change is specified as (permission bits, add, only files, only directories)
+        changes = []
+        group_id = None
+
         if self.group is not None:
             # remove permissions for others, and set group ID
-            try:
-                perms = stat.S_IROTH | stat.S_IWOTH | stat.S_IXOTH
-                adjust_permissions(self.installdir, perms, add=False, recursive=True, group_id=self.group[1],
-                                   relative=True, ignore_errors=True)
-            except EasyBuildError as err:
-                raise EasyBuildError("Unable to change group permissions of file(s): %s", err)
-            self.log.info("Successfully made software only available for group %s (gid %s)" % self.group)
+            changes.append((stat.S_IROTH | stat.S_IWOTH | stat.S_IXOTH, False, False, False))
+            group_id = self.group[1]
+            self.log.info("Making software only available for group %s (gid %s)" % self.group)
 
         if build_option('read_only_installdir'):
             # remove write permissions for everyone
-            perms = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
-            adjust_permissions(self.installdir, perms, add=False, recursive=True, relative=True, ignore_errors=True)
-            self.log.info("Successfully removed write permissions recursively for *EVERYONE* on install dir.")
+            changes.append((stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH, False, False, False))
+            self.log.info("Removing write permissions recursively for *EVERYONE* on install dir.")
 
         elif build_option('group_writable_installdir'):
             # enable write permissions for group
-            perms = stat.S_IWGRP
-            adjust_permissions(self.installdir, perms, add=True, recursive=True, relative=True, ignore_errors=True)
-            self.log.info("Successfully enabled write permissions recursively for group on install dir.")
+            changes.append((stat.S_IWGRP, True, False, False))
+            self.log.info("Enabling write permissions recursively for group on install dir.")
 
         else:
             # remove write permissions for group and other
-            perms = stat.S_IWGRP | stat.S_IWOTH
-            adjust_permissions(self.installdir, perms, add=False, recursive=True, relative=True, ignore_errors=True)
-            self.log.info("Successfully removed write permissions recursively for group/other on install dir.")
+            changes.append((stat.S_IWGRP | stat.S_IWOTH, False, False, False))
+            self.log.info("Removing write permissions recursively for group/other on install dir.")
 
         # add read permissions for everybody on all files, taking into account group (if any)
         perms = stat.S_IRUSR | stat.S_IRGRP
@@ -2980,14 +3160,24 @@ class EasyBlock(object):
             self.log.debug("Taking umask '%s' into account when ensuring read permissions to install dir", umask)
 
         self.log.debug("Adding file read permissions in %s using '%s'", self.installdir, oct(perms))
-        adjust_permissions(self.installdir, perms, add=True, recursive=True, relative=True, ignore_errors=True)
+        changes.append((perms, True, False, False))
 
         # also ensure directories have exec permissions (so they can be opened)
         self.log.debug("Adding directory search permissions in %s using '%s'", self.installdir, oct(dir_perms))
-        adjust_permissions(self.installdir, dir_perms, add=True, recursive=True, relative=True, onlydirs=True,
-                           ignore_errors=True)
+        changes.append((dir_perms, True, False, True))
+
+        plan = det_permissions_plan(changes)
+        try:
+            apply_permissions_plan(self.installdir, plan, recursive=True, group_id=group_id, ignore_errors=True,
+                                   parallel=self.cfg['parallel'] or 1)
+        except EasyBuildError as err:
+            if group_id is None:
+                raise
+            raise EasyBuildError("Unable to change group permissions of file(s): %s", err)
 
-        self.log.info("Successfully added read permissions recursively on install dir %s", self.installdir)
+        if self.group is not None:
+            self.log.info("Successfully made software only available for group %s (gid %s)" % self.group)
+        self.log.info("Successfully adjusted permissions recursively on install dir %s", self.installdir)
 
     def test_cases_step(self):
         """
@@ -3018,6 +3208,172 @@ class EasyBlock(object):
             self.cfg.template_values[name[0]] = str(getattr(self, name[0], None))
         self.cfg.generate_template_values()
 
+    #
+    # CHECKPOINTS
+    #
+    def det_checkpoint_fingerprint(self):
+        """
+        Determine fingerprint of easyconfig for this installation, to check whether a checkpoint can be used;
+        'stop' easyconfig parameter is not taken into account, so an installation stopped via --stop can be resumed.
+        """
+        with disable_templating(self.cfg):
+            cfg = dict((key, val) for (key, val) in self.cfg.asdict().items() if key != 'stop')
+        return det_cache_key(VERSION, self.__class__.__name__, stable_repr(cfg))
+
+    def det_checkpoint_state(self, initial=None):
+        """
+        Determine current state of installation: values of instance attributes and (raw) easyconfig parameters
+        (as Python literals), environment and current working directory.
+
+        :param initial: initial state of installation; if specified, only values that changed are retained
+        """
+        attributes = dict((key, repr(val)) for (key, val) in self.__dict__.items()
+                          if isinstance(val, CHECKPOINT_ATTRIBUTE_TYPES) and key not in CHECKPOINT_EXCLUDED_ATTRIBUTES)
+        with disable_templating(self.cfg):
+            cfg = dict((key, repr(val)) for (key, val) in self.cfg.asdict().items())
+
+        try:
+            cwd = os.getcwd()
+        except OSError:
+            cwd = None
+
+        state = {
+            'attributes': attributes,
+            'cfg': cfg,
+            'cwd': cwd,
+            'environment': dict(os.environ),
+        }
+
+        if initial is not None:
+            # only retain changed values that can be restored from their string representation
+            for key in ['attributes', 'cfg']:
+                state[key] = dict((name, txt) for (name, txt) in state[key].items()
+                                  if txt != initial[key].get(name) and is_python_literal(txt))
+
+            environ = state['environment']
+            state['environment'] = dict((var, val) for (var, val) in environ.items()
+                                        if val != initial['environment'].get(var))
+            # None value indicates that environment variable was undefined
+            state['environment'].update((var, None) for var in initial['environment'] if var not in environ)
+
+        return state
+
+    def init_checkpoint(self, steps):
+        """
+        Initialise checkpoint for this installation, in which state after each completed step is recorded;
+        when resuming an installation (see --resume), steps that were completed in previous session are taken
+        from the checkpoint for this installation, if it can be used.
+
+        Checkpoints are only recorded if --resume is used; otherwise, an existing checkpoint for the build directory
+        of this installation is stale, and is removed.
+
+        :param steps: list of steps for this installation (see get_steps)
+        """
+        path = det_checkpoint_path(self.builddir)
+
+        if not build_option('resume'):
+            if os.path.exists(path):
+                self.log.info("Removing stale checkpoint %s, since installation is not being resumed", path)
+                remove_file(path)
+            return
+
+        self.checkpoint_initial_state = self.det_checkpoint_state()
+        self.checkpoint = {
+            'builddir': self.builddir,
+            'easybuild_version': str(VERSION),
+            'fingerprint': self.det_checkpoint_fingerprint(),
+            'steps': [],
+        }
+
+        if not os.path.exists(path):
+            self.log.info("No checkpoint found at %s, so can't resume installation", path)
+            return
+
+        try:
+            checkpoint = json.loads(read_file(path))
+        except ValueError as err:
+            print_warning("Not resuming installation, failed to load checkpoint %s: %s", path, err,
+                          log=self.log, silent=self.silent)
+            return
+
+        done_steps = [step['name'] for step in checkpoint.get('steps', [])]
+        reason = None
+        if checkpoint.get('fingerprint') != self.checkpoint['fingerprint']:
+            reason = "easyconfig or easyblock changed"
+        elif checkpoint.get('builddir') != self.builddir:
+            reason = "build directory changed"
+        elif done_steps != [step[0] for step in steps[:len(done_steps)]]:
+            reason = "installation procedure changed"
+        elif not os.path.isdir(self.builddir) and CLEANUP_STEP not in done_steps:
+            reason = "build directory %s no longer exists" % self.builddir
+
+        if reason:
+            print_warning("Not resuming installation from checkpoint %s: %s", path, reason,
+                          log=self.log, silent=self.silent)
+        elif done_steps:
+            self.checkpoint['steps'] = checkpoint['steps']
+            self.resuming = True
+            msg = "resuming installation, %d steps were completed before (last step: %s)"
+            print_msg(msg % (len(done_steps), done_steps[-1]), log=self.log, silent=self.silent)
+
+    def checkpoint_step(self, step):
+        """Record state after specified (completed) step in checkpoint file for this installation."""
+        if self.checkpoint is None or self.resuming:
+            return
+
+        state = self.det_checkpoint_state(initial=self.checkpoint_initial_state)
+        self.checkpoint['steps'].append({'name': step, 'state': state})
+
+        path = det_checkpoint_path(self.checkpoint['builddir'])
+        write_file(path, json.dumps(self.checkpoint, sort_keys=True))
+        self.log.debug("Checkpoint after %s step written to %s", step, path)
+
+    def restore_checkpoint_state(self, idx):
+        """
+        Restore state of installation after step at specified index, as recorded in checkpoint.
+        """
+        step = self.checkpoint['steps'][idx]
+        self.log.info("Restoring state of installation after %s step (#%d) from checkpoint", step['name'], idx + 1)
+
+        initial, state = self.checkpoint_initial_state, step['state']
+        current = self.det_checkpoint_state()
+
+        # values that were not changed as recorded in checkpoint must be reset to initial value
+        with disable_templating(self.cfg):
+            for key in ['attributes', 'cfg']:
+                values = dict(initial[key])
+                values.update(state[key])
+                for (name, txt) in values.items():
+                    if txt != current[key].get(name):
+                        try:
+                            value = ast.literal_eval(txt)
+                        except (SyntaxError, ValueError) as err:
+                            self.log.debug("Not restoring value for '%s', can't evaluate '%s': %s", name, txt, err)
+                            continue
+
+                        if key == 'attributes':
+                            setattr(self, name, value)
+                        else:
+                            self.cfg[name] = value
+
+        environ = dict(initial['environment'])
+        environ.update(state['environment'])
+        for var in sorted(set(os.environ) | set(environ)):
+            value = environ.get(var)
+            if value != os.environ.get(var):
+                if value is None:
+                    env.unset_env_vars([var], verbose=False)
+                else:
+                    env.setvar(var, value, verbose=False)
+
+        if state['cwd'] and os.path.isdir(state['cwd']):
+            change_dir(state['cwd'])
+
+    def remove_checkpoint(self):
+        """Remove checkpoint for this installation (if any)."""
+        if self.checkpoint is not None:
+            remove_file(det_checkpoint_path(self.checkpoint['builddir']))
+
     def _skip_step(self, step, skippable):
         """Dedice whether or not to skip the specified step."""
         module_only = build_option('module_only')
@@ -3032,6 +3388,11 @@ class EasyBlock(object):
             self.log.info("Skipping %s step (skip: %s, skipsteps: %s)", step, self.skip, self.cfg['skipsteps'])
             skip = True
 
+        # skip steps that are covered by installation that was restored from build cache
+        elif self.build_cache_module_txt is not None and step not in BUILD_CACHE_STEPS:
+            self.log.info("Skipping %s step (installation restored from build cache)", step)
+            skip = True
+
         # skip step when only generating module file
         # * still run sanity check without use of force
         # * always run ready & prepare step to set up toolchain + deps
@@ -3084,6 +3445,8 @@ class EasyBlock(object):
 
         run_hook(step, self.hooks, post_step_hook=True, args=[self])
 
+        self.checkpoint_step(step)
+
         if self.cfg['stop'] == step:
             self.log.info("Stopping after %s step.", step)
             raise StopException(step)
@@ -3215,17 +3578,59 @@ class EasyBlock(object):
             # create lock to avoid that another installation running in parallel messes things up
             create_lock(lock_name)
 
+        if build_option('profile') and not self.dry_run:
+            self.profiler = StepProfiler()
+
+        use_build_cache = build_option('use_build_cache') and not self.dry_run and not self.skip
+        use_build_cache = use_build_cache and not build_option('module_only') and not self.cfg['stop']
+
         try:
-            for (step_name, descr, step_methods, skippable) in steps:
+            if use_build_cache:
+                self.build_cache_key = det_build_cache_key(self)
+                self.build_cache_module_txt = restore_from_build_cache(self, self.build_cache_key)
+                if self.build_cache_module_txt is not None:
+                    print_msg("restored installation from build cache", log=self.log, silent=self.silent)
+
+            # keep track of completed steps in checkpoint if --resume is used, so installation can be resumed,
+            # unless (most) steps are skipped anyway
+            if not (self.dry_run or build_option('module_only') or self.build_cache_module_txt is not None):
+                self.init_checkpoint(steps)
+
+            for (idx, (step_name, descr, step_methods, skippable)) in enumerate(steps):
+                if self.resuming:
+                    if idx == len(self.checkpoint['steps']):
+                        # continue installation from state after last completed step
+                        self.restore_checkpoint_state(idx - 1)
+                        self.resuming = False
+                    elif step_name in RESUME_STEPS:
+                        # steps that set up build environment are performed again, starting from recorded state
+                        if idx > 0:
+                            self.restore_checkpoint_state(idx - 1)
+                    else:
+                        print_msg("%s [completed before]" % descr, log=self.log, silent=self.silent)
+                        continue
+
                 if self._skip_step(step_name, skippable):
                     print_msg("%s [skipped]" % descr, log=self.log, silent=self.silent)
+                    self.checkpoint_step(step_name)
                 else:
                     if self.dry_run:
                         self.dry_run_msg("%s... [DRY RUN]\n", descr)
                     else:
                         print_msg("%s..." % descr, log=self.log, silent=self.silent)
                     self.current_step = step_name
-                    self.run_step(step_name, step_methods)
+                    if self.profiler is None:
+                        self.run_step(step_name, step_methods)
+                    else:
+                        with self.profiler.step(step_name):
+                            self.run_step(step_name, step_methods)
+
+            if use_build_cache and self.build_cache_module_txt is None:
+                store_in_build_cache(self, self.build_cache_key)
+
+            # installation completed, so checkpoint is no longer needed
+            self.resuming = False
+            self.remove_checkpoint()
 
         except StopException:
             pass
@@ -3237,6 +3642,23 @@ class EasyBlock(object):
         return True
 
 
+def det_checkpoint_path(builddir):
+    """Determine path to checkpoint file for installation that uses specified build directory (see --resume)."""
+    topdir = os.path.abspath(build_path())
+    name = os.path.relpath(builddir, topdir).replace(os.path.sep, '_')
+    return os.path.join(topdir, CHECKPOINTS_SUBDIR, name + '.json')
+
+
+def is_python_literal(txt):
+    """Check whether specified string represents a Python literal (that can be evaluated via ast.literal_eval)."""
+    try:
+        ast.literal_eval(txt)
+        res = True
+    except (SyntaxError, ValueError):
+        res = False
+    return res
+
+
 def print_dry_run_note(loc, silent=True):
     """Print note on interpreting dry run output."""
     msg = '\n'.join([
@@ -3397,6 +3819,7 @@ def build_and_install_one(ecdict, init_env):
         log_fn = os.path.basename(get_log_filename(app.name, app.version))
         application_log = os.path.join(new_log_dir, log_fn)
         move_logs(app.logfile, application_log)
+        app.dump_profile(application_log)
 
         newspec = os.path.join(new_log_dir, app.cfg.filename())
         copy_file(spec, newspec)
@@ -3431,6 +3854,7 @@ def build_and_install_one(ecdict, init_env):
         # cleanup logs
         app.close_log()
         application_log = app.logfile
+        app.dump_profile(application_log)
 
     req_time = time2str(end_timestamp - start_timestamp)
     print_msg("%s: Installation %s %s (took %s)" % (summary, ended, succ, req_time), log=_log, silent=silent)
@@ -3535,7 +3959,7 @@ def get_easyblock_instance(ecdict):
 def build_easyconfigs(easyconfigs, output_dir, test_results):
     """Build the list of easyconfigs."""
 
-    build_stopped = []
+    build_stopped = set()
 
     # sanitize environment before initialising easyblocks
     sanitize_env()
@@ -3578,8 +4002,8 @@ def build_easyconfigs(easyconfigs, output_dir, test_results):
                     tb = traceback.format_exc()
                     fullerr = '\n'.join([tb, str(err)])
                 test_results.append((app, app.current_step, fullerr, applog))
-                # keep a dict of so we can check in O(1) if objects can still be build
-                build_stopped.append(app)
+                # keep a set so we can check in O(1) if objects can still be build
+                build_stopped.add(app)
 
             # close log and move it
             app.close_log()
@@ -42,6 +42,7 @@ Easyconfig module that contains the EasyConfig class.
 import copy
 import difflib
 import functools
+import hashlib
 import os
 import re
 from distutils.version import LooseVersion
@@ -61,12 +62,13 @@ from easybuild.framework.easyconfig.parser import DEPRECATED_PARAMETERS, REPLACE
 from easybuild.framework.easyconfig.parser import EasyConfigParser, fetch_parameters_from_easyconfig
 from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS, template_constant_dict
 from easybuild.tools.build_log import EasyBuildError, print_warning, print_msg
+from easybuild.tools.cache import PersistentCache, det_cache_key, det_cache_path
 from easybuild.tools.config import GENERIC_EASYBLOCK_PKG, LOCAL_VAR_NAMING_CHECK_ERROR, LOCAL_VAR_NAMING_CHECK_LOG
 from easybuild.tools.config import LOCAL_VAR_NAMING_CHECK_WARN
 from easybuild.tools.config import Singleton, build_option, get_module_naming_scheme
 from easybuild.tools.filetools import convert_name, copy_file, create_index, decode_class_name, encode_class_name
 from easybuild.tools.filetools import find_backup_name_candidate, find_easyconfigs, load_index
-from easybuild.tools.filetools import read_file, write_file
+from easybuild.tools.filetools import read_file, remove_dir, write_file
 from easybuild.tools.hooks import PARSE, load_hooks, run_hook
 from easybuild.tools.module_naming_scheme.mns import DEVEL_MODULE_SUFFIX
 from easybuild.tools.module_naming_scheme.utilities import avail_module_naming_schemes, det_full_ec_version
@@ -77,8 +79,9 @@ from easybuild.tools.systemtools import check_os_dependency, pick_dep_version
 from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME, is_system_toolchain
 from easybuild.tools.toolchain.toolchain import TOOLCHAIN_CAPABILITIES, TOOLCHAIN_CAPABILITY_CUDA
 from easybuild.tools.toolchain.utilities import get_toolchain, search_toolchain
-from easybuild.tools.utilities import flatten, get_class_for, nub, quote_py_str, remove_unwanted_chars
-from easybuild.tools.version import VERSION
+from easybuild.tools.utilities import det_class_source_digest, flatten, get_class_for, nub, quote_py_str
+from easybuild.tools.utilities import remove_unwanted_chars, stable_repr
+from easybuild.tools.version import EASYBLOCKS_VERSION, VERSION
 from easybuild.toolchains.compiler.cuda import Cuda
 
 _log = fancylogger.getLogger('easyconfig.easyconfig', fname=False)
@@ -96,6 +99,12 @@ EASYCONFIGS_ARCHIVE_DIR = '__archive__'
 # prefix for names of local variables in easyconfig files
 LOCAL_VAR_PREFIX = 'local_'
 
+# regex to escape '%' characters in values that are not part of a template like '%(name)s' (see resolve_template)
+TEMPLATE_ESCAPE_REGEX = re.compile(r'(%)(?!%*\(\w+\)s)')
+
+# types of easyconfig parameter values that may be changed in place (tuples may include lists or dicts)
+MUTABLE_TYPES = (dict, list, set, tuple)
+
 
 try:
     import autopep8
@@ -105,9 +114,29 @@ except ImportError as err:
     HAVE_AUTOPEP8 = False
 
 
+# build options that (may) affect the result of processing an easyconfig file,
+# which must be taken into account when determining keys for persistent cache of parsed easyconfig files
+# (cuda_compute_capabilities is included since it's used for template values)
+EASYCONFIGS_CACHE_BUILD_OPTIONS = ['check_osdeps', 'cuda_compute_capabilities', 'filter_deps', 'hide_deps',
+                                   'hide_toolchains', 'include_easyblocks', 'include_easyblocks_from_pr',
+                                   'include_module_naming_schemes', 'include_toolchains', 'local_var_naming_check',
+                                   'map_toolchains', 'valid_module_classes', 'valid_stops', 'validate']
+
+# build options that (may) affect toolchain hierarchies (on top of EASYCONFIGS_CACHE_BUILD_OPTIONS),
+# which must be taken into account when determining keys for persistent cache of toolchain hierarchies
+TOOLCHAIN_HIERARCHY_CACHE_BUILD_OPTIONS = ['add_dummy_to_minimal_toolchains', 'add_system_to_minimal_toolchains',
+                                           'consider_archived_easyconfigs', 'minimal_toolchains', 'robot_path']
+
+_class_source_digests = {}
 _easyconfig_files_cache = {}
 _easyconfigs_cache = {}
+_easyconfigs_lookups = {}
 _path_indexes = {}
+_persistent_easyconfigs_caches = {}
+_persistent_toolchain_hierarchy_caches = {}
+
+# stack of dictionaries in which results of robot_find_easyconfig are recorded (see toolchain_hierarchy_cache)
+_robot_find_easyconfig_recorders = []
 
 
 def handle_deprecated_or_replaced_easyconfig_parameters(ec_method):
@@ -196,8 +225,39 @@ def triage_easyconfig_params(variables, ec):
     return ec_params, unknown_keys
 
 
+@contextmanager
+def record_easyconfig_lookups():
+    """
+    Context manager to record results of robot_find_easyconfig, which yields a dictionary with
+    (name, version) tuples as keys and the corresponding easyconfig file path (or None) as values.
+    Recorded results are also passed on to the enclosing recording context (if any).
+    """
+    ec_lookups = {}
+    _robot_find_easyconfig_recorders.append(ec_lookups)
+    try:
+        yield ec_lookups
+    finally:
+        _robot_find_easyconfig_recorders.pop()
+
+    replay_easyconfig_lookups(ec_lookups)
+
+
+def replay_easyconfig_lookups(ec_lookups):
+    """Pass specified results of robot_find_easyconfig on to active recording contexts (if any)."""
+    for recorder in _robot_find_easyconfig_recorders:
+        recorder.update(ec_lookups)
+
+
 def toolchain_hierarchy_cache(func):
-    """Function decorator to cache (and retrieve cached) toolchain hierarchy queries."""
+    """
+    Function decorator to cache (and retrieve cached) toolchain hierarchy queries.
+
+    Toolchain hierarchies are cached in memory, and in a persistent on-disk cache if it is enabled
+    (see get_persistent_toolchain_hierarchy_cache). The easyconfig files that were located via robot_find_easyconfig
+    to determine a toolchain hierarchy are recorded along with it (with a digest of their contents),
+    so entries in the persistent cache can be invalidated when any of those easyconfig files changes.
+    """
+    # values are tuples with toolchain hierarchy and dictionary with easyconfig lookups
     cache = {}
 
     @functools.wraps(func)
@@ -207,12 +267,42 @@ def toolchain_hierarchy_cache(func):
 
         # fetch from cache if available, cache it if it's not
         if cache_key in cache:
-            _log.debug("Using cache to return hierarchy for toolchain %s: %s", str(toolchain), cache[cache_key])
-            return cache[cache_key]
+            toolchain_hierarchy, ec_lookups = cache[cache_key]
+            _log.debug("Using cache to return hierarchy for toolchain %s: %s", str(toolchain), toolchain_hierarchy)
+            replay_easyconfig_lookups(ec_lookups)
+            return toolchain_hierarchy
+
+        # results that depend on which modules are available are not eligible for the persistent cache,
+        # so it's not used at all when existing modules are taken into account
+        if build_option('use_existing_modules'):
+            persistent_cache = None
         else:
+            persistent_cache = get_persistent_toolchain_hierarchy_cache()
+
+        if persistent_cache:
+            persistent_key = det_persistent_toolchain_hierarchy_cache_key(toolchain, incl_capabilities)
+            entry = persistent_cache.get(persistent_key)
+            # check_toolchain_hierarchy_cache_entry also records easyconfig lookups (via robot_find_easyconfig)
+            if entry is not None and check_toolchain_hierarchy_cache_entry(entry):
+                _log.debug("Using persistent cache to return hierarchy for toolchain %s: %s",
+                           str(toolchain), entry['hierarchy'])
+                cache[cache_key] = (entry['hierarchy'], entry['ec_lookups'])
+                return entry['hierarchy']
+
+        with record_easyconfig_lookups() as ec_lookups:
             toolchain_hierarchy = func(toolchain, incl_capabilities)
-            cache[cache_key] = toolchain_hierarchy
-            return cache[cache_key]
+
+        cache[cache_key] = (toolchain_hierarchy, ec_lookups)
+
+        if persistent_cache:
+            entry = {
+                'hierarchy': toolchain_hierarchy,
+                'ec_lookups': ec_lookups,
+                'ec_digests': dict((path, det_cache_key(read_file(path))) for path in ec_lookups.values() if path),
+            }
+            persistent_cache.put(persistent_key, entry)
+
+        return toolchain_hierarchy
 
     # Expose clear method of cache to wrapped function
     cache_aware_func.clear = cache.clear
@@ -385,6 +475,60 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
     return toolchain_hierarchy
 
 
+class TemplateValues(dict):
+    """
+    Dictionary of template values, which also keeps track of string values that were resolved using it
+    (see resolve_template); cached resolved values are discarded whenever the template values are changed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Constructor."""
+        dict.__init__(self, *args, **kwargs)
+        self.resolved = {}
+        # number of times template values were changed
+        self.changes = 0
+
+    def _changed(self):
+        """Discard cached resolved values, since template values are being changed."""
+        self.resolved = {}
+        self.changes = getattr(self, 'changes', 0) + 1
+
+    def __setitem__(self, key, value):
+        """Set template value, discard cached resolved values."""
+        self._changed()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        """Delete template value, discard cached resolved values."""
+        self._changed()
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        """Clear template values, discard cached resolved values."""
+        self._changed()
+        dict.clear(self)
+
+    def pop(self, *args):
+        """Pop template value, discard cached resolved values."""
+        self._changed()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        """Pop template value, discard cached resolved values."""
+        self._changed()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        """Set template value if it's not set yet, discard cached resolved values."""
+        self._changed()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        """Update template values, discard cached resolved values."""
+        self._changed()
+        dict.update(self, *args, **kwargs)
+
+
 @contextmanager
 def disable_templating(ec):
     """Temporarily disable templating on the given EasyConfig
@@ -421,9 +565,15 @@ class EasyConfig(object):
                                          in case they are wrong
         :param local_var_naming_check: mode to use when checking if local variables use the recommended naming scheme
         """
-        self.template_values = None
+        self._template_values = None
         self.enable_templating = True  # a boolean to control templating
 
+        # fingerprint for this easyconfig (see 'fingerprint' property), only determined when needed
+        self._fingerprint = None
+        # names of easyconfig parameters for which a reference to the actual (mutable) value was handed out,
+        # since those values may be changed in place at any time
+        self._raw_refs = set()
+
         self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
 
         if path is not None and not os.path.isfile(path):
@@ -437,13 +587,14 @@ class EasyConfig(object):
             self.log.debug("Raw contents from supplied easyconfig file %s: %s", path, self.rawtxt)
         else:
             self.rawtxt = rawtxt
-            self.log.debug("Supplied raw easyconfig contents: %s" % self.rawtxt)
+            self.log.debug("Supplied raw easyconfig contents: %s", self.rawtxt)
 
         # constructing easyconfig parser object includes a "raw" parse,
         # which serves as a check to see whether supplied easyconfig file is an actual easyconfig...
         self.log.info("Performing quick parse to check for valid easyconfig file...")
-        self.parser = EasyConfigParser(filename=self.path, rawcontent=self.rawtxt,
-                                       auto_convert_value_types=auto_convert_value_types)
+        self.auto_convert_value_types = auto_convert_value_types
+        self._parser = EasyConfigParser(filename=self.path, rawcontent=self.rawtxt,
+                                        auto_convert_value_types=auto_convert_value_types)
 
         self.modules_tool = modules_tool()
 
@@ -508,6 +659,9 @@ class EasyConfig(object):
         # filter hidden dependencies from list of dependencies
         self.filter_hidden_deps()
 
+        # references to actual values that were handed out while parsing & filtering are only used internally
+        self._raw_refs.clear()
+
         self._all_dependencies = None
 
         # keep track of whether the generated module file should be hidden
@@ -525,6 +679,35 @@ class EasyConfig(object):
 
         self.software_license = None
 
+    def __getstate__(self):
+        """
+        Return state of this EasyConfig instance for pickling,
+        excluding attributes that can not be serialized (logger, parser, modules tool, toolchain).
+        """
+        state = self.__dict__.copy()
+        for key in ['log', '_parser', 'modules_tool', '_toolchain']:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore state of this EasyConfig instance, re-creating the attributes that were not serialized."""
+        self.__dict__.update(state)
+        self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
+        # parser is only re-created when it is actually needed (see 'parser' property)
+        self._parser = None
+        self.modules_tool = modules_tool()
+        self._toolchain = None
+
+    @property
+    def parser(self):
+        """
+        Return parser for this easyconfig file (created on demand, for example after unpickling)
+        """
+        if self._parser is None:
+            self._parser = EasyConfigParser(filename=self.path, rawcontent=self.rawtxt,
+                                            auto_convert_value_types=self.auto_convert_value_types)
+        return self._parser
+
     def filename(self):
         """Determine correct filename for this easyconfig file."""
 
@@ -549,6 +732,7 @@ class EasyConfig(object):
                     self.log.debug("Added new easyconfig parameter: %s", key)
                 else:
                     self.log.debug("Easyconfig parameter %s already known, not overwriting", key)
+        self._fingerprint = None
 
         # extend mandatory keys
         for key, value in extra.items():
@@ -556,6 +740,55 @@ class EasyConfig(object):
                 self.mandatory.append(key)
         self.log.debug("Updated list of mandatory easyconfig parameters: %s", self.mandatory)
 
+    @property
+    def template_values(self):
+        """Template values for this easyconfig (TemplateValues instance, or None if not generated yet)."""
+        return self._template_values
+
+    @template_values.setter
+    def template_values(self, value):
+        """Set template values; values that were resolved using previous template values are discarded."""
+        if value is not None and not isinstance(value, TemplateValues):
+            value = TemplateValues(value)
+        self._template_values = value
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """
+        Fingerprint for this easyconfig: SHA256 digest of (a stable representation of) the easyconfig parameter values,
+        as returned by asdict. Determined lazily, and re-determined when easyconfig parameter values or template
+        values were changed, or when templating is enabled/disabled.
+        """
+        if self._fingerprint is not None:
+            (enable_templating, tmpl_changes, raw_ref_reprs, fingerprint) = self._fingerprint
+            if enable_templating == self.enable_templating:
+                if tmpl_changes == getattr(self.template_values, 'changes', None):
+                    # values for which a reference was handed out (see get_ref) may have been changed in place,
+                    # so only those need to be checked
+                    if raw_ref_reprs == self._raw_ref_reprs():
+                        return fingerprint
+
+        if self.enable_templating:
+            values = self.asdict()
+        else:
+            # don't use asdict here, since that hands out references to the actual values
+            values = dict((key, tup[0]) for (key, tup) in self._config.items())
+
+        # asdict may result in template values being generated, so only determine state afterwards
+        fingerprint = hashlib.sha256(stable_repr(values).encode('utf-8')).hexdigest()
+        tmpl_changes = getattr(self.template_values, 'changes', None)
+        self._fingerprint = (self.enable_templating, tmpl_changes, self._raw_ref_reprs(), fingerprint)
+
+        return fingerprint
+
+    def _raw_ref_reprs(self):
+        """
+        Return stable representation of (untemplated) values of easyconfig parameters for which a reference
+        to the actual value was handed out.
+        """
+        return dict((key, stable_repr(self._config[key][0])) for key in self._raw_refs if key in self._config)
+
     def copy(self, validate=None):
         """
         Return a copy of this EasyConfig instance.
@@ -567,6 +800,9 @@ class EasyConfig(object):
         ec = EasyConfig(self.path, validate=validate, hidden=self.hidden, rawtxt=self.rawtxt)
         # take a copy of the actual config dictionary (which already contains the extra options)
         ec._config = copy.deepcopy(self._config)
+        # references that were handed out while creating the new instance don't point to the copied values
+        ec._raw_refs = set()
+        ec._fingerprint = None
         # since rawtxt is defined, self.path may not get inherited, make sure it does
         if self.path:
             ec.path = self.path
@@ -657,12 +893,13 @@ class EasyConfig(object):
         else:
             raise EasyBuildError("Specifications should be specified using a dictionary, got %s",
                                  type(self.build_specs))
-        self.log.debug("Obtained specs dict %s" % arg_specs)
+        self.log.debug("Obtained specs dict %s", arg_specs)
 
-        self.log.info("Parsing easyconfig file %s with rawcontent: %s", self.path, self.rawtxt)
+        # raw contents is already logged (at debug level) when easyconfig file is read, see __init__
+        self.log.info("Parsing easyconfig file %s", self.path)
         self.parser.set_specifications(arg_specs)
         ec_vars = self.parser.get_config_dict()
-        self.log.debug("Parsed easyconfig as a dictionary: %s" % ec_vars)
+        self.log.debug("Parsed easyconfig as a dictionary: %s", ec_vars)
 
         # make sure all mandatory parameters are defined
         # this includes both generic mandatory parameters and software-specific parameters defined via extra_options
@@ -728,6 +965,7 @@ class EasyConfig(object):
 
         # indicate that this is a parsed easyconfig
         self._config['parsed'] = [True, "This is a parsed easyconfig", "HIDDEN"]
+        self._fingerprint = None
 
     def local_var_naming(self, local_var_naming_check):
         """Deal with local variables that do not follow the recommended naming scheme (if any)."""
@@ -1678,6 +1916,9 @@ class EasyConfig(object):
             if self.template_values is None or len(self.template_values) == 0:
                 self.generate_template_values()
             value = resolve_template(value, self.template_values)
+        elif isinstance(value, MUTABLE_TYPES):
+            # a reference to the actual value is returned, which may be changed in place (now or later)
+            self._raw_refs.add(key)
 
         return value
 
@@ -1703,6 +1944,7 @@ class EasyConfig(object):
         """Set value of specified easyconfig parameter (help text & co is left untouched)"""
         if key in self._config:
             self._config[key][0] = value
+            self._fingerprint = None
         else:
             raise EasyBuildError("Use of unknown easyconfig parameter '%s' when setting parameter value to '%s'",
                                  key, value)
@@ -1721,29 +1963,21 @@ class EasyConfig(object):
     # *both* __eq__ and __ne__ must be implemented for == and != comparisons to work correctly
     # see also https://docs.python.org/2/reference/datamodel.html#object.__eq__
     def __eq__(self, ec):
-        """Is this EasyConfig instance equivalent to the provided one?"""
-        return self.asdict() == ec.asdict()
+        """
+        Is this EasyConfig instance equivalent to the provided one?
+
+        Comparison is based on fingerprints, so easyconfig parameter values must have the same (stable) representation
+        to be considered equivalent; for example, 1 and 1.0 (or a list and a tuple with the same items) are different.
+        """
+        return self.fingerprint == ec.fingerprint
 
     def __ne__(self, ec):
-        """Is this EasyConfig instance equivalent to the provided one?"""
-        return self.asdict() != ec.asdict()
+        """Is this EasyConfig instance not equivalent to the provided one? (see also __eq__)"""
+        return self.fingerprint != ec.fingerprint
 
     def __hash__(self):
-        """Return hash value for a hashable representation of this EasyConfig instance."""
-        def make_hashable(val):
-            """Make a hashable value of the given value."""
-            if isinstance(val, list):
-                val = tuple([make_hashable(x) for x in val])
-            elif isinstance(val, dict):
-                val = tuple([(key, make_hashable(val)) for (key, val) in sorted(val.items())])
-            return val
-
-        lst = []
-        for (key, val) in sorted(self.asdict().items()):
-            lst.append((key, make_hashable(val)))
-
-        # a list is not hashable, but a tuple is
-        return hash(tuple(lst))
+        """Return hash value for this EasyConfig instance, based on its fingerprint."""
+        return hash(self.fingerprint)
 
     def asdict(self):
         """
@@ -1757,6 +1991,11 @@ class EasyConfig(object):
                     self.generate_template_values()
                 value = resolve_template(value, self.template_values)
             res[key] = value
+
+        if not self.enable_templating:
+            # references to the actual values are returned, which may be changed in place (now or later)
+            self._raw_refs.update(key for (key, value) in res.items() if isinstance(value, MUTABLE_TYPES))
+
         return res
 
 
@@ -1886,41 +2125,55 @@ def get_module_path(name, generic=None, decode=True):
     return '.'.join(modpath + [module_name])
 
 
+def _resolve_template_str(value, tmpl_dict):
+    """Substitute templated strings in specified string value with actual values."""
+    # simple escaping, making all '%foo', '%%foo', '%%%foo' post-templates values available,
+    #         but ignore a string like '%(name)s'
+    # behaviour of strings like '%(name)s',
+    #   make sure that constructs like %%(name)s are preserved
+    #   higher order escaping in the original text is considered advanced users only,
+    #   and a big no-no otherwise. It indicates that want some new functionality
+    #   in easyconfigs, so just open an issue for it.
+    #   detailed behaviour:
+    #     if a an odd number of % prefixes the (name)s,
+    #     we assume that templating is assumed and the behaviour is as follows
+    #     '%(name)s' -> '%(name)s', and after templating with {'name':'x'} -> 'x'
+    #     '%%%(name)s' -> '%%%(name)s', and after templating with {'name':'x'} -> '%x'
+    #     if a an even number of % prefixes the (name)s,
+    #     we assume that no templating is desired and the behaviour is as follows
+    #     '%%(name)s' -> '%%(name)s', and after templating with {'name':'x'} -> '%(name)s'
+    #     '%%%%(name)s' -> '%%%%(name)s', and after templating with {'name':'x'} -> '%%(name)s'
+    # examples:
+    # '10%' -> '10%%'
+    # '%s' -> '%%s'
+    # '%%' -> '%%%%'
+    # '%(name)s' -> '%(name)s'
+    # '%%(name)s' -> '%%(name)s'
+    value = TEMPLATE_ESCAPE_REGEX.sub(r'\1\1', value)
+
+    try:
+        value = value % tmpl_dict
+    except KeyError:
+        _log.warning("Unable to resolve template value %s with dict %s", value, tmpl_dict)
+
+    return value
+
+
 def resolve_template(value, tmpl_dict):
     """Given a value, try to susbstitute the templated strings with actual values.
         - value: some python object (supported are string, tuple/list, dict or some mix thereof)
         - tmpl_dict: template dictionary
     """
     if isinstance(value, string_type):
-        # simple escaping, making all '%foo', '%%foo', '%%%foo' post-templates values available,
-        #         but ignore a string like '%(name)s'
-        # behaviour of strings like '%(name)s',
-        #   make sure that constructs like %%(name)s are preserved
-        #   higher order escaping in the original text is considered advanced users only,
-        #   and a big no-no otherwise. It indicates that want some new functionality
-        #   in easyconfigs, so just open an issue for it.
-        #   detailed behaviour:
-        #     if a an odd number of % prefixes the (name)s,
-        #     we assume that templating is assumed and the behaviour is as follows
-        #     '%(name)s' -> '%(name)s', and after templating with {'name':'x'} -> 'x'
-        #     '%%%(name)s' -> '%%%(name)s', and after templating with {'name':'x'} -> '%x'
-        #     if a an even number of % prefixes the (name)s,
-        #     we assume that no templating is desired and the behaviour is as follows
-        #     '%%(name)s' -> '%%(name)s', and after templating with {'name':'x'} -> '%(name)s'
-        #     '%%%%(name)s' -> '%%%%(name)s', and after templating with {'name':'x'} -> '%%(name)s'
-        # examples:
-        # '10%' -> '10%%'
-        # '%s' -> '%%s'
-        # '%%' -> '%%%%'
-        # '%(name)s' -> '%(name)s'
-        # '%%(name)s' -> '%%(name)s'
         if '%' in value:
-            value = re.sub(re.compile(r'(%)(?!%*\(\w+\)s)'), r'\1\1', value)
-
-            try:
-                value = value % tmpl_dict
-            except KeyError:
-                _log.warning("Unable to resolve template value %s with dict %s", value, tmpl_dict)
+            # strings that were already resolved with these template values are cached (see TemplateValues)
+            resolved = getattr(tmpl_dict, 'resolved', None)
+            if resolved is None:
+                value = _resolve_template_str(value, tmpl_dict)
+            else:
+                if value not in resolved:
+                    resolved[value] = _resolve_template_str(value, tmpl_dict)
+                value = resolved[value]
     else:
         # this block deals with references to objects and returns other references
         # for reading this is ok, but for self['x'] = {}
@@ -1944,6 +2197,164 @@ def resolve_template(value, tmpl_dict):
     return value
 
 
+def get_persistent_easyconfigs_cache():
+    """
+    Return interface to persistent cache for parsed easyconfig files, or None if it is not enabled.
+    """
+    res = None
+    if build_option('easyconfigs_cache'):
+        path = build_option('easyconfigs_cache_dir') or det_cache_path('ecs')
+        max_size = build_option('easyconfigs_cache_max_size') * 1024 * 1024
+        key = (path, max_size)
+        if key not in _persistent_easyconfigs_caches:
+            _log.info("Using persistent cache for parsed easyconfig files at %s (max. size: %d bytes)",
+                      path, max_size)
+            _persistent_easyconfigs_caches[key] = PersistentCache(path, max_size=max_size)
+        res = _persistent_easyconfigs_caches[key]
+
+    return res
+
+
+def read_hooks_file():
+    """Return contents of hooks file that is being used (if any), or None."""
+    hooks_path = build_option('hooks')
+    if hooks_path and os.path.isfile(hooks_path):
+        hooks_txt = read_file(hooks_path)
+    else:
+        hooks_txt = None
+
+    return hooks_txt
+
+
+def det_source_digest(klass):
+    """
+    Determine digest for source code of specified class (incl. parent classes);
+    digests are cached, since the source code of a class that was already imported doesn't change.
+    """
+    if klass not in _class_source_digests:
+        _class_source_digests[klass] = det_class_source_digest(klass)
+    return _class_source_digests[klass]
+
+
+def det_persistent_easyconfigs_cache_key(path, validate, hidden, parse_only):
+    """
+    Determine key for entry in persistent cache of parsed easyconfig files,
+    based on contents of easyconfig file, EasyBuild version, active build options, hooks,
+    and source code of easyblock, toolchains and module naming scheme that are used.
+    """
+    hooks_txt = read_hooks_file()
+
+    build_opts = [(key, build_option(key)) for key in EASYCONFIGS_CACHE_BUILD_OPTIONS]
+
+    ectxt = read_file(path)
+
+    # easyblock determines which custom easyconfig parameters are available;
+    # the digest also covers changes to included easyblocks (cfr. --include-easyblocks)
+    name, easyblock = fetch_parameters_from_easyconfig(ectxt, ['name', 'easyblock'])
+    try:
+        easyblock_class = get_easyblock_class(easyblock, name=name, error_on_failed_import=False,
+                                              error_on_missing_easyblock=False)
+    except EasyBuildError as err:
+        # error will be reported when easyconfig file is parsed
+        _log.debug("Failed to determine easyblock class for %s: %s", path, err)
+        easyblock_class = None
+
+    easyblock_digest = None
+    if easyblock_class is not None:
+        easyblock_digest = det_source_digest(easyblock_class)
+
+    _, all_tc_classes = search_toolchain('')
+    tc_digests = sorted(det_source_digest(tc_class) for tc_class in all_tc_classes)
+
+    mns_digest = det_source_digest(ActiveMNS().mns.__class__)
+
+    return det_cache_key(ectxt, path, VERSION, EASYBLOCKS_VERSION, get_module_naming_scheme(),
+                         build_opts, validate, hidden, parse_only, hooks_txt,
+                         easyblock_digest, tc_digests, mns_digest)
+
+
+def is_persistent_easyconfigs_cache_eligible(easyconfigs):
+    """
+    Determine whether processed easyconfigs can be stored in persistent cache of parsed easyconfig files.
+
+    Results that depend on the state of the system (loaded/available modules, easyconfig files in robot search path)
+    or which trigger warnings that would get lost when they are obtained from the cache are not eligible.
+    """
+    if build_option('minimal_toolchains'):
+        return False
+
+    for easyconfig in easyconfigs:
+        ec = easyconfig['ec']
+        if ec['deprecated'] or any(dep.get('external_module') for dep in ec.dependencies()):
+            return False
+
+    return True
+
+
+def get_persistent_toolchain_hierarchy_cache():
+    """
+    Return interface to persistent cache for toolchain hierarchies, or None if it is not enabled.
+    """
+    res = None
+    if build_option('toolchain_hierarchy_cache'):
+        path = build_option('toolchain_hierarchy_cache_dir') or det_cache_path('toolchain-hierarchy')
+        if path not in _persistent_toolchain_hierarchy_caches:
+            _log.info("Using persistent cache for toolchain hierarchies at %s", path)
+            _persistent_toolchain_hierarchy_caches[path] = PersistentCache(path)
+        res = _persistent_toolchain_hierarchy_caches[path]
+
+    return res
+
+
+def clear_persistent_toolchain_hierarchy_cache():
+    """
+    Clear persistent cache for toolchain hierarchies (and toolchain hierarchies cached in memory).
+
+    :return: location of persistent cache for toolchain hierarchies
+    """
+    path = build_option('toolchain_hierarchy_cache_dir') or det_cache_path('toolchain-hierarchy')
+    if os.path.exists(path):
+        remove_dir(path)
+    _log.info("Cleared persistent cache for toolchain hierarchies at %s", path)
+
+    get_toolchain_hierarchy.clear()
+
+    return path
+
+
+def det_persistent_toolchain_hierarchy_cache_key(toolchain, incl_capabilities):
+    """
+    Determine key for entry in persistent cache of toolchain hierarchies,
+    based on the toolchain, EasyBuild version, available toolchain classes, active build options and hooks.
+    """
+    _, all_tc_classes = search_toolchain('')
+    tc_classes = sorted((tc_class.__module__, tc_class.__name__) for tc_class in all_tc_classes)
+
+    build_opts = [(key, build_option(key)) for key in TOOLCHAIN_HIERARCHY_CACHE_BUILD_OPTIONS]
+    build_opts.extend((key, build_option(key)) for key in EASYCONFIGS_CACHE_BUILD_OPTIONS)
+
+    return det_cache_key('toolchain-hierarchy', toolchain['name'], toolchain['version'], incl_capabilities,
+                         VERSION, EASYBLOCKS_VERSION, tc_classes, build_opts, read_hooks_file())
+
+
+def check_toolchain_hierarchy_cache_entry(entry):
+    """
+    Check whether entry from persistent cache of toolchain hierarchies is still valid,
+    i.e. whether the easyconfig files that were used to determine the toolchain hierarchy are still the same.
+    """
+    for (name, version), path in sorted(entry['ec_lookups'].items()):
+        curr_path = robot_find_easyconfig(name, version)
+        if curr_path != path:
+            _log.debug("Easyconfig file for %s v%s has changed from %s to %s, so cache entry is invalid",
+                       name, version, path, curr_path)
+            return False
+        elif path and det_cache_key(read_file(path)) != entry['ec_digests'].get(path):
+            _log.debug("Contents of easyconfig file %s has changed, so cache entry is invalid", path)
+            return False
+
+    return True
+
+
 def process_easyconfig(path, build_specs=None, validate=True, parse_only=False, hidden=None):
     """
     Process easyconfig, returning some information for each block
@@ -1963,58 +2374,83 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
     if build_specs is None:
         cache_key = (path, validate, hidden, parse_only)
         if cache_key in _easyconfigs_cache:
+            # easyconfig lookups made while processing this easyconfig file are relevant to active recorders
+            replay_easyconfig_lookups(_easyconfigs_lookups.get(cache_key, {}))
             return [e.copy() for e in _easyconfigs_cache[cache_key]]
 
-    easyconfigs = []
-    for spec in blocks:
-        # process for dependencies and real installversionname
-        _log.debug("Processing easyconfig %s" % spec)
-
-        # create easyconfig
-        try:
-            ec = EasyConfig(spec, build_specs=build_specs, validate=validate, hidden=hidden)
-        except EasyBuildError as err:
-            raise EasyBuildError("Failed to process easyconfig %s: %s", spec, err.msg)
-
-        name = ec['name']
-
-        easyconfig = {
-            'ec': ec,
-        }
-        easyconfigs.append(easyconfig)
-
-        if not parse_only:
-            # also determine list of dependencies, module name (unless only parsed easyconfigs are requested)
-            easyconfig.update({
-                'spec': ec.path,
-                'short_mod_name': ec.short_mod_name,
-                'full_mod_name': ec.full_mod_name,
-                'dependencies': [],
-                'builddependencies': [],
-                'hiddendependencies': [],
-                'hidden': ec.hidden,
-            })
-            if len(blocks) > 1:
-                easyconfig['original_spec'] = path
-
-            # add build dependencies
-            for dep in ec['builddependencies']:
-                _log.debug("Adding build dependency %s for app %s." % (dep, name))
-                easyconfig['builddependencies'].append(dep)
-
-            # add dependencies (including build & hidden dependencies)
-            for dep in ec.dependencies():
-                _log.debug("Adding dependency %s for app %s." % (dep, name))
-                easyconfig['dependencies'].append(dep)
-
-            # add toolchain as dependency too
-            if not is_system_toolchain(ec['toolchain']['name']):
-                tc = ec.toolchain.as_dict()
-                _log.debug("Adding toolchain %s as dependency for app %s." % (tc, name))
-                easyconfig['dependencies'].append(tc)
+    # persistent cache is only used for easyconfig files that consist of a single block
+    persistent_cache = None
+    if cache_key is not None and blocks == [path]:
+        persistent_cache = get_persistent_easyconfigs_cache()
+
+    if persistent_cache is not None:
+        persistent_cache_key = det_persistent_easyconfigs_cache_key(path, validate, hidden, parse_only)
+        # entries are tuples with processed easyconfigs and easyconfig lookups made while processing them
+        entry = persistent_cache.get(persistent_cache_key)
+        if entry is not None:
+            easyconfigs, ec_lookups = entry
+            _log.debug("Obtained processed easyconfig %s from persistent cache (key: %s)", path, persistent_cache_key)
+            _easyconfigs_cache[cache_key] = [e.copy() for e in easyconfigs]
+            _easyconfigs_lookups[cache_key] = ec_lookups
+            replay_easyconfig_lookups(ec_lookups)
+            return easyconfigs
+
+    # keep track of easyconfig files that are located while processing (for example to determine minimal toolchains)
+    with record_easyconfig_lookups() as ec_lookups:
+        easyconfigs = []
+        for spec in blocks:
+            # process for dependencies and real installversionname
+            _log.debug("Processing easyconfig %s" % spec)
+
+            # create easyconfig
+            try:
+                ec = EasyConfig(spec, build_specs=build_specs, validate=validate, hidden=hidden)
+            except EasyBuildError as err:
+                raise EasyBuildError("Failed to process easyconfig %s: %s", spec, err.msg)
+
+            name = ec['name']
+
+            easyconfig = {
+                'ec': ec,
+            }
+            easyconfigs.append(easyconfig)
+
+            if not parse_only:
+                # also determine list of dependencies, module name (unless only parsed easyconfigs are requested)
+                easyconfig.update({
+                    'spec': ec.path,
+                    'short_mod_name': ec.short_mod_name,
+                    'full_mod_name': ec.full_mod_name,
+                    'dependencies': [],
+                    'builddependencies': [],
+                    'hiddendependencies': [],
+                    'hidden': ec.hidden,
+                })
+                if len(blocks) > 1:
+                    easyconfig['original_spec'] = path
+
+                # add build dependencies
+                for dep in ec['builddependencies']:
+                    _log.debug("Adding build dependency %s for app %s." % (dep, name))
+                    easyconfig['builddependencies'].append(dep)
+
+                # add dependencies (including build & hidden dependencies)
+                for dep in ec.dependencies():
+                    _log.debug("Adding dependency %s for app %s." % (dep, name))
+                    easyconfig['dependencies'].append(dep)
+
+                # add toolchain as dependency too
+                if not is_system_toolchain(ec['toolchain']['name']):
+                    tc = ec.toolchain.as_dict()
+                    _log.debug("Adding toolchain %s as dependency for app %s." % (tc, name))
+                    easyconfig['dependencies'].append(tc)
 
     if cache_key is not None:
         _easyconfigs_cache[cache_key] = [e.copy() for e in easyconfigs]
+        _easyconfigs_lookups[cache_key] = ec_lookups
+
+    if persistent_cache is not None and is_persistent_easyconfigs_cache_eligible(easyconfigs):
+        persistent_cache.put(persistent_cache_key, (easyconfigs, ec_lookups))
 
     return easyconfigs
 
@@ -2053,6 +2489,86 @@ def create_paths(path, name, version):
     return ['%s.eb' % os.path.join(path, *cand_path) for cand_path in cand_paths]
 
 
+def det_easyconfig_path_candidates(rel_path):
+    """
+    Determine (name, version) combinations for which the specified path (relative to a robot search path)
+    may be picked up as an easyconfig file, according to the candidate locations produced by create_paths.
+
+    :return: list of (index of candidate location, name, version) tuples
+    """
+    res = []
+
+    if rel_path.endswith('.eb'):
+        parts = rel_path[:-len('.eb')].split(os.path.sep)
+        if len(parts) == 1:
+            # <name>-<version>.eb; software names may include dashes, so consider every possible split
+            subparts = parts[0].split('-')
+            for idx in range(1, len(subparts)):
+                res.append((3, '-'.join(subparts[:idx]), '-'.join(subparts[idx:])))
+        elif len(parts) == 2:
+            # <name>/<version>.eb or <name>/<name>-<version>.eb
+            name, filename = parts
+            res.append((0, name, filename))
+            if filename.startswith(name + '-'):
+                res.append((1, name, filename[len(name) + 1:]))
+        elif len(parts) == 3:
+            # <letter>/<name>/<name>-<version>.eb
+            letter, name, filename = parts
+            if filename.startswith(name + '-') and letter == letter_dir_for(name):
+                res.append((2, name, filename[len(name) + 1:]))
+
+    return res
+
+
+def get_path_index(path):
+    """
+    Return index of easyconfig files for specified robot search path, which is built only once per path.
+
+    The index is a dictionary with:
+    * 'paths': set of (relative) paths to all files in the robot search path
+    * 'by_name': dict mapping software names to (relative) paths of easyconfig files that may provide them
+    * 'by_name_version': dict mapping (name, version) to list of (relative) paths of matching easyconfig files,
+                         ordered by preference (cfr. create_paths)
+    * 'complete': whether the index is known to be complete (only for an index loaded from file);
+                  an index that was created on the fly may be outdated by files being added to the path later on
+
+    :return: index for specified path, or None if no index is available (or if use of indexes is disabled)
+    """
+    if build_option('ignore_index'):
+        _log.info("Ignoring index for %s...", path)
+        return None
+
+    if path not in _path_indexes:
+        if os.path.exists(path):
+            path_index = load_index(path)
+            complete = path_index is not None
+            if complete:
+                _log.info("Loaded index for %s", path)
+            else:
+                _log.info("No index found for %s, so creating it...", path)
+                path_index = create_index(path)
+
+            by_name, by_name_version = {}, {}
+            for rel_path in path_index:
+                for cand_idx, name, version in det_easyconfig_path_candidates(rel_path):
+                    by_name.setdefault(name, set()).add(rel_path)
+                    by_name_version.setdefault((name, version), []).append((cand_idx, rel_path))
+
+            for key in by_name_version:
+                by_name_version[key] = [rel_path for (_, rel_path) in sorted(by_name_version[key])]
+
+            _path_indexes[path] = {
+                'paths': path_index,
+                'by_name': by_name,
+                'by_name_version': by_name_version,
+                'complete': complete,
+            }
+        else:
+            _path_indexes[path] = None
+
+    return _path_indexes[path]
+
+
 def robot_find_easyconfig(name, version):
     """
     Find an easyconfig for module in path, returns (absolute) path to easyconfig file (or None, if none is found).
@@ -2060,6 +2576,7 @@ def robot_find_easyconfig(name, version):
     key = (name, version)
     if key in _easyconfig_files_cache:
         _log.debug("Obtained easyconfig path from cache for %s: %s" % (key, _easyconfig_files_cache[key]))
+        replay_easyconfig_lookups({key: _easyconfig_files_cache[key]})
         return _easyconfig_files_cache[key]
 
     paths = build_option('robot_path')
@@ -2075,35 +2592,30 @@ def robot_find_easyconfig(name, version):
     res = None
     for path in paths:
 
-        if build_option('ignore_index'):
-            _log.info("Ignoring index for %s...", path)
-            path_index = []
-        elif path in _path_indexes:
-            path_index = _path_indexes[path]
-            _log.info("Found loaded index for %s", path)
-        elif os.path.exists(path):
-            path_index = load_index(path)
-            if path_index is None:
-                _log.info("No index found for %s, so creating it...", path)
-                path_index = create_index(path)
-            else:
-                _log.info("Loaded index for %s", path)
-
-            _path_indexes[path] = path_index
-        else:
-            path_index = []
-
-        easyconfigs_paths = create_paths(path, name, version)
-        for easyconfig_path in easyconfigs_paths:
-            _log.debug("Checking easyconfig path %s" % easyconfig_path)
-            if easyconfig_path in path_index or os.path.isfile(easyconfig_path):
-                _log.debug("Found easyconfig file for name %s, version %s at %s" % (name, version, easyconfig_path))
-                _easyconfig_files_cache[key] = os.path.abspath(easyconfig_path)
-                res = _easyconfig_files_cache[key]
-                break
-        if res:
+        path_index = get_path_index(path)
+
+        easyconfig_path = None
+        if path_index is not None:
+            rel_paths = path_index['by_name_version'].get(key)
+            if rel_paths:
+                easyconfig_path = os.path.join(path, rel_paths[0])
+
+        # only check for files on disk if no (complete) index is available for this path
+        if easyconfig_path is None and (path_index is None or not path_index['complete']):
+            for cand_path in create_paths(path, name, version):
+                _log.debug("Checking easyconfig path %s" % cand_path)
+                if os.path.isfile(cand_path):
+                    easyconfig_path = cand_path
+                    break
+
+        if easyconfig_path:
+            _log.debug("Found easyconfig file for name %s, version %s at %s" % (name, version, easyconfig_path))
+            _easyconfig_files_cache[key] = os.path.abspath(easyconfig_path)
+            res = _easyconfig_files_cache[key]
             break
 
+    replay_easyconfig_lookups({key: res})
+
     return res
 
 
@@ -38,6 +38,7 @@ alongside the EasyConfig class to represent parsed easyconfig files.
 """
 import copy
 import glob
+import multiprocessing
 import os
 import re
 import sys
@@ -86,6 +87,9 @@ except ImportError:
 
 _log = fancylogger.getLogger('easyconfig.tools', fname=False)
 
+# parse function and named arguments to use in worker processes forked by parse_easyconfig_files
+_parse_easyconfig_files_spec = None
+
 
 def skip_available(easyconfigs, modtool):
     """Skip building easyconfigs for existing modules."""
@@ -388,6 +392,82 @@ def det_easyconfig_paths(orig_paths):
     return [os.path.abspath(ec_file) for ec_file in ec_files]
 
 
+def _init_parse_easyconfig_files_worker(parse_func, parse_kwargs):
+    """Initializer for worker processes used by parse_easyconfig_files: set parse function & named arguments."""
+    global _parse_easyconfig_files_spec
+    _parse_easyconfig_files_spec = (parse_func, parse_kwargs)
+
+
+def _parse_easyconfig_file_worker(ec_file):
+    """
+    Worker function for parse_easyconfig_files: parse a single easyconfig file using the specified function.
+
+    EasyBuild errors are passed back as a message (since EasyBuildError instances can not be unpickled as is),
+    other exceptions are re-raised in the parent process by the process pool.
+    """
+    (parse_func, parse_kwargs) = _parse_easyconfig_files_spec
+    try:
+        return (parse_func(ec_file, **parse_kwargs), None)
+    except EasyBuildError as err:
+        return (None, err.msg)
+
+
+def parse_easyconfig_files(parse_func, ec_files, parse_kwargs=None):
+    """
+    Parse specified easyconfig files using the provided function;
+    the files are parsed by a pool of worker processes if --parse-workers is set to a value larger than 1.
+
+    Worker processes are forked from the current process, so they inherit the EasyBuild configuration
+    (incl. build options); results must be picklable to be shipped back to the current process.
+
+    :param parse_func: function to call on each easyconfig file
+    :param ec_files: list of paths to easyconfig files
+    :param parse_kwargs: dict with named arguments to pass to the parse function
+    :return: generator of (ec_file, result, error) tuples, in the same order as the list of easyconfig files;
+             error is either None or an EasyBuildError instance
+    """
+    if parse_kwargs is None:
+        parse_kwargs = {}
+
+    parse_workers = min(build_option('parse_workers', default=None) or 1, len(ec_files))
+    # daemonic processes (like process pool workers) are not allowed to have children
+    if parse_workers <= 1 or multiprocessing.current_process().daemon:
+        for ec_file in ec_files:
+            try:
+                yield (ec_file, parse_func(ec_file, **parse_kwargs), None)
+            except EasyBuildError as err:
+                yield (ec_file, None, err)
+        return
+
+    # use 'fork' start method where available, so worker processes inherit the build options
+    if hasattr(multiprocessing, 'get_context') and 'fork' in multiprocessing.get_all_start_methods():
+        mp_ctx = multiprocessing.get_context('fork')
+    else:
+        mp_ctx = multiprocessing
+
+    _log.info("Parsing %d easyconfig files using %d worker processes", len(ec_files), parse_workers)
+
+    # parse function & arguments are passed to the forked worker processes via the pool initializer
+    # (rather than being pickled), also for worker processes that are started to replace exited ones;
+    # only paths to easyconfig files are sent over
+    initargs = (parse_func, parse_kwargs)
+
+    # hand out easyconfig files in chunks, to limit communication overhead
+    chunksize = max(1, len(ec_files) // (parse_workers * 4))
+
+    pool = mp_ctx.Pool(processes=parse_workers, initializer=_init_parse_easyconfig_files_worker, initargs=initargs)
+    try:
+        # imap returns results in order, as soon as they become available
+        for ec_file, (res, err) in zip(ec_files, pool.imap(_parse_easyconfig_file_worker, ec_files, chunksize)):
+            if err is not None:
+                err = EasyBuildError(err)
+            yield (ec_file, res, err)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def parse_easyconfigs(paths, validate=True):
     """
     Parse easyconfig files
@@ -396,6 +476,11 @@ def parse_easyconfigs(paths, validate=True):
     easyconfigs = []
     generated_ecs = False
 
+    kwargs = {'validate': validate}
+    # only pass build specs when not generating easyconfig files
+    if not build_option('try_to_generate'):
+        kwargs['build_specs'] = build_option('build_specs')
+
     for (path, generated) in paths:
         path = os.path.abspath(path)
         # keep track of whether any files were generated
@@ -404,13 +489,10 @@ def parse_easyconfigs(paths, validate=True):
             raise EasyBuildError("Can't find path %s", path)
         try:
             ec_files = find_easyconfigs(path, ignore_dirs=build_option('ignore_dirs'))
-            for ec_file in ec_files:
-                kwargs = {'validate': validate}
-                # only pass build specs when not generating easyconfig files
-                if not build_option('try_to_generate'):
-                    kwargs['build_specs'] = build_option('build_specs')
-
-                easyconfigs.extend(process_easyconfig(ec_file, **kwargs))
+            for (_, ecs, err) in parse_easyconfig_files(process_easyconfig, ec_files, parse_kwargs=kwargs):
+                if err is not None:
+                    raise err
+                easyconfigs.extend(ecs)
 
         except IOError as err:
             raise EasyBuildError("Processing easyconfigs in path %s failed: %s", path, err)
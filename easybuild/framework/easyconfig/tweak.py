@@ -36,6 +36,7 @@ Easyconfig module that provides functionality for tweaking existing eaysconfig (
 :author: Maxime Boissonneault (Universite Laval, Calcul Quebec, Compute Canada)
 """
 import copy
+import fnmatch
 import functools
 import glob
 import os
@@ -47,7 +48,7 @@ from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.constants import EASYCONFIG_CONSTANTS
 from easybuild.framework.easyconfig.default import get_easyconfig_parameter_default
 from easybuild.framework.easyconfig.easyconfig import EasyConfig, create_paths, process_easyconfig
-from easybuild.framework.easyconfig.easyconfig import get_toolchain_hierarchy
+from easybuild.framework.easyconfig.easyconfig import get_path_index, get_toolchain_hierarchy
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
 from easybuild.framework.easyconfig.format.format import DEPENDENCY_PARAMETERS
 from easybuild.framework.easyconfig.parser import fetch_parameters_from_easyconfig
@@ -429,6 +430,24 @@ def pick_version(req_ver, avail_vers):
     return (ver, selected_ver)
 
 
+def match_glob_pattern(rel_path, pattern):
+    """
+    Check whether specified relative path matches the given glob pattern, in the same way as glob.glob would
+    (wildcards don't match across directories, nor do they match hidden files/directories).
+    """
+    parts, pattern_parts = rel_path.split(os.path.sep), pattern.split(os.path.sep)
+    if len(parts) != len(pattern_parts):
+        return False
+
+    for part, pattern_part in zip(parts, pattern_parts):
+        if part.startswith('.') and not pattern_part.startswith('.'):
+            return False
+        if not fnmatch.fnmatchcase(part, pattern_part):
+            return False
+
+    return True
+
+
 def find_matching_easyconfigs(name, installver, paths):
     """
     Find easyconfigs that match specified name/installversion in specified list of paths.
@@ -439,11 +458,24 @@ def find_matching_easyconfigs(name, installver, paths):
     """
     ec_files = []
     for path in paths:
-        patterns = create_paths(path, name, installver)
-        for pattern in patterns:
-            more_ec_files = filter(os.path.isfile, sorted(glob.glob(pattern)))
-            _log.debug("Including files that match glob pattern '%s': %s" % (pattern, more_ec_files))
-            ec_files.extend(more_ec_files)
+        path_index = get_path_index(path)
+        if path_index is not None and path_index['complete']:
+            # (complete) index is available for this path, so no need to hit the filesystem
+            if glob.has_magic(name):
+                cand_rel_paths = path_index['paths']
+            else:
+                cand_rel_paths = path_index['by_name'].get(name, [])
+
+            for pattern in create_paths('', name, installver):
+                more_ec_files = sorted(os.path.join(path, p) for p in cand_rel_paths if match_glob_pattern(p, pattern))
+                _log.debug("Including files in index for %s that match pattern '%s': %s", path, pattern, more_ec_files)
+                ec_files.extend(more_ec_files)
+        else:
+            patterns = create_paths(path, name, installver)
+            for pattern in patterns:
+                more_ec_files = filter(os.path.isfile, sorted(glob.glob(pattern)))
+                _log.debug("Including files that match glob pattern '%s': %s" % (pattern, more_ec_files))
+                ec_files.extend(more_ec_files)
 
     # only retain unique easyconfig paths
     return nub(ec_files)
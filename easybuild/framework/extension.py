@@ -206,7 +206,10 @@ class Extension(object):
         elif exts_filter:
             cmd, stdin = resolve_exts_filter_template(exts_filter, self)
             # set log_ok to False so we can catch the error instead of run_cmd
-            (output, ec) = run_cmd(cmd, log_ok=False, simple=False, regexp=False, inp=stdin)
+            # (last part of) output is only used in error message
+            (output, ec) = run_cmd(cmd, log_ok=False, simple=False, regexp=False, inp=stdin, output_handle=True)
+            with output:
+                output = str(output)
 
             if ec:
                 if stdin:
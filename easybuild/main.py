@@ -47,7 +47,7 @@ from easybuild.tools.build_log import EasyBuildError, print_error, print_msg, st
 
 from easybuild.framework.easyblock import build_and_install_one, inject_checksums
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
-from easybuild.framework.easyconfig.easyconfig import clean_up_easyconfigs
+from easybuild.framework.easyconfig.easyconfig import clean_up_easyconfigs, clear_persistent_toolchain_hierarchy_cache
 from easybuild.framework.easyconfig.easyconfig import fix_deprecated_easyconfigs, verify_easyconfig_filename
 from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
 from easybuild.framework.easyconfig.tools import categorize_files_by_type, dep_graph
@@ -67,7 +67,7 @@ from easybuild.tools.modules import modules_tool
 from easybuild.tools.options import set_up_configuration, use_color
 from easybuild.tools.robot import check_conflicts, dry_run, missing_deps, resolve_dependencies, search_easyconfigs
 from easybuild.tools.package.utilities import check_pkg_support
-from easybuild.tools.parallelbuild import submit_jobs
+from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel_locally, submit_jobs
 from easybuild.tools.repository.repository import init_repository
 from easybuild.tools.testing import create_test_report, overall_test_report, regtest, session_state
 
@@ -108,19 +108,33 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True):
     # e.g. via easyconfig.handle_allowed_system_deps
     init_env = copy.deepcopy(os.environ)
 
-    res = []
-    for ec in ecs:
-        ec_res = {}
-        try:
-            (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env)
-            ec_res['log_file'] = app_log
-            if not ec_res['success']:
-                ec_res['err'] = EasyBuildError(err)
-        except Exception as err:
-            # purposely catch all exceptions
-            ec_res['success'] = False
-            ec_res['err'] = err
-            ec_res['traceback'] = traceback.format_exc()
+    def build_ecs():
+        """Build and install software for provided easyconfigs one by one, yield result for each of them."""
+        for ec in ecs:
+            ec_res = {}
+            try:
+                (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env)
+                ec_res['log_file'] = app_log
+                if not ec_res['success']:
+                    ec_res['err'] = EasyBuildError(err)
+            except Exception as err:
+                # purposely catch all exceptions
+                ec_res['success'] = False
+                ec_res['err'] = err
+                ec_res['traceback'] = traceback.format_exc()
+
+            yield ec, ec_res
+
+    parallel_builds = build_option('parallel_builds') or 1
+    in_parallel = parallel_builds > 1 and len(ecs) > 1
+    if in_parallel:
+        print_msg("building up to %d easyconfigs in parallel..." % parallel_builds, silent=build_option('silent'))
+        ecs_with_res = build_easyconfigs_in_parallel_locally(ecs, init_env, parallel_builds)
+    else:
+        ecs_with_res = build_ecs()
+
+    res, errors = [], []
+    for ec, ec_res in ecs_with_res:
 
         # keep track of success/total count
         if ec_res['success']:
@@ -145,12 +159,24 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True):
 
         if not ec_res['success'] and exit_on_failure:
             if 'traceback' in ec_res:
-                raise EasyBuildError(ec_res['traceback'])
+                errors.append(EasyBuildError(ec_res['traceback']))
             else:
-                raise EasyBuildError(test_msg)
+                errors.append(EasyBuildError(test_msg))
+
+            # when building in parallel, builds that do not depend on the failed build are allowed to complete
+            if not in_parallel:
+                raise errors[0]
 
         res.append((ec, ec_res))
 
+    if errors:
+        raise errors[0]
+
+    if in_parallel:
+        # retain original order of easyconfigs, since builds that run in parallel may complete in any order
+        ec_idxs = dict((id(ec), idx) for (idx, ec) in enumerate(ecs))
+        res.sort(key=lambda ec_with_res: ec_idxs[id(ec_with_res[0])])
+
     return res
 
 
@@ -260,6 +286,10 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     elif options.list_software:
         print(list_software(output_format=options.output_format, detailed=options.list_software == 'detailed'))
 
+    elif options.clear_toolchain_hierarchy_cache:
+        path = clear_persistent_toolchain_hierarchy_cache()
+        print_msg("Cleared persistent cache for toolchain hierarchies at %s" % path, prefix=False)
+
     elif options.create_index:
         print_msg("Creating index for %s..." % options.create_index, prefix=False)
         index_fp = dump_index(options.create_index, max_age_sec=options.index_max_age)
@@ -269,6 +299,7 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     # non-verbose cleanup after handling GitHub integration stuff or printing terse info
     early_stop_options = [
         options.check_github,
+        options.clear_toolchain_hierarchy_cache,
         options.create_index,
         options.install_github_token,
         options.list_installed_software,
@@ -397,7 +428,8 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     if not (forced or dry_run_mode or options.extended_dry_run or pr_options or options.inject_checksums):
         retained_ecs = skip_available(easyconfigs, modtool)
         if not testing:
-            for skipped_ec in [ec for ec in easyconfigs if ec not in retained_ecs]:
+            retained_mod_names = set(ec['full_mod_name'] for ec in retained_ecs)
+            for skipped_ec in [ec for ec in easyconfigs if ec['full_mod_name'] not in retained_mod_names]:
                 print_msg("%s is already installed (module found), skipping" % skipped_ec['full_mod_name'])
         easyconfigs = retained_ecs
 
@@ -0,0 +1,314 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Build cache of installations: compressed tarballs of installation directories (and corresponding module file),
+keyed by a digest of everything that determines the result of an installation
+(processed easyconfig, easyblock, toolchain hierarchy, dependencies, relevant configuration, system).
+
+Installations restored from the build cache are relocated if the installation prefix differs.
+"""
+import hashlib
+import json
+import os
+import stat
+import tarfile
+import tempfile
+import time
+
+from easybuild.base import fancylogger
+from easybuild.framework.easyconfig.easyconfig import disable_templating, get_toolchain_hierarchy
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.cache import det_cache_key, det_cache_path
+from easybuild.tools.config import build_option, get_module_syntax, install_path
+from easybuild.tools.filetools import mkdir, read_file, remove_dir, write_file
+from easybuild.tools.systemtools import get_cpu_architecture, get_cpu_model, get_os_name, get_os_version
+from easybuild.tools.utilities import det_class_source_digest, stable_repr
+from easybuild.tools.version import VERSION
+
+
+_log = fancylogger.getLogger('build_cache', fname=False)
+
+# build options that (may) affect the result of an installation,
+# which must be taken into account when determining keys for build cache entries
+BUILD_CACHE_BUILD_OPTIONS = ['cuda_compute_capabilities', 'filter_deps', 'filter_env_vars', 'group', 'hide_deps',
+                             'minimal_build_env', 'module_extensions', 'optarch', 'read_only_installdir', 'rpath',
+                             'rpath_filter', 'set_gid_bit', 'sticky_bit', 'sysroot', 'umask']
+
+# names of entries in build cache tarballs for installation directory and module file
+BUILD_CACHE_SOFTWARE = 'software'
+BUILD_CACHE_MODULE = 'module'
+
+# placeholders for installation prefixes, used when determining digest of module files of dependencies
+SOFTWARE_INSTALLPATH_PLACEHOLDER = '<SOFTWARE_INSTALLPATH>'
+MODULES_INSTALLPATH_PLACEHOLDER = '<MODULES_INSTALLPATH>'
+
+
+def get_build_cache_dir():
+    """Return location of build cache."""
+    return build_option('build_cache_dir') or det_cache_path('build-cache')
+
+
+def det_build_cache_paths(key):
+    """Determine paths to tarball and metadata file for build cache entry with specified key."""
+    prefix = os.path.join(get_build_cache_dir(), key[:2], key)
+    return prefix + '.tar.gz', prefix + '.json'
+
+
+def det_easyblock_digest(easyblock_class):
+    """Determine digest for source code of specified easyblock class (incl. source code for all parent classes)."""
+    return det_class_source_digest(easyblock_class)
+
+
+def det_module_file_digest(modtool, mod_name):
+    """
+    Determine digest for contents of module file for specified module (None if module file can not be found);
+    installation prefixes are replaced by a placeholder, to allow installations to be relocated.
+    """
+    try:
+        path = modtool.modulefile_path(mod_name)
+    except EasyBuildError as err:
+        _log.debug("Failed to determine path to module file for %s: %s", mod_name, err)
+        path = None
+
+    res = None
+    if path and os.path.isfile(path):
+        txt = read_file(path)
+        for (prefix, placeholder) in [(install_path('software'), SOFTWARE_INSTALLPATH_PLACEHOLDER),
+                                      (install_path('modules'), MODULES_INSTALLPATH_PLACEHOLDER)]:
+            txt = txt.replace(prefix, placeholder)
+        res = hashlib.sha256(txt.encode('utf-8')).hexdigest()
+
+    return res
+
+
+def det_build_cache_key(app):
+    """
+    Determine key for build cache entry for installation performed by specified EasyBlock instance.
+    """
+    items = [VERSION]
+
+    # templating is disabled, since template values include build and installation directories
+    with disable_templating(app.cfg):
+        items.append(app.cfg.fingerprint)
+
+    items.append(det_easyblock_digest(app.__class__))
+
+    toolchain = app.cfg['toolchain']
+    try:
+        tc_hierarchy = get_toolchain_hierarchy(toolchain)
+    except EasyBuildError as err:
+        _log.debug("Failed to determine toolchain hierarchy for %s, only considering toolchain itself: %s",
+                   toolchain, err)
+        tc_hierarchy = [toolchain]
+    items.append(stable_repr(tc_hierarchy))
+
+    mod_names = [dep['full_mod_name'] for dep in app.cfg.dependencies()]
+    if not app.toolchain.is_system_toolchain():
+        mod_names.insert(0, app.toolchain.mod_full_name)
+    for mod_name in mod_names:
+        items.extend([mod_name, det_module_file_digest(app.modules_tool, mod_name)])
+
+    items.extend((opt, build_option(opt)) for opt in BUILD_CACHE_BUILD_OPTIONS)
+    items.extend([get_module_syntax(), get_os_name(), get_os_version(), get_cpu_architecture(), get_cpu_model()])
+
+    key = det_cache_key(*items)
+    _log.info("Key for build cache entry for %s: %s", app.full_mod_name, key)
+
+    return key
+
+
+def relocate_prefix(path, old_prefix, new_prefix):
+    """
+    Replace old installation prefix with new one in all files (and symbolic links) in specified directory.
+
+    In binary files, the old prefix can only be replaced if the new prefix is not longer than the old one;
+    the new prefix is padded with '/' characters to retain the length of strings in that case.
+    """
+    old, new = old_prefix.encode('utf-8'), new_prefix.encode('utf-8')
+    padded_new = new + b'/' * (len(old) - len(new))
+
+    relocated = 0
+    for (dirpath, dirnames, filenames) in os.walk(path):
+        for name in dirnames + filenames:
+            fullpath = os.path.join(dirpath, name)
+            if os.path.islink(fullpath):
+                target = os.readlink(fullpath)
+                if old_prefix in target:
+                    os.remove(fullpath)
+                    os.symlink(target.replace(old_prefix, new_prefix), fullpath)
+                    relocated += 1
+
+            elif os.path.isfile(fullpath):
+                with open(fullpath, 'rb') as handle:
+                    data = handle.read()
+                if old not in data:
+                    continue
+
+                if b'\0' in data:
+                    if len(new) > len(old):
+                        raise EasyBuildError("Can't relocate binary file %s: new prefix %s is longer than %s",
+                                             fullpath, new_prefix, old_prefix)
+                    data = data.replace(old, padded_new)
+                else:
+                    data = data.replace(old, new)
+
+                # make sure file is writable (e.g. when installation was made read-only)
+                mode = os.stat(fullpath).st_mode
+                os.chmod(fullpath, mode | stat.S_IWUSR)
+                with open(fullpath, 'wb') as handle:
+                    handle.write(data)
+                os.chmod(fullpath, mode)
+                relocated += 1
+
+    _log.info("Relocated %d files in %s from %s to %s", relocated, path, old_prefix, new_prefix)
+
+
+def store_in_build_cache(app, key):
+    """
+    Add installation performed by specified EasyBlock instance to build cache.
+    Failing to do so is not considered fatal, only a warning is logged.
+
+    :return: True if installation was added to build cache, False otherwise
+    """
+    tarball, metadata_path = det_build_cache_paths(key)
+    metadata = {
+        'easybuild_version': str(VERSION),
+        'full_mod_name': app.full_mod_name,
+        'installdir': app.installdir,
+        'timestamp': time.time(),
+    }
+
+    tmp_path = None
+    try:
+        mkdir(os.path.dirname(tarball), parents=True)
+        # write to temporary file first & then rename it, so concurrent sessions never see partial tarballs
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(tarball), prefix='.' + key)
+        os.close(fd)
+        with tarfile.open(tmp_path, 'w:gz') as tar:
+            tar.add(app.installdir, arcname=BUILD_CACHE_SOFTWARE)
+            if os.path.isfile(app.mod_filepath):
+                tar.add(app.mod_filepath, arcname=BUILD_CACHE_MODULE)
+        os.rename(tmp_path, tarball)
+        write_file(metadata_path, json.dumps(metadata, indent=4, sort_keys=True))
+    except (EasyBuildError, IOError, OSError, tarfile.TarError) as err:
+        _log.warning("Failed to add installation of %s to build cache: %s", app.full_mod_name, err)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+    _log.info("Installation of %s added to build cache: %s", app.full_mod_name, tarball)
+    return True
+
+
+def is_link_target_in_dir(name, target, abs_prefixes=None):
+    """
+    Determine whether target of link at specified location (relative to some directory) is located in that directory;
+    absolute targets are only considered to be located in that directory if they start with one of the specified
+    absolute prefixes (which correspond to the location of that directory).
+    """
+    if os.path.isabs(target):
+        for prefix in abs_prefixes or []:
+            prefix = os.path.normpath(prefix)
+            if target == prefix or target.startswith(os.path.join(prefix, '')):
+                # absolute target is relative to top of directory, not to location of link
+                name, target = '', os.path.relpath(target, prefix)
+                break
+        else:
+            return False
+
+    path = os.path.normpath(os.path.join(os.path.dirname(name), target))
+    return not (os.path.isabs(path) or path == os.path.pardir or path.startswith(os.path.pardir + os.path.sep))
+
+
+def restore_from_build_cache(app, key):
+    """
+    Restore installation for specified EasyBlock instance from build cache (if a matching entry is available),
+    relocating it if the installation prefix differs.
+
+    :return: contents of (relocated) module file for restored installation, or None if it was not restored
+    """
+    tarball, metadata_path = det_build_cache_paths(key)
+    if not (os.path.isfile(tarball) and os.path.isfile(metadata_path)):
+        _log.info("No build cache entry found for %s (key: %s)", app.full_mod_name, key)
+        return None
+
+    try:
+        metadata = json.loads(read_file(metadata_path))
+        old_installdir = metadata['installdir']
+
+        app.make_installdir()
+        module_txt, members = None, []
+        with tarfile.open(tarball, 'r:gz') as tar:
+            for member in tar.getmembers():
+                parts = member.name.split('/')
+                if member.name.startswith('/') or '..' in parts:
+                    raise EasyBuildError("Unexpected entry in build cache tarball %s: %s", tarball, member.name)
+                elif member.name == BUILD_CACHE_MODULE:
+                    module_txt = tar.extractfile(member).read().decode('utf-8')
+                elif parts[0] == BUILD_CACHE_SOFTWARE and len(parts) > 1:
+                    member.name = '/'.join(parts[1:])
+                    # links must not point outside of installation directory,
+                    # since that could result in files being written anywhere during extraction
+                    if member.islnk():
+                        # hard links refer to other entries in tarball
+                        link_parts = member.linkname.split('/')
+                        if link_parts[0] == BUILD_CACHE_SOFTWARE and len(link_parts) > 1:
+                            member.linkname = '/'.join(link_parts[1:])
+                            link_ok = is_link_target_in_dir('', member.linkname)
+                        else:
+                            link_ok = False
+                    elif member.issym():
+                        # absolute symlinks into the original installation directory are relocated later
+                        link_ok = is_link_target_in_dir(member.name, member.linkname,
+                                                        abs_prefixes=[old_installdir, app.installdir])
+                    else:
+                        link_ok = True
+
+                    if not link_ok:
+                        raise EasyBuildError("Link pointing outside of installation directory found in build cache "
+                                             "tarball %s: %s -> %s", tarball, member.name, member.linkname)
+                    members.append(member)
+
+            # extractall takes care of setting permissions of directories after their contents is extracted
+            tar.extractall(app.installdir, members=members)
+
+        if module_txt is None:
+            raise EasyBuildError("No module file found in build cache tarball %s", tarball)
+
+        if old_installdir != app.installdir:
+            relocate_prefix(app.installdir, old_installdir, app.installdir)
+            module_txt = module_txt.replace(old_installdir, app.installdir)
+
+    except (EasyBuildError, IOError, OSError, KeyError, ValueError, tarfile.TarError) as err:
+        _log.warning("Failed to restore installation of %s from build cache, so building it: %s",
+                     app.full_mod_name, err)
+        remove_dir(app.installdir)
+        return None
+
+    # touch metadata file, to keep track of which entries were used recently
+    os.utime(metadata_path, None)
+
+    _log.info("Installation of %s restored from build cache: %s", app.full_mod_name, tarball)
+    return module_txt
@@ -55,4 +55,8 @@ def get_build_stats(app, start_time, command_line):
     for key, val in sorted(get_system_info().items()):
         buildstats.update({key: val})
 
+    # include profile per step of installation (if available)
+    if app.profiler is not None:
+        buildstats['step_profile'] = app.profiler.summary()
+
     return buildstats
@@ -0,0 +1,204 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Support for persistent on-disk caches.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+
+
+_log = fancylogger.getLogger('cache', fname=False)
+
+# suffix for files that hold cache entries
+CACHE_ENTRY_SUFFIX = '.pickle'
+
+
+def det_cache_path(*subdirs):
+    """
+    Determine path to (subdirectory of) the EasyBuild cache directory,
+    which is located in $XDG_CACHE_HOME (or $HOME/.cache if $XDG_CACHE_HOME is not set).
+    """
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache_home, 'easybuild', *subdirs)
+
+
+def det_cache_key(*items):
+    """Determine key for cache entry, as SHA256 digest of string representation of specified items."""
+    sha256 = hashlib.sha256()
+    for item in items:
+        if not isinstance(item, bytes):
+            item = str(item).encode('utf-8')
+        sha256.update(item)
+        # separator to avoid that e.g. ('ab', 'c') and ('a', 'bc') result in the same key
+        sha256.update(b'\0')
+    return sha256.hexdigest()
+
+
+class PersistentCache(object):
+    """
+    Persistent on-disk cache of picklable values, keyed by (hex) digests.
+
+    Each cache entry is stored in a separate file; least recently used entries are evicted
+    when the total size of the cache exceeds the specified maximum size.
+    """
+
+    def __init__(self, path, max_size=None):
+        """
+        Create interface to persistent cache.
+
+        :param path: location of cache directory
+        :param max_size: maximum total size of cache entries (in bytes), None implies no limit
+        """
+        # cache entries are pickled, so keep them separate per Python version
+        self.path = os.path.join(path, 'py%s%s' % sys.version_info[:2])
+        self.max_size = max_size
+
+        # total size of cache entries (only determined when needed)
+        self._size = None
+
+    def _entry_path(self, key):
+        """Determine path to file for cache entry with specified key."""
+        return os.path.join(self.path, key[:2], key + CACHE_ENTRY_SUFFIX)
+
+    def get(self, key, default=None):
+        """
+        Obtain value for cache entry with specified key, or specified default value if there is no such entry.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as handle:
+                value = pickle.load(handle)
+            # update modification time, to keep track of which entries were used recently
+            os.utime(entry_path, None)
+        except (IOError, OSError):
+            _log.debug("No cache entry found for key %s", key)
+            value = default
+        except Exception as err:
+            # corrupt cache entry (for example because it was only partially written), get rid of it
+            _log.warning("Failed to load cache entry %s, removing it: %s", entry_path, err)
+            self.remove(key)
+            value = default
+
+        return value
+
+    def put(self, key, value):
+        """
+        Store cache entry with specified key and value.
+        Failing to store a cache entry is not considered fatal, only a warning is logged.
+
+        :return: True if the cache entry was stored, False otherwise
+        """
+        entry_path = self._entry_path(key)
+        entry_dir = os.path.dirname(entry_path)
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as err:
+            _log.warning("Failed to serialize value for cache entry with key %s: %s", key, err)
+            return False
+
+        try:
+            if not os.path.exists(entry_dir):
+                os.makedirs(entry_dir)
+            # write to temporary file first & then rename it,
+            # so concurrent EasyBuild sessions never see partially written cache entries
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix='.' + key)
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.rename(tmp_path, entry_path)
+        except (IOError, OSError) as err:
+            _log.warning("Failed to store cache entry %s: %s", entry_path, err)
+            return False
+
+        _log.debug("Stored cache entry %s (%d bytes)", entry_path, len(data))
+
+        if self.max_size is not None:
+            if self._size is None:
+                self._size = sum(size for (_, size, _) in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_size:
+                self.evict()
+
+        return True
+
+    def remove(self, key):
+        """Remove cache entry with specified key (if it exists)."""
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Return list of (modification time, size, path) tuples for all cache entries."""
+        entries = []
+        if os.path.isdir(self.path):
+            for subdir in os.listdir(self.path):
+                subdir_path = os.path.join(self.path, subdir)
+                if os.path.isdir(subdir_path):
+                    for fn in os.listdir(subdir_path):
+                        if fn.endswith(CACHE_ENTRY_SUFFIX):
+                            entry_path = os.path.join(subdir_path, fn)
+                            try:
+                                st = os.stat(entry_path)
+                            except OSError:
+                                # entry may have been removed by a concurrent EasyBuild session
+                                continue
+                            entries.append((st.st_mtime, st.st_size, entry_path))
+        return entries
+
+    def evict(self):
+        """
+        Evict least recently used cache entries until total size of cache no longer exceeds maximum size.
+        """
+        entries = sorted(self._entries())
+        self._size = sum(size for (_, size, _) in entries)
+
+        evicted = 0
+        for _, size, entry_path in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+                evicted += 1
+            except OSError as err:
+                _log.warning("Failed to evict cache entry %s: %s", entry_path, err)
+            self._size -= size
+
+        _log.debug("Evicted %d entries from cache at %s, total size is now %d bytes", evicted, self.path, self._size)
+
+    def clear(self):
+        """Remove all cache entries."""
+        for _, _, entry_path in self._entries():
+            try:
+                os.remove(entry_path)
+            except OSError as err:
+                raise EasyBuildError("Failed to remove cache entry %s: %s", entry_path, err)
+        self._size = 0
@@ -79,6 +79,9 @@ CONT_TYPES = [CONT_TYPE_DOCKER, CONT_TYPE_SINGULARITY]
 DEFAULT_CONT_TYPE = CONT_TYPE_SINGULARITY
 
 DEFAULT_BRANCH = 'develop'
+DEFAULT_CHECKSUMS_CACHE_MAX_SIZE = 10  # in MiB
+DEFAULT_CMD_OUTPUT_BUFFER_SIZE = 10 * 1024  # in KiB
+DEFAULT_EASYCONFIGS_CACHE_MAX_SIZE = 100  # in MiB
 DEFAULT_INDEX_MAX_AGE = 7 * 24 * 60 * 60  # 1 week (in seconds)
 DEFAULT_JOB_BACKEND = 'GC3Pie'
 DEFAULT_LOGFILE_FORMAT = ("easybuild", "easybuild-%(name)s-%(version)s-%(date)s.%(time)s.log")
@@ -133,6 +136,10 @@ LOCAL_VAR_NAMING_CHECK_LOG = 'log'
 LOCAL_VAR_NAMING_CHECK_WARN = WARN
 LOCAL_VAR_NAMING_CHECKS = [LOCAL_VAR_NAMING_CHECK_ERROR, LOCAL_VAR_NAMING_CHECK_LOG, LOCAL_VAR_NAMING_CHECK_WARN]
 
+PROFILE_FORMAT_JSON = 'json'
+PROFILE_FORMAT_TRACE = 'trace'
+PROFILE_FORMATS = [PROFILE_FORMAT_JSON, PROFILE_FORMAT_TRACE]
+
 
 class Singleton(ABCMeta):
     """Serves as metaclass for classes that should implement the Singleton pattern.
@@ -162,6 +169,8 @@ BUILD_OPTIONS_CMDLINE = {
     None: [
         'aggregate_regtest',
         'backup_modules',
+        'build_cache_dir',
+        'checksums_cache_dir',
         'container_config',
         'container_image_format',
         'container_image_name',
@@ -171,6 +180,7 @@ BUILD_OPTIONS_CMDLINE = {
         'download_timeout',
         'dump_test_report',
         'easyblock',
+        'easyconfigs_cache_dir',
         'extra_modules',
         'filter_deps',
         'filter_env_vars',
@@ -184,7 +194,10 @@ BUILD_OPTIONS_CMDLINE = {
         'group',
         'hooks',
         'ignore_dirs',
+        'include_easyblocks',
         'include_easyblocks_from_pr',
+        'include_module_naming_schemes',
+        'include_toolchains',
         'job_backend_config',
         'job_cores',
         'job_deps_type',
@@ -196,11 +209,15 @@ BUILD_OPTIONS_CMDLINE = {
         'locks_dir',
         'modules_footer',
         'modules_header',
+        'modules_index_cache_dir',
         'mpi_cmd_template',
         'only_blocks',
         'optarch',
         'package_tool_options',
         'parallel',
+        'parallel_builds',
+        'parallel_downloads',
+        'parse_workers',
         'pr_branch_name',
         'pr_commit_msg',
         'pr_descr',
@@ -216,6 +233,7 @@ BUILD_OPTIONS_CMDLINE = {
         'sysroot',
         'test_report_env_filter',
         'testoutput',
+        'toolchain_hierarchy_cache_dir',
         'wait_on_lock',
         'umask',
         'zip_logs',
@@ -224,11 +242,14 @@ BUILD_OPTIONS_CMDLINE = {
         'add_dummy_to_minimal_toolchains',
         'add_system_to_minimal_toolchains',
         'allow_modules_tool_mismatch',
+        'async_logging',
+        'checksums_cache',
         'consider_archived_easyconfigs',
         'container_build_image',
         'debug',
         'debug_lmod',
         'dump_autopep8',
+        'easyconfigs_cache',
         'enforce_checksums',
         'extended_dry_run',
         'experimental',
@@ -243,11 +264,16 @@ BUILD_OPTIONS_CMDLINE = {
         'minimal_toolchains',
         'module_extensions',
         'module_only',
+        'modules_index',
+        'modules_index_cache',
         'package',
+        'profile',
         'read_only_installdir',
         'remove_ghost_install_dirs',
         'rebuild',
+        'resume',
         'robot',
+        'robot_stats',
         'rpath',
         'search_paths',
         'sequential',
@@ -255,12 +281,15 @@ BUILD_OPTIONS_CMDLINE = {
         'skip_test_cases',
         'generate_devel_module',
         'sticky_bit',
+        'toolchain_hierarchy_cache',
         'trace',
         'upload_test_report',
         'update_modules_tool_cache',
+        'use_build_cache',
         'use_ccache',
         'use_f90cache',
         'use_existing_modules',
+        'use_source_store',
         'set_default_module',
         'wait_on_lock_limit',
     ],
@@ -289,6 +318,15 @@ BUILD_OPTIONS_CMDLINE = {
     DEFAULT_BRANCH: [
         'pr_target_branch',
     ],
+    DEFAULT_CHECKSUMS_CACHE_MAX_SIZE: [
+        'checksums_cache_max_size',
+    ],
+    DEFAULT_CMD_OUTPUT_BUFFER_SIZE: [
+        'cmd_output_buffer_size',
+    ],
+    DEFAULT_EASYCONFIGS_CACHE_MAX_SIZE: [
+        'easyconfigs_cache_max_size',
+    ],
     DEFAULT_INDEX_MAX_AGE: [
         'index_max_age',
     ],
@@ -307,6 +345,9 @@ BUILD_OPTIONS_CMDLINE = {
     DEFAULT_PKG_TYPE: [
         'package_type',
     ],
+    PROFILE_FORMAT_JSON: [
+        'profile_format',
+    ],
     GENERAL_CLASS: [
         'suffix_modules_path',
     ],
@@ -518,9 +559,30 @@ def init_build_options(build_options=None, cmdline_options=None):
     return BuildOptions(bo)
 
 
+def update_build_option(key, value):
+    """
+    Update build option with specified name to given value.
+
+    WARNING: Use this with care, the build options are not expected to be changed during an EasyBuild session!
+    """
+    # BuildOptions() is a (singleton) frozen dict, so this is less straightforward that it seems...
+    build_options = BuildOptions()
+    orig_value = build_options._FrozenDict__dict[key]
+    build_options._FrozenDict__dict[key] = value
+    _log.debug("Build option '%s' was updated to: %s", key, build_option(key))
+
+    # Return original value, so it can be restored later if needed
+    return orig_value
+
+
 def build_option(key, **kwargs):
     """Obtain value specified build option."""
 
+    # avoid creating an (empty) BuildOptions instance only to return the specified default value,
+    # since that would prevent initializing the build options later
+    if 'default' in kwargs and BuildOptions not in Singleton._instances:
+        return kwargs['default']
+
     build_options = BuildOptions()
     if key in build_options:
         return build_options[key]
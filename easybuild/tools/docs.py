@@ -50,7 +50,7 @@ from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_CONFIG, TEMP
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_LOWER, TEMPLATE_NAMES_LOWER_TEMPLATE
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RUN_STEP, TEMPLATE_CONSTANTS
 from easybuild.framework.easyconfig.templates import TEMPLATE_SOFTWARE_VERSIONS, template_constant_dict
-from easybuild.framework.easyconfig.tools import avail_easyblocks
+from easybuild.framework.easyconfig.tools import avail_easyblocks, parse_easyconfig_files
 from easybuild.framework.easyconfig.tweak import find_matching_easyconfigs
 from easybuild.framework.extension import Extension
 from easybuild.tools.build_log import EasyBuildError, print_msg
@@ -500,6 +500,25 @@ def gen_list_easyblocks(list_easyblocks, format_strings):
     return '\n'.join(txt)
 
 
+def _parse_easyconfig_for_software(ec_path, only_installed=False):
+    """
+    Parse easyconfig file for list_software
+
+    :param ec_path: path to easyconfig file
+    :param only_installed: whether or not a full EasyConfig instance is required (to determine module name)
+    """
+    # full EasyConfig instance is only required when module name is needed
+    # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser
+    if only_installed:
+        ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
+    else:
+        ec = EasyConfigParser(filename=ec_path).get_config_dict()
+        # drop '__builtins__' entry (not picklable in Python 2), which is not an easyconfig parameter anyway
+        ec.pop('__builtins__', None)
+
+    return ec
+
+
 def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False):
     """
     Show list of supported software
@@ -514,13 +533,11 @@ def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False
     ec_paths = find_matching_easyconfigs('*', '*', build_option('robot_path') or [])
     ecs = []
     cnt = len(ec_paths)
-    for idx, ec_path in enumerate(ec_paths):
-        # full EasyConfig instance is only required when module name is needed
-        # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser
-        if only_installed:
-            ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
-        else:
-            ec = EasyConfigParser(filename=ec_path).get_config_dict()
+    parse_kwargs = {'only_installed': only_installed}
+    parsed_ecs = parse_easyconfig_files(_parse_easyconfig_for_software, ec_paths, parse_kwargs=parse_kwargs)
+    for idx, (_, ec, err) in enumerate(parsed_ecs):
+        if err is not None:
+            raise err
 
         ecs.append(ec)
         print_msg('\r', prefix=False, newline=False, silent=silent)
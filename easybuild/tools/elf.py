@@ -0,0 +1,321 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Support for inspecting ELF files (binaries, shared libraries), without relying on external tools
+like 'file', 'ldd' or 'readelf'.
+"""
+import glob
+import os
+import re
+import struct
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+
+
+_log = fancylogger.getLogger('elf', fname=False)
+
+ELF_MAGIC = b'\x7fELF'
+
+# values for EI_CLASS and EI_DATA fields in ELF identification
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+# types of program headers
+PT_LOAD = 1
+PT_DYNAMIC = 2
+PT_INTERP = 3
+
+# tags of entries in dynamic section
+DT_NULL = 0
+DT_NEEDED = 1
+DT_STRTAB = 5
+DT_STRSZ = 10
+DT_RPATH = 15
+DT_RUNPATH = 29
+
+# formats (see struct module) of ELF header (excl. identification), program header & dynamic section entry,
+# indexed by ELF class
+ELF_HEADER_FORMATS = {
+    # e_type, e_machine, e_version, e_entry, e_phoff, e_shoff, e_flags,
+    # e_ehsize, e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx
+    ELFCLASS32: 'HHIIIIIHHHHHH',
+    ELFCLASS64: 'HHIQQQIHHHHHH',
+}
+ELF_PROGRAM_HEADER_FORMATS = {
+    # p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align
+    ELFCLASS32: 'IIIIIIII',
+    # p_type, p_flags, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_align
+    ELFCLASS64: 'IIQQQQQQ',
+}
+ELF_DYNAMIC_ENTRY_FORMATS = {
+    # d_tag, d_val
+    ELFCLASS32: 'iI',
+    ELFCLASS64: 'qQ',
+}
+
+# trusted directories that are always searched by the dynamic linker
+DEFAULT_LIB_DIRS = ['/lib64', '/usr/lib64', '/lib', '/usr/lib']
+LD_SO_CONF = '/etc/ld.so.conf'
+
+# $ORIGIN dynamic string token in RPATH/RUNPATH entries
+ORIGIN_REGEX = re.compile(r'\$(ORIGIN\b|\{ORIGIN\})')
+
+# cached list of directories searched by the dynamic linker by default
+_system_lib_dirs = []
+
+
+def _decode(value):
+    """Decode bytes value obtained from ELF file to a string value."""
+    return str(value.decode('ascii', 'ignore'))
+
+
+def read_elf_info(path):
+    """
+    Read ELF header, program headers & dynamic section of specified file.
+
+    :param path: path to file
+    :return: None if the file is not an ELF file, or a dictionary with ELF class ('class': 32 or 64),
+             machine type ('machine'), whether the file is dynamically linked ('dynamic'), the program interpreter
+             ('interpreter'), and the DT_NEEDED, DT_RPATH and DT_RUNPATH entries ('needed', 'rpath', 'runpath');
+             files that have a dynamic section but no program interpreter nor required shared libraries
+             (like static PIE binaries) are not considered to be dynamically linked
+    """
+    try:
+        with open(path, 'rb') as fh:
+            ident = fh.read(16)
+            if len(ident) < 16 or ident[:4] != ELF_MAGIC:
+                return None
+
+            elf_class, elf_data = struct.unpack('BB', ident[4:6])
+            if elf_class not in ELF_HEADER_FORMATS or elf_data not in (ELFDATA2LSB, ELFDATA2MSB):
+                raise EasyBuildError("Unknown ELF class (%s) or data encoding (%s) for %s", elf_class, elf_data, path)
+            endian = '<' if elf_data == ELFDATA2LSB else '>'
+
+            def read_struct(fmt, offset):
+                """Read & unpack data at specified offset in file."""
+                fmt = endian + fmt
+                fh.seek(offset)
+                data = fh.read(struct.calcsize(fmt))
+                if len(data) < struct.calcsize(fmt):
+                    raise EasyBuildError("Unexpected end of file at offset %d in %s", offset, path)
+                return struct.unpack(fmt, data)
+
+            hdr = read_struct(ELF_HEADER_FORMATS[elf_class], 16)
+            machine, phoff, phentsize, phnum = hdr[1], hdr[4], hdr[8], hdr[9]
+
+            # collect (type, offset, virtual address, size in file) for all program headers
+            segments = []
+            for idx in range(phnum):
+                phdr = read_struct(ELF_PROGRAM_HEADER_FORMATS[elf_class], phoff + idx * phentsize)
+                if elf_class == ELFCLASS64:
+                    segments.append((phdr[0], phdr[2], phdr[3], phdr[5]))
+                else:
+                    segments.append((phdr[0], phdr[1], phdr[2], phdr[4]))
+
+            res = {
+                'class': 32 if elf_class == ELFCLASS32 else 64,
+                'machine': machine,
+                'dynamic': False,
+                'interpreter': None,
+                'needed': [],
+                'rpath': [],
+                'runpath': [],
+            }
+
+            for (p_type, p_offset, _, p_filesz) in segments:
+                if p_type == PT_INTERP:
+                    fh.seek(p_offset)
+                    res['interpreter'] = _decode(fh.read(p_filesz).rstrip(b'\0'))
+
+                elif p_type == PT_DYNAMIC:
+                    dyn_fmt = ELF_DYNAMIC_ENTRY_FORMATS[elf_class]
+                    dyn_entries = []
+                    for offset in range(p_offset, p_offset + p_filesz, struct.calcsize(endian + dyn_fmt)):
+                        tag, val = read_struct(dyn_fmt, offset)
+                        if tag == DT_NULL:
+                            break
+                        dyn_entries.append((tag, val))
+
+                    # location of string table is specified as virtual address,
+                    # which needs to be translated to an offset in the file via the loadable segments
+                    dyn_dict = dict(dyn_entries)
+                    strtab_addr, strtab_size = dyn_dict.get(DT_STRTAB), dyn_dict.get(DT_STRSZ, 0)
+                    strtab = None
+                    for (seg_type, seg_offset, seg_vaddr, seg_filesz) in segments:
+                        if seg_type == PT_LOAD and strtab_addr is not None:
+                            if seg_vaddr <= strtab_addr < seg_vaddr + seg_filesz:
+                                fh.seek(strtab_addr - seg_vaddr + seg_offset)
+                                strtab = fh.read(strtab_size)
+                                break
+
+                    for tag, val in dyn_entries:
+                        if tag in (DT_NEEDED, DT_RPATH, DT_RUNPATH):
+                            if strtab is None or val >= len(strtab):
+                                raise EasyBuildError("Failed to locate string table for dynamic section of %s", path)
+                            value = _decode(strtab[val:strtab.index(b'\0', val)])
+                            if tag == DT_NEEDED:
+                                res['needed'].append(value)
+                            elif tag == DT_RPATH:
+                                res['rpath'].extend(x for x in value.split(':') if x)
+                            else:
+                                res['runpath'].extend(x for x in value.split(':') if x)
+
+    except (IOError, OSError, ValueError, struct.error) as err:
+        raise EasyBuildError("Failed to read ELF file %s: %s", path, err)
+
+    res['dynamic'] = bool(res['interpreter'] or res['needed'])
+
+    return res
+
+
+def get_system_lib_dirs():
+    """
+    Return list of directories that are searched by the dynamic linker by default,
+    i.e. directories listed in /etc/ld.so.conf (incl. included files) and the trusted default directories.
+    """
+    if not _system_lib_dirs:
+        lib_dirs = []
+
+        def parse_ld_so_conf(path):
+            """Parse ld.so.conf file at specified location."""
+            try:
+                with open(path) as fh:
+                    lines = fh.readlines()
+            except (IOError, OSError) as err:
+                _log.debug("Failed to read %s: %s", path, err)
+                lines = []
+
+            for line in lines:
+                line = line.split('#')[0].strip()
+                if line.startswith('include '):
+                    pattern = line.split(None, 1)[1]
+                    for include_path in sorted(glob.glob(os.path.join(os.path.dirname(path), pattern))):
+                        parse_ld_so_conf(include_path)
+                elif line and not line.startswith('hwcap '):
+                    lib_dirs.append(line)
+
+        parse_ld_so_conf(LD_SO_CONF)
+
+        for lib_dir in lib_dirs + DEFAULT_LIB_DIRS:
+            if lib_dir not in _system_lib_dirs:
+                _system_lib_dirs.append(lib_dir)
+
+        _log.debug("Directories searched for shared libraries by default: %s", _system_lib_dirs)
+
+    return _system_lib_dirs
+
+
+def expand_origin(lib_dirs, path):
+    """
+    Expand $ORIGIN in specified list of directories (RPATH/RUNPATH entries) for ELF file at specified path.
+
+    :return: list of directories, or None if other dynamic string tokens (like $LIB or $PLATFORM) are used
+    """
+    res = []
+    origin = os.path.dirname(os.path.realpath(path))
+    for lib_dir in lib_dirs:
+        lib_dir = ORIGIN_REGEX.sub(lambda _: origin, lib_dir)
+        if '$' in lib_dir:
+            return None
+        res.append(lib_dir)
+    return res
+
+
+def find_missing_libs(path, elf_info=None, cache=None):
+    """
+    Determine which shared libraries required by ELF file at specified path (directly or indirectly)
+    can not be found, by following the search order of the dynamic linker ($LD_LIBRARY_PATH is not taken into account):
+    RPATH of the object (if it has no RUNPATH) and of the objects that (indirectly) load it, RUNPATH of the object,
+    and finally the default directories.
+
+    :param path: path to ELF file
+    :param elf_info: ELF information for specified file (see read_elf_info), if it is already available
+    :param cache: dictionary to cache ELF information of shared libraries in
+    :return: list of names of missing libraries, or None if it could not be determined
+    """
+    if cache is None:
+        cache = {}
+
+    def get_elf_info(lib_path):
+        """Get (cached) ELF information for specified file."""
+        if lib_path not in cache:
+            try:
+                cache[lib_path] = read_elf_info(lib_path)
+            except EasyBuildError as err:
+                _log.debug("Ignoring %s: %s", lib_path, err)
+                cache[lib_path] = None
+        return cache[lib_path]
+
+    if elf_info is None:
+        elf_info = get_elf_info(path)
+
+    missing = []
+    checked = set()
+
+    # stack of (path to object, ELF info for object, RPATH dirs inherited from objects that load it)
+    todo = [(path, elf_info, [])]
+    while todo:
+        obj_path, obj_info, inherited_rpath = todo.pop()
+
+        # RPATH is ignored for objects that also have a RUNPATH
+        if obj_info['runpath']:
+            rpath = []
+        else:
+            rpath = expand_origin(obj_info['rpath'], obj_path)
+        runpath = expand_origin(obj_info['runpath'], obj_path)
+        if rpath is None or runpath is None:
+            _log.debug("Unsupported dynamic string token in RPATH/RUNPATH of %s, can't resolve libraries", obj_path)
+            return None
+
+        search_dirs = rpath + inherited_rpath + runpath + get_system_lib_dirs()
+
+        for lib_name in obj_info['needed']:
+            if '/' in lib_name:
+                cands = [lib_name]
+            else:
+                cands = [os.path.join(lib_dir, lib_name) for lib_dir in search_dirs]
+
+            lib_path = None
+            for cand in cands:
+                if os.path.isfile(cand):
+                    lib_info = get_elf_info(cand)
+                    # libraries for a different architecture are skipped by the dynamic linker
+                    arch = (elf_info['class'], elf_info['machine'])
+                    if lib_info and (lib_info['class'], lib_info['machine']) == arch:
+                        lib_path = cand
+                        break
+
+            if lib_path is None:
+                missing.append(lib_name)
+            else:
+                real_lib_path = os.path.realpath(lib_path)
+                if real_lib_path not in checked:
+                    checked.add(real_lib_path)
+                    todo.append((lib_path, get_elf_info(lib_path), rpath + inherited_rpath))
+
+    return missing
@@ -40,6 +40,7 @@ Set of file tools.
 """
 import datetime
 import difflib
+import errno
 import fileinput
 import glob
 import hashlib
@@ -52,15 +53,18 @@ import signal
 import stat
 import sys
 import tempfile
+import threading
 import time
 import zlib
+from multiprocessing.pool import ThreadPool
 
 from easybuild.base import fancylogger
 from easybuild.tools import run
 # import build_log must stay, to use of EasyBuildLog
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, print_msg, print_warning
+from easybuild.tools.cache import PersistentCache, det_cache_key, det_cache_path
 from easybuild.tools.config import DEFAULT_WAIT_ON_LOCK_INTERVAL, GENERIC_EASYBLOCK_PKG, build_option, install_path
-from easybuild.tools.py2vs3 import HTMLParser, std_urllib, string_type
+from easybuild.tools.py2vs3 import HTMLParser, HTTPException, scandir, std_urllib, string_type
 from easybuild.tools.utilities import nub, remove_unwanted_chars
 
 try:
@@ -71,6 +75,17 @@ except ImportError:
 
 _log = fancylogger.getLogger('filetools', fname=False)
 
+# checksums that were computed already (or on the fly, for example while downloading a file),
+# indexed by (path, size, modification time, inode) of the file they correspond to
+_checksums_cache = {}
+
+# persistent caches for checksums, indexed by path to cache directory and maximum size
+_persistent_checksums_caches = {}
+
+# locks to avoid that concurrent downloads to the same path clash
+_download_locks = {}
+_download_locks_lock = threading.Lock()
+
 # easyblock class prefix
 EASYBLOCK_CLASS_PREFIX = 'EB_'
 
@@ -117,6 +132,16 @@ CHECKSUM_TYPE_MD5 = 'md5'
 CHECKSUM_TYPE_SHA256 = 'sha256'
 DEFAULT_CHECKSUM = CHECKSUM_TYPE_MD5
 
+# map of checksum types to constructors for checksum algorithms (with hashlib-compatible interface)
+CHECKSUM_ALGORITHMS = {
+    'adler32': lambda: ZlibChecksum(zlib.adler32),
+    'crc32': lambda: ZlibChecksum(zlib.crc32),
+    CHECKSUM_TYPE_MD5: hashlib.md5,
+    'sha1': hashlib.sha1,
+    CHECKSUM_TYPE_SHA256: hashlib.sha256,
+    'sha512': hashlib.sha512,
+}
+
 # map of checksum types to checksum functions
 CHECKSUM_FUNCTIONS = {
     'adler32': lambda p: calc_block_checksum(p, ZlibChecksum(zlib.adler32)),
@@ -129,6 +154,16 @@ CHECKSUM_FUNCTIONS = {
 }
 CHECKSUM_TYPES = sorted(CHECKSUM_FUNCTIONS.keys())
 
+# types of checksums that are computed on the fly when downloading files
+DOWNLOAD_CHECKSUM_TYPES = [CHECKSUM_TYPE_MD5, CHECKSUM_TYPE_SHA256]
+# size of chunks (in bytes) in which files are downloaded
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# suffix for (temporary) file that holds data of download that is still in progress
+PARTIAL_DOWNLOAD_SUFFIX = '.part'
+
+# all permission bits (incl. setuid/setgid/sticky bits)
+ALL_PERMISSION_BITS = 0o7777
+
 EXTRACT_CMDS = {
     # gzipped or gzipped tarball
     '.gtgz': "tar xzf %(filepath)s",
@@ -567,8 +602,60 @@ def derive_alt_pypi_url(url):
     return alt_pypi_url
 
 
+def get_download_lock(path):
+    """Return lock for downloading to specified path, to avoid that concurrent downloads clash."""
+    with _download_locks_lock:
+        return _download_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def stream_to_file(url_fd, path, resume=False):
+    """
+    Write data obtained from specified file-like object to file at specified path, in chunks.
+    Checksums are computed on the fly (see DOWNLOAD_CHECKSUM_TYPES).
+
+    :param url_fd: file-like object to read data from
+    :param path: location of file to write data to
+    :param resume: append to existing file, rather than overwriting it
+    :return: dictionary with checksums of the complete file (incl. data that was already present when resuming)
+    """
+    checksum_algorithms = dict((typ, CHECKSUM_ALGORITHMS[typ]()) for typ in DOWNLOAD_CHECKSUM_TYPES)
+
+    try:
+        if resume:
+            # take into account data that was downloaded previously
+            with open(path, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(DOWNLOAD_CHUNK_SIZE), b''):
+                    for algorithm in checksum_algorithms.values():
+                        algorithm.update(chunk)
+
+        handle = open(path, 'ab' if resume else 'wb')
+    except IOError as err:
+        raise EasyBuildError("Failed to open %s: %s", path, err)
+
+    try:
+        # note: reading from url_fd may raise an IOError, which should be handled by the caller
+        for chunk in iter(lambda: url_fd.read(DOWNLOAD_CHUNK_SIZE), b''):
+            try:
+                handle.write(chunk)
+            except IOError as err:
+                raise EasyBuildError("Failed to write to %s: %s", path, err)
+            for algorithm in checksum_algorithms.values():
+                algorithm.update(chunk)
+    finally:
+        handle.close()
+
+    return dict((typ, algorithm.hexdigest()) for (typ, algorithm) in checksum_algorithms.items())
+
+
 def download_file(filename, url, path, forced=False):
-    """Download a file from the given URL, to the specified path."""
+    """
+    Download a file from the given URL, to the specified path.
+
+    The file is downloaded in chunks to a temporary file next to the target path, which is renamed on completion.
+    A download that was interrupted is resumed using an HTTP range request (if the server supports it),
+    but only when retrying the download from the same URL; partial downloads left behind by an earlier call
+    are never resumed, since they may originate from a different URL.
+    """
 
     _log.debug("Trying to download %s from %s to %s", filename, url, path)
 
@@ -583,6 +670,9 @@ def download_file(filename, url, path, forced=False):
     basedir = os.path.dirname(path)
     mkdir(basedir, parents=True)
 
+    # data is downloaded to a temporary file first, which is only renamed once the download is complete
+    partial_path = path + PARTIAL_DOWNLOAD_SUFFIX
+
     # try downloading, three times max.
     downloaded = False
     max_attempts = 3
@@ -591,56 +681,118 @@ def download_file(filename, url, path, forced=False):
     # use custom HTTP header
     headers = {'User-Agent': 'EasyBuild', 'Accept': '*/*'}
     # for backward compatibility, and to avoid relying on 3rd party Python library 'requests'
-    url_req = std_urllib.Request(url, headers=headers)
     used_urllib = std_urllib
     switch_to_requests = False
 
-    while not downloaded and attempt_cnt < max_attempts:
-        attempt_cnt += 1
-        try:
-            if used_urllib is std_urllib:
-                # urllib2 (Python 2) / urllib.request (Python 3) does the right thing for http proxy setups,
-                # urllib does not!
-                url_fd = std_urllib.urlopen(url_req, timeout=timeout)
-                status_code = url_fd.getcode()
-            else:
-                response = requests.get(url, headers=headers, stream=True, timeout=timeout)
-                status_code = response.status_code
-                response.raise_for_status()
-                url_fd = response.raw
-                url_fd.decode_content = True
-            _log.debug('response code for given url %s: %s' % (url, status_code))
-            write_file(path, url_fd.read(), forced=forced, backup=True)
-            _log.info("Downloaded file %s from url %s to %s" % (filename, url, path))
-            downloaded = True
-            url_fd.close()
-        except used_urllib.HTTPError as err:
-            if used_urllib is std_urllib:
-                status_code = err.code
-            if status_code == 403 and attempt_cnt == 1:
-                switch_to_requests = True
-            elif 400 <= status_code <= 499:
-                _log.warning("URL %s was not found (HTTP response code %s), not trying again" % (url, status_code))
-                break
-            else:
-                _log.warning("HTTPError occurred while trying to download %s to %s: %s" % (url, path, err))
-        except IOError as err:
-            _log.warning("IOError occurred while trying to download %s to %s: %s" % (url, path, err))
-            error_re = re.compile(r"<urlopen error \[Errno 1\] _ssl.c:.*: error:.*:"
-                                  "SSL routines:SSL23_GET_SERVER_HELLO:sslv3 alert handshake failure>")
-            if error_re.match(str(err)):
-                switch_to_requests = True
-        except Exception as err:
-            raise EasyBuildError("Unexpected error occurred when trying to download %s to %s: %s", url, path, err)
-
-        if not downloaded and attempt_cnt < max_attempts:
-            _log.info("Attempt %d of downloading %s to %s failed, trying again..." % (attempt_cnt, url, path))
-            if used_urllib is std_urllib and switch_to_requests:
-                if not HAVE_REQUESTS:
-                    raise EasyBuildError("SSL issues with urllib2. If you are using RHEL/CentOS 6.x please "
-                                         "install the python-requests and pyOpenSSL RPM packages and try again.")
-                _log.info("Downloading using requests package instead of urllib2")
-                used_urllib = requests
+    # make sure that only one download to the specified path is done at the same time
+    with get_download_lock(path):
+        # partial download left behind by an earlier call may originate from a different URL (or a different
+        # version of the file), so don't resume it; only data downloaded during this call can be resumed
+        if os.path.exists(partial_path):
+            _log.info("Removing stale partial download %s", partial_path)
+            remove_file(partial_path)
+
+        while not downloaded and attempt_cnt < max_attempts:
+            attempt_cnt += 1
+
+            # resume download if data was already downloaded in an earlier (failed) attempt of this call
+            resume_from = 0
+            if os.path.exists(partial_path):
+                resume_from = os.path.getsize(partial_path)
+            req_headers = headers.copy()
+            if resume_from:
+                req_headers['Range'] = 'bytes=%d-' % resume_from
+
+            try:
+                if used_urllib is std_urllib:
+                    # urllib2 (Python 2) / urllib.request (Python 3) does the right thing for http proxy setups,
+                    # urllib does not!
+                    url_req = std_urllib.Request(url, headers=req_headers)
+                    url_fd = std_urllib.urlopen(url_req, timeout=timeout)
+                    status_code = url_fd.getcode()
+                    content_length = url_fd.info().get('Content-Length')
+                else:
+                    response = requests.get(url, headers=req_headers, stream=True, timeout=timeout)
+                    status_code = response.status_code
+                    response.raise_for_status()
+                    content_length = response.headers.get('Content-Length')
+                    url_fd = response.raw
+                    url_fd.decode_content = True
+                _log.debug('response code for given url %s: %s' % (url, status_code))
+
+                if not forced and build_option('extended_dry_run'):
+                    dry_run_msg("file written: %s" % path, silent=build_option('silent'))
+                else:
+                    # response code 206 (Partial Content) indicates that the server honored the range request
+                    if resume_from and status_code == 206:
+                        _log.info("Resuming download of %s from %s at byte %d", filename, url, resume_from)
+                    elif resume_from:
+                        _log.info("Server did not honor range request, restarting download of %s from scratch", url)
+                        resume_from = 0
+
+                    checksums = stream_to_file(url_fd, partial_path, resume=bool(resume_from))
+
+                    # connection may be closed before all data was received, without an error being raised;
+                    # partial download is retained, so the download can be resumed in the next attempt
+                    if content_length is not None:
+                        expected_size = resume_from + int(content_length)
+                        size = os.path.getsize(partial_path)
+                        if size < expected_size:
+                            raise IOError("Incomplete download, only got %d of %d bytes" % (size, expected_size))
+
+                    if os.path.exists(path):
+                        _log.info("Overwriting existing file %s", path)
+                        backed_up_fp = back_up_file(path)
+                        _log.info("Existing file %s backed up to %s", path, backed_up_fp)
+                    try:
+                        os.rename(partial_path, path)
+                    except OSError as err:
+                        raise EasyBuildError("Failed to rename %s to %s: %s", partial_path, path, err)
+
+                    # keep track of checksums computed while downloading, to avoid having to compute them again
+                    register_checksums(path, checksums)
+
+                _log.info("Downloaded file %s from url %s to %s" % (filename, url, path))
+                downloaded = True
+                url_fd.close()
+            except used_urllib.HTTPError as err:
+                if used_urllib is std_urllib:
+                    status_code = err.code
+                if status_code == 416 and resume_from:
+                    # requested range not satisfiable, so partial download is of no use
+                    _log.warning("Failed to resume download of %s, starting from scratch", url)
+                    remove_file(partial_path)
+                elif status_code == 403 and attempt_cnt == 1:
+                    switch_to_requests = True
+                elif 400 <= status_code <= 499:
+                    _log.warning("URL %s was not found (HTTP response code %s), not trying again", url, status_code)
+                    break
+                else:
+                    _log.warning("HTTPError occurred while trying to download %s to %s: %s" % (url, path, err))
+            except IOError as err:
+                _log.warning("IOError occurred while trying to download %s to %s: %s" % (url, path, err))
+                error_re = re.compile(r"<urlopen error \[Errno 1\] _ssl.c:.*: error:.*:"
+                                      "SSL routines:SSL23_GET_SERVER_HELLO:sslv3 alert handshake failure>")
+                if error_re.match(str(err)):
+                    switch_to_requests = True
+            except HTTPException as err:
+                # for example IncompleteRead, when connection was closed before all data was received
+                _log.warning("HTTPException occurred while trying to download %s to %s: %s" % (url, path, err))
+            except Exception as err:
+                raise EasyBuildError("Unexpected error occurred when trying to download %s to %s: %s", url, path, err)
+
+            if not downloaded and attempt_cnt < max_attempts:
+                _log.info("Attempt %d of downloading %s to %s failed, trying again..." % (attempt_cnt, url, path))
+                if used_urllib is std_urllib and switch_to_requests:
+                    if not HAVE_REQUESTS:
+                        raise EasyBuildError("SSL issues with urllib2. If you are using RHEL/CentOS 6.x please "
+                                             "install the python-requests and pyOpenSSL RPM packages and try again.")
+                    _log.info("Downloading using requests package instead of urllib2")
+                    used_urllib = requests
+
+        # don't leave partial download behind, it can not be resumed anyway
+        if not downloaded and os.path.exists(partial_path):
+            remove_file(partial_path)
 
     if downloaded:
         _log.info("Successful download of file %s from url %s to path %s" % (filename, url, path))
@@ -921,6 +1073,115 @@ def find_eb_script(script_name):
     return script_loc
 
 
+def get_persistent_checksums_cache():
+    """
+    Return interface to persistent cache for checksums of files, or None if it is not enabled.
+    """
+    res = None
+    if build_option('checksums_cache'):
+        path = build_option('checksums_cache_dir') or det_cache_path('checksums')
+        max_size = build_option('checksums_cache_max_size') * 1024 * 1024
+        key = (path, max_size)
+        if key not in _persistent_checksums_caches:
+            _log.info("Using persistent cache for checksums at %s (max. size: %d bytes)", path, max_size)
+            _persistent_checksums_caches[key] = PersistentCache(path, max_size=max_size)
+        res = _persistent_checksums_caches[key]
+
+    return res
+
+
+def det_checksums_cache_key(path):
+    """
+    Determine key for cached checksums of specified file, which takes into account size, modification time & inode,
+    so cached checksums are no longer used when the file is changed or replaced.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # st_mtime_ns is only available in Python 3
+    mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+    return (os.path.realpath(path), st.st_size, mtime, st.st_ino)
+
+
+def get_cached_checksums(path):
+    """
+    Return dictionary with cached checksums for specified file (indexed by checksum type).
+    """
+    res = {}
+    key = det_checksums_cache_key(path)
+    if key is not None:
+        if key not in _checksums_cache:
+            persistent_cache = get_persistent_checksums_cache()
+            if persistent_cache is not None:
+                cached_checksums = persistent_cache.get(det_cache_key(*key))
+                if cached_checksums:
+                    _log.debug("Found cached checksums for %s in persistent cache: %s", path, cached_checksums)
+                    _checksums_cache[key] = cached_checksums
+        res = _checksums_cache.get(key, {})
+
+    return res
+
+
+def register_checksums(path, checksums):
+    """
+    Register checksums for file at specified path, so they don't need to be computed again.
+
+    :param path: path to file
+    :param checksums: dictionary with checksums (indexed by checksum type)
+    """
+    key = det_checksums_cache_key(path)
+    if key is not None:
+        cached_checksums = _checksums_cache.setdefault(key, {})
+        cached_checksums.update(checksums)
+
+        persistent_cache = get_persistent_checksums_cache()
+        if persistent_cache is not None:
+            persistent_cache.put(det_cache_key(*key), cached_checksums)
+
+
+def compute_checksums(path, checksum_types):
+    """
+    Compute checksums of specified types for specified file.
+    Cached checksums are used when available; all others are computed in a single pass over the file.
+
+    :param path: Path of file to compute checksums for
+    :param checksum_types: list of checksum types (see CHECKSUM_TYPES)
+    :return: dictionary with checksums, indexed by checksum type
+    """
+    for checksum_type in checksum_types:
+        if checksum_type not in CHECKSUM_FUNCTIONS:
+            raise EasyBuildError("Unknown checksum type (%s), supported types are: %s",
+                                 checksum_type, CHECKSUM_FUNCTIONS.keys())
+
+    cached_checksums = get_cached_checksums(path)
+    res = dict((typ, cached_checksums[typ]) for typ in checksum_types if typ in cached_checksums)
+    if res:
+        _log.debug("Using cached checksums for %s: %s", path, res)
+
+    todo = nub([typ for typ in checksum_types if typ not in res])
+    if todo:
+        checksums = {}
+        algorithms = dict((typ, CHECKSUM_ALGORITHMS[typ]()) for typ in todo if typ in CHECKSUM_ALGORITHMS)
+        try:
+            if algorithms:
+                checksums.update(calc_block_checksums(path, algorithms))
+            for typ in todo:
+                if typ not in algorithms:
+                    checksums[typ] = CHECKSUM_FUNCTIONS[typ](path)
+        except (IOError, OSError) as err:
+            raise EasyBuildError("Failed to read %s: %s", path, err)
+        except MemoryError as err:
+            _log.warning("A memory error occurred when computing the checksum for %s: %s" % (path, err))
+            checksums = dict((typ, 'dummy_checksum_due_to_memory_error') for typ in todo)
+        else:
+            register_checksums(path, checksums)
+
+        res.update(checksums)
+
+    return res
+
+
 def compute_checksum(path, checksum_type=DEFAULT_CHECKSUM):
     """
     Compute checksum of specified file.
@@ -928,41 +1189,67 @@ def compute_checksum(path, checksum_type=DEFAULT_CHECKSUM):
     :param path: Path of file to compute checksum for
     :param checksum_type: type(s) of checksum ('adler32', 'crc32', 'md5' (default), 'sha1', 'sha256', 'sha512', 'size')
     """
-    if checksum_type not in CHECKSUM_FUNCTIONS:
-        raise EasyBuildError("Unknown checksum type (%s), supported types are: %s",
-                             checksum_type, CHECKSUM_FUNCTIONS.keys())
-
-    try:
-        checksum = CHECKSUM_FUNCTIONS[checksum_type](path)
-    except IOError as err:
-        raise EasyBuildError("Failed to read %s: %s", path, err)
-    except MemoryError as err:
-        _log.warning("A memory error occurred when computing the checksum for %s: %s" % (path, err))
-        checksum = 'dummy_checksum_due_to_memory_error'
+    return compute_checksums(path, [checksum_type])[checksum_type]
 
-    return checksum
 
+def calc_block_checksums(path, algorithms):
+    """
+    Calculate checksums of a file for multiple algorithms, by reading it into blocks (only once).
 
-def calc_block_checksum(path, algorithm):
-    """Calculate a checksum of a file by reading it into blocks"""
+    :param path: path to file
+    :param algorithms: dictionary with checksum algorithms to use (with hashlib-compatible interface)
+    :return: dictionary with checksums, using same keys as algorithms dictionary
+    """
     # We pick a blocksize of 16 MB: it's a multiple of the internal
     # blocksize of md5/sha1 (64) and gave the best speed results
-    try:
-        # in hashlib, blocksize is a class parameter
-        blocksize = algorithm.blocksize * 262144  # 2^18
-    except AttributeError:
-        blocksize = 16777216  # 2^24
+    blocksize = 16777216  # 2^24
+    for algorithm in algorithms.values():
+        try:
+            # in hashlib, blocksize is a class parameter
+            blocksize = max(blocksize, algorithm.blocksize * 262144)  # 2^18
+        except AttributeError:
+            pass
     _log.debug("Using blocksize %s for calculating the checksum" % blocksize)
 
     try:
         f = open(path, 'rb')
         for block in iter(lambda: f.read(blocksize), b''):
-            algorithm.update(block)
+            for algorithm in algorithms.values():
+                algorithm.update(block)
         f.close()
     except IOError as err:
         raise EasyBuildError("Failed to read %s: %s", path, err)
 
-    return algorithm.hexdigest()
+    return dict((key, algorithm.hexdigest()) for (key, algorithm) in algorithms.items())
+
+
+def calc_block_checksum(path, algorithm):
+    """Calculate a checksum of a file by reading it into blocks"""
+    return calc_block_checksums(path, {None: algorithm})[None]
+
+
+def det_checksum_types(filename, checksums):
+    """
+    Determine list of checksum types that are required to verify specified checksum spec for file with given name.
+    Invalid checksum specs are ignored here (they are reported by verify_checksum).
+    """
+    res = []
+
+    if isinstance(checksums, dict):
+        checksums = checksums.get(filename)
+
+    if isinstance(checksums, string_type):
+        if len(checksums) == 64:
+            res.append(CHECKSUM_TYPE_SHA256)
+        elif len(checksums) == 32:
+            res.append(CHECKSUM_TYPE_MD5)
+    elif isinstance(checksums, tuple) and len(checksums) == 2 and checksums[0] in CHECKSUM_FUNCTIONS:
+        res.append(checksums[0])
+    elif isinstance(checksums, (list, tuple)):
+        for checksum in checksums:
+            res.extend(det_checksum_types(filename, checksum))
+
+    return nub(res)
 
 
 def verify_checksum(path, checksums):
@@ -986,6 +1273,12 @@ def verify_checksum(path, checksums):
     if not isinstance(checksums, list):
         checksums = [checksums]
 
+    # compute all required types of checksums in a single pass over the file,
+    # so alternative checksums and multiple checksum types don't imply reading the file over and over again
+    checksum_types = det_checksum_types(filename, checksums)
+    if len(checksum_types) > 1:
+        compute_checksums(path, checksum_types)
+
     for checksum in checksums:
         if isinstance(checksum, dict):
             if filename in checksum:
@@ -1272,7 +1565,10 @@ def apply_patch(patch_file, dest, fn=None, copy=False, level=None, use_git_am=Fa
 
         patch_cmd = "patch -b -p%s -i %s" % (level, abs_patch_file)
 
-    out, ec = run.run_cmd(patch_cmd, simple=False, path=abs_dest, log_ok=False, trace=False)
+    # (last part of) output is only used in error message
+    out, ec = run.run_cmd(patch_cmd, simple=False, path=abs_dest, log_ok=False, trace=False, output_handle=True)
+    with out:
+        out = str(out)
 
     if ec:
         raise EasyBuildError("Couldn't apply patch file %s. Process exited with code %s: %s", patch_file, ec, out)
@@ -1378,90 +1674,213 @@ def adjust_permissions(provided_path, permission_bits, add=True, onlyfiles=False
         depr_msg += "(symlinks are never followed anymore)"
         _log.deprecated(depr_msg, '4.0')
 
+    if relative:
+        changes = [(permission_bits, add, onlyfiles, onlydirs)]
+    else:
+        # hard setting permissions is equivalent to removing all permission bits, and then adding the specified ones
+        changes = [(ALL_PERMISSION_BITS, False, onlyfiles, onlydirs), (permission_bits, True, onlyfiles, onlydirs)]
+
+    plan = det_permissions_plan(changes)
+    apply_permissions_plan(provided_path, plan, recursive=recursive, group_id=group_id, ignore_errors=ignore_errors)
+
+
+def det_permissions_plan(changes):
+    """
+    Combine a sequence of relative permission changes into a single change, for files and directories separately.
+
+    :param changes: list of (permission_bits, add, onlyfiles, onlydirs) tuples, in the order they should be applied
+    :return: dictionary with (bits to remove, bits to add) tuple for files ('files') and directories ('dirs');
+             new permissions are determined as (current & ~bits to remove) | bits to add
+    """
+    plan = {'dirs': (0, 0), 'files': (0, 0)}
+
+    for permission_bits, add, onlyfiles, onlydirs in changes:
+        for key, skip in [('dirs', onlyfiles), ('files', onlydirs)]:
+            if not skip:
+                remove_bits, add_bits = plan[key]
+                if add:
+                    add_bits |= permission_bits
+                else:
+                    remove_bits |= permission_bits
+                    add_bits &= ~permission_bits
+                plan[key] = (remove_bits, add_bits)
+
+    return plan
+
+
+def _apply_permissions(path, st, is_dir, plan, group_id, stats, deferred=None):
+    """
+    Apply permissions plan (see det_permissions_plan) to specified path, for which stat result (not following symlinks)
+    is already available, and update counters in provided stats dictionary accordingly.
+
+    If a list is provided via 'deferred', read/execute permissions for the owner of a directory are retained for now,
+    so its contents can still be processed; the final permissions for that directory are added to the list instead.
+    """
+    # don't change permissions if path is a symlink, since we're not checking where the symlink points to
+    # this is done because of security concerns (symlink may point out of installation directory)
+    # (note: os.lchmod is not supported on Linux)
+    if stat.S_ISLNK(st.st_mode):
+        stats['symlinks'] += 1
+    else:
+        remove_bits, add_bits = plan['dirs' if is_dir else 'files']
+        new_perms = (st.st_mode & ~remove_bits) | add_bits
+        if is_dir and deferred is not None:
+            traverse_perms = new_perms | (st.st_mode & (stat.S_IRUSR | stat.S_IXUSR))
+            if traverse_perms != new_perms:
+                deferred.append((path, stat.S_IMODE(new_perms)))
+                new_perms = traverse_perms
+        # only actually do chmod if current permissions are not correct already
+        # (this is important because chmod requires that files are owned by current user)
+        if new_perms != st.st_mode:
+            os.chmod(path, stat.S_IMODE(new_perms))
+            stats['chmod'] += 1
+
+    # only change the group id if it the current gid is different from what we want
+    if group_id and st.st_gid != group_id:
+        os.lchown(path, -1, group_id)
+        stats['chown'] += 1
+
+
+def _apply_permissions_dir(dirpath, plan, group_id, ignore_errors):
+    """
+    Apply permissions plan to all entries in specified directory (non-recursively), using a single scandir call.
+
+    :return: tuple with list of subdirectories to process next, stats dictionary, list of failures,
+             and list of (path, permissions) tuples for subdirectories that should be changed after processing them
+    """
+    subdirs, failures, deferred = [], [], []
+    stats = {'chmod': 0, 'chown': 0, 'fail': 0, 'symlinks': 0, 'total': 0}
+
+    try:
+        entries = list(scandir(dirpath))
+    except OSError as err:
+        if ignore_errors:
+            _log.info("Failed to list contents of %s, so skipping it when adjusting permissions: %s", dirpath, err)
+            stats['fail'] += 1
+        else:
+            failures.append((dirpath, err))
+        entries = []
+
+    for entry in entries:
+        stats['total'] += 1
+        try:
+            st = entry.stat(follow_symlinks=False)
+            # symlinks to directories are treated as directories, like os.walk does, but are never followed
+            is_dir = entry.is_dir()
+            if is_dir and not stat.S_ISLNK(st.st_mode):
+                subdirs.append(entry.path)
+            _apply_permissions(entry.path, st, is_dir, plan, group_id, stats, deferred=deferred)
+        except OSError as err:
+            if ignore_errors:
+                # ignore errors while adjusting permissions (for example caused by bad links)
+                _log.debug("Failed to chmod/chown %s (but ignoring it): %s", entry.path, err)
+                stats['fail'] += 1
+            else:
+                failures.append((entry.path, err))
+
+    return subdirs, stats, failures, deferred
+
+
+def apply_permissions_plan(provided_path, plan, recursive=True, group_id=None, ignore_errors=False, parallel=1):
+    """
+    Apply permissions plan (see det_permissions_plan) to specified path, in a single pass over the directory tree.
+
+    :param provided_path: path to apply permissions plan to
+    :param plan: permissions plan, i.e. (bits to remove, bits to add) for files ('files') and directories ('dirs')
+    :param recursive: also apply permissions plan to all files and directories in specified path
+    :param group_id: also change group ownership to group with this group ID
+    :param ignore_errors: ignore errors that occur when changing permissions
+                          (up to a maximum ratio specified by --max-fail-ratio-adjust-permissions configuration option)
+    :param parallel: number of threads to use to process subdirectories concurrently
+    """
     provided_path = os.path.abspath(provided_path)
 
     if recursive:
         _log.info("Adjusting permissions recursively for %s", provided_path)
-        allpaths = [provided_path]
-        for root, dirs, files in os.walk(provided_path):
-            paths = []
-            if not onlydirs:
-                paths.extend(files)
-            if not onlyfiles:
-                # os.walk skips symlinked dirs by default, i.e., no special handling needed here
-                paths.extend(dirs)
-
-            for path in paths:
-                allpaths.append(os.path.join(root, path))
-
     else:
         _log.info("Adjusting permissions for %s (no recursion)", provided_path)
-        allpaths = [provided_path]
 
-    failed_paths = []
-    fail_cnt = 0
-    err_msg = None
-    for path in allpaths:
-        try:
-            # don't change permissions if path is a symlink, since we're not checking where the symlink points to
-            # this is done because of security concerns (symlink may point out of installation directory)
-            # (note: os.lchmod is not supported on Linux)
-            if os.path.islink(path):
-                _log.debug("Not changing permissions for %s, since it's a symlink", path)
-            else:
-                # determine current permissions
-                current_perms = os.lstat(path)[stat.ST_MODE]
-                _log.debug("Current permissions for %s: %s", path, oct(current_perms))
-
-                if relative:
-                    # relative permissions (add or remove)
-                    if add:
-                        _log.debug("Adding permissions for %s: %s", path, oct(permission_bits))
-                        new_perms = current_perms | permission_bits
-                    else:
-                        _log.debug("Removing permissions for %s: %s", path, oct(permission_bits))
-                        new_perms = current_perms & ~permission_bits
-                else:
-                    # hard permissions bits (not relative)
-                    new_perms = permission_bits
-                    _log.debug("Hard setting permissions for %s: %s", path, oct(new_perms))
-
-                # only actually do chmod if current permissions are not correct already
-                # (this is important because chmod requires that files are owned by current user)
-                if new_perms == current_perms:
-                    _log.debug("Current permissions for %s are already OK: %s", path, oct(current_perms))
-                else:
-                    _log.debug("Changing permissions for %s to %s", path, oct(new_perms))
-                    os.chmod(path, new_perms)
-
-            if group_id:
-                # only change the group id if it the current gid is different from what we want
-                cur_gid = os.lstat(path).st_gid
-                if cur_gid == group_id:
-                    _log.debug("Group id of %s is already OK (%s)", path, group_id)
-                else:
-                    _log.debug("Changing group id of %s to %s", path, group_id)
-                    os.lchown(path, -1, group_id)
+    _log.debug("Permissions plan (bits to remove, bits to add) for files: (%s, %s), for directories: (%s, %s)",
+               oct(plan['files'][0]), oct(plan['files'][1]), oct(plan['dirs'][0]), oct(plan['dirs'][1]))
+
+    stats = {'chmod': 0, 'chown': 0, 'fail': 0, 'symlinks': 0, 'total': 1}
+    failures = []
 
+    # permissions for directories that would make them inaccessible are only applied once their contents
+    # have been processed, deepest directories first
+    deferred = []
+
+    subdirs = []
+    try:
+        st = os.lstat(provided_path)
+        is_dir = os.path.isdir(provided_path)
+        if recursive and is_dir and not stat.S_ISLNK(st.st_mode):
+            subdirs.append(provided_path)
+            _apply_permissions(provided_path, st, is_dir, plan, group_id, stats, deferred=deferred)
+        else:
+            _apply_permissions(provided_path, st, is_dir, plan, group_id, stats)
+    except OSError as err:
+        if ignore_errors:
+            _log.info("Failed to chmod/chown %s (but ignoring it): %s", provided_path, err)
+            stats['fail'] += 1
+        else:
+            failures.append((provided_path, err))
+
+    def process_dir(dirpath):
+        """Process specified directory."""
+        return _apply_permissions_dir(dirpath, plan, group_id, ignore_errors)
+
+    # directories are processed level by level, such that only the list of directories at a particular depth
+    # is kept in memory; if requested, directories at the same depth are processed concurrently
+    pool = None
+    if parallel > 1 and subdirs:
+        pool = ThreadPool(parallel)
+
+    try:
+        while subdirs:
+            if pool is None:
+                results = (process_dir(dirpath) for dirpath in subdirs)
+            else:
+                results = pool.imap_unordered(process_dir, subdirs)
+
+            next_subdirs = []
+            for dir_subdirs, dir_stats, dir_failures, dir_deferred in results:
+                next_subdirs.extend(dir_subdirs)
+                for key in stats:
+                    stats[key] += dir_stats[key]
+                failures.extend(dir_failures)
+                deferred.extend(dir_deferred)
+            subdirs = next_subdirs
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # directories are listed level by level, so deeper directories are always later in the list
+    for path, perms in reversed(deferred):
+        try:
+            os.chmod(path, perms)
         except OSError as err:
             if ignore_errors:
-                # ignore errors while adjusting permissions (for example caused by bad links)
-                _log.info("Failed to chmod/chown %s (but ignoring it): %s", path, err)
-                fail_cnt += 1
+                _log.info("Failed to chmod %s (but ignoring it): %s", path, err)
+                stats['fail'] += 1
             else:
-                failed_paths.append(path)
-                err_msg = err
+                failures.append((path, err))
 
-    if failed_paths:
-        raise EasyBuildError("Failed to chmod/chown several paths: %s (last error: %s)", failed_paths, err_msg)
+    _log.info("Adjusted permissions for %(total)d paths in %(path)s: %(chmod)d chmod, %(chown)d chown, "
+              "%(symlinks)d symlinks skipped, %(fail)d failures ignored", dict(stats, path=provided_path))
+
+    if failures:
+        failed_paths = [path for (path, _) in failures]
+        raise EasyBuildError("Failed to chmod/chown several paths: %s (last error: %s)", failed_paths, failures[-1][1])
 
     # we ignore some errors, but if there are to many, something is definitely wrong
-    fail_ratio = fail_cnt / float(len(allpaths))
+    fail_ratio = stats['fail'] / float(stats['total'])
     max_fail_ratio = float(build_option('max_fail_ratio_adjust_permissions'))
     if fail_ratio > max_fail_ratio:
         raise EasyBuildError("%.2f%% of permissions/owner operations failed (more than %.2f%%), "
                              "something must be wrong...", 100 * fail_ratio, 100 * max_fail_ratio)
-    elif fail_cnt > 0:
+    elif stats['fail'] > 0:
         _log.debug("%.2f%% of permissions/owner operations failed, ignoring that...", 100 * fail_ratio)
 
 
@@ -1522,7 +1941,11 @@ def mkdir(path, parents=False, set_gid=None, sticky=None):
             else:
                 os.mkdir(path)
         except OSError as err:
-            raise EasyBuildError("Failed to create directory %s: %s", path, err)
+            # directory may have been created concurrently (for example by another thread)
+            if err.errno == errno.EEXIST and os.path.isdir(path):
+                _log.debug("Directory %s was created concurrently", path)
+            else:
+                raise EasyBuildError("Failed to create directory %s: %s", path, err)
 
         # set group ID and sticky bits, if desired
         bits = 0
@@ -2197,7 +2620,7 @@ def get_source_tarball_from_git(filename, targetdir, git_config):
 
     tmpdir = tempfile.mkdtemp()
     cwd = change_dir(tmpdir)
-    run.run_cmd(' '.join(clone_cmd), log_all=True, log_ok=False, simple=False, regexp=False)
+    run.run_cmd(' '.join(clone_cmd), log_all=True, log_ok=False, simple=True, regexp=False)
 
     # if a specific commit is asked for, check it out
     if commit:
@@ -2205,14 +2628,14 @@ def get_source_tarball_from_git(filename, targetdir, git_config):
         if recursive:
             checkout_cmd.extend(['&&', 'git', 'submodule', 'update'])
 
-        run.run_cmd(' '.join(checkout_cmd), log_all=True, log_ok=False, simple=False, regexp=False, path=repo_name)
+        run.run_cmd(' '.join(checkout_cmd), log_all=True, log_ok=False, simple=True, regexp=False, path=repo_name)
 
     # create an archive and delete the git repo directory
     if keep_git_dir:
         tar_cmd = ['tar', 'cfvz', targetpath, repo_name]
     else:
         tar_cmd = ['tar', 'cfvz', targetpath, '--exclude', '.git', repo_name]
-    run.run_cmd(' '.join(tar_cmd), log_all=True, log_ok=False, simple=False, regexp=False)
+    run.run_cmd(' '.join(tar_cmd), log_all=True, log_ok=False, simple=True, regexp=False)
 
     # cleanup (repo_name dir does not exist in dry run mode)
     change_dir(cwd)
@@ -44,7 +44,8 @@ from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option, get_module_syntax, install_path
 from easybuild.tools.filetools import convert_name, mkdir, read_file, remove_file, resolve_path, symlink, write_file
-from easybuild.tools.modules import ROOT_ENV_VAR_NAME_PREFIX, EnvironmentModulesC, Lmod, modules_tool
+from easybuild.tools.modules import MODULE_DEPS_CACHE, MODULE_FILE_DEPS_CACHE, ROOT_ENV_VAR_NAME_PREFIX
+from easybuild.tools.modules import EnvironmentModulesC, Lmod, modules_tool
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.utilities import get_subclasses, quote_str
 
@@ -85,15 +86,35 @@ def module_load_regex(modfilepath):
     return re.compile(regex, re.M)
 
 
+def module_file_dependencies(mod_filepath):
+    """
+    Return list of (direct) dependencies listed in specified module file;
+    each module file is only parsed once, unless it was changed since it was parsed.
+    """
+    st = os.stat(mod_filepath)
+    stamp = (st.st_mtime, st.st_size)
+
+    cached = MODULE_FILE_DEPS_CACHE.get(mod_filepath)
+    if cached is None or cached[0] != stamp:
+        modtxt = read_file(mod_filepath)
+        cached = (stamp, module_load_regex(mod_filepath).findall(modtxt))
+        MODULE_FILE_DEPS_CACHE[mod_filepath] = cached
+
+    return cached[1][:]
+
+
 def dependencies_for(mod_name, modtool, depth=None):
     """
     Obtain a list of dependencies for the given module, determined recursively, up to a specified depth (optionally)
     :param depth: recursion depth (default is None, which corresponds to infinite recursion depth)
     """
-    mod_filepath = modtool.modulefile_path(mod_name)
-    modtxt = read_file(mod_filepath)
-    loadregex = module_load_regex(mod_filepath)
-    mods = loadregex.findall(modtxt)
+    # result is cached, so dependencies shared by multiple modules are only determined once
+    key = modtool.mk_module_cache_key('%s;depth=%s' % (mod_name, depth))
+    if key in MODULE_DEPS_CACHE:
+        _log.debug("Found cached dependencies for %s (depth: %s): %s", mod_name, depth, MODULE_DEPS_CACHE[key])
+        return MODULE_DEPS_CACHE[key][:]
+
+    mods = module_file_dependencies(modtool.modulefile_path(mod_name))
 
     if depth is None or depth > 0:
         if depth and depth > 0:
@@ -110,9 +131,20 @@ def dependencies_for(mod_name, modtool, depth=None):
             if dep not in mods:
                 mods.append(dep)
 
+    MODULE_DEPS_CACHE[key] = mods[:]
+
     return mods
 
 
+def dependency_graph(mod_names, modtool, depth=None):
+    """
+    Determine dependencies for each of the specified modules (see dependencies_for).
+
+    :return: dictionary with set of (recursive) dependencies for each module
+    """
+    return dict((mod_name, set(dependencies_for(mod_name, modtool, depth=depth))) for mod_name in mod_names)
+
+
 class ModuleGenerator(object):
     """
     Class for generating module files.
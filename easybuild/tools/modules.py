@@ -38,10 +38,13 @@ This python module implements the environment modules functionality:
 import os
 import re
 import shlex
+import stat
+import time
 from distutils.version import StrictVersion
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, print_warning
+from easybuild.tools.cache import PersistentCache, det_cache_key, det_cache_path
 from easybuild.tools.config import ERROR, IGNORE, PURGE, UNLOAD, UNSET
 from easybuild.tools.config import EBROOT_ENV_VAR_ACTIONS, LOADED_MODULES_ACTIONS
 from easybuild.tools.config import build_option, get_modules_tool, install_path
@@ -124,10 +127,340 @@ MODULE_SHOW_CACHE = {}
 # value: corresponding (validated) module version
 MODULE_VERSION_CACHE = {}
 
+# cache for changes made to environment by 'module load'/'module unload' commands
+# cache key: module command, module arguments & digest of current environment (see ModulesTool.mk_module_cache_key)
+# value: dictionary with environment variables changed by the module command (None for unset variables)
+MODULE_ENV_CHANGES_CACHE = {}
+
+# cache for (transitive) dependencies of modules, see dependencies_for in easybuild.tools.module_generator
+# cache key: module name & recursion depth, combined with $MODULEPATH (see ModulesTool.mk_module_cache_key)
+# value: list of names of dependency modules
+MODULE_DEPS_CACHE = {}
+
+# cache for dependencies listed in module files, see module_file_dependencies in easybuild.tools.module_generator
+# key: path to module file
+# value: tuple with modification time & size of module file, and list of (direct) dependencies
+MODULE_FILE_DEPS_CACHE = {}
+
+# index of module files, see ModulePathIndex
+# key: path to directory listed in $MODULEPATH
+# value: corresponding ModulePathIndex instance
+MODULE_INDEX = {}
+
+# interfaces to persistent caches for index of module files, by path to cache directory
+_persistent_modules_index_caches = {}
+
+# version of format of module index, should be bumped when ModulePathIndex is changed in an incompatible way
+MODULE_INDEX_FORMAT_VERSION = 1
+
+# margin (in seconds) for modification time of directories, changes made to a directory
+# within this margin after it was scanned may go unnoticed, so such directories are always rescanned
+MODULE_INDEX_MTIME_MARGIN = 2
+
+# header for module files in Tcl syntax, and extension for module files in Lua syntax
+MODULE_FILE_TCL_HEADER = b'#%Module'
+MODULE_FILE_LUA_EXT = '.lua'
+
+# files in which module aliases and symbolic versions can be defined
+MODULERC_FILES = ['.modulerc', '.modulerc.lua', '.version']
+
+# module files/aliases/symbolic versions are looked up in a module index with the following results
+MODULE_INDEX_FILE = 'file'  # module file found (Tcl syntax, or Lua syntax if lua=True)
+MODULE_INDEX_DIR = 'dir'  # directory found, which may imply a default module
+MODULE_INDEX_RC = 'rc'  # name defined in a .modulerc file (module alias or symbolic version)
+
+# regular expressions to extract names of module aliases & symbolic versions from .modulerc files;
+# for symbolic versions, the name is determined by the module name and the symbolic version(s)
+MODULERC_REGEXES = {
+    'alias': [
+        re.compile(r'^\s*module-(alias|virtual)\s+(?P<name>\S+)', re.M),
+        re.compile(r'^\s*module_alias\(\s*["\'](?P<name>[^"\']+)["\']', re.M),
+    ],
+    'version': [
+        re.compile(r'^\s*module-version\s+(?P<mod>\S+)(?P<syms>([ \t]+[^\s;}]+)+)', re.M),
+        re.compile(r'^\s*module_version\(\s*["\'](?P<mod>[^"\']+)["\'](?P<syms>[^)]*)\)', re.M),
+    ],
+}
+
 
 _log = fancylogger.getLogger('modules', fname=False)
 
 
+class ModulePathIndex(object):
+    """
+    Index of module files in a directory that is listed in $MODULEPATH.
+
+    The index is populated lazily, by scanning (sub)directories directly rather than querying the modules tool,
+    and is kept up to date based on the modification time of each (sub)directory.
+    Module files in Tcl syntax (which must start with '#%Module') and Lua syntax (.lua) are considered,
+    as well as module aliases & symbolic versions defined in .modulerc, .modulerc.lua and .version files.
+    """
+
+    def __init__(self, path, dirs=None):
+        """
+        Create index for specified module path.
+
+        :param path: path to directory listed in $MODULEPATH
+        :param dirs: existing index data for subdirectories (for example obtained from a persistent cache)
+        """
+        self.path = path
+        # index data for each (sub)directory, keyed by path relative to module path (with '' for top level)
+        self.dirs = dirs or {}
+        # indicates whether index was updated (and should be saved again)
+        self.dirty = False
+
+    def _scan_dir(self, subdir, mtime, recent=False):
+        """
+        Scan specified subdirectory, and return index data for it.
+
+        :param subdir: subdirectory to scan (relative to module path)
+        :param mtime: modification time of subdirectory
+        :param recent: subdirectory was modified very recently
+        """
+        dirpath = os.path.join(self.path, subdir)
+        res = {
+            'mtime': mtime,
+            # module files, with list of supported syntaxes (Tcl and/or Lua) for each
+            'modules': {},
+            'subdirs': [],
+            # module aliases & symbolic versions defined in .modulerc files
+            'rc_names': [],
+        }
+
+        # if directory was modified very recently, don't trust modification time to detect future changes,
+        # since changes made within the granularity of the modification time would go unnoticed
+        if recent:
+            res['mtime'] = None
+
+        try:
+            entries = os.listdir(dirpath)
+        except OSError as err:
+            _log.debug("Failed to list contents of %s, so treating it as empty: %s", dirpath, err)
+            entries = []
+
+        for entry in sorted(entries):
+            path = os.path.join(dirpath, entry)
+            if entry in MODULERC_FILES:
+                res['rc_names'].extend(self._parse_modulerc(subdir, path))
+            # skip backup/temporary files, like editors leave behind
+            elif entry.endswith('~') or entry.startswith('#') or entry.startswith('.#') or entry.endswith('.swp'):
+                continue
+            elif os.path.isdir(path):
+                res['subdirs'].append(entry)
+            elif entry.endswith(MODULE_FILE_LUA_EXT):
+                res['modules'].setdefault(entry[:-len(MODULE_FILE_LUA_EXT)], []).append('lua')
+            else:
+                try:
+                    with open(path, 'rb') as handle:
+                        header = handle.read(len(MODULE_FILE_TCL_HEADER))
+                except (IOError, OSError):
+                    header = None
+                if header == MODULE_FILE_TCL_HEADER:
+                    res['modules'].setdefault(entry, []).append('tcl')
+
+        _log.debug("Scanned module path subdirectory %s: %d module files, %d subdirectories, %d aliases/versions",
+                   dirpath, len(res['modules']), len(res['subdirs']), len(res['rc_names']))
+
+        return res
+
+    def _parse_modulerc(self, subdir, path):
+        """Determine list of names of module aliases & symbolic versions defined in specified .modulerc file."""
+        names = []
+        try:
+            txt = read_file(path)
+        except EasyBuildError as err:
+            _log.debug("Failed to read %s, so ignoring it: %s", path, err)
+            txt = ''
+
+        for regex in MODULERC_REGEXES['alias']:
+            names.extend(res.group('name') for res in regex.finditer(txt))
+
+        for regex in MODULERC_REGEXES['version']:
+            for res in regex.finditer(txt):
+                syms = [s.strip('"\' ') for s in res.group('syms').replace(',', ' ').split()]
+                # symbolic version applies to directory of module, which may be specified relative to module path,
+                # or to directory in which .modulerc file is located
+                mod_dir = os.path.dirname(res.group('mod').lstrip('/'))
+                for sym in syms:
+                    names.extend(nub([os.path.join(subdir, sym), os.path.join(mod_dir, sym)]))
+
+        return names
+
+    def get_dir(self, subdir):
+        """
+        Return (up to date) index data for specified subdirectory, or None if it doesn't exist (anymore).
+        """
+        dirpath = os.path.join(self.path, subdir)
+        try:
+            st = os.stat(dirpath)
+        except OSError:
+            st = None
+
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            if self.dirs.pop(subdir, None) is not None:
+                self.dirty = True
+            return None
+
+        # st_mtime_ns is only available in Python 3
+        mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+        res = self.dirs.get(subdir)
+        if res is None or res['mtime'] is None or res['mtime'] != mtime:
+            res = self._scan_dir(subdir, mtime, recent=time.time() - st.st_mtime < MODULE_INDEX_MTIME_MARGIN)
+            self.dirs[subdir] = res
+            self.dirty = True
+
+        return res
+
+    def refresh(self):
+        """
+        Make sure index is complete and up to date, by checking all subdirectories (and rescanning them if needed).
+        """
+        # keep track of real paths of directories, to avoid infinite recursion via symlinks
+        seen = set()
+        subdirs = ['']
+        while subdirs:
+            subdir = subdirs.pop(0)
+            realpath = os.path.realpath(os.path.join(self.path, subdir))
+            if realpath in seen:
+                continue
+            seen.add(realpath)
+
+            res = self.get_dir(subdir)
+            if res is not None:
+                subdirs.extend(os.path.join(subdir, x) for x in res['subdirs'])
+
+        # get rid of data for subdirectories that are no longer there
+        for subdir in [x for x in self.dirs if os.path.realpath(os.path.join(self.path, x)) not in seen]:
+            del self.dirs[subdir]
+            self.dirty = True
+
+    def lookup(self, mod_name, lua=True, refresh=True):
+        """
+        Look up module with specified name in index.
+
+        :param mod_name: module name
+        :param lua: also consider module files in Lua syntax
+        :param refresh: refresh full index before concluding that module was not found
+        :return: MODULE_INDEX_FILE, MODULE_INDEX_DIR or MODULE_INDEX_RC, or None if module was not found
+        """
+        res = None
+
+        subdir = os.path.dirname(mod_name)
+        name = os.path.basename(mod_name)
+
+        # check whether all parent directories are there, and whether a module file/directory is found
+        parts = subdir.split(os.path.sep) if subdir else []
+        dir_data = self.get_dir('')
+        for idx, part in enumerate(parts):
+            if dir_data is None or part not in dir_data['subdirs']:
+                dir_data = None
+                break
+            dir_data = self.get_dir(os.path.join(*parts[:idx + 1]))
+
+        if dir_data is not None:
+            syntaxes = dir_data['modules'].get(name, [])
+            if 'tcl' in syntaxes or (lua and 'lua' in syntaxes):
+                res = MODULE_INDEX_FILE
+            elif name in dir_data['subdirs']:
+                res = MODULE_INDEX_DIR
+            elif mod_name in dir_data['rc_names']:
+                res = MODULE_INDEX_RC
+
+        # module aliases can be defined in any .modulerc file, so full index must be checked
+        if res is None:
+            if refresh:
+                self.refresh()
+            if any(mod_name in x['rc_names'] for x in self.dirs.values()):
+                res = MODULE_INDEX_RC
+
+        return res
+
+    def available(self, lua=True, hidden=False, rc_names=False):
+        """
+        Return list of names of all available modules.
+
+        :param lua: also consider module files in Lua syntax
+        :param hidden: also include hidden modules (of which name (or any directory) starts with '.')
+        :param rc_names: also include module aliases & symbolic versions (except 'default')
+        """
+        self.refresh()
+
+        mod_names = []
+        for subdir, dir_data in self.dirs.items():
+            for name, syntaxes in dir_data['modules'].items():
+                if 'tcl' in syntaxes or (lua and 'lua' in syntaxes):
+                    mod_names.append(os.path.join(subdir, name))
+            if rc_names:
+                mod_names.extend(x for x in dir_data['rc_names'] if os.path.basename(x) != 'default')
+
+        if not hidden:
+            mod_names = [x for x in mod_names if not any(p.startswith('.') for p in x.split(os.path.sep))]
+
+        return mod_names
+
+
+def get_module_index(path):
+    """
+    Return (up to date) index of module files for specified module path,
+    which is loaded from the persistent cache if it is available.
+    """
+    if path not in MODULE_INDEX:
+        dirs = None
+        cache = get_persistent_modules_index_cache()
+        if cache:
+            dirs = cache.get(det_cache_key('modules-index', MODULE_INDEX_FORMAT_VERSION, os.path.realpath(path)))
+            if dirs is not None:
+                _log.debug("Loaded index of module files in %s from persistent cache", path)
+        MODULE_INDEX[path] = ModulePathIndex(path, dirs=dirs)
+
+    return MODULE_INDEX[path]
+
+
+def save_module_indexes():
+    """Save indexes of module files that were updated to the persistent cache (if enabled)."""
+    cache = get_persistent_modules_index_cache()
+    for path, index in MODULE_INDEX.items():
+        if index.dirty:
+            if cache:
+                key = det_cache_key('modules-index', MODULE_INDEX_FORMAT_VERSION, os.path.realpath(path))
+                cache.put(key, index.dirs)
+                _log.debug("Saved index of module files in %s to persistent cache", path)
+            index.dirty = False
+
+
+def det_global_modulerc_files():
+    """
+    Determine list of existing global .modulerc files (which can define module aliases & symbolic versions
+    that are not tied to a particular module path).
+    """
+    cands = [os.environ.get(key) for key in ['MODULERCFILE', 'LMOD_MODULERCFILE']]
+    cands.extend(os.path.join(os.path.expanduser('~'), x) for x in ['.modulerc', '.modulerc.lua'])
+
+    res = []
+    for cand in cands:
+        # $MODULERCFILE may specify a list of paths
+        for path in (cand or '').split(os.pathsep):
+            if path and os.path.exists(path):
+                res.append(path)
+
+    return res
+
+
+def get_persistent_modules_index_cache():
+    """
+    Return interface to persistent cache for index of module files, or None if it is not enabled.
+    """
+    res = None
+    if build_option('modules_index_cache', default=False):
+        path = build_option('modules_index_cache_dir', default=None) or det_cache_path('modules-index')
+        if path not in _persistent_modules_index_caches:
+            _log.info("Using persistent cache for index of module files at %s", path)
+            _persistent_modules_index_caches[path] = PersistentCache(path)
+        res = _persistent_modules_index_caches[path]
+
+    return res
+
+
 class ModulesTool(object):
     """An abstract interface to a tool that deals with modules."""
     # name of this modules tool (used in log/warning/error messages)
@@ -153,6 +486,12 @@ class ModulesTool(object):
     VERSION_REGEXP = None
     # modules tool user cache directory
     USER_CACHE_DIR = None
+    # consider module files in Lua syntax in index of module files
+    MODULE_INDEX_LUA = False
+    # include hidden modules in list of available modules obtained from index of module files
+    MODULE_INDEX_HIDDEN = False
+    # include module aliases & symbolic versions in list of available modules obtained from index of module files
+    MODULE_INDEX_RC_NAMES = False
 
     def __init__(self, mod_paths=None, testing=False):
         """
@@ -330,6 +669,21 @@ class ModulesTool(object):
             # module function may not be defined (weird, but fine)
             self.log.warning("No 'module' function defined, can't check if it matches %s." % mod_details)
 
+    def use_modules_index(self):
+        """
+        Determine whether index of module files should be used, rather than running 'module avail'/'module show'.
+        The index is only used when enabled via --modules-index, and if 'avail'/'show' are not customised.
+        """
+        res = build_option('modules_index', default=False)
+        if res:
+            # only implementations of 'avail'/'show' provided in this module are known to be consistent with the index
+            customised = [m.__name__ for m in (self.available, self.show) if m.__module__ != __name__]
+            if customised:
+                self.log.debug("Not using index of module files, since %s is customised", customised)
+                res = False
+
+        return res
+
     def mk_module_cache_key(self, partial_key):
         """Create a module cache key, using the specified partial key, by combining it with the current $MODULEPATH."""
         return ('MODULEPATH=%s' % os.environ.get('MODULEPATH', ''), self.COMMAND, partial_key)
@@ -468,6 +822,10 @@ class ModulesTool(object):
         if not mod_name and key in MODULE_AVAIL_CACHE:
             ans = MODULE_AVAIL_CACHE[key]
             self.log.debug("Found cached result for 'module avail' with key '%s': %s", key, ans)
+        elif not mod_name and self.use_modules_index():
+            ans = self.available_via_index()
+            MODULE_AVAIL_CACHE[key] = ans
+            self.log.debug("Cached result for 'module avail' (via index of module files) with key '%s': %s", key, ans)
         else:
             args = ['avail'] + extra_args + [mod_name]
             mods = self.run_module(*args)
@@ -483,6 +841,63 @@ class ModulesTool(object):
 
         return ans
 
+    def available_via_index(self):
+        """
+        Return list of all available modules, based on index of module files in current module paths
+        (rather than running 'module avail').
+        """
+        mod_names = []
+        for mod_path in curr_module_paths():
+            index = get_module_index(mod_path)
+            mod_names.extend(index.available(lua=self.MODULE_INDEX_LUA, hidden=self.MODULE_INDEX_HIDDEN,
+                                             rc_names=self.MODULE_INDEX_RC_NAMES))
+        save_module_indexes()
+
+        ans = nub(sorted(mod_names))
+        self.log.debug("Index of module files gave %d available modules: %s", len(ans), ans)
+        return ans
+
+    def exist_via_index(self, mod_names):
+        """
+        Check whether modules with specified names exist, based on index of module files in current module paths.
+
+        :param mod_names: list of module names
+        :return: list with True/False for each module name, or None if existence can not be determined via index
+                 (for example for partial module names, or names defined in a .modulerc file)
+        """
+        global_modulerc_files = det_global_modulerc_files()
+        if global_modulerc_files:
+            self.log.debug("Found global .modulerc files, so modules not found via index may still exist: %s",
+                           global_modulerc_files)
+
+        indexes = [get_module_index(mod_path) for mod_path in curr_module_paths()]
+        # full refresh of index is only done once (only required when module name is not found)
+        refreshed = set()
+
+        res = []
+        for mod_name in mod_names:
+            mod_exists = None
+            if mod_name and not mod_name.startswith(os.path.sep) and '..' not in mod_name.split(os.path.sep):
+                lookups = []
+                for index in indexes:
+                    lookups.append(index.lookup(mod_name, lua=self.MODULE_INDEX_LUA,
+                                                refresh=index.path not in refreshed))
+                    if lookups[-1] is None:
+                        refreshed.add(index.path)
+
+                if MODULE_INDEX_FILE in lookups:
+                    mod_exists = True
+                elif not any(lookups) and not global_modulerc_files:
+                    mod_exists = False
+
+            self.log.debug("Result for existence check of %s module via index of module files: %s",
+                           mod_name, mod_exists)
+            res.append(mod_exists)
+
+        save_module_indexes()
+
+        return res
+
     def module_wrapper_exists(self, mod_name, modulerc_fn='.modulerc', mod_wrapper_regex_template=None):
         """
         Determine whether a module wrapper with specified name exists.
@@ -590,7 +1005,13 @@ class ModulesTool(object):
 
             return res
 
-        if skip_avail:
+        # first check via index of module files, only fall back to running module commands when needed
+        if self.use_modules_index():
+            index_res = dict(zip(mod_names, self.exist_via_index(mod_names)))
+        else:
+            index_res = {}
+
+        if skip_avail or all(index_res.get(mod_name) is not None for mod_name in mod_names):
             avail_mod_names = []
         elif len(mod_names) == 1:
             # optimize for case of single module name ('avail' without arguments can be expensive)
@@ -604,6 +1025,13 @@ class ModulesTool(object):
         mods_exist = []
         for (mod_name, visible) in mod_names:
             self.log.info("Checking whether %s exists...", mod_name)
+            if index_res.get(mod_name) is not None:
+                mod_exists = index_res[mod_name]
+                self.log.info("Result for existence check of %s module (via index of module files): %s",
+                              mod_name, mod_exists)
+                mods_exist.append(mod_exists)
+                continue
+
             if visible:
                 mod_exists = mod_name in avail_mod_names
                 # module name may be partial, so also check via 'module show' as fallback
@@ -667,17 +1095,51 @@ class ModulesTool(object):
             full_mod_path = os.path.join(install_path('mod'), build_option('suffix_modules_path'), mod_path)
             self.prepend_module_path(full_mod_path)
 
-        loaded_modules = self.loaded_modules()
-        for mod in modules:
-            if allow_reload or mod not in loaded_modules:
-                self.run_module('load', mod)
+        # only determine list of loaded modules if it's actually needed ('module list' is not free)
+        if not allow_reload:
+            loaded_modules = self.loaded_modules()
+            modules = [mod for mod in modules if mod not in loaded_modules]
+
+        # load all modules with a single module command
+        if modules:
+            self.run_module_env_cached('load', *modules)
 
     def unload(self, modules=None):
         """
         Unload all requested modules.
         """
-        for mod in modules:
-            self.run_module('unload', mod)
+        # unload all modules with a single module command
+        if modules:
+            self.run_module_env_cached('unload', *modules)
+
+    def run_module_env_cached(self, *args):
+        """
+        Run module command that modifies the environment (like 'load' or 'unload'),
+        or replay the changes it made to the environment before if the same command was already run
+        in an identical environment.
+
+        :param args: list of arguments for module command; first argument should be the subcommand to run
+        """
+        env_digest = det_cache_key(*sorted(os.environ.items()))
+        key = self.mk_module_cache_key(' '.join(args) + ';' + env_digest)
+
+        if key in MODULE_ENV_CHANGES_CACHE:
+            env_changes = MODULE_ENV_CHANGES_CACHE[key]
+            self.log.debug("Replaying cached changes to environment for 'module %s': %s", ' '.join(args), env_changes)
+            for env_var, value in env_changes.items():
+                if value is None:
+                    os.environ.pop(env_var, None)
+                else:
+                    os.environ[env_var] = value
+        else:
+            prev_env = os.environ.copy()
+            self.run_module(*args)
+
+            env_changes = dict((k, v) for (k, v) in os.environ.items() if prev_env.get(k) != v)
+            env_changes.update((k, None) for k in prev_env if k not in os.environ)
+            MODULE_ENV_CHANGES_CACHE[key] = env_changes
+            self.log.debug("Cached changes to environment for 'module %s' with key '%s': %s",
+                           ' '.join(args), key, env_changes)
 
     def purge(self):
         """
@@ -729,16 +1191,48 @@ class ModulesTool(object):
 
         :param mod_name: module name
         :param strip_ext: strip (.lua) extension from module fileame (if present)"""
-        # (possible relative) path is always followed by a ':', and may be prepended by whitespace
-        # this works for both environment modules and Lmod
-        modpath_re = re.compile(r'^\s*(?P<modpath>[^/\n]*/[^\s]+):$', re.M)
-        modpath = self.get_value_from_modulefile(mod_name, modpath_re)
+        modpath = None
+        if self.use_modules_index():
+            modpath = self.modulefile_path_via_index(mod_name)
+
+        if modpath is None:
+            # (possible relative) path is always followed by a ':', and may be prepended by whitespace
+            # this works for both environment modules and Lmod
+            modpath_re = re.compile(r'^\s*(?P<modpath>[^/\n]*/[^\s]+):$', re.M)
+            modpath = self.get_value_from_modulefile(mod_name, modpath_re)
 
         if strip_ext and modpath.endswith('.lua'):
             modpath = os.path.splitext(modpath)[0]
 
         return modpath
 
+    def modulefile_path_via_index(self, mod_name):
+        """
+        Determine path of the module file for the specified module via index of module files (see ModulePathIndex),
+        rather than via 'module show'.
+
+        :param mod_name: module name
+        :return: path to module file, or None if it could not be determined (unambiguously) via index
+        """
+        res = None
+        for mod_path in curr_module_paths():
+            index = get_module_index(mod_path)
+            lookup = index.lookup(mod_name, lua=self.MODULE_INDEX_LUA, refresh=False)
+            if lookup == MODULE_INDEX_FILE:
+                syntaxes = index.get_dir(os.path.dirname(mod_name))['modules'][os.path.basename(mod_name)]
+                # Lmod picks module file in Lua syntax if both a Tcl and a Lua module file are available
+                if self.MODULE_INDEX_LUA and 'lua' in syntaxes:
+                    res = os.path.join(mod_path, mod_name + MODULE_FILE_LUA_EXT)
+                else:
+                    res = os.path.join(mod_path, mod_name)
+                self.log.debug("Found module file for %s via index of module files: %s", mod_name, res)
+                break
+            elif lookup is not None:
+                # partial module name, or module alias/symbolic version: leave it up to modules tool to resolve it
+                break
+
+        return res
+
     def set_path_env_var(self, key, paths):
         """Set path environment variable to the given list of paths."""
         setvar(key, os.pathsep.join(paths), verbose=False)
@@ -788,7 +1282,7 @@ class ModulesTool(object):
         else:
             args = list(args)
 
-        self.log.debug('Current MODULEPATH: %s' % os.environ.get('MODULEPATH', ''))
+        self.log.debug("Current MODULEPATH: %s", os.environ.get('MODULEPATH', ''))
 
         # restore selected original environment variables before running module command
         environ = os.environ.copy()
@@ -799,14 +1293,14 @@ class ModulesTool(object):
 
         cmd_list = self.compose_cmd_list(args)
         full_cmd = ' '.join(cmd_list)
-        self.log.debug("Running module command '%s' from %s" % (full_cmd, os.getcwd()))
+        self.log.debug("Running module command '%s' from %s", full_cmd, os.getcwd())
 
         proc = subprocess_popen_text(cmd_list, env=environ)
 
         # stdout will contain python code (to change environment etc)
         # stderr will contain text (just like the normal module command)
         (stdout, stderr) = proc.communicate()
-        self.log.debug("Output of module command '%s': stdout: %s; stderr: %s" % (full_cmd, stdout, stderr))
+        self.log.debug("Output of module command '%s': stdout: %s; stderr: %s", full_cmd, stdout, stderr)
 
         # also catch and check exit code
         exit_code = proc.returncode
@@ -845,7 +1339,7 @@ class ModulesTool(object):
                 curr_ld_val = os.environ.get(key, '').split(os.pathsep)
                 new_ld_val = [x for x in nub(prev_ld_values[key] + curr_ld_val[::-1]) if x][::-1]
 
-                self.log.debug("Correcting paths in $%s from %s to %s" % (key, curr_ld_val, new_ld_val))
+                self.log.debug("Correcting paths in $%s from %s to %s", key, curr_ld_val, new_ld_val)
                 self.set_path_env_var(key, new_ld_val)
 
             # Process stderr
@@ -891,14 +1385,30 @@ class ModulesTool(object):
         if eb_module_keys:
             loaded_modules = self.loaded_modules()
 
-            # try to track down modules that define the $EBROOT* environment variables that were found
+            # try to track down modules that define the $EBROOT* environment variables that were found;
+            # first check the module files directly (which is cheap when their location is known via the index),
+            # only use 'module show' for modules that define $EBROOT* environment variables in some other way
             loaded_eb_modules = []
-            for loaded_module in loaded_modules:
-                out = self.show(loaded_module)
-                for key in eb_module_keys[:]:
-                    if key in out:
-                        loaded_eb_modules.append(loaded_module)
-                        eb_module_keys.remove(key)
+            for show in ([False, True] if self.use_modules_index() else [True]):
+                for loaded_module in loaded_modules:
+                    if not eb_module_keys:
+                        break
+                    elif show:
+                        out = self.show(loaded_module)
+                    else:
+                        modfilepath = self.modulefile_path_via_index(loaded_module)
+                        if modfilepath is None:
+                            continue
+                        out = read_file(modfilepath)
+
+                    for key in eb_module_keys[:]:
+                        if key in out:
+                            if loaded_module not in loaded_eb_modules:
+                                loaded_eb_modules.append(loaded_module)
+                            eb_module_keys.remove(key)
+
+            # retain order in which modules were loaded
+            loaded_eb_modules = [x for x in loaded_modules if x in loaded_eb_modules]
 
             # warn about $EBROOT* environment variables without matching loaded module
             if eb_module_keys:
@@ -1313,6 +1823,9 @@ class Lmod(ModulesTool):
     REQ_VERSION_DEPENDS_ON = '7.6.1'
     VERSION_REGEXP = r"^Modules\s+based\s+on\s+Lua:\s+Version\s+(?P<version>\d\S*)\s"
     USER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.lmod.d', '.cache')
+    MODULE_INDEX_LUA = True
+    MODULE_INDEX_HIDDEN = True
+    MODULE_INDEX_RC_NAMES = True
 
     SHOW_HIDDEN_OPTION = '--show-hidden'
 
@@ -1617,7 +2130,11 @@ def modules_tool(mod_paths=None, testing=False):
 def reset_module_caches():
     """Reset module caches."""
     MODULE_AVAIL_CACHE.clear()
+    MODULE_DEPS_CACHE.clear()
+    MODULE_ENV_CHANGES_CACHE.clear()
+    MODULE_FILE_DEPS_CACHE.clear()
     MODULE_SHOW_CACHE.clear()
+    MODULE_INDEX.clear()
 
 
 def invalidate_module_caches_for(path):
@@ -1626,7 +2143,13 @@ def invalidate_module_caches_for(path):
         raise EasyBuildError("Non-existing path specified to invalidate module caches: %s", path)
 
     _log.debug("Invallidating module cache entries for path '%s'", path)
-    for cache, subcmd in [(MODULE_AVAIL_CACHE, 'avail'), (MODULE_SHOW_CACHE, 'show')]:
+    caches = [
+        (MODULE_AVAIL_CACHE, 'avail'),
+        (MODULE_DEPS_CACHE, 'dependencies'),
+        (MODULE_ENV_CHANGES_CACHE, 'load/unload'),
+        (MODULE_SHOW_CACHE, 'show'),
+    ]
+    for cache, subcmd in caches:
         for key in list(cache.keys()):
             paths_in_key = '='.join(key[0].split('=')[1:]).split(os.pathsep)
             _log.debug("Paths for 'module %s' key '%s': %s", subcmd, key, paths_in_key)
@@ -1637,6 +2160,11 @@ def invalidate_module_caches_for(path):
                     del cache[key]
                     break
 
+    for mod_path in list(MODULE_INDEX.keys()):
+        if path == mod_path or (os.path.exists(mod_path) and os.path.samefile(path, mod_path)):
+            _log.debug("Index of module files for %s is evicted, marked as invalid via path '%s'", mod_path, path)
+            del MODULE_INDEX[mod_path]
+
 
 class Modules(EnvironmentModulesC):
     """NO LONGER SUPPORTED: interface to modules tool, use modules_tool from easybuild.tools.modules instead"""
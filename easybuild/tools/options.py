@@ -60,7 +60,10 @@ from easybuild.tools import build_log, run  # build_log should always stay there
 from easybuild.tools.build_log import DEVEL_LOG_LEVEL, EasyBuildError
 from easybuild.tools.build_log import init_logging, log_start, print_msg, print_warning, raise_easybuilderror
 from easybuild.tools.config import CONT_IMAGE_FORMATS, CONT_TYPES, DEFAULT_CONT_TYPE, DEFAULT_ALLOW_LOADED_MODULES
-from easybuild.tools.config import DEFAULT_BRANCH, DEFAULT_FORCE_DOWNLOAD, DEFAULT_INDEX_MAX_AGE
+from easybuild.tools.config import DEFAULT_BRANCH, DEFAULT_CHECKSUMS_CACHE_MAX_SIZE, DEFAULT_CMD_OUTPUT_BUFFER_SIZE
+from easybuild.tools.config import DEFAULT_EASYCONFIGS_CACHE_MAX_SIZE
+from easybuild.tools.config import DEFAULT_FORCE_DOWNLOAD
+from easybuild.tools.config import DEFAULT_INDEX_MAX_AGE
 from easybuild.tools.config import DEFAULT_JOB_BACKEND, DEFAULT_LOGFILE_FORMAT, DEFAULT_MAX_FAIL_RATIO_PERMS
 from easybuild.tools.config import DEFAULT_MINIMAL_BUILD_ENV, DEFAULT_MNS, DEFAULT_MODULE_SYNTAX, DEFAULT_MODULES_TOOL
 from easybuild.tools.config import DEFAULT_MODULECLASSES, DEFAULT_PATH_SUBDIRS, DEFAULT_PKG_RELEASE, DEFAULT_PKG_TOOL
@@ -68,7 +71,7 @@ from easybuild.tools.config import DEFAULT_PKG_TYPE, DEFAULT_PNS, DEFAULT_PREFIX
 from easybuild.tools.config import DEFAULT_WAIT_ON_LOCK_INTERVAL, DEFAULT_WAIT_ON_LOCK_LIMIT, EBROOT_ENV_VAR_ACTIONS
 from easybuild.tools.config import ERROR, FORCE_DOWNLOAD_CHOICES, GENERAL_CLASS, IGNORE, JOB_DEPS_TYPE_ABORT_ON_ERROR
 from easybuild.tools.config import JOB_DEPS_TYPE_ALWAYS_RUN, LOADED_MODULES_ACTIONS, LOCAL_VAR_NAMING_CHECK_WARN
-from easybuild.tools.config import LOCAL_VAR_NAMING_CHECKS, WARN
+from easybuild.tools.config import LOCAL_VAR_NAMING_CHECKS, PROFILE_FORMAT_JSON, PROFILE_FORMATS, WARN
 from easybuild.tools.config import get_pretend_installpath, init, init_build_options, mk_full_default_path
 from easybuild.tools.configobj import ConfigObj, ConfigObjError
 from easybuild.tools.docs import FORMAT_TXT, FORMAT_RST
@@ -268,10 +271,16 @@ class EasyBuildOptions(GeneralOption):
             'only-blocks': ("Only build listed blocks", 'strlist', 'extend', None, 'b', {'metavar': 'BLOCKS'}),
             'rebuild': ("Rebuild software, even if module already exists (don't skip OS dependencies checks)",
                         None, 'store_true', False),
+            'resume': ("Keep track of completed steps, and resume installation after last step that was completed "
+                       "in a previous (failed or stopped) session in which --resume was also used, "
+                       "if build directory and easyconfig did not change",
+                       None, 'store_true', False),
             'robot': ("Enable dependency resolution, using easyconfigs in specified paths",
                       'pathlist', 'store_or_None', [], 'r', {'metavar': 'PATH[%sPATH]' % os.pathsep}),
             'robot-paths': ("Additional paths to consider by robot for easyconfigs (--robot paths get priority)",
                             'pathlist', 'add_flex', self.default_robot_paths, {'metavar': 'PATH[%sPATH]' % os.pathsep}),
+            'robot-stats': ("Print statistics on dependency resolution (time spent, size of dependency graph, "
+                            "number of parsed easyconfig files)", None, 'store_true', False),
             'search-paths': ("Additional locations to consider in --search (next to --robot and --robot-paths paths)",
                              'pathlist', 'store_or_None', [], {'metavar': 'PATH[%sPATH]' % os.pathsep}),
             'skip': ("Skip existing software (useful for installing additional packages)",
@@ -344,13 +353,28 @@ class EasyBuildOptions(GeneralOption):
                                             None, 'store_true', False),
             'allow-use-as-root-and-accept-consequences': ("Allow using of EasyBuild as root (NOT RECOMMENDED!)",
                                                           None, 'store_true', False),
+            'async-logging': ("Write log files asynchronously, in batches (via a background thread)",
+                              None, 'store_true', False),
             'backup-modules': ("Back up an existing module file, if any. Only works when using --module-only",
                                None, 'store_true', None),  # default None to allow auto-enabling if not disabled
+            'build-cache-dir': ("Directory for build cache of installations (see --use-build-cache); "
+                                "None implies 'easybuild/build-cache' subdirectory of $XDG_CACHE_HOME",
+                                None, 'store_or_None', None),
             'check-ebroot-env-vars': ("Action to take when defined $EBROOT* environment variables are found "
                                       "for which there is no matching loaded module; "
                                       "supported values: %s" % ', '.join(EBROOT_ENV_VAR_ACTIONS), None, 'store', WARN),
+            'checksums-cache': ("Use persistent on-disk cache for checksums of source/patch files",
+                                None, 'store_true', False),
+            'checksums-cache-dir': ("Directory for persistent cache of checksums of source/patch files; "
+                                    "None implies 'easybuild/checksums' subdirectory of $XDG_CACHE_HOME",
+                                    None, 'store_or_None', None),
+            'checksums-cache-max-size': ("Maximum size of persistent cache of checksums of source/patch files "
+                                         "(in MiB)", int, 'store', DEFAULT_CHECKSUMS_CACHE_MAX_SIZE),
             'cleanup-builddir': ("Cleanup build dir after successful installation.", None, 'store_true', True),
             'cleanup-tmpdir': ("Cleanup tmp dir after successful run.", None, 'store_true', True),
+            'cmd-output-buffer-size': ("Maximum size of output of a shell command that is kept in memory (in KiB); "
+                                       "larger output is spooled to a temporary file",
+                                       int, 'store', DEFAULT_CMD_OUTPUT_BUFFER_SIZE),
             'color': ("Colorize output", 'choice', 'store', fancylogger.Colorize.AUTO, fancylogger.Colorize,
                       {'metavar': 'WHEN'}),
             'consider-archived-easyconfigs': ("Also consider archived easyconfigs", None, 'store_true', False),
@@ -370,6 +394,13 @@ class EasyBuildOptions(GeneralOption):
             'dump-autopep8': ("Reformat easyconfigs using autopep8 when dumping them", None, 'store_true', False),
             'easyblock': ("easyblock to use for processing the spec file or dumping the options",
                           None, 'store', None, 'e', {'metavar': 'CLASS'}),
+            'easyconfigs-cache': ("Use persistent on-disk cache for parsed easyconfig files",
+                                  None, 'store_true', False),
+            'easyconfigs-cache-dir': ("Directory for persistent cache of parsed easyconfig files; "
+                                      "None implies 'easybuild/ecs' subdirectory of $XDG_CACHE_HOME",
+                                      None, 'store_or_None', None),
+            'easyconfigs-cache-max-size': ("Maximum size of persistent cache of parsed easyconfig files (in MiB)",
+                                           int, 'store', DEFAULT_EASYCONFIGS_CACHE_MAX_SIZE),
             'enforce-checksums': ("Enforce availability of checksums for all sources/patches, so they can be verified",
                                   None, 'store_true', False),
             'experimental': ("Allow experimental code (with behaviour that can be changed/removed at any given time).",
@@ -413,6 +444,15 @@ class EasyBuildOptions(GeneralOption):
             'minimal-toolchains': ("Use minimal toolchain when resolving dependencies", None, 'store_true', False),
             'module-only': ("Only generate module file(s); skip all steps except for %s" % ', '.join(MODULE_ONLY_STEPS),
                             None, 'store_true', False),
+            'modules-index': ("Determine which modules are available by scanning module paths directly, "
+                              "rather than running 'module avail'/'module show' "
+                              "(not aware of module hiding or other customisations done via the modules tool)",
+                              None, 'store_true', False),
+            'modules-index-cache': ("Use persistent on-disk cache for index of module files",
+                                    None, 'store_true', False),
+            'modules-index-cache-dir': ("Directory for persistent cache of index of module files; "
+                                        "None implies 'easybuild/modules-index' subdirectory of $XDG_CACHE_HOME",
+                                        None, 'store_or_None', None),
             'modules-tool-version-check': ("Check version of modules tool being used", None, 'store_true', True),
             'mpi-cmd-template': ("Template for MPI commands (template keys: %(nr_ranks)s, %(cmd)s)",
                                  None, 'store', None),
@@ -422,10 +462,23 @@ class EasyBuildOptions(GeneralOption):
             'output-format': ("Set output format", 'choice', 'store', FORMAT_TXT, [FORMAT_TXT, FORMAT_RST]),
             'parallel': ("Specify (maximum) level of parallellism used during build procedure",
                          'int', 'store', None),
+            'parallel-builds': ("Specify maximum number of builds to run in parallel on the local host, "
+                                "in separate processes (available cores are split across builds)",
+                                'int', 'store', None),
+            'parallel-downloads': ("Specify maximum number of source/patch files to download concurrently "
+                                   "(default: download files one at a time)", 'int', 'store', None),
+            'parse-workers': ("Specify number of worker processes to use for parsing easyconfig files "
+                              "(default: parse easyconfig files one at a time)", 'int', 'store', None),
             'pre-create-installdir': ("Create installation directory before submitting build jobs",
                                       None, 'store_true', True),
             'pretend': (("Does the build/installation in a test directory located in $HOME/easybuildinstall"),
                         None, 'store_true', False, 'p'),
+            'profile': ("Profile installation: record wall time, CPU time and peak memory usage (RSS) "
+                        "of each step and each command being run, and dump it next to the build log",
+                        None, 'store_true', False),
+            'profile-format': ("Format to use for dumping profile of installation (see --profile); "
+                               "'trace' implies Chrome trace event format", 'choice', 'store', PROFILE_FORMAT_JSON,
+                               PROFILE_FORMATS),
             'read-only-installdir': ("Set read-only permissions on installation directory after installation",
                                      None, 'store_true', False),
             'remove-ghost-install-dirs': ("Remove ghost installation directories when --force or --rebuild is used, "
@@ -442,17 +495,28 @@ class EasyBuildOptions(GeneralOption):
                                       None, 'store_true', True),
             'sysroot': ("Location root directory of system, prefix for standard paths like /usr/lib and /usr/include",
                         None, 'store', None),
+            'toolchain-hierarchy-cache': ("Use persistent on-disk cache for toolchain hierarchies",
+                                          None, 'store_true', False),
+            'toolchain-hierarchy-cache-dir': ("Directory for persistent cache of toolchain hierarchies; "
+                                              "None implies 'easybuild/toolchain-hierarchy' subdirectory "
+                                              "of $XDG_CACHE_HOME", None, 'store_or_None', None),
             'trace': ("Provide more information in output to stdout on progress", None, 'store_true', False, 'T'),
             'umask': ("umask to use (e.g. '022'); non-user write permissions on install directories are removed",
                       None, 'store', None),
             'update-modules-tool-cache': ("Update modules tool cache file(s) after generating module file",
                                           None, 'store_true', False),
+            'use-build-cache': ("Restore installations from build cache if a matching entry is available "
+                                "(rather than building from source), and add new installations to build cache",
+                                None, 'store_true', False),
             'use-ccache': ("Enable use of ccache to speed up compilation, with specified cache dir",
                            str, 'store', False, {'metavar': "PATH"}),
             'use-f90cache': ("Enable use of f90cache to speed up compilation, with specified cache dir",
                              str, 'store', False, {'metavar': "PATH"}),
             'use-existing-modules': ("Use existing modules when resolving dependencies with minimal toolchains",
                                      None, 'store_true', False),
+            'use-source-store': ("Keep source files in content-addressed store (.cas subdirectory of first source "
+                                 "path), with links in usual locations; avoids duplicates and repeated downloads",
+                                 None, 'store_true', False),
             'verify-easyconfig-filenames': ("Verify whether filename of specified easyconfigs matches with contents",
                                             None, 'store_true', False),
             'wait-on-lock': ("Wait for lock to be released; 0 implies no waiting (exit with an error if the lock "
@@ -716,6 +780,8 @@ class EasyBuildOptions(GeneralOption):
         descr = ("Options for Easyconfigs", "Options that affect all specified easyconfig files.")
 
         opts = OrderedDict({
+            'clear-toolchain-hierarchy-cache': ("Clear persistent cache of toolchain hierarchies",
+                                                None, 'store_true', False),
             'create-index': ("Create index for files in specified directory", None, 'store', None),
             'fix-deprecated-easyconfigs': ("Fix use of deprecated functionality in specified easyconfig files.",
                                            None, 'store_true', False),
@@ -1407,7 +1473,8 @@ def set_up_configuration(args=None, logfile=None, testing=False, silent=False):
     # initialise logging for main
     log, logfile = init_logging(logfile, logtostdout=options.logtostdout,
                                 silent=(testing or options.terse or search_query or silent),
-                                colorize=options.color, tmp_logdir=options.tmp_logdir)
+                                colorize=options.color, tmp_logdir=options.tmp_logdir,
+                                async_logging=options.async_logging)
 
     # log startup info (must be done after setting up logger)
     eb_cmd_line = eb_go.generate_cmd_line() + eb_go.args
@@ -33,17 +33,21 @@ Support for PBS is provided via the PbsJob class. If you want you could create o
 :author: Stijn De Weirdt (Ghent University)
 """
 import math
+import multiprocessing
 import os
 import re
+import traceback
 
 from easybuild.base import fancylogger
-from easybuild.framework.easyblock import get_easyblock_instance
+from easybuild.framework.easyblock import build_and_install_one, get_easyblock_instance
 from easybuild.framework.easyconfig.easyconfig import ActiveMNS
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.config import build_option, get_repository, get_repositorypath
+from easybuild.tools.config import build_option, get_repository, get_repositorypath, update_build_option
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.job.backend import job_backend
+from easybuild.tools.py2vs3 import queue
 from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.systemtools import det_parallelism
 
 
 _log = fancylogger.getLogger('parallelbuild', fname=False)
@@ -208,3 +212,121 @@ def prepare_easyconfig(ec):
         os.remove(easyblock_instance.logfile)
     except (OSError, EasyBuildError) as err:
         raise EasyBuildError("An error occurred while preparing %s: %s", ec, err)
+
+
+def _build_and_install_one_worker(idx, ec, init_env, cores, result_queue):
+    """
+    Build and install specified easyconfig in a worker process, report result via specified queue.
+
+    :param idx: index of easyconfig in list of easyconfigs being built
+    :param ec: parsed easyconfig to build and install
+    :param init_env: original environment (used to reset environment)
+    :param cores: number of cores to use for this build
+    :param result_queue: queue to put result on, as (index, success, log file, error, traceback) tuple
+    """
+    update_build_option('parallel', cores)
+
+    try:
+        (success, app_log, err) = build_and_install_one(ec, init_env)
+        res = (idx, success, app_log, err, None)
+    except (Exception, SystemExit) as err:
+        # purposely catch all exceptions (and exit attempts), since the result must be reported
+        res = (idx, False, None, str(err), traceback.format_exc())
+
+    result_queue.put(res)
+
+
+def build_easyconfigs_in_parallel_locally(easyconfigs, init_env, max_builds, poll_interval=1):
+    """
+    Build easyconfigs in parallel on the local host, using a separate worker process for each build.
+
+    An easyconfig is built as soon as the builds for all of its dependencies have completed,
+    using at most max_builds builds at the same time; available cores are split across builds.
+    If a build fails, the easyconfigs that (directly or indirectly) depend on it are not built,
+    builds for independent easyconfigs are not affected.
+
+    Yields (easyconfig, result) tuples, in the order in which the builds are completed.
+
+    :param easyconfigs: list of parsed easyconfigs, in the order they should be processed
+    :param init_env: original environment (used to reset environment)
+    :param max_builds: maximum number of builds to run at the same time
+    :param poll_interval: interval (in seconds) for checking whether worker processes are still alive
+    """
+    cores = max(1, det_parallelism(par=build_option('parallel')) // max_builds)
+    _log.info("Building %d easyconfigs with up to %d builds at a time, using %d cores per build",
+              len(easyconfigs), max_builds, cores)
+
+    # determine which of the easyconfigs being built each easyconfig depends on
+    idx_for_mod = dict((ec['full_mod_name'], idx) for (idx, ec) in enumerate(easyconfigs))
+    deps_for = []
+    for ec in easyconfigs:
+        # filter out dependencies marked as external modules
+        deps = [d for d in ec['ec'].all_dependencies if not d.get('external_module', False)]
+        dep_mod_names = [_to_key(dep) for dep in deps]
+        deps_for.append(set(idx_for_mod[dep] for dep in dep_mod_names if dep in idx_for_mod))
+
+    result_queue = multiprocessing.Queue()
+    todo = list(range(len(easyconfigs)))
+    running, done, failed = {}, set(), set()
+
+    try:
+        while todo or running:
+            # builds for which a dependency failed to build can not be started, so mark them as failed too;
+            # easyconfigs are ordered such that dependencies come first, so this propagates through the whole graph
+            for idx in todo[:]:
+                if not deps_for[idx] & failed:
+                    continue
+                todo.remove(idx)
+                failed.add(idx)
+                failed_deps = sorted(easyconfigs[i]['full_mod_name'] for i in deps_for[idx] & failed)
+                err = "dependencies failed to build: %s" % ', '.join(failed_deps)
+                yield easyconfigs[idx], {'success': False, 'err': EasyBuildError(err)}
+
+            # start builds for which all dependencies are available, as long as there are free slots
+            for idx in [i for i in todo if deps_for[i] <= done]:
+                if len(running) >= max_builds:
+                    break
+                todo.remove(idx)
+                args = (idx, easyconfigs[idx], init_env, cores, result_queue)
+                proc = multiprocessing.Process(target=_build_and_install_one_worker, args=args)
+                proc.start()
+                running[idx] = proc
+                _log.info("Started build for %s (PID %s)", easyconfigs[idx]['spec'], proc.pid)
+
+            if not running:
+                if todo:
+                    raise EasyBuildError("Can not start build for any of the remaining easyconfigs: %s",
+                                         ', '.join(easyconfigs[i]['spec'] for i in todo))
+                break
+
+            try:
+                (idx, success, app_log, err, tb) = result_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                # check for worker processes that died without reporting back
+                for idx, proc in list(running.items()):
+                    if not proc.is_alive() and proc.exitcode != 0:
+                        proc.join()
+                        del running[idx]
+                        failed.add(idx)
+                        err = "build process exited unexpectedly (exit code: %s)" % proc.exitcode
+                        yield easyconfigs[idx], {'success': False, 'err': EasyBuildError(err)}
+                continue
+
+            running.pop(idx).join()
+
+            ec_res = {'success': success, 'log_file': app_log}
+            if success:
+                done.add(idx)
+            else:
+                failed.add(idx)
+                ec_res['err'] = EasyBuildError(err)
+                if tb:
+                    ec_res['traceback'] = tb
+
+            yield easyconfigs[idx], ec_res
+
+    finally:
+        # make sure no worker processes are left behind (for example when an error occurred)
+        for proc in running.values():
+            proc.terminate()
+            proc.join()
@@ -0,0 +1,233 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Support for profiling installations: wall time, CPU time and peak memory usage (RSS)
+of each step of the installation procedure, and of each command being run.
+"""
+import errno
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import PROFILE_FORMAT_TRACE
+from easybuild.tools.py2vs3 import OrderedDict
+
+
+_log = fancylogger.getLogger('profiling', fname=False)
+
+# active profiler, to which commands being run are reported (see record_cmd)
+_active_profiler = None
+
+
+def maxrss_bytes(ru_maxrss):
+    """Return peak RSS value reported by getrusage/wait4 in bytes (reported in kilobytes on Linux)."""
+    if sys.platform == 'darwin':
+        return ru_maxrss
+    else:
+        return ru_maxrss * 1024
+
+
+def cpu_time(rusage):
+    """Return (user + system) CPU time for specified resource usage."""
+    return rusage.ru_utime + rusage.ru_stime
+
+
+def wait_for_process(proc):
+    """
+    Wait for specified process (subprocess.Popen instance) to complete,
+    and collect resource usage for it (incl. all of its descendant processes that were waited for).
+
+    :return: tuple with exit code and resource usage (as returned by os.wait4)
+    """
+    while True:
+        try:
+            (_, status, rusage) = os.wait4(proc.pid, 0)
+            break
+        except OSError as err:
+            if err.errno != errno.EINTR:
+                raise
+
+    if os.WIFSIGNALED(status):
+        exit_code = -os.WTERMSIG(status)
+    else:
+        exit_code = os.WEXITSTATUS(status)
+
+    # make sure subprocess.Popen instance doesn't try to wait for the process again
+    proc.returncode = exit_code
+
+    return (exit_code, rusage)
+
+
+def record_cmd(cmd, start_time, wall_time, rusage):
+    """
+    Report command that was run to active profiler (if any).
+
+    :param cmd: command that was run
+    :param start_time: time at which command was started (seconds since epoch)
+    :param wall_time: wall time for running command (in seconds)
+    :param rusage: resource usage for the process tree of the command (as returned by os.wait4)
+    """
+    if _active_profiler is not None:
+        _active_profiler.add_cmd(cmd, start_time, wall_time, cpu_time(rusage), maxrss_bytes(rusage.ru_maxrss))
+
+
+class StepProfiler(object):
+    """Profiler for steps of an installation, and for the commands being run as a part of those steps."""
+
+    def __init__(self):
+        """Profiler constructor."""
+        self.steps = []
+        self.cmds = []
+        self.current_step = None
+
+    @contextmanager
+    def step(self, name):
+        """Context manager to profile the specified step; also makes this profiler the active one."""
+        global _active_profiler
+
+        prev_profiler, _active_profiler = _active_profiler, self
+
+        step_info = OrderedDict([
+            ('name', name),
+            ('start_time', time.time()),
+            ('wall_time', None),
+            ('cpu_time', None),
+            ('peak_rss', 0),
+            ('cmds', 0),
+        ])
+        self.current_step = step_info
+
+        self_rusage = resource.getrusage(resource.RUSAGE_SELF)
+        children_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        try:
+            yield step_info
+        finally:
+            step_info['wall_time'] = time.time() - step_info['start_time']
+
+            new_self_rusage = resource.getrusage(resource.RUSAGE_SELF)
+            new_children_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+            # CPU time spent in EasyBuild itself + in all processes that were run during this step
+            step_info['cpu_time'] = cpu_time(new_self_rusage) - cpu_time(self_rusage)
+            step_info['cpu_time'] += cpu_time(new_children_rusage) - cpu_time(children_rusage)
+
+            # peak RSS for child processes is only known for this step if it went up,
+            # which also covers processes that were not run via run_cmd
+            if new_children_rusage.ru_maxrss > children_rusage.ru_maxrss:
+                peak_rss = maxrss_bytes(new_children_rusage.ru_maxrss)
+                step_info['peak_rss'] = max(step_info['peak_rss'], peak_rss)
+
+            self.steps.append(step_info)
+            self.current_step = None
+            _active_profiler = prev_profiler
+
+            _log.info("Profile for %s step: wall time %.2fs, CPU time %.2fs, peak RSS %d bytes",
+                      name, step_info['wall_time'], step_info['cpu_time'], step_info['peak_rss'])
+
+    def add_cmd(self, cmd, start_time, wall_time, cpu_time, peak_rss):
+        """Add profile for command that was run."""
+        if isinstance(cmd, (list, tuple)):
+            cmd = ' '.join(cmd)
+
+        cmd_info = OrderedDict([
+            ('cmd', cmd),
+            ('step', None),
+            ('start_time', start_time),
+            ('wall_time', wall_time),
+            ('cpu_time', cpu_time),
+            ('peak_rss', peak_rss),
+        ])
+        if self.current_step is not None:
+            cmd_info['step'] = self.current_step['name']
+            self.current_step['cmds'] += 1
+            self.current_step['peak_rss'] = max(self.current_step['peak_rss'], peak_rss)
+
+        self.cmds.append(cmd_info)
+
+    def summary(self):
+        """
+        Return summary of profile per step, for inclusion in build statistics;
+        for steps that were run multiple times (iterated builds), totals are reported.
+        """
+        res = {}
+        for step_info in self.steps:
+            entry = res.setdefault(step_info['name'], {'wall_time': 0, 'cpu_time': 0, 'peak_rss': 0, 'cmds': 0})
+            entry['wall_time'] = round(entry['wall_time'] + step_info['wall_time'], 2)
+            entry['cpu_time'] = round(entry['cpu_time'] + step_info['cpu_time'], 2)
+            entry['peak_rss'] = max(entry['peak_rss'], step_info['peak_rss'])
+            entry['cmds'] += step_info['cmds']
+
+        return res
+
+    def to_dict(self):
+        """Return full profile as a dictionary."""
+        return OrderedDict([
+            ('steps', self.steps),
+            ('cmds', self.cmds),
+        ])
+
+    def to_trace_events(self):
+        """
+        Return full profile in Chrome trace event format (see chrome://tracing),
+        with steps and commands as 'complete' events in separate threads (timestamps are in microseconds).
+        """
+        pid = os.getpid()
+        events = []
+        for (tid, cat, entries, name_key) in [(1, 'step', self.steps, 'name'), (2, 'cmd', self.cmds, 'cmd')]:
+            for entry in entries:
+                args = dict((key, val) for (key, val) in entry.items() if key not in (name_key, 'start_time'))
+                events.append({
+                    'name': entry[name_key],
+                    'cat': cat,
+                    'ph': 'X',
+                    'ts': int(entry['start_time'] * 1000000),
+                    'dur': int(entry['wall_time'] * 1000000),
+                    'pid': pid,
+                    'tid': tid,
+                    'args': args,
+                })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_json(self, fmt=None):
+        """
+        Return profile in JSON format.
+
+        :param fmt: format to use (PROFILE_FORMAT_TRACE for Chrome trace event format, plain JSON otherwise)
+        """
+        if fmt == PROFILE_FORMAT_TRACE:
+            data = self.to_trace_events()
+        else:
+            data = self.to_dict()
+
+        try:
+            return json.dumps(data, indent=4)
+        except (TypeError, ValueError) as err:
+            raise EasyBuildError("Failed to dump profile in JSON format: %s", err)
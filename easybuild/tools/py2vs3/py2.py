@@ -31,10 +31,14 @@ Implementations for Python 2.
 """
 # these are not used here, but imported from here in other places
 import ConfigParser as configparser  # noqa
+import Queue as queue  # noqa
 import json
+import os
+import stat
 import subprocess
 import urllib2 as std_urllib  # noqa
 from HTMLParser import HTMLParser  # noqa
+from httplib import HTTPException  # noqa
 from string import letters as ascii_letters  # noqa
 from string import lowercase as ascii_lowercase  # noqa
 from StringIO import StringIO  # noqa
@@ -48,6 +52,12 @@ except ImportError:
     # only needed to keep supporting Python 2.6
     from easybuild.tools.ordereddict import OrderedDict  # noqa
 
+try:
+    # backport of os.scandir (see https://pypi.org/project/scandir/)
+    from scandir import scandir  # noqa
+except ImportError:
+    scandir = None
+
 # reload function (built-in in Python 2)
 reload = reload
 
@@ -90,3 +100,38 @@ def sort_looseversions(looseversions):
     # with Python 2, we can safely use 'sorted' on LooseVersion instances
     # (but we can't in Python 3, see https://bugs.python.org/issue14894)
     return sorted(looseversions)
+
+
+class DirEntry(object):
+    """Minimal equivalent of os.DirEntry (only available in Python 3.5 or newer), for use with scandir."""
+
+    def __init__(self, dirpath, name):
+        """Constructor for DirEntry instance."""
+        self.name = name
+        self.path = os.path.join(dirpath, name)
+        self._lstat = None
+
+    def stat(self, follow_symlinks=True):
+        """Return stat result for this entry (lstat result is cached)."""
+        if follow_symlinks:
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+    def is_symlink(self):
+        """Check whether this entry is a symlink."""
+        return stat.S_ISLNK(self.stat(follow_symlinks=False).st_mode)
+
+    def is_dir(self, follow_symlinks=True):
+        """Check whether this entry is a directory (or a symlink pointing to a directory)."""
+        try:
+            return stat.S_ISDIR(self.stat(follow_symlinks=follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+
+if scandir is None:
+    def scandir(path):
+        """Fallback for os.scandir, using os.listdir (only available in Python 3.5 or newer)."""
+        return (DirEntry(path, name) for name in os.listdir(path))
@@ -32,6 +32,7 @@ Implementations for Python 3.
 # these are not used here, but imported from here in other places
 import configparser  # noqa
 import json
+import queue  # noqa
 import subprocess
 import sys
 import urllib.request as std_urllib  # noqa
@@ -39,11 +40,13 @@ from collections import OrderedDict  # noqa
 from distutils.version import LooseVersion
 from functools import cmp_to_key
 from html.parser import HTMLParser  # noqa
+from http.client import HTTPException  # noqa
 from itertools import zip_longest
 from io import StringIO  # noqa
 from string import ascii_letters, ascii_lowercase  # noqa
 from urllib.request import HTTPError, HTTPSHandler, Request, URLError, build_opener, urlopen  # noqa
 from urllib.parse import urlencode  # noqa
+from os import scandir  # noqa
 
 # reload function (no longer a built-in in Python 3)
 # importlib only works with Python 3.4 & newer
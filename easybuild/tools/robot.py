@@ -34,19 +34,22 @@ Dependency resolution functionality, a.k.a. robot.
 :author: Ward Poelmans (Ghent University)
 """
 import copy
+import heapq
 import os
 import sys
+import time
 
 from easybuild.base import fancylogger
-from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, process_easyconfig
+from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, EasyConfig
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig
 from easybuild.framework.easyconfig.easyconfig import robot_find_easyconfig, verify_easyconfig_filename
-from easybuild.framework.easyconfig.tools import find_resolved_modules, skip_available
-from easybuild.tools.build_log import EasyBuildError
+from easybuild.framework.easyconfig.tools import skip_available
+from easybuild.tools.build_log import EasyBuildError, print_msg
 from easybuild.tools.config import build_option
 from easybuild.tools.filetools import det_common_path_prefix, search_file
 from easybuild.tools.module_naming_scheme.easybuild_mns import EasyBuildMNS
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
-from easybuild.tools.utilities import flatten, nub
+from easybuild.tools.utilities import flatten
 
 
 _log = fancylogger.getLogger('tools.robot', fname=False)
@@ -127,7 +130,8 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         # we need to iterate over them when checking for conflicts...
         if node['ec']['multi_deps']:
             parsed_multi_deps = node['ec'].get_parsed_multi_deps()
-            parsed_build_deps = [d for d in parsed_build_deps if d not in flatten(parsed_multi_deps)]
+            flat_parsed_multi_deps = flatten(parsed_multi_deps)
+            parsed_build_deps = [d for d in parsed_build_deps if d not in flat_parsed_multi_deps]
         else:
             parsed_multi_deps = []
 
@@ -137,12 +141,14 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         deps = mk_dep_keys(node['ec'].all_dependencies)
 
         # separate runtime deps from build deps & multi deps
-        runtime_deps = [d for d in deps if d not in build_deps and d not in flatten(multi_deps)]
+        flat_multi_deps = flatten(multi_deps)
+        non_runtime_deps = set(build_deps + flat_multi_deps)
+        runtime_deps = [d for d in deps if d not in non_runtime_deps]
 
         deps_for[node_key] = (build_deps, runtime_deps, multi_deps)
 
         # keep track of reverse deps too
-        for dep in deps + flatten(multi_deps):
+        for dep in deps + flat_multi_deps:
             dep_of.setdefault(dep, set()).add(node_key)
 
     if check_inter_ec_conflicts:
@@ -152,33 +158,35 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         ec_keys = [k for k in [mk_key(e) for e in easyconfigs] if k not in wrapper_deps]
         deps_for[(None, None)] = ([], ec_keys, [])
 
-    # iteratively expand list of dependencies
-    last_deps_for = None
-    while deps_for != last_deps_for:
-        last_deps_for = copy.deepcopy(deps_for)
-        # (Automake, _), [], [(Autoconf, _), (GCC, _)]
-        for (key, (build_deps, runtime_deps, multi_deps)) in last_deps_for.items():
-            # extend runtime dependencies with non-build dependencies of own runtime dependencies
-            # Autoconf
-            for dep in runtime_deps:
-                # [], [M4, GCC]
-                deps_for[key][1].extend(deps_for[dep][1])
-
-            # extend multi deps with non-build dependencies of own runtime dependencies
-            for deplist in multi_deps:
-                for dep in deplist:
-                    deps_for[key][2].extend(deps_for[dep][1])
-
-            # extend build dependencies with non-build dependencies of own build dependencies
-            for dep in build_deps:
-                deps_for[key][0].extend(deps_for[dep][1])
-
-            deps_for[key] = (sorted(nub(deps_for[key][0])), sorted(nub(deps_for[key][1])), multi_deps)
-
-            # also track reverse deps (except for ghost entry)
-            if key != (None, None):
-                for dep in build_deps + runtime_deps:
-                    dep_of.setdefault(dep, set()).add(key)
+    # determine transitive closure of runtime dependencies for each entry, via a memoized depth-first search;
+    # (resolved) dependencies form a directed acyclic graph, so each entry only needs to be visited once
+    runtime_closure = {}
+
+    def det_runtime_closure(key):
+        """Determine set of all (direct and indirect) runtime dependencies for entry with specified key."""
+        if key not in runtime_closure:
+            res = set()
+            for dep in deps_for[key][1]:
+                res.add(dep)
+                res.update(det_runtime_closure(dep))
+            runtime_closure[key] = res
+        return runtime_closure[key]
+
+    # expand list of dependencies:
+    # runtime dependencies are extended with runtime dependencies of own runtime dependencies (recursively),
+    # build dependencies are extended with (all) runtime dependencies of own build dependencies;
+    # multi deps are not expanded
+    for (key, (build_deps, runtime_deps, multi_deps)) in list(deps_for.items()):
+        all_build_deps = set(build_deps)
+        for dep in build_deps:
+            all_build_deps.update(det_runtime_closure(dep))
+
+        deps_for[key] = (sorted(all_build_deps), sorted(det_runtime_closure(key)), multi_deps)
+
+        # also track reverse deps (except for ghost entry)
+        if key != (None, None):
+            for dep in all_build_deps | det_runtime_closure(key):
+                dep_of.setdefault(dep, set()).add(key)
 
     def check_conflict(parent, dep1, dep2):
         """
@@ -217,12 +225,26 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
             lists_of_runtime_deps = [runtime_deps]
 
         for runtime_deps in lists_of_runtime_deps:
-            # also check whether module itself clashes with any of its dependencies
-            for i, dep1 in enumerate(build_deps + runtime_deps + [key]):
-                for dep2 in (build_deps + runtime_deps)[i + 1:]:
-                    # don't worry about conflicts between module itself and any of its build deps
-                    if dep1 != key or dep2 not in build_deps:
-                        res |= check_conflict(key, dep1, dep2)
+            deps = build_deps + runtime_deps
+
+            # only dependencies with the same name can conflict, so group positions of dependencies by name;
+            # conflicts are reported in order of position of both dependencies in list of dependencies
+            positions = {}
+            for i, dep in enumerate(deps):
+                positions.setdefault(dep[0], []).append(i)
+
+            conflicting_pairs = []
+            for idxs in positions.values():
+                for i, idx1 in enumerate(idxs):
+                    for idx2 in idxs[i + 1:]:
+                        if deps[idx1][1] != deps[idx2][1]:
+                            conflicting_pairs.append((idx1, idx2))
+
+            for (idx1, idx2) in sorted(conflicting_pairs):
+                dep1, dep2 = deps[idx1], deps[idx2]
+                # don't worry about conflicts between module itself and any of its build deps
+                if dep1 != key or dep2 not in build_deps:
+                    res |= check_conflict(key, dep1, dep2)
 
     return res
 
@@ -326,12 +348,19 @@ def raise_error_missing_deps(missing_deps, extra_msg=None):
 def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_error_missing_ecs=True):
     """
     Work through the list of easyconfigs to determine an optimal order
+
+    A dependency graph is constructed (keyed by full module name), which is expanded using the robot
+    in rounds; nodes are ordered via a heap-based topological sort, such that the resulting order is
+    the one in which the easyconfigs become resolvable.
+
     :param easyconfigs: list of easyconfigs
     :param modtool: ModulesTool instance to use
     :param retain_all_deps: boolean indicating whether all dependencies must be retained, regardless of availability;
                             retain all deps when True, check matching build option when False
     :param raise_error_missing_ecs: raise an error when one or more easyconfig files could not be found
     """
+    start_time = time.time()
+
     robot = build_option('robot_path')
     # retain all dependencies if specified by either the resp. build option or the dedicated named argument
     retain_all_deps = build_option('retain_all_deps') or retain_all_deps
@@ -345,60 +374,162 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
         if len(avail_modules) == 0:
             _log.warning("No installed modules. Your MODULEPATH is probably incomplete: %s" % os.getenv('MODULEPATH'))
 
-    ordered_ecs = []
     # all available modules can be used for resolving dependencies except those that will be installed
-    being_installed = [p['full_mod_name'] for p in easyconfigs]
-    avail_modules = [m for m in avail_modules if m not in being_installed]
+    being_installed = set(p['full_mod_name'] for p in easyconfigs)
+    avail_modules = set(m for m in avail_modules if m not in being_installed)
 
     _log.debug('easyconfigs before resolving deps: %s', easyconfigs)
 
+    # dependency graph: nodes are (copies of) parsed easyconfigs, keyed by full module name;
+    # 'dependencies' of each node only retains dependencies that are not resolved yet
+    nodes, node_pos, dep_mod_names, unresolved, dependents = {}, {}, {}, {}, {}
+    eb_mod_names = {}
+    exists_cache = {}
+    missing_mod_names = set()
+    resolved = set()
+    ordered_ecs = []
+    stats = {'edges': 0, 'parsed': 0}
+
+    def det_eb_mod_name(spec, mod_name):
+        """Determine module name for specified easyconfig/dependency according to EasyBuild MNS (cached)."""
+        if mod_name not in eb_mod_names:
+            eb_mod_names[mod_name] = EasyBuildMNS().det_full_module_name(spec)
+        return eb_mod_names[mod_name]
+
+    def is_resolved(dep_mod_name):
+        """Check whether dependency with specified module name is resolved (i.e. requires no node to be built)."""
+        if dep_mod_name in resolved:
+            res = True
+        elif retain_all_deps or dep_mod_name in nodes:
+            res = False
+        elif dep_mod_name in avail_modules:
+            res = True
+        else:
+            # fallback to checking with modtool.exist is required,
+            # for hidden modules and external modules where module name may be partial
+            if dep_mod_name not in exists_cache:
+                exists_cache[dep_mod_name] = modtool.exist([dep_mod_name], skip_avail=True)[0]
+            res = exists_cache[dep_mod_name]
+        return res
+
+    def add_node(entry):
+        """Add node for specified parsed easyconfig to dependency graph (dependencies are linked separately)."""
+        mod_name = entry['full_mod_name']
+        if isinstance(entry, EasyConfig):
+            entry._config = copy.copy(entry._config)
+        else:
+            entry = entry.copy()
+        nodes[mod_name] = entry
+        node_pos[mod_name] = len(node_pos)
+        return mod_name
+
+    def link_node(mod_name):
+        """Link node with specified module name to the nodes for its (unresolved) dependencies."""
+        entry = nodes[mod_name]
+        deps, mod_names = [], []
+        for dep in entry['dependencies']:
+            # always treat external modules as resolved,
+            # since no corresponding easyconfig can be found for them
+            if dep.get('external_module', False):
+                _log.debug("Treating dependency marked as external module as resolved: %s", dep)
+                continue
+
+            if 'full_mod_name' in dep:
+                dep_mod_name = dep['full_mod_name']
+            else:
+                dep_mod_name = ActiveMNS().det_full_module_name(dep)
+
+            if not is_resolved(dep_mod_name):
+                deps.append(dep)
+                mod_names.append(dep_mod_name)
+                dependents.setdefault(dep_mod_name, []).append(mod_name)
+
+        entry['dependencies'] = deps
+        dep_mod_names[mod_name] = mod_names
+        unresolved[mod_name] = set(mod_names)
+        stats['edges'] += len(deps)
+
+    def remove_dep(mod_name, dep_mod_name):
+        """Remove dependency with specified module name from list of unresolved dependencies for specified node."""
+        entry = nodes[mod_name]
+        idxs = [i for (i, x) in enumerate(dep_mod_names[mod_name]) if x != dep_mod_name]
+        entry['dependencies'] = [entry['dependencies'][i] for i in idxs]
+        dep_mod_names[mod_name] = [dep_mod_names[mod_name][i] for i in idxs]
+        unresolved[mod_name].discard(dep_mod_name)
+
+    def resolve(queue):
+        """
+        Resolve nodes in specified queue (and nodes that become resolvable along the way).
+
+        Nodes are sorted on (pass, position), where a node that becomes resolvable in the same pass is
+        only picked up in the next pass if it precedes the node it depends on.
+        """
+        pass_nrs = {}
+        while queue:
+            pass_nr, pos, mod_name = heapq.heappop(queue)
+            _log.debug("Adding easyconfig %s to final list", mod_name)
+            ordered_ecs.append(nodes[mod_name])
+            resolved.add(mod_name)
+            for dependent in dependents.get(mod_name, []):
+                if dependent in unresolved and mod_name in unresolved[dependent]:
+                    remove_dep(dependent, mod_name)
+                    dep_pass_nr = pass_nr + int(node_pos[dependent] < pos)
+                    pass_nrs[dependent] = max(pass_nrs.get(dependent, 1), dep_pass_nr)
+                    if not unresolved[dependent]:
+                        heapq.heappush(queue, (pass_nrs[dependent], node_pos[dependent], dependent))
+
+    def resolvable(mod_names):
+        """Compose queue of nodes with specified module names that have no unresolved dependencies."""
+        queue = [(1, node_pos[x], x) for x in mod_names if not unresolved[x]]
+        heapq.heapify(queue)
+        return queue
+
+    pending = [add_node(ec) for ec in easyconfigs if ec['full_mod_name'] not in nodes]
+    for mod_name in pending:
+        link_node(mod_name)
+    queue = resolvable(pending)
+
     totally_missing, missing_easyconfigs = [], []
 
     # resolve all dependencies, put a safeguard in place to avoid an infinite loop (shouldn't occur though)
     loopcnt = 0
     maxloopcnt = 10000
-    while easyconfigs:
+    while pending:
         # make sure this stops, we really don't want to get stuck in an infinite loop
         loopcnt += 1
         if loopcnt > maxloopcnt:
             raise EasyBuildError("Maximum loop cnt %s reached, so quitting (easyconfigs: %s, missing_easyconfigs: %s)",
-                                 maxloopcnt, easyconfigs, missing_easyconfigs)
-
-        # first try resolving dependencies without using external dependencies
-        last_processed_count = -1
-        while len(avail_modules) > last_processed_count:
-            last_processed_count = len(avail_modules)
-            res = find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=retain_all_deps)
-            resolved_ecs, easyconfigs, avail_modules = res
-            ordered_ec_mod_names = [x['full_mod_name'] for x in ordered_ecs]
-            for ec in resolved_ecs:
-                # only add easyconfig if it's not included yet (based on module name)
-                if not ec['full_mod_name'] in ordered_ec_mod_names:
-                    ordered_ecs.append(ec)
-
-        # dependencies marked as external modules should be resolved via available modules at this point
-        missing_external_modules = [d['full_mod_name'] for ec in easyconfigs for d in ec['dependencies']
-                                    if d.get('external_module', False)]
-        if missing_external_modules:
-            raise EasyBuildError("Missing modules for dependencies marked as external modules: %s",
-                                 ', '.join(missing_external_modules))
+                                 maxloopcnt, [nodes[x] for x in pending], missing_easyconfigs)
+
+        resolve(queue)
+        pending = [x for x in pending if x not in resolved]
 
         # robot: look for existing dependencies, add them
-        if robot and easyconfigs:
+        if robot and pending:
 
             # rely on EasyBuild module naming scheme when resolving dependencies, since we know that will
             # generate sensible module names that include the necessary information for the resolution to work
             # (name, version, toolchain, versionsuffix)
-            being_installed = [EasyBuildMNS().det_full_module_name(p['ec']) for p in easyconfigs]
+            being_installed = set(det_eb_mod_name(nodes[x]['ec'], x) for x in pending)
 
             additional = []
-            for entry in easyconfigs:
+            for mod_name in pending:
+                entry = nodes[mod_name]
                 # do not choose an entry that is being installed in the current run
                 # if they depend, you probably want to rebuild them using the new dependency
-                deps = entry['dependencies']
-                candidates = [d for d in deps if not EasyBuildMNS().det_full_module_name(d) in being_installed]
-                if candidates:
-                    cand_dep = candidates[0]
+                cand_dep, cand_mod_name = None, None
+                for dep, dep_mod_name in zip(entry['dependencies'], dep_mod_names[mod_name]):
+                    if det_eb_mod_name(dep, dep_mod_name) not in being_installed:
+                        cand_dep, cand_mod_name = dep, dep_mod_name
+                        break
+
+                if cand_dep is None:
+                    _log.debug("No more candidate dependencies to resolve for %s", eb_mod_names[mod_name])
+
+                elif cand_mod_name in nodes and cand_mod_name not in missing_mod_names:
+                    _log.debug("Dependency %s of %s is already included in dependency graph", cand_dep, mod_name)
+
+                else:
                     # find easyconfig, might not find any
                     _log.debug("Looking for easyconfig for %s" % str(cand_dep))
                     # note: robot_find_easyconfig may return None
@@ -419,40 +550,43 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
                             missing_easyconfigs.append(cand_dep)
 
                         # remove irresolvable dependency from list of dependencies so we can continue
-                        entry['dependencies'].remove(cand_dep)
+                        remove_dep(mod_name, cand_mod_name)
 
                         # add dummy entry for this dependency, so --dry-run for example can still report the dep
-                        additional.append({
-                            'dependencies': [],
-                            'ec': None,
-                            'full_mod_name': full_mod_name,
-                            'spec': None,
-                        })
+                        if full_mod_name not in nodes:
+                            missing_mod_names.add(full_mod_name)
+                            additional.append(add_node({
+                                'dependencies': [],
+                                'ec': None,
+                                'full_mod_name': full_mod_name,
+                                'spec': None,
+                            }))
                     else:
                         _log.info("Robot: resolving dependency %s with %s" % (cand_dep, path))
                         # build specs should not be passed down to resolved dependencies,
                         # to avoid that e.g. --try-toolchain trickles down into the used toolchain itself
                         hidden = cand_dep.get('hidden', False)
                         processed_ecs = process_easyconfig(path, validate=not retain_all_deps, hidden=hidden)
+                        stats['parsed'] += 1
 
                         # ensure that selected easyconfig provides required dependency
                         verify_easyconfig_filename(path, cand_dep, parsed_ec=processed_ecs)
 
                         for ec in processed_ecs:
-                            if ec not in easyconfigs + additional:
-                                additional.append(ec)
+                            if ec['full_mod_name'] not in nodes:
+                                additional.append(add_node(ec))
                                 _log.debug("Added %s as dependency of %s" % (ec, entry))
-                else:
-                    mod_name = EasyBuildMNS().det_full_module_name(entry['ec'])
-                    _log.debug("No more candidate dependencies to resolve for %s" % mod_name)
 
-            # add additional (new) easyconfigs to list of stuff to process
-            easyconfigs.extend(additional)
-            _log.debug("Unprocessed dependencies: %s", easyconfigs)
+            # link additional (new) nodes in dependency graph, and add them to list of stuff to process
+            for mod_name in additional:
+                link_node(mod_name)
+            pending.extend(additional)
+            queue = resolvable(pending)
+            _log.debug("Unprocessed dependencies: %s", pending)
 
         elif not robot:
             # no use in continuing if robot is not enabled, dependencies won't be resolved anyway
-            missing_deps = [dep for x in easyconfigs for dep in x['dependencies']]
+            missing_deps = [dep for x in pending for dep in nodes[x]['dependencies']]
             if missing_deps:
                 raise_error_missing_deps(missing_deps, extra_msg="enable dependency resolution via --robot?")
 
@@ -465,6 +599,14 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
         else:
             _log.warning("No easyconfig files found for: %s", missing_easyconfigs)
 
+    stats_msg = "dependency resolution completed in %.2f sec: %d nodes & %d edges in dependency graph, "
+    stats_msg += "%d easyconfig files parsed"
+    stats_msg = stats_msg % (time.time() - start_time, len(nodes), stats['edges'], stats['parsed'])
+    if build_option('robot_stats'):
+        print_msg(stats_msg, log=_log)
+    else:
+        _log.info(stats_msg)
+
     _log.info("Dependency resolution complete, building as follows: %s", ordered_ecs)
     return ordered_ecs
 
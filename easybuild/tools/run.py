@@ -33,9 +33,11 @@ Tools to run commands.
 :author: Toon Willems (Ghent University)
 :author: Ward Poelmans (Ghent University)
 """
+import collections
 import functools
 import os
 import re
+import select
 import signal
 import subprocess
 import sys
@@ -46,7 +48,8 @@ from datetime import datetime
 import easybuild.tools.asyncprocess as asyncprocess
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, print_msg, time_str_since
-from easybuild.tools.config import ERROR, IGNORE, WARN, build_option
+from easybuild.tools.config import DEFAULT_CMD_OUTPUT_BUFFER_SIZE, ERROR, IGNORE, WARN, build_option
+from easybuild.tools.profiling import record_cmd, wait_for_process
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.utilities import trace_msg
 
@@ -59,6 +62,10 @@ errors_found_in_log = 0
 # default strictness level
 strictness = WARN
 
+# maximum amount of most recent output (in characters) that is checked for questions in run_cmd_qa;
+# questions are expected to be asked at the end of the output, so older output can be ignored
+QA_OUTPUT_WINDOW = 64 * 1024
+
 
 CACHED_COMMANDS = [
     "sysctl -n hw.cpufrequency_max",  # used in get_cpu_speed (OS X)
@@ -123,9 +130,118 @@ def get_output_from_process(proc, read_size=None, asynchronous=False):
     return output
 
 
+class CmdOutput(object):
+    """
+    Output of a shell command, which is collected while the command is running.
+
+    Output is kept in memory until its size exceeds the specified buffer size, after which it is spooled to a
+    temporary file; only a ring buffer with the tail of the output is kept in memory.
+    Output is checked line by line for errors (if a regular expression is specified).
+    """
+
+    def __init__(self, buffer_size, regexp=None):
+        """
+        Create new CmdOutput instance.
+
+        :param buffer_size: maximum size of output (in bytes) to keep in memory
+        :param regexp: regular expression to check output for errors; if True the default is used
+                       (see parse_log_for_error)
+        """
+        self.buffer_size = buffer_size
+        self.size = 0
+        self.errors = []
+
+        self._spool = tempfile.SpooledTemporaryFile(max_size=buffer_size, mode='w+')
+        self._tail = collections.deque()
+        self._tail_size = 0
+
+        # compiled regular expression to check output for errors (if any)
+        self.error_regex = None
+        if regexp:
+            self.error_regex = det_error_regex(regexp)
+        self._partial_line = ''
+
+    def write(self, output):
+        """Add output, and check all complete lines in it for errors."""
+        self._spool.write(output)
+        self.size += len(output)
+
+        self._tail.append(output)
+        self._tail_size += len(output)
+        while len(self._tail) > 1 and self._tail_size - len(self._tail[0]) >= self.buffer_size:
+            self._tail_size -= len(self._tail.popleft())
+
+        if self.error_regex is not None:
+            lines = (self._partial_line + output).split('\n')
+            self._partial_line = lines.pop()
+            # avoid that a very long line without newlines keeps growing
+            if len(self._partial_line) > self.buffer_size:
+                lines.append(self._partial_line)
+                self._partial_line = ''
+            self._check_lines(lines)
+
+    def _check_lines(self, lines):
+        """Check specified lines for errors."""
+        for line in lines:
+            res = self.error_regex.search(line)
+            if res:
+                self.errors.append([line, res.groups()])
+
+    def finalize(self):
+        """Finalize collecting output (check last line for errors)."""
+        if self.error_regex is not None:
+            self._check_lines([self._partial_line])
+            self._partial_line = ''
+
+    @property
+    def in_memory(self):
+        """Indicate whether all output is still available in memory (or was spooled to a temporary file)."""
+        # spooled file is rolled over to disk as soon as its size exceeds the buffer size
+        return self.size <= self.buffer_size
+
+    def read(self):
+        """Return full output."""
+        self._spool.seek(0)
+        res = self._spool.read()
+        self._spool.seek(0, os.SEEK_END)
+        return res
+
+    def __iter__(self):
+        """Iterate over lines in output."""
+        self._spool.seek(0)
+        for line in self._spool:
+            yield line
+        self._spool.seek(0, os.SEEK_END)
+
+    def tail(self):
+        """Return last part of output, which is available in memory (up to buffer size)."""
+        return ''.join(self._tail)
+
+    def close(self):
+        """Close (and remove) temporary file that holds output."""
+        self._spool.close()
+
+    def __enter__(self):
+        """Enter context, CmdOutput instance is closed when context is exited."""
+        return self
+
+    def __exit__(self, *args):
+        """Exit context, close CmdOutput instance."""
+        self.close()
+
+    def __str__(self):
+        """Return full output if it is available in memory, or last part of output otherwise."""
+        if self.in_memory:
+            res = self.read()
+        else:
+            res = "[... only last %d bytes of %d bytes of output are shown ...]\n" % (self._tail_size, self.size)
+            res += self.tail()
+        return res
+
+
 @run_cmd_cache
 def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True, log_output=False, path=None,
-            force_in_dry_run=False, verbose=True, shell=True, trace=True, stream_output=None):
+            force_in_dry_run=False, verbose=True, shell=True, trace=True, stream_output=None, output_handle=False):
     """
     Run specified command (in a subshell)
     :param cmd: command to run
@@ -141,6 +257,8 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
     :param shell: allow commands to not run in a shell (especially useful for cmd lists)
     :param trace: print command being executed as part of trace output
     :param stream_output: enable streaming command output to stdout
+    :param output_handle: return CmdOutput instance rather than a string value as output (if simple is False),
+                          which avoids that full output needs to be loaded in memory
     """
     cwd = os.getcwd()
 
@@ -192,6 +310,8 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
         # make sure we get the type of the return value right
         if simple:
             return True
+        elif output_handle:
+            return (CmdOutput(0), 0)
         else:
             # output, exit code
             return ('', 0)
@@ -220,6 +340,8 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
             raise EasyBuildError("Don't know how to prefix with /usr/bin/env for commands of type %s", type(cmd))
 
     _log.info('running cmd: %s ' % cmd)
+    profile = build_option('profile', default=False)
+    cmd_start_time = time.time()
     try:
         proc = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                                 stdin=subprocess.PIPE, close_fds=True, executable=exec_cmd)
@@ -236,27 +358,36 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
     else:
         read_size = 1024 * 8
 
-    ec = proc.poll()
-    stdouterr = ''
-    while ec is None:
-        # need to read from time to time.
-        # - otherwise the stdout/stderr buffer gets filled and it all stops working
-        output = get_output_from_process(proc, read_size=read_size)
+    # buffer size may not be defined yet when commands are run while EasyBuild configuration is being set up
+    buffer_size = build_option('cmd_output_buffer_size', default=DEFAULT_CMD_OUTPUT_BUFFER_SIZE) * 1024
+    stdouterr = CmdOutput(buffer_size, regexp=regexp)
+
+    # read output as soon as it becomes available, until end-of-file (when command completed);
+    # os.read returns whatever output is available (up to read size), it does not wait until read size is reached
+    fd = proc.stdout.fileno()
+    while True:
+        output = os.read(fd, read_size)
+        if not output:
+            break
+        # need to be careful w.r.t. encoding since we want to obtain a string value (see get_output_from_process)
+        output = str(output.decode('ascii', 'ignore'))
         if cmd_log:
             cmd_log.write(output)
         if stream_output:
             sys.stdout.write(output)
-        stdouterr += output
-        ec = proc.poll()
+        stdouterr.write(output)
+
+    proc.stdout.close()
+    if profile:
+        # collect resource usage of the process tree of the command
+        ec, rusage = wait_for_process(proc)
+        record_cmd(cmd_msg, cmd_start_time, time.time() - cmd_start_time, rusage)
+    else:
+        ec = proc.wait()
+    stdouterr.finalize()
 
-    # read remaining data (all of it)
-    output = get_output_from_process(proc)
     if cmd_log:
-        cmd_log.write(output)
         cmd_log.close()
-    if stream_output:
-        sys.stdout.write(output)
-    stdouterr += output
 
     if trace:
         trace_msg("command completed: exit %s, ran in %s" % (ec, time_str_since(start_time)))
@@ -266,7 +397,20 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
     except OSError as err:
         raise EasyBuildError("Failed to return to %s after executing command: %s", cwd, err)
 
-    return parse_cmd_output(cmd, stdouterr, ec, simple, log_all, log_ok, regexp)
+    # temporary file that holds output is always closed, unless CmdOutput instance is returned
+    return_handle = False
+    try:
+        res = parse_cmd_output(cmd, stdouterr, ec, simple, log_all, log_ok, regexp)
+        if not simple:
+            if output_handle:
+                return_handle = True
+            else:
+                res = (stdouterr.read(), ec)
+    finally:
+        if not return_handle:
+            stdouterr.close()
+
+    return res
 
 
 def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, regexp=True, std_qa=None, path=None,
@@ -282,7 +426,7 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
     :param regex: regex used to check the output for errors; if True it will use the default (see parse_log_for_error)
     :param std_qa: dictionary which maps question regex patterns to answers
     :param path: path to execute the command is; current working directory is used if unspecified
-    :param maxhits: maximum number of cycles (seconds) without being able to find a known question
+    :param maxhits: maximum time (in seconds) without new output and without being able to find a known question
     :param trace: print command being executed as part of trace output
     """
     cwd = os.getcwd()
@@ -401,93 +545,89 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
     except OSError as err:
         raise EasyBuildError("run_cmd_qa init cmd %s failed:%s", cmd, err)
 
-    ec = proc.poll()
-    stdout_err = ''
-    old_len_out = -1
-    hit_count = 0
+    # list of all questions (incl. answers), in order of priority
+    questions = list(new_qa.items()) + list(new_std_qa.items())
 
-    while ec is None:
-        # need to read from time to time.
-        # - otherwise the stdout/stderr buffer gets filled and it all stops working
-        try:
-            out = get_output_from_process(proc, asynchronous=True)
-            if cmd_log:
-                cmd_log.write(out)
-            stdout_err += out
-        # recv_some used by get_output_from_process for getting asynchronous output may throw exception
-        except (IOError, Exception) as err:
-            _log.debug("run_cmd_qa cmd %s: read failed: %s", cmd, err)
-            out = None
-
-        hit = False
-        for question, answers in new_qa.items():
-            res = question.search(stdout_err)
-            if out and res:
-                fa = answers[0] % res.groupdict()
-                # cycle through list of answers
-                last_answer = answers.pop(0)
-                answers.append(last_answer)
-                _log.debug("List of answers for question %s after cycling: %s", question.pattern, answers)
-
-                _log.debug("run_cmd_qa answer %s question %s out %s", fa, question.pattern, stdout_err[-50:])
-                asyncprocess.send_all(proc, fa)
-                hit = True
-                break
-        if not hit:
-            for question, answers in new_std_qa.items():
-                res = question.search(stdout_err)
-                if out and res:
-                    fa = answers[0] % res.groupdict()
-                    # cycle through list of answers
-                    last_answer = answers.pop(0)
-                    answers.append(last_answer)
-                    _log.debug("List of answers for question %s after cycling: %s", question.pattern, answers)
-
-                    _log.debug("run_cmd_qa answer %s std question %s out %s", fa, question.pattern, stdout_err[-50:])
-                    asyncprocess.send_all(proc, fa)
-                    hit = True
-                    break
-            if not hit:
-                if len(stdout_err) > old_len_out:
-                    old_len_out = len(stdout_err)
-                else:
-                    noqa = False
-                    for r in new_no_qa:
-                        if r.search(stdout_err):
-                            _log.debug("runqanda: noQandA found for out %s", stdout_err[-50:])
-                            noqa = True
-                    if not noqa:
-                        hit_count += 1
-            else:
-                hit_count = 0
-        else:
-            hit_count = 0
-
-        if hit_count > maxhits:
-            # explicitly kill the child process before exiting
-            try:
-                os.killpg(proc.pid, signal.SIGKILL)
-                os.kill(proc.pid, signal.SIGKILL)
-            except OSError as err:
-                _log.debug("run_cmd_qa exception caught when killing child process: %s", err)
-            _log.debug("run_cmd_qa: full stdouterr: %s", stdout_err)
-            raise EasyBuildError("run_cmd_qa: cmd %s : Max nohits %s reached: end of output %s",
-                                 cmd, maxhits, stdout_err[-500:])
-
-        # the sleep below is required to avoid exiting on unknown 'questions' too early (see above)
-        time.sleep(1)
-        ec = proc.poll()
-
-    # Process stopped. Read all remaining data
+    # combined pattern for all questions, to quickly check whether any question is found in new output;
+    # this may fail to compile, for example due to duplicate names for groups in different questions
     try:
-        if proc.stdout:
-            out = get_output_from_process(proc)
-            stdout_err += out
+        any_question = re.compile('|'.join('(?:%s)' % question.pattern for (question, _) in questions))
+    except re.error as err:
+        _log.debug("Failed to compile combined pattern for questions, checking them one by one: %s", err)
+        any_question = None
+
+    # output is only checked for questions when new output is available;
+    # only output since last answer is taken into account, output before that is consumed
+    stdout_err = []
+    unconsumed_out = ''
+    consumed_out = ''
+    last_activity = time.time()
+
+    fd = proc.stdout.fileno()
+    while True:
+        timeout = max(last_activity + maxhits - time.time(), 0)
+        if select.select([fd], [], [], timeout)[0]:
+            out = os.read(fd, 1024 * 8)
+            if not out:
+                # end of output, command completed
+                break
+
+            # need to be careful w.r.t. encoding since we want to obtain a string value (see get_output_from_process)
+            out = str(out.decode('ascii', 'ignore'))
             if cmd_log:
                 cmd_log.write(out)
-                cmd_log.close()
-    except IOError as err:
-        _log.debug("runqanda cmd %s: remaining data read failed: %s", cmd, err)
+            stdout_err.append(out)
+            unconsumed_out += out
+            if len(unconsumed_out) > QA_OUTPUT_WINDOW:
+                # only retain most recent output (starting at a new line), to avoid rescanning all output
+                unconsumed_out = unconsumed_out[-QA_OUTPUT_WINDOW:]
+                idx = unconsumed_out.find('\n')
+                if 0 <= idx < len(unconsumed_out) - 1:
+                    unconsumed_out = unconsumed_out[idx + 1:]
+            last_activity = time.time()
+
+            if questions and (any_question is None or any_question.search(unconsumed_out)):
+                for question, answers in questions:
+                    res = question.search(unconsumed_out)
+                    if res:
+                        fa = answers[0] % res.groupdict()
+                        # cycle through list of answers
+                        last_answer = answers.pop(0)
+                        answers.append(last_answer)
+                        _log.debug("List of answers for question %s after cycling: %s", question.pattern, answers)
+
+                        _log.debug("run_cmd_qa answer %s question %s out %s", fa, question.pattern,
+                                   unconsumed_out[-50:])
+                        asyncprocess.send_all(proc, fa)
+
+                        consumed_out, unconsumed_out = unconsumed_out, ''
+                        break
+
+        elif time.time() - last_activity >= maxhits:
+            # no new output and no question found during specified time,
+            # so something is wrong (unless the most recent output is known to not be a question)
+            recent_out = consumed_out + unconsumed_out
+            if any(no_qa_regex.search(recent_out) for no_qa_regex in new_no_qa):
+                _log.debug("runqanda: noQandA found for out %s", recent_out[-50:])
+                last_activity = time.time()
+            else:
+                # explicitly kill the child process before exiting
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                    os.kill(proc.pid, signal.SIGKILL)
+                except OSError as err:
+                    _log.debug("run_cmd_qa exception caught when killing child process: %s", err)
+                if cmd_log:
+                    cmd_log.close()
+                stdout_err = ''.join(stdout_err)
+                _log.debug("run_cmd_qa: full stdouterr: %s", stdout_err)
+                raise EasyBuildError("run_cmd_qa: cmd %s : Max nohits %s reached: end of output %s",
+                                     cmd, maxhits, stdout_err[-500:])
+
+    ec = proc.wait()
+    stdout_err = ''.join(stdout_err)
+    if cmd_log:
+        cmd_log.close()
 
     if trace:
         trace_msg("interactive command completed: exit %s, ran in %s" % (ec, time_str_since(start_time)))
@@ -504,7 +644,7 @@ def parse_cmd_output(cmd, stdouterr, ec, simple, log_all, log_ok, regexp):
     """
     Parse command output and construct return value.
     :param cmd: executed command
-    :param stdouterr: combined stdout/stderr of executed command
+    :param stdouterr: combined stdout/stderr of executed command (string value or CmdOutput instance)
     :param ec: exit code of executed command
     :param simple: if True, just return True/False to indicate success, else return a tuple: (output, exit_code)
     :param log_all: always log command output and exit code
@@ -532,16 +672,22 @@ def parse_cmd_output(cmd, stdouterr, ec, simple, log_all, log_ok, regexp):
         if check_ec:
             raise EasyBuildError('cmd "%s" exited with exit code %s and output:\n%s', cmd, ec, stdouterr)
         else:
-            _log.warning('cmd "%s" exited with exit code %s and output:\n%s' % (cmd, ec, stdouterr))
+            _log.warning('cmd "%s" exited with exit code %s and output:\n%s', cmd, ec, stdouterr)
     elif not ec:
         if log_all:
-            _log.info('cmd "%s" exited with exit code %s and output:\n%s' % (cmd, ec, stdouterr))
+            _log.info('cmd "%s" exited with exit code %s and output:\n%s', cmd, ec, stdouterr)
         else:
-            _log.debug('cmd "%s" exited with exit code %s and output:\n%s' % (cmd, ec, stdouterr))
+            # output is only formatted if debug logging is enabled
+            _log.debug('cmd "%s" exited with exit code %s and output:\n%s', cmd, ec, stdouterr)
 
     # parse the stdout/stderr for errors when strictness dictates this or when regexp is passed in
     if use_regexp or regexp:
-        res = parse_log_for_error(stdouterr, regexp, msg="Command used: %s" % cmd)
+        if isinstance(stdouterr, CmdOutput):
+            # output was already checked for errors line by line while it was being collected
+            res = stdouterr.errors
+            report_errors_in_log(res, stdouterr.error_regex.pattern, msg="Command used: %s" % cmd)
+        else:
+            res = parse_log_for_error(stdouterr, regexp, msg="Command used: %s" % cmd)
         if len(res) > 0:
             message = "Found %s errors in command output (output: %s)" % (len(res), "\n\t".join([r[0] for r in res]))
             if use_regexp:
@@ -560,15 +706,12 @@ def parse_cmd_output(cmd, stdouterr, ec, simple, log_all, log_ok, regexp):
         return (stdouterr, ec)
 
 
-def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
-    """
-    txt is multiline string.
-    - in memory
-    regExp is a one-line regular expression
-    - default
+def det_error_regex(regExp):
     """
-    global errors_found_in_log
+    Determine compiled regular expression to check command output for errors.
 
+    :param regExp: regular expression pattern (string value), or True to use the default one
+    """
     if regExp and isinstance(regExp, bool):
         regExp = r"(?<![(,-]|\w)(?:error|segmentation fault|failed)(?![(,-]|\.?\w)"
         _log.debug('Using default regular expression: %s' % regExp)
@@ -577,14 +720,21 @@ def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
     else:
         raise EasyBuildError("parse_log_for_error no valid regExp used: %s", regExp)
 
-    reg = re.compile(regExp, re.I)
+    return re.compile(regExp, re.I)
 
-    res = []
-    for line in txt.split('\n'):
-        r = reg.search(line)
-        if r:
-            res.append([line, r.groups()])
-            errors_found_in_log += 1
+
+def report_errors_in_log(res, regExp, stdout=True, msg=None):
+    """
+    Report on errors found in command output.
+
+    :param res: list of errors found, as returned by parse_log_for_error
+    :param regExp: regular expression pattern that was used
+    :param stdout: log errors that were found
+    :param msg: additional message to log
+    """
+    global errors_found_in_log
+
+    errors_found_in_log += len(res)
 
     if stdout and res:
         if msg:
@@ -592,6 +742,24 @@ def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
         _log.info("parse_log_for_error (some may be harmless) regExp %s found:\n%s" %
                   (regExp, '\n'.join([x[0] for x in res])))
 
+
+def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
+    """
+    txt is multiline string.
+    - in memory
+    regExp is a one-line regular expression
+    - default
+    """
+    reg = det_error_regex(regExp)
+
+    res = []
+    for line in txt.split('\n'):
+        r = reg.search(line)
+        if r:
+            res.append([line, r.groups()])
+
+    report_errors_in_log(res, reg.pattern, stdout=stdout, msg=msg)
+
     return res
 
 
@@ -0,0 +1,257 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Content-addressed store for source files (and patches), located in the .cas subdirectory of a source path.
+
+Files are stored once per SHA256 digest (.cas/sha256/<first 2 characters of digest>/<digest>), and are
+(hard or symbolic) linked from the usual locations in the source path (<letter>/<name>/<filename>);
+an index of paths (relative to the source path) to digests avoids having to search for files in different locations
+(the size and modification time of files are recorded as well, so unchanged files don't need to be hashed again).
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import CHECKSUM_FUNCTIONS, CHECKSUM_TYPE_SHA256, compute_checksum, is_sha256_checksum
+from easybuild.tools.filetools import mkdir, read_file
+from easybuild.tools.py2vs3 import string_type
+
+
+_log = fancylogger.getLogger('source_store', fname=False)
+
+SOURCE_STORE_SUBDIR = '.cas'
+SOURCE_STORE_INDEX = 'index.json'
+
+# source stores that were already initialised, indexed by source path
+_source_stores = {}
+
+
+def det_sha256_checksums(checksum):
+    """
+    Determine list of SHA256 checksums in specified checksum specification (which may specify alternative checksums).
+    """
+    res = []
+    if isinstance(checksum, string_type):
+        if is_sha256_checksum(checksum):
+            res.append(checksum)
+    elif isinstance(checksum, tuple) and len(checksum) == 2 and checksum[0] in CHECKSUM_FUNCTIONS:
+        if checksum[0] == CHECKSUM_TYPE_SHA256:
+            res.append(checksum[1])
+    elif isinstance(checksum, (list, tuple)):
+        for alt_checksum in checksum:
+            res.extend(det_sha256_checksums(alt_checksum))
+    return res
+
+
+def get_source_store(srcpath):
+    """Return source store for specified source path."""
+    srcpath = os.path.abspath(srcpath)
+    if srcpath not in _source_stores:
+        _source_stores[srcpath] = SourceStore(srcpath)
+    return _source_stores[srcpath]
+
+
+class SourceStore(object):
+    """Content-addressed store for files in a particular source path."""
+
+    def __init__(self, srcpath):
+        """
+        Constructor.
+
+        :param srcpath: source path in which content-addressed store is located
+        """
+        self.srcpath = os.path.abspath(srcpath)
+        self.topdir = os.path.join(self.srcpath, SOURCE_STORE_SUBDIR)
+        self.index_path = os.path.join(self.topdir, SOURCE_STORE_INDEX)
+        self._index = None
+        # files may be fetched by multiple threads concurrently
+        self.lock = threading.Lock()
+
+    @property
+    def index(self):
+        """
+        Index of paths (relative to source path) to entries with SHA256 digest, size and modification time
+        (loaded on first use).
+        """
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def index_entry(self, relpath):
+        """Return index entry for specified path (relative to source path), or empty dict if it's not indexed."""
+        entry = self.index.get(relpath) or {}
+        if isinstance(entry, string_type):
+            # entry that only specifies SHA256 digest
+            entry = {CHECKSUM_TYPE_SHA256: entry}
+        return entry
+
+    def indexed_digest(self, relpath):
+        """Return SHA256 digest recorded in index for specified path (relative to source path), or None."""
+        return self.index_entry(relpath).get(CHECKSUM_TYPE_SHA256)
+
+    def _mk_index_entry(self, digest, path):
+        """Create index entry for file at specified path with specified SHA256 digest."""
+        st = os.stat(path)
+        return {CHECKSUM_TYPE_SHA256: digest, 'mtime': st.st_mtime, 'size': st.st_size}
+
+    def _read_index(self):
+        """Read index from disk (empty index if it can't be read)."""
+        res = {}
+        if os.path.exists(self.index_path):
+            try:
+                res = json.loads(read_file(self.index_path))
+            except (EasyBuildError, ValueError) as err:
+                _log.warning("Ignoring index of source store %s that can not be read: %s", self.topdir, err)
+        return res
+
+    def _write_index(self, updates):
+        """
+        Add specified entries to index, and write it to disk;
+        index is written to a temporary file first, which is then renamed, so concurrent sessions never see
+        a partially written index (entries that were added by other sessions in the meantime are retained).
+        """
+        index = self._read_index()
+        index.update(updates)
+        mkdir(self.topdir, parents=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.topdir, prefix='.' + SOURCE_STORE_INDEX)
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(json.dumps(index, indent=0, sort_keys=True))
+        os.rename(tmp_path, self.index_path)
+        self._index = index
+
+    def path_for(self, digest):
+        """Return path to file in store for specified SHA256 digest."""
+        return os.path.join(self.topdir, CHECKSUM_TYPE_SHA256, digest[:2], digest)
+
+    def relpath(self, path):
+        """Return path relative to source path, or None if specified path is not located in source path."""
+        res = os.path.relpath(os.path.abspath(path), self.srcpath)
+        if res.startswith(os.path.pardir) or res.split(os.path.sep)[0] == SOURCE_STORE_SUBDIR:
+            res = None
+        return res
+
+    def _link(self, stored_path, path):
+        """Replace file at specified path (if any) with link to specified file in store."""
+        mkdir(os.path.dirname(path), parents=True)
+        tmp_path = '%s.%s' % (path, SOURCE_STORE_SUBDIR.lstrip('.'))
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(stored_path, tmp_path)
+        except OSError as err:
+            # hard links don't work across filesystems, fall back to a symbolic link
+            _log.debug("Failed to create hard link to %s, using symbolic link instead: %s", stored_path, err)
+            os.symlink(stored_path, tmp_path)
+        os.rename(tmp_path, path)
+
+    def provide(self, path, checksum=None):
+        """
+        Provide file at specified path via store, if the file is known in the index or if a file with the
+        expected SHA256 digest is available in the store.
+
+        :param path: location of file in source path
+        :param checksum: expected checksum(s) for file (only SHA256 checksums are taken into account)
+        :return: True if file at specified path is provided by store, False otherwise
+        """
+        relpath = self.relpath(path)
+        if relpath is None:
+            return False
+
+        indexed_digest = self.indexed_digest(relpath)
+        for digest in [indexed_digest] + det_sha256_checksums(checksum):
+            if digest:
+                stored_path = self.path_for(digest)
+                if not os.path.isfile(stored_path):
+                    continue
+
+                try:
+                    with self.lock:
+                        if not os.path.exists(path):
+                            self._link(stored_path, path)
+                        elif not os.path.samefile(path, stored_path):
+                            # existing file that is not provided by store must not be replaced,
+                            # but if it's known in the index, that entry is outdated
+                            _log.info("File %s differs from file in source store for %s", path, digest)
+                            return False
+
+                        if digest != indexed_digest:
+                            self._write_index({relpath: self._mk_index_entry(digest, path)})
+
+                except (EasyBuildError, IOError, OSError) as err:
+                    _log.warning("Failed to provide %s via source store: %s", path, err)
+                    return False
+
+                _log.info("File %s provided via source store (%s)", path, stored_path)
+                return True
+
+        return False
+
+    def add(self, path):
+        """
+        Add file at specified path to store (if it's located in the source path), and replace it with a link
+        to the stored file (which may have been stored already for another path, so duplicates are avoided).
+
+        :return: True if file was added to the store, False otherwise
+        """
+        relpath = self.relpath(path)
+        if relpath is None or not os.path.isfile(path):
+            return False
+
+        try:
+            # only compute SHA256 digest for new files, or files that were changed since they were indexed
+            st = os.stat(path)
+            entry = self.index_entry(relpath)
+            digest = entry.get(CHECKSUM_TYPE_SHA256)
+            if digest and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime:
+                _log.debug("File %s was not changed since it was indexed, using indexed digest %s", path, digest)
+            else:
+                digest = compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)
+            stored_path = self.path_for(digest)
+
+            with self.lock:
+                if not os.path.exists(stored_path):
+                    mkdir(os.path.dirname(stored_path), parents=True)
+                    try:
+                        os.link(path, stored_path)
+                    except OSError:
+                        shutil.copy2(path, stored_path)
+
+                if not os.path.samefile(path, stored_path):
+                    self._link(stored_path, path)
+
+                new_entry = self._mk_index_entry(digest, path)
+                if self.index.get(relpath) != new_entry:
+                    self._write_index({relpath: new_entry})
+
+        except (EasyBuildError, IOError, OSError) as err:
+            _log.warning("Failed to add %s to source store: %s", path, err)
+            return False
+
+        _log.info("File %s added to source store (%s)", path, stored_path)
+        return True
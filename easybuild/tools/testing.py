@@ -42,7 +42,7 @@ from time import gmtime, strftime
 from easybuild.base import fancylogger
 from easybuild.framework.easyblock import build_easyconfigs
 from easybuild.framework.easyconfig.tools import process_easyconfig
-from easybuild.framework.easyconfig.tools import skip_available
+from easybuild.framework.easyconfig.tools import parse_easyconfig_files, skip_available
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
 from easybuild.tools.filetools import find_easyconfigs, mkdir, read_file, write_file
@@ -100,10 +100,11 @@ def regtest(easyconfig_paths, modtool, build_specs=None):
 
     # process all the found easyconfig files
     easyconfigs = []
-    for ecfile in ecfiles:
-        try:
-            easyconfigs.extend(process_easyconfig(ecfile, build_specs=build_specs))
-        except EasyBuildError as err:
+    parse_kwargs = {'build_specs': build_specs}
+    for (ecfile, ecs, err) in parse_easyconfig_files(process_easyconfig, ecfiles, parse_kwargs=parse_kwargs):
+        if err is None:
+            easyconfigs.extend(ecs)
+        else:
             test_results.append((ecfile, 'parsing_easyconfigs', 'easyconfig file error: %s' % err, _log))
 
     # skip easyconfigs for which a module is already available, unless forced
@@ -52,6 +52,7 @@ TooclchainVariables: list of environment variables that are set when the toolcha
 """
 import copy
 import os
+import re
 import stat
 import sys
 import tempfile
@@ -67,7 +68,7 @@ from easybuild.tools.modules import get_software_version, get_software_version_e
 from easybuild.tools.systemtools import LINUX, get_os_type
 from easybuild.tools.toolchain.options import ToolchainOptions
 from easybuild.tools.toolchain.toolchainvariables import ToolchainVariables
-from easybuild.tools.utilities import nub, trace_msg
+from easybuild.tools.utilities import nub, shell_quote, trace_msg
 
 
 _log = fancylogger.getLogger('tools.toolchain', fname=False)
@@ -85,6 +86,13 @@ F90CACHE = 'f90cache'
 
 RPATH_WRAPPERS_SUBDIR = 'rpath_wrappers'
 
+# linker commands, for which options should not be prefixed with -Wl, in RPATH wrappers
+LINKER_CMDS = ['ld', 'ld.gold', 'ld.bfd']
+
+# Python-specific regular expression syntax that is not supported in POSIX extended regular expressions
+# (which is what is used by bash for =~): escape sequences like \d, \w, \s, (?...) groups and lazy quantifiers
+PY_SPECIFIC_REGEX_SYNTAX = re.compile(r'\\[^.^$*+?()\[\]{}|\\/-]|\(\?|[*+?}]\?')
+
 # available capabilities of toolchains
 # values match method names supported by Toolchain class (except for 'cuda')
 TOOLCHAIN_CAPABILITY_BLAS_FAMILY = 'blas_family'
@@ -980,8 +988,22 @@ class Toolchain(object):
         rpath_include = ','.join(rpath_include_dirs or [])
         self.log.debug("Combined RPATH include paths: '%s'", rpath_include)
 
+        # RPATH wrappers preprocess command line arguments using a bash function, unless the RPATH filter
+        # uses regular expression syntax that is not supported by bash, in which case rpath_args.py is used
+        if PY_SPECIFIC_REGEX_SYNTAX.search(rpath_filter):
+            self.log.info("RPATH filter '%s' can not be evaluated by bash, so using rpath_args.py in RPATH wrappers",
+                          rpath_filter)
+            use_rpath_args_py = 1
+        else:
+            use_rpath_args_py = 0
+
+        # regex used by rpath_args bash function must have exactly the same semantics as the one used by rpath_args.py,
+        # i.e. re.match with '^<filter 1>|...|<filter N>$' (so only the last filter is anchored at the end);
+        # wrapping that in a group that is anchored at the start yields the same result with the bash =~ operator
+        rpath_filter_regex = '^(^%s$)' % rpath_filter.replace(',', '|')
+
         # create wrappers
-        for cmd in nub(c_comps + fortran_comps + ['ld', 'ld.gold', 'ld.bfd']):
+        for cmd in nub(c_comps + fortran_comps + LINKER_CMDS):
             orig_cmd = which(cmd)
 
             if orig_cmd:
@@ -1010,15 +1032,23 @@ class Toolchain(object):
                 else:
                     rpath_wrapper_log = '/dev/null'
 
+                # determine whether or not to use -Wl to pass options to the linker based on name of command
+                flag_prefix = '' if cmd in LINKER_CMDS else '-Wl,'
+                rpath_include_args = [flag_prefix + '-rpath=%s' % inc for inc in rpath_include_dirs or []]
+
                 # complete template script and put it in place
                 cmd_wrapper_txt = read_file(rpath_wrapper_template) % {
+                    'flag_prefix': flag_prefix,
                     'orig_cmd': orig_cmd,
                     'python': sys.executable,
                     'rpath_args_py': rpath_args_py,
                     'rpath_filter': rpath_filter,
+                    'rpath_filter_regex': shell_quote(rpath_filter_regex),
                     'rpath_include': rpath_include,
+                    'rpath_include_args': ' '.join(shell_quote(x) for x in rpath_include_args),
                     'rpath_wrapper_log': rpath_wrapper_log,
-                    'wrapper_dir': wrapper_dir,
+                    'use_rpath_args_py': use_rpath_args_py,
+                    'wrapper_dir_quoted': shell_quote(wrapper_dir),
                 }
                 write_file(cmd_wrapper, cmd_wrapper_txt)
                 adjust_permissions(cmd_wrapper, stat.S_IXUSR)
@@ -29,6 +29,8 @@ Module with various utility functions
 """
 import datetime
 import glob
+import hashlib
+import inspect
 import os
 import re
 import sys
@@ -217,6 +219,29 @@ def nub(list_):
     return [x for x in list_ if x not in seen and not seen_add(x)]
 
 
+def stable_repr(value):
+    """
+    Return string representation of specified value (which may be a nested structure of dicts, lists, tuples & sets)
+    that does not depend on the order of keys in dicts or items in sets, and hence can be used to determine a digest.
+    """
+    if isinstance(value, dict):
+        items = sorted('%s: %s' % (stable_repr(key), stable_repr(val)) for (key, val) in value.items())
+        res = '{%s}' % ', '.join(items)
+    elif isinstance(value, list):
+        res = '[%s]' % ', '.join(stable_repr(x) for x in value)
+    elif isinstance(value, tuple):
+        res = '(%s)' % ', '.join(stable_repr(x) for x in value)
+    elif isinstance(value, (set, frozenset)):
+        res = 'set([%s])' % ', '.join(sorted(stable_repr(x) for x in value))
+    elif isinstance(value, string_type) and not isinstance(value, str):
+        # make sure that equal string values are represented in the same way in Python 2 (u'foo' vs 'foo')
+        res = repr(value.encode('utf-8'))
+    else:
+        res = repr(value)
+
+    return res
+
+
 def get_class_for(modulepath, class_name):
     """
     Get class for a given Python class name and Python module path.
@@ -254,6 +279,26 @@ def get_subclasses(klass, include_base_class=False):
     return get_subclasses_dict(klass, include_base_class=include_base_class).keys()
 
 
+def det_class_source_digest(klass):
+    """Determine digest for source code of specified class (incl. source code for all parent classes)."""
+    sha256 = hashlib.sha256()
+    paths = []
+    for parent_class in inspect.getmro(klass):
+        try:
+            path = inspect.getsourcefile(parent_class)
+        except TypeError:
+            # built-in classes (like 'object') have no source file
+            path = None
+        if path and path not in paths and os.path.isfile(path):
+            paths.append(path)
+            with open(path, 'rb') as handle:
+                sha256.update(handle.read())
+
+    _log.debug("Source files considered to determine digest for class %s: %s", klass.__name__, paths)
+
+    return sha256.hexdigest()
+
+
 def mk_rst_table(titles, columns):
     """
     Returns an rst table with given titles and columns (a nested list of string columns for each column)
@@ -0,0 +1,352 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Benchmarks for scaling-sensitive parts of the framework, using a synthetic easyconfig repository
+(and corresponding module files) of configurable size, and a stand-in modules tool (no Lmod required).
+
+Measures wall time and peak memory usage (of Python allocations, only with Python 3) of:
+process_easyconfig, robot_find_easyconfig, search_file, resolve_dependencies, check_conflicts,
+ModulesTool.exist and resolve_template.
+
+Usage: python -m test.benchmarks.framework [--size 1000] [--depth 5] [--save-baseline | --check]
+
+Baselines are stored per repository configuration (size/depth/versions) in baselines.json (see --baseline);
+with --check, the exit code is non-zero if any benchmark is slower (or uses more memory) than the baseline
+by more than the specified tolerance factor.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+from easybuild.tools.py2vs3 import OrderedDict
+from test.benchmarks.synthetic import synthetic_easyconfigs, write_easyconfigs, write_module_files
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# only regressions that exceed this (absolute) minimum are reported, to avoid flagging noise for fast benchmarks
+MIN_TIME_DIFF = 0.05
+MIN_MEM_DIFF = 1024 ** 2
+
+
+class BenchmarkContext(object):
+    """Synthetic easyconfig repository & module files used by benchmarks."""
+
+    def __init__(self, tmpdir, size, depth, versions, parse_count, seed=42):
+        """Generate synthetic easyconfig repository and module files."""
+        self.tmpdir = tmpdir
+        self.ecs = synthetic_easyconfigs(size, depth=depth, versions=versions, seed=seed)
+
+        self.robot_path = os.path.join(tmpdir, 'easyconfigs')
+        self.ec_paths = write_easyconfigs(self.robot_path, self.ecs)
+
+        # module files are only available for software in the lower half of the layers
+        self.modpath = os.path.join(tmpdir, 'modules', 'all')
+        write_module_files(self.modpath, [ec for ec in self.ecs if ec.layer < depth // 2])
+
+        # evenly spread subset of easyconfig files to parse
+        step = max(1, len(self.ec_paths) // parse_count)
+        self.parse_paths = self.ec_paths[::step][:parse_count]
+
+        # easyconfigs in top layer are the ones with the deepest dependency graph;
+        # only one version per software name is retained, to avoid conflicts
+        top_ecs = dict((ec.name, path) for (ec, path) in zip(self.ecs, self.ec_paths) if ec.layer == depth - 1)
+        self.top_paths = [top_ecs[name] for name in sorted(top_ecs)][:20]
+
+    def init_config(self):
+        """(Re)initialise EasyBuild configuration, which also clears all caches."""
+        # only imported here, since test.framework.utilities parses the command line arguments when it's imported
+        from test.framework.utilities import init_config
+        from easybuild.tools.modules import reset_module_caches
+
+        os.environ['MODULEPATH'] = self.modpath
+        args = [
+            '--installpath=%s' % self.tmpdir,
+            '--modules-tool=StandInModulesTool',
+            '--module-syntax=Tcl',
+            '--robot-paths=%s' % self.robot_path,
+        ]
+        build_options = {
+            'robot_path': [self.robot_path],
+            'silent': True,
+        }
+        init_config(args=args, build_options=build_options)
+        reset_module_caches()
+
+
+def bench_process_easyconfig(ctx):
+    """Parse easyconfig files."""
+    from easybuild.framework.easyconfig.easyconfig import process_easyconfig
+
+    def run():
+        for path in ctx.parse_paths:
+            process_easyconfig(path)
+
+    return run
+
+
+def bench_robot_find_easyconfig(ctx):
+    """Locate easyconfig files for all software in the repository (incl. 10% misses)."""
+    from easybuild.framework.easyconfig.easyconfig import robot_find_easyconfig
+
+    specs = [(ec.name, ec.version) for ec in ctx.ecs]
+    specs += [(ec.name, '0.0') for ec in ctx.ecs[::10]]
+
+    def run():
+        for (name, version) in specs:
+            robot_find_easyconfig(name, version)
+
+    return run
+
+
+def bench_search_file(ctx):
+    """Search for easyconfig files in repository (like 'eb --search')."""
+    from easybuild.tools.filetools import search_file
+
+    queries = ['a0000', r'z.*-1\.[0-4]', 'does-not-exist']
+
+    def run():
+        for query in queries:
+            search_file([ctx.robot_path], query, silent=True)
+
+    return run
+
+
+def parse_top_easyconfigs(ctx):
+    """Parse easyconfig files in top layer (not part of benchmark)."""
+    from easybuild.framework.easyconfig.easyconfig import process_easyconfig
+
+    ecs = []
+    for path in ctx.top_paths:
+        ecs.extend(process_easyconfig(path))
+    return ecs
+
+
+def bench_resolve_dependencies(ctx):
+    """Resolve full dependency graph for easyconfigs in top layer."""
+    from easybuild.tools.modules import modules_tool
+    from easybuild.tools.robot import resolve_dependencies
+
+    ecs, modtool = parse_top_easyconfigs(ctx), modules_tool()
+
+    def run():
+        resolve_dependencies(ecs, modtool, retain_all_deps=True)
+
+    return run
+
+
+def bench_check_conflicts(ctx):
+    """Check for conflicts in dependency graphs for easyconfigs in top layer."""
+    from easybuild.tools.modules import modules_tool
+    from easybuild.tools.robot import check_conflicts
+
+    ecs, modtool = parse_top_easyconfigs(ctx), modules_tool()
+
+    def run():
+        check_conflicts(ecs, modtool)
+
+    return run
+
+
+def bench_modules_exist(ctx):
+    """Check existence of modules for all software in the repository (only half of them exist)."""
+    from easybuild.tools.modules import modules_tool
+
+    mod_names = [ec.mod_name for ec in ctx.ecs]
+    modtool = modules_tool()
+
+    def run():
+        modtool.exist(mod_names)
+
+    return run
+
+
+def bench_resolve_template(ctx):
+    """Resolve templates in easyconfig parameter values."""
+    from easybuild.framework.easyconfig.easyconfig import EasyConfig, resolve_template
+
+    ec = EasyConfig(ctx.parse_paths[0])
+    ec.generate_template_values()
+    tmpl_dict = ec.template_values
+    values = [ec.get_ref(key) for key in sorted(ec.asdict().keys())]
+
+    def run():
+        for _ in range(len(ctx.ecs)):
+            resolve_template(values, tmpl_dict)
+
+    return run
+
+
+BENCHMARKS = OrderedDict([
+    ('process_easyconfig', bench_process_easyconfig),
+    ('robot_find_easyconfig', bench_robot_find_easyconfig),
+    ('search_file', bench_search_file),
+    ('resolve_dependencies', bench_resolve_dependencies),
+    ('check_conflicts', bench_check_conflicts),
+    ('modules_exist', bench_modules_exist),
+    ('resolve_template', bench_resolve_template),
+])
+
+
+def measure(func):
+    """Run specified function, return wall time (in seconds) & peak memory usage (in bytes, None if unknown)."""
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    start = time.time()
+    func()
+    wall_time = time.time() - start
+
+    if tracemalloc is None:
+        peak_mem = None
+    else:
+        peak_mem = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return wall_time, peak_mem
+
+
+def run_benchmarks(ctx, names, repeat=1):
+    """Run specified benchmarks, return dict with best wall time & peak memory usage for each of them."""
+    results = OrderedDict()
+    for name in names:
+        wall_times, peak_mems = [], []
+        for _ in range(repeat):
+            # start from clean slate for each run: all caches are cleared when configuration is initialised
+            ctx.init_config()
+            (wall_time, peak_mem) = measure(BENCHMARKS[name](ctx))
+            wall_times.append(wall_time)
+            peak_mems.append(peak_mem)
+
+        results[name] = {'time': round(min(wall_times), 4)}
+        if peak_mems[0] is not None:
+            results[name]['peak_mem'] = min(peak_mems)
+
+    return results
+
+
+def check_results(results, baseline, tolerance):
+    """Compare results with baseline, return list of regressions."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for (key, min_diff) in [('time', MIN_TIME_DIFF), ('peak_mem', MIN_MEM_DIFF)]:
+            if res.get(key) is None or base.get(key) is None:
+                continue
+            if res[key] > base[key] * tolerance and res[key] - base[key] > min_diff:
+                regressions.append("%s: %s %s exceeds baseline %s by more than a factor %s" %
+                                   (name, key, res[key], base[key], tolerance))
+    return regressions
+
+
+def main():
+    """Run benchmarks."""
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option('--size', type='int', default=1000, help="Number of easyconfig files (default: %default)")
+    parser.add_option('--depth', type='int', default=5, help="Depth of dependency graph (default: %default)")
+    parser.add_option('--versions', type='int', default=2, help="Versions per software name (default: %default)")
+    parser.add_option('--parse-count', type='int', default=500,
+                      help="Number of easyconfig files to parse in process_easyconfig benchmark (default: %default)")
+    parser.add_option('--repeat', type='int', default=1, help="Number of runs per benchmark (default: %default)")
+    parser.add_option('--only', action='append', choices=list(BENCHMARKS.keys()), help="Only run specified benchmark")
+    parser.add_option('--baseline', default=DEFAULT_BASELINE, help="Path to baselines file (default: %default)")
+    parser.add_option('--save-baseline', action='store_true', help="Store results as baseline")
+    parser.add_option('--check', action='store_true', help="Check results against baseline")
+    parser.add_option('--tolerance', type='float', default=2.0,
+                      help="Tolerated slowdown factor compared to baseline (default: %default)")
+    opts, _ = parser.parse_args()
+    del sys.argv[1:]
+
+    # import here, to make sure stand-in modules tool is registered before configuration is initialised
+    import test.benchmarks.synthetic  # noqa
+
+    names = opts.only or list(BENCHMARKS.keys())
+    config_key = 'size=%d,depth=%d,versions=%d' % (opts.size, opts.depth, opts.versions)
+
+    tmpdir = tempfile.mkdtemp()
+    orig_env = dict((key, os.environ.get(key)) for key in ['MODULEPATH', 'XDG_CACHE_HOME'])
+    # make sure no persistent caches in home directory are used
+    os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+    try:
+        start = time.time()
+        ctx = BenchmarkContext(tmpdir, opts.size, opts.depth, opts.versions, min(opts.parse_count, opts.size))
+        print("Generated %d easyconfig files in %.2fs (%s)" % (len(ctx.ec_paths), time.time() - start, config_key))
+
+        results = run_benchmarks(ctx, names, repeat=opts.repeat)
+    finally:
+        for key, val in orig_env.items():
+            if val is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = val
+        shutil.rmtree(tmpdir)
+
+    baselines = {}
+    if os.path.exists(opts.baseline):
+        with open(opts.baseline) as fh:
+            baselines = json.load(fh)
+    baseline = baselines.get(config_key, {})
+
+    for name, res in results.items():
+        line = "%-22s: %9.3fs" % (name, res['time'])
+        if 'peak_mem' in res:
+            line += ", peak memory %8.1f MiB" % (float(res['peak_mem']) / 1024 ** 2)
+        if name in baseline:
+            line += " (baseline: %.3fs)" % baseline[name]['time']
+        print(line)
+
+    exit_code = 0
+    if opts.check:
+        regressions = check_results(results, baseline, opts.tolerance)
+        if regressions:
+            print("Regressions compared to baseline:\n* %s" % '\n* '.join(regressions))
+            exit_code = 1
+        elif baseline:
+            print("No regressions compared to baseline")
+        else:
+            print("No baseline available for %s" % config_key)
+
+    if opts.save_baseline:
+        baselines.setdefault(config_key, {}).update(results)
+        with open(opts.baseline, 'w') as fh:
+            json.dump(baselines, fh, indent=4, sort_keys=True)
+        print("Baseline for %s saved to %s" % (config_key, opts.baseline))
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
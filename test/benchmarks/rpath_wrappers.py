@@ -0,0 +1,130 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Benchmark for RPATH wrappers: compares throughput of compiler/linker commands that are not wrapped,
+wrapped using the rpath_args bash function, and wrapped using the rpath_args.py script.
+
+Usage: python -m test.benchmarks.rpath_wrappers [--count N] [--compiler gcc]
+
+By default, a fake compiler command that does nothing is used, so the overhead of the wrapper itself is measured;
+with --compiler, the specified compiler command is used to compile a trivial C source file.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+from easybuild.toolchains.system import SystemToolchain
+from easybuild.tools.filetools import which
+
+
+# RPATH filter that can be evaluated by bash, and an equivalent one that requires rpath_args.py
+RPATH_FILTERS = {
+    'bash': ['/lib.*', '/usr.*'],
+    'python': [r'/lib\w*.*', '/usr.*'],
+}
+
+
+def time_cmd(cmd, count, env=None):
+    """Run specified command a number of times, return average time (in seconds) per invocation."""
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        for _ in range(count):
+            subprocess.check_call(cmd, stdout=devnull, stderr=devnull, env=env)
+        return (time.time() - start) / count
+
+
+def prepare_wrapper(cmd_name, mode, tmpdir):
+    """Put RPATH wrapper in place for specified command, using specified mode; return path to wrapper."""
+    # only imported here, since test.framework.utilities parses the command line arguments when it's imported
+    from test.framework.utilities import init_config
+
+    init_config(args=[], build_options={'rpath': True, 'rpath_filter': RPATH_FILTERS[mode], 'silent': True})
+    tc = SystemToolchain(version='system')
+    tc.compilers = lambda: ([cmd_name], [])
+    orig_tmpdir = tempfile.tempdir
+    tempfile.tempdir = tmpdir
+    try:
+        tc.prepare_rpath_wrappers()
+    finally:
+        tempfile.tempdir = orig_tmpdir
+    return which(cmd_name)
+
+
+def main():
+    """Run benchmark."""
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option('--count', type='int', default=200, help="Number of compiler invocations (default: %default)")
+    parser.add_option('--compiler', help="Compiler command to use (default: fake compiler that does nothing)")
+    opts, _ = parser.parse_args()
+    del sys.argv[1:]
+
+    tmpdir = tempfile.mkdtemp()
+    orig_path = os.getenv('PATH', '')
+    try:
+        src = os.path.join(tmpdir, 'test.c')
+        with open(src, 'w') as fh:
+            fh.write("int main(void) { return 0; }\n")
+
+        if opts.compiler:
+            cmd_name = opts.compiler
+        else:
+            cmd_name = 'fakecc'
+            fake_bin = os.path.join(tmpdir, 'bin')
+            os.makedirs(fake_bin)
+            with open(os.path.join(fake_bin, cmd_name), 'w') as fh:
+                fh.write("#!/bin/sh\nexit 0\n")
+            os.chmod(os.path.join(fake_bin, cmd_name), 0o755)
+            os.environ['PATH'] = fake_bin + os.pathsep + orig_path
+
+        # typical compiler invocation, with a couple of -L options and a $LIBRARY_PATH with several entries
+        lib_dirs = [os.path.join(tmpdir, 'software', 'dep%d' % idx, 'lib') for idx in range(10)]
+        os.environ['LIBRARY_PATH'] = os.pathsep.join(lib_dirs)
+        args = [src, '-O2', '-o', os.path.join(tmpdir, 'test')] + ['-L%s' % d for d in lib_dirs[:5]]
+
+        results = {}
+        results['unwrapped'] = time_cmd([which(cmd_name)] + args, opts.count)
+        for mode in sorted(RPATH_FILTERS):
+            os.environ['PATH'] = os.pathsep.join(p for p in orig_path.split(os.pathsep) if 'rpath_wrappers' not in p)
+            if not opts.compiler:
+                os.environ['PATH'] = fake_bin + os.pathsep + os.environ['PATH']
+            wrapper = prepare_wrapper(cmd_name, mode, tmpdir)
+            results[mode] = time_cmd([wrapper] + args, opts.count)
+
+        print("RPATH wrapper benchmark for '%s' (%d invocations)" % (cmd_name, opts.count))
+        for key in ['unwrapped', 'bash', 'python']:
+            overhead = results[key] - results['unwrapped']
+            print("%-10s: %8.2f ms/call, %8.1f calls/s, overhead %8.2f ms/call" %
+                  (key, results[key] * 1000, 1.0 / results[key], overhead * 1000))
+    finally:
+        os.environ['PATH'] = orig_path
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
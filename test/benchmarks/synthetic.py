@@ -0,0 +1,201 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Synthetic easyconfig repositories and module trees for benchmarking, and a stand-in modules tool
+that does not require an actual modules tool (like Lmod) to be available.
+"""
+import os
+import random
+from string import ascii_lowercase
+
+from easybuild.tools import modules
+
+
+EASYCONFIG_TEMPLATE = '''easyblock = 'easybuild.framework.easyblock.EasyBlock'
+
+name = '%(name)s'
+version = '%(version)s'
+
+homepage = 'https://example.com/%%(namelower)s'
+description = """Synthetic software package %%(name)s v%%(version)s, generated for benchmarking."""
+
+toolchain = SYSTEM
+
+source_urls = ['https://example.com/%%(namelower)s/download/']
+sources = [SOURCE_TAR_GZ]
+checksums = ['%(checksum)s']
+
+dependencies = [%(deps)s]
+
+configopts = '--prefix=%%(installdir)s --with-name=%%(name)s-%%(version)s'
+
+sanity_check_paths = {
+    'files': ['bin/%%(namelower)s'],
+    'dirs': ['lib'],
+}
+
+moduleclass = 'tools'
+'''
+
+MODULE_FILE_TEMPLATE = '''#%%Module
+proc ModulesHelp { } {
+    puts stderr {%(name)s v%(version)s}
+}
+conflict %(name)s
+%(loads)s
+prepend-path PATH $root/bin
+'''
+
+
+class SyntheticEasyconfig(object):
+    """Name, version and dependencies of a synthetic easyconfig file."""
+
+    def __init__(self, name, version, layer):
+        """Constructor."""
+        self.name = name
+        self.version = version
+        self.layer = layer
+        self.deps = []
+
+    @property
+    def mod_name(self):
+        """Module name for this synthetic easyconfig (with default module naming scheme)."""
+        return '%s/%s' % (self.name, self.version)
+
+    @property
+    def filename(self):
+        """Filename for this synthetic easyconfig."""
+        return '%s-%s.eb' % (self.name, self.version)
+
+
+def synthetic_easyconfigs(count, depth=5, versions=2, max_deps=3, seed=42):
+    """
+    Determine set of synthetic easyconfigs, organised in layers such that each easyconfig only depends on
+    easyconfigs in the layer below it; the depth of the dependency graph is equal to the number of layers
+
+    :param count: total number of easyconfigs
+    :param depth: number of layers (i.e. depth of dependency graph)
+    :param versions: number of versions per software name
+    :param max_deps: maximum number of dependencies per easyconfig
+    :param seed: seed for random number generator (same seed implies same set of easyconfigs)
+    :return: list of SyntheticEasyconfig instances
+    """
+    rand = random.Random(seed)
+
+    ecs, layers = [], [[] for _ in range(depth)]
+    for idx in range(count):
+        # software names start with different letters, to get a realistic distribution across subdirectories
+        name = '%s%06d' % (ascii_lowercase[(idx // versions) % len(ascii_lowercase)], idx // versions)
+        version = '%d.%d' % (1 + idx % versions, rand.randint(0, 9))
+        layer = (idx // versions) % depth
+        ec = SyntheticEasyconfig(name, version, layer)
+        ecs.append(ec)
+        # only first version of each software name is used as a dependency, to avoid conflicts in dependency graphs
+        if idx % versions == 0:
+            layers[layer].append(ec)
+
+    for ec in ecs:
+        if ec.layer > 0 and layers[ec.layer - 1]:
+            cands = layers[ec.layer - 1]
+            ec.deps = sorted(rand.sample(cands, min(len(cands), max_deps)), key=lambda dep: dep.name)
+
+    return ecs
+
+
+def write_easyconfigs(topdir, ecs):
+    """
+    Write synthetic easyconfig files to specified directory, using same layout as the central easyconfigs repository
+    (<letter>/<name>/<name>-<version>.eb).
+
+    :return: list of paths to easyconfig files that were created
+    """
+    paths = []
+    for ec in ecs:
+        ec_dir = os.path.join(topdir, ec.name[0], ec.name)
+        if not os.path.exists(ec_dir):
+            os.makedirs(ec_dir)
+
+        deps = ', '.join("('%s', '%s')" % (dep.name, dep.version) for dep in ec.deps)
+        ectxt = EASYCONFIG_TEMPLATE % {
+            'name': ec.name,
+            'version': ec.version,
+            'checksum': '%064x' % random.Random(ec.mod_name).getrandbits(256),
+            'deps': deps,
+        }
+
+        path = os.path.join(ec_dir, ec.filename)
+        with open(path, 'w') as fh:
+            fh.write(ectxt)
+        paths.append(path)
+
+    return paths
+
+
+def write_module_files(modpath, ecs):
+    """Write (Tcl) module files for specified synthetic easyconfigs in specified module path."""
+    for ec in ecs:
+        mod_dir = os.path.join(modpath, ec.name)
+        if not os.path.exists(mod_dir):
+            os.makedirs(mod_dir)
+
+        loads = '\n'.join('module load %s' % dep.mod_name for dep in ec.deps)
+        with open(os.path.join(mod_dir, ec.version), 'w') as fh:
+            fh.write(MODULE_FILE_TEMPLATE % {'name': ec.name, 'version': ec.version, 'loads': loads})
+
+
+class StandInModulesTool(modules.ModulesTool):
+    """
+    Stand-in modules tool, which does not run an actual modules tool command;
+    'module avail' and 'module show' are emulated by looking for module files in the module paths.
+    """
+    NAME = 'StandIn'
+    COMMAND = 'echo'
+    VERSION_OPTION = '1.0'
+    VERSION_REGEXP = r'(?P<version>\d\S*)'
+    # redirect to stderr, ignore 'echo python' ($0 and $1)
+    COMMAND_SHELL = ['bash', '-c', 'echo $2 $3 $4 1>&2']
+
+    def available(self, mod_name=None, extra_args=None):
+        """Emulate 'module avail' by walking module paths."""
+        res = set()
+        for mod_path in self.mod_paths:
+            for (dirpath, _, filenames) in os.walk(mod_path):
+                for filename in filenames:
+                    full_mod_name = os.path.relpath(os.path.join(dirpath, filename), mod_path)
+                    if mod_name is None or full_mod_name.startswith(mod_name):
+                        res.add(full_mod_name)
+        return sorted(res)
+
+    def show(self, mod_name):
+        """Emulate 'module show', by returning path to module file (or error when no module file is found)."""
+        for mod_path in self.mod_paths:
+            path = os.path.join(mod_path, mod_name)
+            if os.path.isfile(path):
+                return '%s:\n' % path
+        return "ERROR: Unable to locate a modulefile for '%s'" % mod_name
+
+    def check_module_function(self, *args, **kwargs):
+        """There's no 'module' function to check."""
+        pass
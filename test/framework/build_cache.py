@@ -0,0 +1,226 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for build_cache.py
+"""
+import io
+import os
+import re
+import stat
+import sys
+import tarfile
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
+from unittest import TextTestRunner
+
+from easybuild.framework.easyblock import EasyBlock
+from easybuild.framework.easyconfig.easyconfig import EasyConfig
+from easybuild.tools.build_cache import det_build_cache_key, det_build_cache_paths, det_easyblock_digest
+from easybuild.tools.build_cache import is_link_target_in_dir, relocate_prefix, restore_from_build_cache
+from easybuild.tools.build_cache import store_in_build_cache
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, write_file
+
+
+class BuildCacheTest(EnhancedTestCase):
+    """Tests for build cache support."""
+
+    def setUp(self):
+        """Test setup."""
+        super(BuildCacheTest, self).setUp()
+
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        self.toy_ec = os.path.join(test_ecs_dir, 't', 'toy', 'toy-0.0.eb')
+        self.build_cache_dir = os.path.join(self.test_prefix, 'build-cache')
+        init_config(build_options={'build_cache_dir': self.build_cache_dir, 'silent': True})
+
+    def test_det_build_cache_key(self):
+        """Test det_build_cache_key function."""
+        key = det_build_cache_key(EasyBlock(EasyConfig(self.toy_ec)))
+        self.assertTrue(re.match('^[0-9a-f]{64}$', key))
+
+        # key is stable, and does not depend on build/installation directory
+        app = EasyBlock(EasyConfig(self.toy_ec))
+        app.builddir = os.path.join(self.test_prefix, 'build')
+        app.installdir = os.path.join(self.test_prefix, 'install')
+        self.assertEqual(det_build_cache_key(app), key)
+
+        # different easyconfig parameter values result in a different key
+        app = EasyBlock(EasyConfig(self.toy_ec))
+        app.cfg['configopts'] = '--enable-foo'
+        self.assertFalse(det_build_cache_key(app) == key)
+
+        # different configuration results in a different key
+        init_config(build_options={'build_cache_dir': self.build_cache_dir, 'optarch': 'GENERIC', 'silent': True})
+        self.assertFalse(det_build_cache_key(EasyBlock(EasyConfig(self.toy_ec))) == key)
+
+        # digest for easyblock takes into account source code of easyblock itself and of parent classes
+        class TestEasyBlock(EasyBlock):
+            """Test easyblock"""
+            pass
+
+        self.assertTrue(re.match('^[0-9a-f]{64}$', det_easyblock_digest(EasyBlock)))
+        self.assertEqual(det_easyblock_digest(EasyBlock), det_easyblock_digest(EasyBlock))
+        self.assertFalse(det_easyblock_digest(TestEasyBlock) == det_easyblock_digest(EasyBlock))
+
+    def test_relocate_prefix(self):
+        """Test relocate_prefix function."""
+        old_prefix = '/apps/software/toy/0.0'
+        installdir = os.path.join(self.test_prefix, 'toy', '0.0')
+
+        write_file(os.path.join(installdir, 'bin', 'toy.sh'), "#!/bin/bash\n%s/bin/toy\n" % old_prefix)
+        write_file(os.path.join(installdir, 'lib', 'libtoy.so'), b'\x7fELF\0\0rpath=%s/lib\0' % old_prefix.encode())
+        write_file(os.path.join(installdir, 'README'), "no prefix here")
+        os.symlink(os.path.join(old_prefix, 'bin', 'toy.sh'), os.path.join(installdir, 'toy'))
+        adjust_permissions(os.path.join(installdir, 'bin', 'toy.sh'), stat.S_IWUSR, add=False)
+
+        relocate_prefix(installdir, old_prefix, '/short/toy')
+
+        self.assertEqual(read_file(os.path.join(installdir, 'bin', 'toy.sh')), "#!/bin/bash\n/short/toy/bin/toy\n")
+        # new prefix is padded in binary files
+        padded = '/short/toy' + '/' * (len(old_prefix) - len('/short/toy'))
+        expected = b'\x7fELF\0\0rpath=%s/lib\0' % padded.encode()
+        self.assertEqual(read_file(os.path.join(installdir, 'lib', 'libtoy.so'), mode='rb'), expected)
+        self.assertEqual(read_file(os.path.join(installdir, 'README')), "no prefix here")
+        self.assertEqual(os.readlink(os.path.join(installdir, 'toy')), '/short/toy/bin/toy.sh')
+        self.assertFalse(os.stat(os.path.join(installdir, 'bin', 'toy.sh')).st_mode & stat.S_IWUSR)
+
+        # binary files can't be relocated to a longer prefix
+        error_pattern = "Can't relocate binary file .*/libtoy.so: new prefix .* is longer than"
+        self.assertErrorRegex(EasyBuildError, error_pattern, relocate_prefix, installdir, '/short/toy',
+                              '/a/much/longer/prefix')
+
+    def test_store_restore(self):
+        """Test storing installation in build cache and restoring it."""
+        app = EasyBlock(EasyConfig(self.toy_ec))
+        app.installdir = os.path.join(self.test_prefix, 'software', 'toy', '0.0')
+        app.mod_filepath = os.path.join(self.test_prefix, 'modules', 'toy', '0.0')
+        write_file(os.path.join(app.installdir, 'bin', 'toy'), "#!/bin/bash\necho %s\n" % app.installdir)
+        mkdir(os.path.join(app.installdir, 'lib'))
+        os.symlink('bin', os.path.join(app.installdir, 'bin64'))
+        module_txt = "#%%Module\nset root %s\n" % app.installdir
+        write_file(app.mod_filepath, module_txt)
+
+        key = det_build_cache_key(app)
+        self.assertEqual(restore_from_build_cache(app, key), None)
+
+        self.assertTrue(store_in_build_cache(app, key))
+        tarball, metadata_path = det_build_cache_paths(key)
+        self.assertTrue(tarball.startswith(self.build_cache_dir))
+        self.assertTrue(os.path.isfile(tarball))
+        self.assertTrue(os.path.isfile(metadata_path))
+
+        # restore in same location
+        remove_dir(app.installdir)
+        self.assertEqual(restore_from_build_cache(app, key), module_txt)
+        toy_bin = os.path.join(app.installdir, 'bin', 'toy')
+        self.assertEqual(read_file(toy_bin), "#!/bin/bash\necho %s\n" % app.installdir)
+        self.assertTrue(os.path.isdir(os.path.join(app.installdir, 'lib')))
+        self.assertEqual(os.readlink(os.path.join(app.installdir, 'bin64')), 'bin')
+
+        # restore in different location
+        old_installdir = app.installdir
+        app.installdir = os.path.join(self.test_prefix, 'elsewhere', 'toy', '0.0')
+        self.assertEqual(restore_from_build_cache(app, key), module_txt.replace(old_installdir, app.installdir))
+        toy_bin = os.path.join(app.installdir, 'bin', 'toy')
+        self.assertEqual(read_file(toy_bin), "#!/bin/bash\necho %s\n" % app.installdir)
+
+        # corrupt build cache entry is not restored
+        write_file(tarball, 'this is not a tarball')
+        self.assertEqual(restore_from_build_cache(app, key), None)
+        self.assertFalse(os.path.exists(app.installdir))
+
+    def test_restore_links(self):
+        """Test restoring installation that includes (symbolic/hard) links from build cache."""
+        app = EasyBlock(EasyConfig(self.toy_ec))
+        app.installdir = os.path.join(self.test_prefix, 'software', 'toy', '0.0')
+        app.mod_filepath = os.path.join(self.test_prefix, 'modules', 'toy', '0.0')
+        write_file(os.path.join(app.installdir, 'bin', 'toy'), "#!/bin/bash\necho toy\n")
+        os.symlink(os.path.join(app.installdir, 'bin', 'toy'), os.path.join(app.installdir, 'toy'))
+        mkdir(os.path.join(app.installdir, 'lib'))
+        os.symlink(os.path.join('..', 'bin', 'toy'), os.path.join(app.installdir, 'lib', 'toy'))
+        os.link(os.path.join(app.installdir, 'bin', 'toy'), os.path.join(app.installdir, 'bin', 'toy-hardlink'))
+        write_file(app.mod_filepath, "#%Module\n")
+
+        key = det_build_cache_key(app)
+        self.assertTrue(store_in_build_cache(app, key))
+
+        # links that point inside the installation directory are fine (absolute symlinks are relocated)
+        old_installdir = app.installdir
+        app.installdir = os.path.join(self.test_prefix, 'elsewhere', 'toy', '0.0')
+        self.assertEqual(restore_from_build_cache(app, key), "#%Module\n")
+        toy_bin = os.path.join(app.installdir, 'bin', 'toy')
+        self.assertEqual(os.readlink(os.path.join(app.installdir, 'toy')), toy_bin)
+        self.assertEqual(os.readlink(os.path.join(app.installdir, 'lib', 'toy')), os.path.join('..', 'bin', 'toy'))
+        self.assertTrue(os.path.samefile(os.path.join(app.installdir, 'bin', 'toy-hardlink'), toy_bin))
+        remove_dir(app.installdir)
+        app.installdir = old_installdir
+
+        # links that point outside of the installation directory are never extracted
+        tarball = det_build_cache_paths(key)[0]
+        outside = os.path.join(self.test_prefix, 'outside')
+        mkdir(outside)
+
+        test_cases = [
+            ('software/evil', tarfile.SYMTYPE, '../../../outside'),
+            ('software/bin/evil', tarfile.SYMTYPE, '../../evil'),
+            ('software/evil', tarfile.SYMTYPE, outside),
+            ('software/evil', tarfile.LNKTYPE, 'module'),
+            ('software/evil', tarfile.LNKTYPE, 'software/../../outside'),
+            ('software/evil', tarfile.LNKTYPE, outside),
+        ]
+        for (name, link_type, linkname) in test_cases:
+            with tarfile.open(tarball, 'w:gz') as tar:
+                tarinfo = tarfile.TarInfo('module')
+                tarinfo.size = len(b"#%Module\n")
+                tar.addfile(tarinfo, io.BytesIO(b"#%Module\n"))
+                tarinfo = tarfile.TarInfo(name)
+                tarinfo.type = link_type
+                tarinfo.linkname = linkname
+                tar.addfile(tarinfo)
+                tarinfo = tarfile.TarInfo(name + '/test.txt')
+                tarinfo.size = len(b"foo")
+                tar.addfile(tarinfo, io.BytesIO(b"foo"))
+
+            self.assertEqual(restore_from_build_cache(app, key), None)
+            self.assertFalse(os.path.exists(app.installdir))
+            self.assertEqual(os.listdir(outside), [])
+
+        self.assertTrue(is_link_target_in_dir('bin/toy', 'lib/../../bin/toy'))
+        self.assertTrue(is_link_target_in_dir('bin/toy', '/prefix/bin/toy', abs_prefixes=['/prefix']))
+        self.assertTrue(is_link_target_in_dir('bin/toy', '/prefix', abs_prefixes=['/prefix/']))
+        self.assertFalse(is_link_target_in_dir('bin/toy', '../../bin/toy'))
+        self.assertFalse(is_link_target_in_dir('bin/toy', '/prefix/bin/toy'))
+        self.assertFalse(is_link_target_in_dir('bin/toy', '/prefix2/bin/toy', abs_prefixes=['/prefix']))
+        self.assertFalse(is_link_target_in_dir('bin/toy', '/prefix/../bin/toy', abs_prefixes=['/prefix']))
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(BuildCacheTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
@@ -35,7 +35,7 @@ from datetime import datetime, timedelta
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner
 
-from easybuild.base.fancylogger import getLogger, logToFile, setLogFormat
+from easybuild.base.fancylogger import ASYNC_BATCH_SIZE, AsyncFileHandler, getLogger, logToFile, setLogFormat
 from easybuild.tools.build_log import (
     LOGGING_FORMAT, EasyBuildError, EasyBuildLog, dry_run_msg, dry_run_warning, init_logging, print_error, print_msg,
     print_warning, stop_logging, time_str_since, raise_nosupport)
@@ -432,6 +432,40 @@ class BuildLogTest(EnhancedTestCase):
 
         stop_logging(logfile, logtostdout=True)
 
+    def test_async_logging(self):
+        """Test asynchronous logging to file."""
+        tmp_logfile = os.path.join(self.test_prefix, 'test.log')
+        log, logfile = init_logging(tmp_logfile, silent=True, async_logging=True)
+
+        handler = logToFile(logfile)
+        self.assertTrue(isinstance(handler, AsyncFileHandler))
+
+        log.setLevelName('DEBUG')
+        # log message is determined when record is logged, even if arguments change before it is written
+        items = ['foo']
+        log.debug("items: %s", items)
+        items.append('bar')
+        for idx in range(3 * ASYNC_BATCH_SIZE):
+            log.info("message #%d", idx)
+
+        # all pending records are written before an error is logged
+        log.error("kaput")
+        logtxt = read_file(logfile)
+        self.assertTrue("items: ['foo']\n" in logtxt)
+        self.assertTrue(re.search(r"message #%d\n.*kaput\n$" % (3 * ASYNC_BATCH_SIZE - 1), logtxt))
+
+        # all records are written when logging is stopped
+        log.info("done")
+        stop_logging(logfile)
+        self.assertFalse(handler.writer.is_alive())
+        self.assertTrue(read_file(logfile).endswith(" done\n"))
+
+        # asynchronous logging is disabled by default
+        log, logfile = init_logging(tmp_logfile, silent=True)
+        handler = logToFile(logfile)
+        self.assertFalse(isinstance(handler, AsyncFileHandler))
+        stop_logging(logfile)
+
     def test_raise_nosupport(self):
         self.assertErrorRegex(EasyBuildError, 'NO LONGER SUPPORTED since v42: foobar;',
                               raise_nosupport, 'foobar', 42)
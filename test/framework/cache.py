@@ -0,0 +1,137 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for cache.py
+"""
+import os
+import sys
+import time
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.cache import PersistentCache, det_cache_key, det_cache_path
+from easybuild.tools.filetools import write_file
+
+
+class CacheTest(EnhancedTestCase):
+    """Tests for persistent cache support."""
+
+    def test_det_cache_path(self):
+        """Test det_cache_path function."""
+        os.environ['XDG_CACHE_HOME'] = self.test_prefix
+        self.assertEqual(det_cache_path(), os.path.join(self.test_prefix, 'easybuild'))
+        self.assertEqual(det_cache_path('ecs'), os.path.join(self.test_prefix, 'easybuild', 'ecs'))
+
+        del os.environ['XDG_CACHE_HOME']
+        os.environ['HOME'] = self.test_prefix
+        self.assertEqual(det_cache_path('ecs'), os.path.join(self.test_prefix, '.cache', 'easybuild', 'ecs'))
+
+    def test_det_cache_key(self):
+        """Test det_cache_key function."""
+        key = det_cache_key('foo', 1, [2, 3])
+        self.assertEqual(len(key), 64)
+        self.assertEqual(key, det_cache_key('foo', 1, [2, 3]))
+        self.assertEqual(key, det_cache_key(b'foo', '1', '[2, 3]'))
+        self.assertNotEqual(key, det_cache_key('foo', 1, [3, 2]))
+        self.assertNotEqual(det_cache_key('ab', 'c'), det_cache_key('a', 'bc'))
+
+    def test_persistent_cache(self):
+        """Test PersistentCache class."""
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        cache = PersistentCache(cache_dir)
+
+        key = det_cache_key('test')
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(cache.get(key, default='nope'), 'nope')
+
+        value = {'name': 'test', 'list': [1, 2, 3], 'tuple': ('a', 'b')}
+        self.assertTrue(cache.put(key, value))
+        self.assertEqual(cache.get(key), value)
+
+        # cache entries are also picked up by a different instance of the same cache
+        self.assertEqual(PersistentCache(cache_dir).get(key), value)
+
+        # values that can not be serialized are not stored
+        self.assertFalse(cache.put(det_cache_key('unpicklable'), lambda x: x))
+        self.assertEqual(cache.get(det_cache_key('unpicklable')), None)
+
+        # corrupt cache entries are removed
+        entry_path = cache._entry_path(key)
+        self.assertTrue(os.path.exists(entry_path))
+        write_file(entry_path, 'this is not a pickled value')
+        self.assertEqual(cache.get(key), None)
+        self.assertFalse(os.path.exists(entry_path))
+
+        cache.put(key, value)
+        cache.remove(key)
+        self.assertEqual(cache.get(key), None)
+
+        cache.put(key, value)
+        cache.clear()
+        self.assertEqual(cache.get(key), None)
+
+    def test_persistent_cache_eviction(self):
+        """Test eviction of least recently used entries from persistent cache."""
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+
+        value = 'x' * 1000
+
+        # determine size of a single cache entry
+        tmp_cache = PersistentCache(os.path.join(self.test_prefix, 'tmp'))
+        tmp_cache.put('00', value)
+        entry_size = os.path.getsize(tmp_cache._entry_path('00'))
+
+        # allow for 3 cache entries
+        cache = PersistentCache(cache_dir, max_size=3 * entry_size)
+        keys = [det_cache_key(i) for i in range(3)]
+        now = time.time()
+        for idx, key in enumerate(keys):
+            cache.put(key, value)
+            # make sure modification times are different
+            os.utime(cache._entry_path(key), (now - 100 + idx, now - 100 + idx))
+
+        self.assertTrue(all(cache.get(key) == value for key in keys))
+
+        # make 1st entry most recently used, 2nd entry least recently used
+        os.utime(cache._entry_path(keys[1]), (now - 50, now - 50))
+        os.utime(cache._entry_path(keys[2]), (now - 40, now - 40))
+        os.utime(cache._entry_path(keys[0]), (now - 30, now - 30))
+
+        # adding another entry results in evicting the least recently used one
+        new_key = det_cache_key('new')
+        cache.put(new_key, value)
+        self.assertEqual(cache.get(keys[1]), None)
+        for key in [keys[0], keys[2], new_key]:
+            self.assertEqual(cache.get(key), value)
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(CacheTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
@@ -286,6 +286,11 @@ class DocsTest(EnhancedTestCase):
         expected_found = any([lines[i:i + len(expected)] == expected for i in range(len(lines))])
         self.assertTrue(expected_found, "%s found in: %s" % (expected, lines))
 
+        # parsing easyconfig files in parallel yields the same output
+        build_options['parse_workers'] = 3
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='rst', detailed=True), txt)
+
 
 def suite():
     """ returns all test cases in this module """
@@ -46,9 +46,11 @@ from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools import config
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import get_module_syntax
-from easybuild.tools.filetools import change_dir, copy_dir, copy_file, mkdir, read_file, remove_file, write_file
+from easybuild.tools.filetools import change_dir, copy_dir, copy_file, mkdir, read_file, remove_dir, remove_file
+from easybuild.tools.filetools import symlink, which, write_file
 from easybuild.tools.module_generator import module_generator
 from easybuild.tools.modules import reset_module_caches
+from easybuild.tools.run import run_cmd
 from easybuild.tools.utilities import time2str
 from easybuild.tools.version import get_git_revision, this_is_easybuild
 from easybuild.tools.py2vs3 import string_type
@@ -1261,6 +1263,16 @@ class EasyBlockTest(EnhancedTestCase):
         orig_toy_extra_txt = read_file(os.path.join(os.path.dirname(toy_source), 'toy-extra.txt'))
         self.assertNotEqual(read_file(eb.src[0]['path']), orig_toy_extra_txt)
 
+        # sources can also be downloaded concurrently, order of sources is retained
+        remove_dir(toy_source_dir)
+        init_config(build_options={'parallel_downloads': 3})
+        eb.src = []
+        eb.fetch_sources(sources, checksums=[])
+        self.assertEqual([src['name'] for src in eb.src], expected_sources)
+        for idx in range(3):
+            self.assertTrue(os.path.samefile(eb.src[idx]['path'], os.path.join(toy_source_dir, expected_sources[idx])))
+        self.assertEqual(read_file(eb.src[0]['path']), toy_extra_txt)
+
         # old format for specifying source with custom extract command is deprecated
         eb.src = []
         error_msg = r"DEPRECATED \(since v4.0\).*Using a 2-element list/tuple.*"
@@ -1817,6 +1829,36 @@ class EasyBlockTest(EnhancedTestCase):
         self.assertEqual(stdout, '')
         self.assertEqual(stderr.strip(), "WARNING: Ignoring failing checksum verification for bar-0.0.tar.gz")
 
+    def test_fetch_extension_sources_git(self):
+        """Test whether extension sources are fetched sequentially when they're obtained from a git repository."""
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        toy_ec = os.path.join(testdir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+        eb = EasyBlock(EasyConfig(toy_ec))
+
+        # only keep track of whether fetch tasks would be run sequentially
+        seq_values = []
+        eb.run_fetch_tasks = lambda func, items, sequential=False: seq_values.append(sequential)
+
+        eb.fetch_extension_sources()
+        self.assertEqual(seq_values, [False])
+
+        # strings mentioning 'git_config' don't matter, only 'git_config' entries in source specs do
+        eb.cfg['exts_list'] = [('foo', '1.0', {'description': "no git_config here"})]
+        eb.fetch_extension_sources()
+        self.assertEqual(seq_values, [False, False])
+
+        git_config = {'url': 'https://github.com/example', 'repo_name': 'foo', 'tag': 'v1.0'}
+        sources = [{'filename': 'foo.tar.gz', 'git_config': git_config}]
+        eb.cfg['exts_list'] = ['bar', ('foo', '1.0', {'sources': sources})]
+        eb.fetch_extension_sources()
+        self.assertEqual(seq_values, [False, False, True])
+
+        # git_config may also be specified via exts_default_options
+        eb.cfg['exts_list'] = [('foo', '1.0')]
+        eb.cfg['exts_default_options'] = {'sources': {'filename': 'foo.tar.gz', 'git_config': git_config}}
+        eb.fetch_extension_sources()
+        self.assertEqual(seq_values, [False, False, True, True])
+
     def test_check_checksums(self):
         """Test for check_checksums_for and check_checksums methods."""
         testdir = os.path.abspath(os.path.dirname(__file__))
@@ -2001,6 +2043,57 @@ class EasyBlockTest(EnhancedTestCase):
         error_pattern = "Incorrect value type provided to time2str, should be datetime.timedelta: <.* 'int'>"
         self.assertErrorRegex(EasyBuildError, error_pattern, time2str, 123)
 
+    def test_sanity_check_rpath(self):
+        """Test sanity_check_rpath method."""
+        if not which('gcc', log_error=False):
+            print("Skipping test_sanity_check_rpath, gcc is not available")
+            return
+
+        testdir = os.path.abspath(os.path.dirname(__file__))
+        toy_ec = os.path.join(testdir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+        eb = EasyBlock(EasyConfig(toy_ec))
+        eb.installdir = os.path.join(self.test_prefix, 'toy')
+        eb.cfg['parallel'] = 2
+
+        bin_dir = os.path.join(eb.installdir, 'bin')
+        lib_dir = os.path.join(eb.installdir, 'lib')
+        mkdir(bin_dir, parents=True)
+        mkdir(lib_dir)
+
+        # no binaries/libraries at all: no problems
+        self.assertEqual(eb.sanity_check_rpath(), [])
+
+        foo_c = os.path.join(self.test_prefix, 'foo.c')
+        write_file(foo_c, "int foo(void) { return 42; }\n")
+        main_c = os.path.join(self.test_prefix, 'main.c')
+        write_file(main_c, "int foo(void);\nint main(void) { return foo(); }\n")
+
+        libfoo = os.path.join(lib_dir, 'libfoo.so')
+        cmds = [
+            "gcc -shared -fPIC -o %s %s -Wl,-rpath,%s -Wl,--disable-new-dtags" % (libfoo, foo_c, lib_dir),
+            "gcc -o %s/rpath %s -L%s -lfoo -Wl,-rpath,'$ORIGIN/../lib' -Wl,--disable-new-dtags" %
+            (bin_dir, main_c, lib_dir),
+            "gcc -o %s/runpath %s -L%s -lfoo -Wl,-rpath,%s -Wl,--enable-new-dtags" %
+            (bin_dir, main_c, lib_dir, lib_dir),
+            "gcc -o %s/norpath %s -L%s -lfoo" % (bin_dir, main_c, lib_dir),
+        ]
+        for cmd in cmds:
+            run_cmd(cmd)
+
+        # non-ELF files and symlinks are ignored
+        write_file(os.path.join(bin_dir, 'script.sh'), "#!/bin/bash\necho hello")
+        symlink(libfoo, os.path.join(lib_dir, 'libfoo.so.1'))
+
+        fails = eb.sanity_check_rpath()
+        self.assertEqual(len(fails), 3, fails)
+        norpath, runpath = os.path.join(bin_dir, 'norpath'), os.path.join(bin_dir, 'runpath')
+        self.assertTrue(fails[0].startswith("One or more required libraries not found for %s" % norpath))
+        self.assertTrue(fails[1].startswith("No RPATH found in dynamic section of %s" % norpath))
+        self.assertTrue(fails[2].startswith("No RPATH found in dynamic section of %s" % runpath))
+
+        # only check specified subdirectories
+        self.assertEqual(eb.sanity_check_rpath(rpath_dirs=['lib']), [])
+
     def test_sanity_check_paths_verification(self):
         """Test verification of sanity_check_paths w.r.t. keys & values."""
 
@@ -47,7 +47,9 @@ import easybuild.tools.systemtools as st
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.constants import EXTERNAL_MODULE_MARKER
 from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, create_paths, copy_easyconfigs
-from easybuild.framework.easyconfig.easyconfig import det_subtoolchain_version, fix_deprecated_easyconfigs
+from easybuild.framework.easyconfig.easyconfig import det_persistent_easyconfigs_cache_key, det_subtoolchain_version
+from easybuild.framework.easyconfig.easyconfig import disable_templating
+from easybuild.framework.easyconfig.easyconfig import fix_deprecated_easyconfigs
 from easybuild.framework.easyconfig.easyconfig import is_generic_easyblock, get_easyblock_class, get_module_path
 from easybuild.framework.easyconfig.easyconfig import letter_dir_for, process_easyconfig, resolve_template
 from easybuild.framework.easyconfig.easyconfig import triage_easyconfig_params, verify_easyconfig_filename
@@ -66,6 +68,7 @@ from easybuild.tools.configobj import ConfigObj
 from easybuild.tools.docs import avail_easyconfig_constants, avail_easyconfig_templates
 from easybuild.tools.filetools import adjust_permissions, change_dir, copy_file, mkdir, read_file
 from easybuild.tools.filetools import remove_dir, remove_file, symlink, write_file
+from easybuild.tools.include import include_easyblocks
 from easybuild.tools.module_naming_scheme.toolchain import det_toolchain_compilers, det_toolchain_mpi
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.options import parse_external_modules_metadata
@@ -73,7 +76,7 @@ from easybuild.tools.py2vs3 import OrderedDict, reload
 from easybuild.tools.robot import resolve_dependencies
 from easybuild.tools.systemtools import get_shared_lib_ext
 from easybuild.tools.toolchain.utilities import search_toolchain
-from easybuild.tools.utilities import quote_str, quote_py_str
+from easybuild.tools.utilities import quote_str, quote_py_str, stable_repr
 from test.framework.utilities import find_full_path
 
 try:
@@ -2753,6 +2756,132 @@ class EasyConfigTest(EnhancedTestCase):
         self.assertEqual(ec1.template_values, ec2.template_values)
         self.assertFalse(ec1.template_values is ec2.template_values)
 
+    def test_persistent_easyconfigs_cache(self):
+        """Test use of persistent cache for parsed easyconfig files."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ec = os.path.join(self.test_prefix, 'gzip-1.4-GCC-4.6.3.eb')
+        copy_file(os.path.join(test_ecs_dir, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb'), test_ec)
+
+        cache_dir = os.path.join(self.test_prefix, 'ecs_cache')
+        build_options = {
+            'easyconfigs_cache': True,
+            'easyconfigs_cache_dir': cache_dir,
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+
+        res = process_easyconfig(test_ec)
+        self.assertEqual(len(res), 1)
+        cache_entries = glob.glob(os.path.join(cache_dir, '*', '*', '*.pickle'))
+        self.assertEqual(len(cache_entries), 1)
+
+        # make sure parsing of easyconfig files fails, so we know results are served from persistent cache
+        orig_parse = EasyConfig.parse
+
+        def fail_parse(*args, **kwargs):
+            raise EasyBuildError("Parsing easyconfig file is not allowed!")
+
+        EasyConfig.parse = fail_parse
+        try:
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            easyconfig.easyconfig._easyconfigs_lookups.clear()
+            cached_res = process_easyconfig(test_ec)
+            self.assertEqual(len(cached_res), 1)
+            # easyconfig lookups are also restored from persistent cache
+            cache_key = (test_ec, True, False, False)
+            self.assertTrue(cache_key in easyconfig.easyconfig._easyconfigs_lookups)
+            for key in ['spec', 'short_mod_name', 'full_mod_name', 'dependencies', 'builddependencies',
+                        'hiddendependencies', 'hidden']:
+                self.assertEqual(cached_res[0][key], res[0][key])
+
+            ec = cached_res[0]['ec']
+            self.assertEqual(ec['name'], 'gzip')
+            self.assertEqual(ec['toolchain'], {'name': 'GCC', 'version': '4.6.3'})
+            self.assertEqual(ec.path, test_ec)
+            self.assertEqual(ec.full_mod_name, 'gzip/1.4-GCC-4.6.3')
+            self.assertEqual([d['full_mod_name'] for d in ec['hiddendependencies']], ['toy/.0.0-deps'])
+            self.assertEqual(ec.dependencies(), res[0]['ec'].dependencies())
+            self.assertEqual(ec.toolchain.as_dict(), res[0]['ec'].toolchain.as_dict())
+            # parser is re-created on demand
+            self.assertEqual(ec.parser.get_config_dict()['name'], 'gzip')
+
+            # changing the easyconfig file results in a cache miss
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            write_file(test_ec, "\n# just a comment", append=True)
+            error_pattern = "Parsing easyconfig file is not allowed"
+            self.assertErrorRegex(EasyBuildError, error_pattern, process_easyconfig, test_ec)
+
+            # same for different build options that affect processing of easyconfig files
+            copy_file(os.path.join(test_ecs_dir, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb'), test_ec)
+            process_easyconfig(test_ec)
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            build_options['hide_deps'] = ['toy']
+            init_config(build_options=build_options)
+            self.assertErrorRegex(EasyBuildError, error_pattern, process_easyconfig, test_ec)
+
+            # CUDA compute capabilities are used for template values
+            del build_options['hide_deps']
+            build_options['cuda_compute_capabilities'] = ['7.0']
+            init_config(build_options=build_options)
+            self.assertErrorRegex(EasyBuildError, error_pattern, process_easyconfig, test_ec)
+        finally:
+            EasyConfig.parse = orig_parse
+
+        self.assertEqual(len(process_easyconfig(test_ec)), 1)
+        cache_entries = glob.glob(os.path.join(cache_dir, '*', '*', '*.pickle'))
+        self.assertEqual(len(cache_entries), 2)
+
+        # persistent cache is not used unless it is enabled
+        build_options['easyconfigs_cache'] = False
+        init_config(build_options=build_options)
+        remove_dir(cache_dir)
+        process_easyconfig(test_ec)
+        self.assertFalse(os.path.exists(cache_dir))
+
+    def test_persistent_easyconfigs_cache_key(self):
+        """Test det_persistent_easyconfigs_cache_key function."""
+        topdir = os.path.dirname(os.path.abspath(__file__))
+        toy_ec = os.path.join(topdir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+
+        build_options = {'valid_module_classes': module_classes()}
+        init_config(build_options=build_options)
+
+        key = det_persistent_easyconfigs_cache_key(toy_ec, True, False, False)
+        self.assertTrue(re.match('^[0-9a-f]{64}$', key))
+        self.assertEqual(det_persistent_easyconfigs_cache_key(toy_ec, True, False, False), key)
+
+        # key takes into account source code of (included) easyblock
+        toy_easyblock = os.path.join(topdir, 'sandbox', 'easybuild', 'easyblocks', 't', 'toy.py')
+        my_toy_easyblock = os.path.join(self.test_prefix, 'myeasyblocks', 'toy.py')
+        copy_file(toy_easyblock, my_toy_easyblock)
+
+        def include_toy_easyblock():
+            """Include custom toy easyblock, and make sure it gets imported (again)."""
+            sys.modules.pop('easybuild.easyblocks.toy', None)
+            include_easyblocks(self.test_prefix, [my_toy_easyblock])
+
+        try:
+            include_toy_easyblock()
+            build_options['include_easyblocks'] = [my_toy_easyblock]
+            init_config(build_options=build_options)
+            key_incl = det_persistent_easyconfigs_cache_key(toy_ec, True, False, False)
+            self.assertFalse(key_incl == key)
+            self.assertEqual(det_persistent_easyconfigs_cache_key(toy_ec, True, False, False), key_incl)
+
+            # editing the included easyblock results in a different key
+            write_file(my_toy_easyblock, "\n# just a comment", append=True)
+            include_toy_easyblock()
+            key_incl_bis = det_persistent_easyconfigs_cache_key(toy_ec, True, False, False)
+            self.assertFalse(key_incl_bis == key_incl)
+            self.assertFalse(key_incl_bis == key)
+        finally:
+            sys.modules.pop('easybuild.easyblocks.toy', None)
+
+        # values for --include-* configuration options are also taken into account
+        build_options['include_toolchains'] = [os.path.join(self.test_prefix, 'mytoolchains', '*.py')]
+        init_config(build_options=build_options)
+        self.assertFalse(det_persistent_easyconfigs_cache_key(toy_ec, True, False, False) == key_incl_bis)
+
     def test_eq_hash(self):
         """Test comparing two EasyConfig instances."""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -2773,6 +2902,98 @@ class EasyConfigTest(EnhancedTestCase):
         self.assertFalse(ec1 == ec3)
         self.assertTrue(ec1 != ec3)
 
+        # comparison/hashing is based on fingerprint
+        self.assertTrue(re.match('^[0-9a-f]{64}$', ec1.fingerprint))
+        self.assertEqual(ec1.fingerprint, ec2.fingerprint)
+        self.assertEqual(ec1.fingerprint, ec1.copy().fingerprint)
+        self.assertFalse(ec1.fingerprint == ec3.fingerprint)
+        self.assertEqual(len(set([ec1, ec2, ec3])), 2)
+
+        # fingerprint is updated when easyconfig parameter values are changed
+        ec2['versionsuffix'] = '-test'
+        self.assertTrue(ec1 != ec2)
+        ec2['versionsuffix'] = ''
+        self.assertEqual(ec1, ec2)
+
+        ec2.get_ref('sources').append('extra.tgz')
+        self.assertTrue(ec1 != ec2)
+        ec2.get_ref('sources').pop()
+        self.assertEqual(ec1, ec2)
+
+        with disable_templating(ec2):
+            ec2['patches'].append('%(name)s.patch')
+        self.assertTrue(ec1 != ec2)
+        ec1.update('patches', ['%(name)s.patch'])
+        self.assertEqual(ec1, ec2)
+
+        # fingerprint is updated when a reference to an easyconfig parameter value is changed in place,
+        # even if that reference was obtained before the fingerprint was determined
+        ec1, ec2 = ec1.copy(), ec2.copy()
+        self.assertEqual(ec1, ec2)
+        patches = ec1.get_ref('patches')
+        self.assertEqual(ec1, ec2)
+        patches.append('extra.patch')
+        self.assertTrue(ec1 != ec2)
+        self.assertFalse(ec1 == ec2)
+        patches.pop()
+        self.assertEqual(ec1, ec2)
+        with disable_templating(ec1):
+            sources = ec1.asdict()['sources']
+        self.assertEqual(hash(ec1), hash(ec2))
+        sources.append('extra.tgz')
+        self.assertFalse(hash(ec1) == hash(ec2))
+        sources.pop()
+
+        # fingerprint is not re-determined needlessly: once it is known, comparing/hashing only requires
+        # checking the values of easyconfig parameters for which a reference was handed out
+        ec1 = EasyConfig(os.path.join(test_easyconfigs, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb'))
+        ec2 = ec1.copy()
+        self.assertEqual(ec1, ec2)
+
+        orig_stable_repr = easyconfig.easyconfig.stable_repr
+        stable_repr_args = []
+
+        def counting_stable_repr(value):
+            """Wrapper for stable_repr that keeps track of values it is called for."""
+            stable_repr_args.append(value)
+            return orig_stable_repr(value)
+
+        easyconfig.easyconfig.stable_repr = counting_stable_repr
+        try:
+            for _ in range(10):
+                self.assertEqual(ec1, ec2)
+                self.assertEqual(hash(ec1), hash(ec2))
+            self.assertEqual(stable_repr_args, [])
+
+            deps = ec1.get_ref('dependencies')
+            self.assertEqual(ec1, ec2)
+            del stable_repr_args[:]
+            for _ in range(10):
+                self.assertEqual(ec1, ec2)
+            self.assertEqual(stable_repr_args, [deps] * 10)
+        finally:
+            easyconfig.easyconfig.stable_repr = orig_stable_repr
+
+        # fingerprint is updated when template values are changed
+        ec2.template_values['name'] = 'notoy'
+        self.assertTrue(ec1 != ec2)
+        ec2.generate_template_values()
+        self.assertEqual(ec1, ec2)
+
+        # fingerprint is updated when templating is disabled
+        fingerprint = ec1.fingerprint
+        with disable_templating(ec1):
+            self.assertFalse(ec1.fingerprint == fingerprint)
+        self.assertEqual(ec1.fingerprint, fingerprint)
+
+        # representation used to determine fingerprint does not depend on order of keys in dicts
+        dict1, dict2 = {'one': [1, (2, 3)], 'two': {'a': set(['x', 'y'])}}, {}
+        for key in reversed(sorted(dict1)):
+            dict2[key] = dict1[key]
+        self.assertEqual(stable_repr(dict1), "{'one': [1, (2, 3)], 'two': {'a': set(['x', 'y'])}}")
+        self.assertEqual(stable_repr(dict1), stable_repr(dict2))
+        self.assertFalse(stable_repr([1, 2]) == stable_repr((1, 2)))
+
     def test_copy_easyconfigs(self):
         """Test copy_easyconfigs function."""
         init_config(build_options={'silent': True})
@@ -3136,6 +3357,68 @@ class EasyConfigTest(EnhancedTestCase):
         # '%(name)' is not a correct template spec (missing trailing 's')
         self.assertEqual(resolve_template('%(name)', tmpl_dict), '%(name)')
 
+        # resolved values are cached when TemplateValues instance is used
+        # (imported here, since easyconfig module is reloaded by other tests)
+        from easybuild.framework.easyconfig.easyconfig import TemplateValues
+        tmpl_values = TemplateValues(tmpl_dict)
+        self.assertEqual(resolve_template(value, tmpl_values), expected)
+        self.assertEqual(tmpl_values.resolved['%(name)s-%(version)s'], 'FooBar-1.2.3')
+        self.assertEqual(resolve_template('10%', tmpl_values), '10%')
+
+        # cached values are discarded when template values are changed
+        for change in [lambda t: t.update({'version': '4.5'}), lambda t: t.__setitem__('version', '4.5'),
+                       lambda t: t.pop('version'), lambda t: t.setdefault('foo', 'bar')]:
+            tmpl_values = TemplateValues(tmpl_dict)
+            self.assertEqual(resolve_template('%(namelower)s', tmpl_values), 'foobar')
+            self.assertTrue(tmpl_values.resolved)
+            change(tmpl_values)
+            self.assertEqual(tmpl_values.resolved, {})
+
+        tmpl_values = TemplateValues(tmpl_dict)
+        tmpl_values['version'] = '4.5.6'
+        self.assertEqual(resolve_template('%(namelower)s-%(version)s', tmpl_values), 'foobar-4.5.6')
+        tmpl_values['version'] = '7.8'
+        self.assertEqual(resolve_template('%(namelower)s-%(version)s', tmpl_values), 'foobar-7.8')
+
+    def test_template_values_cache(self):
+        """Test caching of resolved template values in EasyConfig instances."""
+        from easybuild.framework.easyconfig.easyconfig import EasyConfig, TemplateValues
+
+        test_ecs_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_ecs_dir, 't', 'toy', 'toy-0.0.eb')
+
+        ec = EasyConfig(toy_ec)
+        self.assertEqual(ec['sources'], ['toy-0.0.tar.gz'])
+        self.assertTrue(isinstance(ec.template_values, TemplateValues))
+        self.assertEqual(ec.template_values.resolved['%(name)s-%(version)s.tar.gz'], 'toy-0.0.tar.gz')
+
+        # values obtained via templating are not shared with cache, so changing them is harmless
+        ec['sources'].append('bar.tgz')
+        self.assertEqual(ec['sources'], ['toy-0.0.tar.gz'])
+
+        # changing easyconfig parameter value in place is taken into account
+        ec.get_ref('sources').append('%(name)s-extra.tgz')
+        self.assertEqual(ec['sources'], ['toy-0.0.tar.gz', 'toy-extra.tgz'])
+        ec['sources'] = ['%(namelower)s-%(version)s.tgz']
+        self.assertEqual(ec['sources'], ['toy-0.0.tgz'])
+
+        # changing template values is taken into account
+        ec.template_values['version'] = '1.2.3'
+        self.assertEqual(ec['sources'], ['toy-1.2.3.tgz'])
+        ec['version'] = '4.5.6'
+        ec.generate_template_values()
+        self.assertEqual(ec['sources'], ['toy-4.5.6.tgz'])
+        self.assertEqual(ec.asdict()['sources'], ['toy-4.5.6.tgz'])
+
+        # plain dict is turned into TemplateValues instance when template values are set
+        ec.template_values = {'namelower': 'foo', 'version': '7.8'}
+        self.assertTrue(isinstance(ec.template_values, TemplateValues))
+        self.assertEqual(ec['sources'], ['foo-7.8.tgz'])
+
+        ec_copy = ec.copy()
+        self.assertEqual(ec_copy['sources'], ['foo-7.8.tgz'])
+        self.assertFalse(ec_copy.template_values is ec.template_values)
+
     def test_det_subtoolchain_version(self):
         """Test det_subtoolchain_version function"""
         _, all_tc_classes = search_toolchain('')
@@ -4023,6 +4306,46 @@ class EasyConfigTest(EnhancedTestCase):
         self.assertEqual(ec['configopts'], 'sm_42,sm_63')
         self.assertEqual(ec['preconfigopts'], 'sm_42 sm_63')
 
+    def test_parse_easyconfigs_parallel(self):
+        """Test parsing easyconfig files in parallel via parse_easyconfigs."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ecs_dir = os.path.join(test_ecs_dir, 't', 'toy')
+
+        build_options = {
+            'robot_path': [test_ecs_dir],
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+        ecs, _ = parse_easyconfigs([(toy_ecs_dir, False)])
+        self.assertTrue(len(ecs) > 2)
+
+        build_options['parse_workers'] = 3
+        init_config(build_options=build_options)
+        par_ecs, _ = parse_easyconfigs([(toy_ecs_dir, False)])
+
+        # same results in the same order, incl. fully parsed EasyConfig instances
+        # (specs are only compared for regular easyconfig files,
+        # since files for the different blocks of toy-0.0-multiple.eb are generated with random names)
+        specs = [ec['spec'] for ec in ecs if ec['spec'].startswith(toy_ecs_dir)]
+        self.assertEqual([ec['spec'] for ec in par_ecs if ec['spec'].startswith(toy_ecs_dir)], specs)
+        self.assertEqual([ec['full_mod_name'] for ec in par_ecs], [ec['full_mod_name'] for ec in ecs])
+        self.assertEqual([ec['dependencies'] for ec in par_ecs], [ec['dependencies'] for ec in ecs])
+        for ec, par_ec in zip(ecs, par_ecs):
+            self.assertTrue(isinstance(par_ec['ec'], EasyConfig))
+            self.assertEqual(par_ec['ec'], ec['ec'])
+
+        # errors are reported for the first broken easyconfig file (in order)
+        test_ecs = os.path.join(self.test_prefix, 'ecs')
+        toy_ectxt = read_file(os.path.join(toy_ecs_dir, 'toy-0.0.eb'))
+        for idx in range(6):
+            ectxt = toy_ectxt.replace("version = '0.0'", "version = '%d'" % idx)
+            if idx in (3, 5):
+                ectxt += "\nfoo = bar"
+            write_file(os.path.join(test_ecs, 'toy-%d.eb' % idx), ectxt)
+
+        error_pattern = "Failed to process easyconfig .*/toy-3.eb: Parsing easyconfig file failed"
+        self.assertErrorRegex(EasyBuildError, error_pattern, parse_easyconfigs, [(test_ecs, False)])
+
 
 def suite():
     """ returns all the testcases in this module """
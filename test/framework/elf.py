@@ -0,0 +1,158 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for elf.py
+"""
+import os
+import re
+import shutil
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.elf import expand_origin, find_missing_libs, get_system_lib_dirs, read_elf_info
+from easybuild.tools.filetools import mkdir, which, write_file
+from easybuild.tools.run import run_cmd
+
+
+class ElfTest(EnhancedTestCase):
+    """Tests for inspection of ELF files."""
+
+    def compile(self, args):
+        """Compile with gcc using specified arguments."""
+        out, ec = run_cmd("gcc %s" % args, simple=False, log_all=False, log_ok=False)
+        self.assertEqual(ec, 0, "Compilation with 'gcc %s' failed: %s" % (args, out))
+
+    def test_read_elf_info(self):
+        """Test read_elf_info function."""
+        # non-ELF files result in None
+        txt = os.path.join(self.test_prefix, 'test.txt')
+        write_file(txt, "this is not an ELF file")
+        self.assertEqual(read_elf_info(txt), None)
+
+        empty = os.path.join(self.test_prefix, 'empty')
+        write_file(empty, '')
+        self.assertEqual(read_elf_info(empty), None)
+
+        # truncated ELF file
+        truncated = os.path.join(self.test_prefix, 'truncated')
+        with open(sys.executable, 'rb') as fh:
+            write_file(truncated, fh.read(100))
+        self.assertErrorRegex(EasyBuildError, "Unexpected end of file", read_elf_info, truncated)
+
+        self.assertErrorRegex(EasyBuildError, "Failed to read", read_elf_info, os.path.join(self.test_prefix, 'nope'))
+
+        elf_info = read_elf_info(os.path.realpath(sys.executable))
+        self.assertTrue(elf_info['class'] in [32, 64])
+        self.assertTrue(elf_info['dynamic'])
+        self.assertTrue(elf_info['interpreter'])
+        self.assertTrue(any(lib.startswith('libc.so') for lib in elf_info['needed']))
+
+        # compare with output of 'readelf', if it's available
+        if which('readelf', log_error=False):
+            out, _ = run_cmd("readelf -d %s" % os.path.realpath(sys.executable), simple=False, log_all=False)
+            needed = re.findall(r'\(NEEDED\)\s+Shared library: \[(.*)\]', out)
+            self.assertEqual(elf_info['needed'], needed)
+
+    def test_expand_origin(self):
+        """Test expand_origin function."""
+        path = os.path.join(self.test_prefix, 'bin', 'test')
+        origin = os.path.join(self.test_prefix, 'bin')
+        lib_dirs = ['$ORIGIN/../lib', '${ORIGIN}/lib64', '/usr/lib', '$ORIGINAL/lib']
+        expected = [os.path.join(origin, '../lib'), os.path.join(origin, 'lib64'), '/usr/lib', '$ORIGINAL/lib']
+        self.assertEqual(expand_origin(lib_dirs[:3], path), expected[:3])
+
+        # other dynamic string tokens can not be expanded
+        self.assertEqual(expand_origin(['$LIB/foo'], path), None)
+        self.assertEqual(expand_origin(['$PLATFORM/foo'], path), None)
+
+    def test_get_system_lib_dirs(self):
+        """Test get_system_lib_dirs function."""
+        lib_dirs = get_system_lib_dirs()
+        self.assertTrue(lib_dirs)
+        for lib_dir in ['/lib', '/usr/lib']:
+            self.assertTrue(lib_dir in lib_dirs)
+
+    def test_find_missing_libs(self):
+        """Test find_missing_libs function."""
+        self.assertEqual(find_missing_libs(os.path.realpath(sys.executable)), [])
+
+        if not which('gcc', log_error=False):
+            print("Skipping test_find_missing_libs, gcc is not available")
+            return
+
+        src_dir = os.path.join(self.test_prefix, 'src')
+        lib_dir = os.path.join(self.test_prefix, 'lib')
+        bin_dir = os.path.join(self.test_prefix, 'bin')
+        for dirpath in [src_dir, lib_dir, bin_dir]:
+            mkdir(dirpath)
+
+        write_file(os.path.join(src_dir, 'foo.c'), "int foo(void) { return 42; }\n")
+        write_file(os.path.join(src_dir, 'main.c'), "int foo(void);\nint main(void) { return foo(); }\n")
+
+        libfoo = os.path.join(lib_dir, 'libfoo.so')
+        self.compile("-shared -fPIC -o %s %s" % (libfoo, os.path.join(src_dir, 'foo.c')))
+        self.assertTrue(read_elf_info(libfoo))
+
+        # binary with RPATH (old-style dynamic tags)
+        main_rpath = os.path.join(bin_dir, 'main_rpath')
+        self.compile("-o %s %s -L%s -lfoo -Wl,-rpath,'$ORIGIN/../lib' -Wl,--disable-new-dtags" %
+                     (main_rpath, os.path.join(src_dir, 'main.c'), lib_dir))
+        elf_info = read_elf_info(main_rpath)
+        self.assertEqual(elf_info['rpath'], ['$ORIGIN/../lib'])
+        self.assertEqual(elf_info['runpath'], [])
+        self.assertTrue('libfoo.so' in elf_info['needed'])
+        self.assertEqual(find_missing_libs(main_rpath), [])
+
+        # binary with RUNPATH
+        main_runpath = os.path.join(bin_dir, 'main_runpath')
+        self.compile("-o %s %s -L%s -lfoo -Wl,-rpath,%s -Wl,--enable-new-dtags" %
+                     (main_runpath, os.path.join(src_dir, 'main.c'), lib_dir, lib_dir))
+        elf_info = read_elf_info(main_runpath)
+        self.assertEqual(elf_info['rpath'], [])
+        self.assertEqual(elf_info['runpath'], [lib_dir])
+        self.assertEqual(find_missing_libs(main_runpath), [])
+
+        # binary without RPATH/RUNPATH can't find libfoo.so
+        main_norpath = os.path.join(bin_dir, 'main_norpath')
+        self.compile("-o %s %s -L%s -lfoo" % (main_norpath, os.path.join(src_dir, 'main.c'), lib_dir))
+        self.assertEqual(find_missing_libs(main_norpath), ['libfoo.so'])
+
+        # missing libraries are also found when RPATH is specified, but library is gone
+        shutil.move(libfoo, os.path.join(self.test_prefix, 'libfoo.so'))
+        cache = {}
+        self.assertEqual(find_missing_libs(main_rpath, cache=cache), ['libfoo.so'])
+        self.assertEqual(find_missing_libs(main_runpath, cache=cache), ['libfoo.so'])
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(ElfTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
@@ -32,13 +32,16 @@ Unit tests for filetools.py
 @author: Maxime Boissonneault (Compute Canada, Universite Laval)
 """
 import datetime
+import errno
 import glob
+import hashlib
 import os
 import re
 import shutil
 import stat
 import sys
 import tempfile
+import threading
 import time
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
@@ -338,6 +341,68 @@ class FileToolsTest(EnhancedTestCase):
             dict_checksum = {os.path.basename(fp): checksum, 'foo': 'baa'}
             self.assertTrue(ft.verify_checksum(fp, dict_checksum))
 
+    def test_checksums_cache(self):
+        """Test caching of computed checksums."""
+        fp = os.path.join(self.test_prefix, 'test.txt')
+        ft.write_file(fp, "easybuild\n")
+
+        md5 = '7167b64b1ca062b9674ffef46f9325db'
+        sha256 = '1c49562c4b404f3120a3fa0926c8d09c99ef80e470f7de03ffdfa14047960ea5'
+
+        orig_calc_block_checksums = ft.calc_block_checksums
+        calls = []
+
+        def mocked_calc_block_checksums(path, algorithms):
+            """Mocked version of calc_block_checksums, which keeps track of calls."""
+            calls.append((path, sorted(algorithms.keys())))
+            return orig_calc_block_checksums(path, algorithms)
+
+        ft.calc_block_checksums = mocked_calc_block_checksums
+
+        try:
+            # alternative checksums of different types are computed in a single pass over the file
+            self.assertTrue(ft.verify_checksum(fp, ('0' * 32, '0' * 64, sha256)))
+            self.assertEqual(calls, [(fp, ['md5', 'sha256'])])
+
+            # cached checksums are used when the file is not changed
+            self.assertEqual(ft.compute_checksum(fp, 'md5'), md5)
+            self.assertTrue(ft.verify_checksum(fp, [md5, ('sha256', sha256)]))
+            self.assertEqual(ft.compute_checksums(fp, ['sha256', 'md5', 'size']),
+                             {'md5': md5, 'sha256': sha256, 'size': 10})
+            self.assertEqual(len(calls), 1)
+
+            # only missing checksums are computed
+            self.assertEqual(sorted(ft.compute_checksums(fp, ['md5', 'sha1', 'adler32']).keys()),
+                             ['adler32', 'md5', 'sha1'])
+            self.assertEqual(calls[1:], [(fp, ['adler32', 'sha1'])])
+
+            # changing the file results in checksums being computed again
+            ft.write_file(fp, "EasyBuild\n")
+            self.assertFalse(ft.verify_checksum(fp, md5))
+            self.assertEqual(calls[2:], [(fp, ['md5'])])
+
+            # checksums can also be cached persistently
+            cache_dir = os.path.join(self.test_prefix, 'cache')
+            init_config(build_options={'checksums_cache': True, 'checksums_cache_dir': cache_dir})
+            ft.write_file(fp, "easybuild\n")
+            self.assertTrue(ft.verify_checksum(fp, (md5, sha256)))
+            self.assertEqual(len(calls), 4)
+            self.assertTrue(os.listdir(cache_dir))
+
+            # in-memory cache is not populated in a new session, but persistent cache is used
+            ft._checksums_cache.clear()
+            self.assertTrue(ft.verify_checksum(fp, (md5, sha256)))
+            self.assertEqual(ft.compute_checksum(fp, 'sha256'), sha256)
+            self.assertEqual(len(calls), 4)
+
+            # size of persistent cache is limited (10MiB by default)
+            self.assertEqual(ft.get_persistent_checksums_cache().max_size, 10 * 1024 * 1024)
+            init_config(build_options={'checksums_cache': True, 'checksums_cache_dir': cache_dir,
+                                       'checksums_cache_max_size': 1})
+            self.assertEqual(ft.get_persistent_checksums_cache().max_size, 1024 * 1024)
+        finally:
+            ft.calc_block_checksums = orig_calc_block_checksums
+
     def test_common_path_prefix(self):
         """Test get common path prefix for a list of paths."""
         self.assertEqual(ft.det_common_path_prefix(['/foo/bar/foo', '/foo/bar/baz', '/foo/bar/bar']), '/foo/bar')
@@ -466,6 +531,87 @@ class FileToolsTest(EnhancedTestCase):
         ft.HAVE_REQUESTS = False
         self.assertErrorRegex(EasyBuildError, "SSL issues with urllib2", ft.download_file, fn, url, target)
 
+    def test_download_file_resume(self):
+        """Test resuming of interrupted downloads in download_file function, using a local HTTP server."""
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+        data = b''.join(b'%06d\n' % i for i in range(100000))
+        requests = []
+        interrupted = []
+
+        class TestHandler(BaseHTTPRequestHandler):
+            """Handler that interrupts the first request half-way, and supports range requests."""
+
+            def do_GET(self):
+                start = 0
+                range_hdr = self.headers.get('Range')
+                requests.append(range_hdr)
+                if range_hdr:
+                    start = int(re.match(r'^bytes=([0-9]+)-$', range_hdr).group(1))
+                    self.send_response(206)
+                    self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, len(data) - 1, len(data)))
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(data) - start))
+                self.end_headers()
+                if not interrupted:
+                    # only send first half of data for very first request, then close the connection
+                    interrupted.append(True)
+                    self.wfile.write(data[:len(data) // 2])
+                else:
+                    self.wfile.write(data[start:])
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), TestHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        try:
+            fn = 'test.txt'
+            url = 'http://127.0.0.1:%d/%s' % (server.server_address[1], fn)
+            target = os.path.join(self.test_prefix, fn)
+            res = ft.download_file(fn, url, target)
+
+            self.assertEqual(res, target)
+            self.assertEqual(requests, [None, 'bytes=%d-' % (len(data) // 2)])
+            with open(target, 'rb') as fh:
+                self.assertEqual(fh.read(), data)
+            self.assertFalse(os.path.exists(target + ft.PARTIAL_DOWNLOAD_SUFFIX))
+
+            # checksums were computed on the fly while downloading (incl. data downloaded in the first attempt)
+            cache_key = ft.det_checksums_cache_key(target)
+            self.assertEqual(ft._checksums_cache[cache_key]['md5'], hashlib.md5(data).hexdigest())
+            self.assertEqual(ft.compute_checksum(target, 'sha256'), hashlib.sha256(data).hexdigest())
+
+            # partial download left behind by an earlier download from a different URL is not resumed
+            other_target = os.path.join(self.test_prefix, 'other', fn)
+            ft.write_file(other_target + ft.PARTIAL_DOWNLOAD_SUFFIX, b'this is not the data you are looking for')
+            del requests[:]
+            res = ft.download_file(fn, url, other_target)
+            self.assertEqual(res, other_target)
+            self.assertEqual(requests, [None])
+            with open(other_target, 'rb') as fh:
+                self.assertEqual(fh.read(), data)
+            self.assertFalse(os.path.exists(other_target + ft.PARTIAL_DOWNLOAD_SUFFIX))
+
+            # same when download is forced
+            ft.write_file(other_target + ft.PARTIAL_DOWNLOAD_SUFFIX, b'foo')
+            del requests[:]
+            res = ft.download_file(fn, url, other_target, forced=True)
+            self.assertEqual(res, other_target)
+            self.assertEqual(requests, [None])
+            with open(other_target, 'rb') as fh:
+                self.assertEqual(fh.read(), data)
+        finally:
+            server.shutdown()
+            server.server_close()
+
     def test_mkdir(self):
         """Test mkdir function."""
 
@@ -1143,6 +1289,96 @@ class FileToolsTest(EnhancedTestCase):
         ft.write_file(test_files[2], '')
         ft.adjust_permissions(testdir, perms, recursive=True, ignore_errors=True)
 
+    def test_permissions_plan(self):
+        """Test det_permissions_plan and apply_permissions_plan functions."""
+        # remove write permissions for group/other, add read permissions for everyone, add search permissions on dirs
+        changes = [
+            (stat.S_IWGRP | stat.S_IWOTH, False, False, False),
+            (stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH, True, False, False),
+            (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH, True, False, True),
+        ]
+        plan = ft.det_permissions_plan(changes)
+        expected = {
+            'dirs': (0o022, 0o555),
+            'files': (0o022, 0o444),
+        }
+        self.assertEqual(plan, expected)
+
+        # order matters: removing permissions that were added earlier cancels them out
+        changes = [(stat.S_IWGRP, True, False, False), (stat.S_IWGRP | stat.S_IWOTH, False, True, False)]
+        self.assertEqual(ft.det_permissions_plan(changes), {'dirs': (0, 0o020), 'files': (0o022, 0)})
+
+        # set up directory tree with a bunch of subdirectories/files
+        testdir = os.path.join(self.test_prefix, 'test')
+        for idx in range(10):
+            subdir = os.path.join(testdir, 'sub%d' % idx, 'subsub')
+            ft.mkdir(subdir, parents=True)
+            ft.write_file(os.path.join(subdir, 'file%d.txt' % idx), 'test')
+            os.chmod(subdir, 0o700)
+            ft.write_file(os.path.join(testdir, 'sub%d' % idx, 'file.txt'), 'test')
+            os.chmod(os.path.join(testdir, 'sub%d' % idx, 'file.txt'), 0o666)
+        ft.symlink(os.path.join(testdir, 'sub0'), os.path.join(testdir, 'sub_symlink'))
+
+        for parallel in [1, 4]:
+            ft.apply_permissions_plan(testdir, plan, parallel=parallel)
+            for idx in range(10):
+                subdir = os.path.join(testdir, 'sub%d' % idx)
+                self.assertEqual(stat.S_IMODE(os.stat(subdir).st_mode), 0o755)
+                self.assertEqual(stat.S_IMODE(os.stat(os.path.join(subdir, 'subsub')).st_mode), 0o755)
+                self.assertEqual(stat.S_IMODE(os.stat(os.path.join(subdir, 'file.txt')).st_mode), 0o644)
+                txt = os.path.join(subdir, 'subsub', 'file%d.txt' % idx)
+                self.assertEqual(stat.S_IMODE(os.stat(txt).st_mode), 0o644)
+
+            # change permissions again for next iteration
+            os.chmod(os.path.join(testdir, 'sub9', 'subsub'), 0o700)
+
+        # non-recursive: only specified path is changed
+        os.chmod(testdir, 0o700)
+        os.chmod(os.path.join(testdir, 'sub0'), 0o700)
+        ft.apply_permissions_plan(testdir, plan, recursive=False)
+        self.assertEqual(stat.S_IMODE(os.stat(testdir).st_mode), 0o755)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(testdir, 'sub0')).st_mode), 0o700)
+
+        nosuchdir = os.path.join(self.test_prefix, 'nosuchdir')
+        error_pattern = "Failed to chmod/chown several paths.*No such file or directory"
+        self.assertErrorRegex(EasyBuildError, error_pattern, ft.apply_permissions_plan, nosuchdir, plan)
+
+        # directories that can't be listed by their owner anymore (like for non-root users) result in an error
+        orig_scandir = ft.scandir
+
+        def mocked_scandir(path):
+            """Mocked scandir, which fails if owner has no read/search permissions (even if running as root)."""
+            if stat.S_IMODE(os.stat(path).st_mode) & 0o500 != 0o500:
+                raise OSError(errno.EACCES, "Permission denied", path)
+            return orig_scandir(path)
+
+        ft.scandir = mocked_scandir
+        try:
+            os.chmod(os.path.join(testdir, 'sub3'), 0o200)
+            plan = ft.det_permissions_plan([(stat.S_IWOTH, False, False, False)])
+            error_pattern = "Failed to chmod/chown several paths.*sub3.*Permission denied"
+            self.assertErrorRegex(EasyBuildError, error_pattern, ft.apply_permissions_plan, testdir, plan)
+            for subdir in ['sub0', 'sub3', os.path.join('sub9', 'subsub')]:
+                os.chmod(os.path.join(testdir, subdir), 0o755)
+
+            # removing read/search permissions for owner on directories is only done after processing them
+            plan = ft.det_permissions_plan([(stat.S_IRUSR | stat.S_IXUSR, False, False, True)])
+            for parallel in [1, 4]:
+                ft.apply_permissions_plan(testdir, plan, parallel=parallel)
+                self.assertEqual(stat.S_IMODE(os.stat(testdir).st_mode), 0o255)
+                for idx in range(10):
+                    subdir = os.path.join(testdir, 'sub%d' % idx)
+                    self.assertEqual(stat.S_IMODE(os.stat(subdir).st_mode), 0o255)
+                    self.assertEqual(stat.S_IMODE(os.stat(os.path.join(subdir, 'subsub')).st_mode), 0o255)
+                    txt = os.path.join(subdir, 'subsub', 'file%d.txt' % idx)
+                    self.assertEqual(stat.S_IMODE(os.stat(txt).st_mode), 0o644)
+
+                # restore permissions for next iteration
+                ft.apply_permissions_plan(testdir, ft.det_permissions_plan([(0o500, True, False, True)]))
+                self.assertEqual(stat.S_IMODE(os.stat(os.path.join(testdir, 'sub9', 'subsub')).st_mode), 0o755)
+        finally:
+            ft.scandir = orig_scandir
+
     def test_apply_regex_substitutions(self):
         """Test apply_regex_substitutions function."""
         testfile = os.path.join(self.test_prefix, 'test.txt')
@@ -39,12 +39,15 @@ from unittest import TextTestRunner, TestSuite
 from easybuild.framework.easyconfig.tools import process_easyconfig
 from easybuild.tools import config
 from easybuild.tools.filetools import mkdir, read_file, remove_file, write_file
-from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, dependencies_for
+from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl
+from easybuild.tools.module_generator import dependencies_for, dependency_graph
 from easybuild.tools.module_naming_scheme.utilities import is_valid_module_name
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.easyconfig import EasyConfig, ActiveMNS
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.modules import EnvironmentModulesC, EnvironmentModulesTcl, Lmod
+from easybuild.tools.modules import MODULE_DEPS_CACHE, MODULE_FILE_DEPS_CACHE, EnvironmentModulesC
+from easybuild.tools.modules import EnvironmentModulesTcl, Lmod
+from easybuild.tools.modules import reset_module_caches
 from easybuild.tools.utilities import quote_str
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, find_full_path, init_config
 
@@ -1383,6 +1386,29 @@ class ModuleGeneratorTest(EnhancedTestCase):
         # only with depth=0, only direct dependencies are returned
         self.assertEqual(dependencies_for('foss/2018a', self.modtool, depth=0), expected[:-2])
 
+        # results are cached, module files are only parsed once
+        foss_modfile = self.modtool.modulefile_path('foss/2018a')
+        self.assertTrue(foss_modfile in MODULE_FILE_DEPS_CACHE)
+        self.assertEqual(len([k for k in MODULE_DEPS_CACHE if k[2].startswith('GCC/6.4.0-2.28;')]), 1)
+        MODULE_FILE_DEPS_CACHE.clear()
+        self.assertEqual(dependencies_for('foss/2018a', self.modtool), expected)
+        self.assertEqual(MODULE_FILE_DEPS_CACHE, {})
+
+        # cached results are not affected by changes to returned list
+        dependencies_for('foss/2018a', self.modtool).append('foo')
+        self.assertEqual(dependencies_for('foss/2018a', self.modtool), expected)
+
+        res = dependency_graph(['foss/2018a', 'gompi/2018a', 'GCC/6.4.0-2.28'], self.modtool)
+        self.assertEqual(res['foss/2018a'], set(expected))
+        self.assertEqual(res['gompi/2018a'], set(['GCC/6.4.0-2.28', 'OpenMPI/2.1.2-GCC-6.4.0-2.28',
+                                                  'hwloc/1.11.8-GCC-6.4.0-2.28']))
+        self.assertEqual(res['GCC/6.4.0-2.28'], set())
+
+        reset_module_caches()
+        self.assertEqual(MODULE_DEPS_CACHE, {})
+        self.assertEqual(MODULE_FILE_DEPS_CACHE, {})
+        self.assertEqual(dependencies_for('foss/2018a', self.modtool), expected)
+
         # Lmod 7.6+ is required to use depends-on
         if self.modtool.supports_depends_on:
             # also test on module file that includes depends_on statements
@@ -459,6 +459,60 @@ class ModulesTest(EnhancedTestCase):
         self.assertEqual(os.environ.get('EBROOTGCC'), None)
         self.assertFalse(loaded_modules[-1] == 'GCC/6.4.0-2.28')
 
+    def test_load_unload_batched(self):
+        """Test loading/unloading modules with a single module command, and replaying cached environment changes."""
+        module_cmds = []
+
+        def mocked_run_module(*args, **kwargs):
+            """Mocked version of run_module, which only (un)sets $EBROOT* environment variables."""
+            module_cmds.append(args)
+            for mod_name in args[1:]:
+                env_var = 'EBROOT' + mod_name.split('/')[0].upper()
+                if args[0] == 'load':
+                    os.environ[env_var] = os.path.join('/software', mod_name)
+                else:
+                    del os.environ[env_var]
+
+        self.modtool.run_module = mocked_run_module
+        for env_var in ['EBROOTGCC', 'EBROOTOPENMPI']:
+            if env_var in os.environ:
+                del os.environ[env_var]
+
+        mods = ['GCC/6.4.0-2.28', 'OpenMPI/2.1.2-GCC-6.4.0-2.28']
+        self.modtool.load(mods)
+        self.assertEqual(module_cmds, [('load', 'GCC/6.4.0-2.28', 'OpenMPI/2.1.2-GCC-6.4.0-2.28')])
+        self.assertEqual(os.environ['EBROOTGCC'], '/software/GCC/6.4.0-2.28')
+        self.assertEqual(os.environ['EBROOTOPENMPI'], '/software/OpenMPI/2.1.2-GCC-6.4.0-2.28')
+
+        self.modtool.unload(mods[::-1])
+        self.assertEqual(module_cmds[-1], ('unload', 'OpenMPI/2.1.2-GCC-6.4.0-2.28', 'GCC/6.4.0-2.28'))
+        self.assertFalse('EBROOTGCC' in os.environ or 'EBROOTOPENMPI' in os.environ)
+
+        # loading/unloading the same modules in the same environment again replays the cached environment changes
+        self.modtool.load(mods)
+        self.modtool.unload(mods[::-1])
+        self.modtool.load(mods)
+        self.assertEqual(len(module_cmds), 2)
+        self.assertEqual(os.environ['EBROOTGCC'], '/software/GCC/6.4.0-2.28')
+        self.assertEqual(os.environ['EBROOTOPENMPI'], '/software/OpenMPI/2.1.2-GCC-6.4.0-2.28')
+
+        # different environment implies running module command again
+        self.modtool.unload(mods[::-1])
+        os.environ['FOO'] = 'bar'
+        self.modtool.load(mods)
+        self.assertEqual(len(module_cmds), 3)
+
+        # cache is cleared when module caches are invalidated
+        self.modtool.unload(mods[::-1])
+        reset_module_caches()
+        self.modtool.load(mods)
+        self.assertEqual(len(module_cmds), 5)
+
+        # nothing to load implies no module command
+        self.modtool.load([])
+        self.modtool.unload([])
+        self.assertEqual(len(module_cmds), 5)
+
     def test_show(self):
         """Test for ModulesTool.show method."""
 
@@ -1141,6 +1195,117 @@ class ModulesTest(EnhancedTestCase):
         invalidate_module_caches_for(test_mods_path)
         self.assertEqual(mod.MODULE_AVAIL_CACHE, {})
         self.assertEqual(mod.MODULE_SHOW_CACHE, {})
+        self.assertFalse(any(os.path.samefile(test_mods_path, p) for p in mod.MODULE_INDEX))
+
+    def test_module_index(self):
+        """Test index of module files."""
+        mod_path = os.path.join(self.test_prefix, 'modules')
+        tcl_txt = '#%Module\nsetenv FOO bar\n'
+        write_file(os.path.join(mod_path, 'GCC', '4.6.3'), tcl_txt)
+        write_file(os.path.join(mod_path, 'GCC', '.4.6.4'), tcl_txt)
+        write_file(os.path.join(mod_path, 'GCC', '4.6.3~'), tcl_txt)
+        write_file(os.path.join(mod_path, 'GCC', 'README'), "not a module file")
+        write_file(os.path.join(mod_path, 'GCC', '.modulerc'), "#%Module\nmodule-version GCC/4.6.3 default 4.6\n")
+        write_file(os.path.join(mod_path, 'Java', '11.lua'), 'setenv("JAVA_HOME", "/opt/java")')
+        write_file(os.path.join(mod_path, 'Java', '.modulerc.lua'), 'module_version("Java/11", "lts")')
+        write_file(os.path.join(mod_path, 'Core', '.modulerc'), "#%Module\nmodule-alias toy/1.0 Core/toy/0.0\n")
+        symlink(os.path.join(mod_path, 'GCC', '4.6.3'), os.path.join(mod_path, 'GCC', '4.6.3-symlink'))
+        # symlink loop should not cause trouble
+        symlink(mod_path, os.path.join(mod_path, 'Core', 'loop'))
+
+        index = mod.ModulePathIndex(mod_path)
+        self.assertEqual(index.lookup('GCC/4.6.3'), mod.MODULE_INDEX_FILE)
+        self.assertEqual(index.lookup('GCC/.4.6.4'), mod.MODULE_INDEX_FILE)
+        self.assertEqual(index.lookup('GCC/4.6.3-symlink'), mod.MODULE_INDEX_FILE)
+        self.assertEqual(index.lookup('GCC'), mod.MODULE_INDEX_DIR)
+        self.assertEqual(index.lookup('GCC/4.6'), mod.MODULE_INDEX_RC)
+        self.assertEqual(index.lookup('GCC/default'), mod.MODULE_INDEX_RC)
+        self.assertEqual(index.lookup('Java/11'), mod.MODULE_INDEX_FILE)
+        self.assertEqual(index.lookup('Java/11', lua=False), None)
+        self.assertEqual(index.lookup('Java/lts'), mod.MODULE_INDEX_RC)
+        # module aliases can be defined anywhere
+        self.assertEqual(index.lookup('toy/1.0'), mod.MODULE_INDEX_RC)
+        for mod_name in ['GCC/4.6.3~', 'GCC/README', 'GCC/4.6.5', 'nosuchmodule/1.0', 'GCC/4.6.3/foo']:
+            self.assertEqual(index.lookup(mod_name), None)
+
+        self.assertEqual(sorted(index.available()), ['GCC/4.6.3', 'GCC/4.6.3-symlink', 'Java/11'])
+        self.assertEqual(sorted(index.available(lua=False, hidden=True)),
+                         ['GCC/.4.6.4', 'GCC/4.6.3', 'GCC/4.6.3-symlink'])
+        self.assertEqual(sorted(index.available(rc_names=True)),
+                         ['GCC/4.6', 'GCC/4.6.3', 'GCC/4.6.3-symlink', 'Java/11', 'Java/lts', 'toy/1.0'])
+
+        # index is updated when module files are added/removed, based on modification time of directories;
+        # directories that were changed very recently are always rescanned
+        self.assertEqual(index.dirs['GCC']['mtime'], None)
+        write_file(os.path.join(mod_path, 'GCC', '4.6.5'), tcl_txt)
+        self.assertEqual(index.lookup('GCC/4.6.5'), mod.MODULE_INDEX_FILE)
+        remove_file(os.path.join(mod_path, 'GCC', '4.6.5'))
+        self.assertEqual(index.lookup('GCC/4.6.5'), None)
+        remove_dir(os.path.join(mod_path, 'Java'))
+        self.assertEqual(index.lookup('Java/11'), None)
+        self.assertFalse('Java' in index.dirs)
+
+        # directories which were not modified recently are not rescanned if modification time is unchanged
+        gcc_dir = os.path.join(mod_path, 'GCC')
+        os.utime(gcc_dir, (0, 0))
+        self.assertEqual(index.lookup('GCC/4.6.3'), mod.MODULE_INDEX_FILE)
+        self.assertTrue(index.dirs['GCC']['mtime'] is not None)
+        index.dirs['GCC']['modules']['4.6.7'] = ['tcl']
+        self.assertEqual(index.lookup('GCC/4.6.7'), mod.MODULE_INDEX_FILE)
+
+        # check use of index in ModulesTool.exist
+        os.environ['MODULEPATH'] = mod_path
+        os.environ['HOME'] = self.test_prefix
+        res = self.modtool.exist_via_index(['GCC/4.6.3', 'GCC/.4.6.4', 'GCC', 'GCC/4.6', 'GCC/4.6.8', '../GCC/4.6.3'])
+        self.assertEqual(res, [True, True, None, None, False, None])
+        # module files (and aliases) may be defined in global .modulerc files, so not found implies unknown
+        write_file(os.path.join(self.test_prefix, '.modulerc'), "#%Module\nmodule-alias GCC/4.6.8 GCC/4.6.3\n")
+        self.assertEqual(self.modtool.exist_via_index(['GCC/4.6.3', 'GCC/4.6.8']), [True, None])
+
+        # index can be stored in persistent cache
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        init_config(build_options={'modules_index_cache': True, 'modules_index_cache_dir': cache_dir})
+        reset_module_caches()
+        self.assertEqual(self.modtool.exist_via_index(['GCC/4.6.3']), [True])
+        self.assertTrue(os.listdir(cache_dir))
+        reset_module_caches()
+        index = mod.get_module_index(mod_path)
+        self.assertTrue('GCC' in index.dirs)
+        self.assertFalse(index.dirty)
+
+        # index is not used unless --modules-index is enabled
+        init_config(build_options={'modules_index': False})
+        reset_module_caches()
+        self.assertFalse(self.modtool.use_modules_index())
+        self.mock_stdout(True)
+        self.modtool.available()
+        self.mock_stdout(False)
+        self.assertEqual(mod.MODULE_INDEX, {})
+
+        init_config(build_options={'modules_index': True})
+        reset_module_caches()
+        self.assertTrue(self.modtool.use_modules_index())
+        self.assertEqual(self.modtool.exist(['GCC/4.6.3', 'GCC/4.6.9']), [True, False])
+        self.assertTrue(mod_path in mod.MODULE_INDEX)
+
+        # index is not used when 'avail' or 'show' is customised, since it is not aware of that
+        reset_module_caches()
+        self.modtool.available = lambda *args, **kwargs: []
+        self.assertFalse(self.modtool.use_modules_index())
+        self.assertEqual(self.modtool.exist(['GCC/4.6.3'], maybe_partial=False), [False])
+        self.assertEqual(mod.MODULE_INDEX, {})
+        del self.modtool.available
+
+        # check_loaded_modules finds loaded modules that define $EBROOT* via module files in index
+        write_file(os.path.join(mod_path, 'GCC', '4.6.3'), tcl_txt + 'setenv EBROOTGCC /opt/GCC\n')
+        os.environ['EBROOTGCC'] = '/opt/GCC'
+        self.modtool.loaded_modules = lambda: ['GCC/4.6.3']
+        self.mock_stderr(True)
+        self.modtool.check_loaded_modules()
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        self.assertTrue(re.search(r"^\* GCC/4.6.3$", stderr, re.M), "GCC/4.6.3 found in: %s" % stderr)
+        self.assertFalse('without matching loaded module' in stderr)
 
     def test_module_use(self):
         """Test 'module use'."""
@@ -38,11 +38,14 @@ from easybuild.framework.easyconfig.tools import process_easyconfig
 from easybuild.tools import config
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import get_module_syntax
-from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, which, write_file
+from easybuild.tools import parallelbuild
+from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, remove_file, which
+from easybuild.tools.filetools import write_file
 from easybuild.tools.job import pbs_python
 from easybuild.tools.job.pbs_python import PbsPython
 from easybuild.tools.options import parse_options
-from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, submit_jobs
+from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, build_easyconfigs_in_parallel_locally
+from easybuild.tools.parallelbuild import submit_jobs
 from easybuild.tools.robot import resolve_dependencies
 
 
@@ -375,6 +378,63 @@ class ParallelBuildTest(EnhancedTestCase):
         }
         self.assertEqual(jobs[1].job_specs, expected)
 
+    def test_build_easyconfigs_in_parallel_locally(self):
+        """Test build_easyconfigs_in_parallel_locally function."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ec = os.path.join(test_ecs, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb')
+        init_config(build_options={'parallel': 4, 'robot_path': [test_ecs]})
+        ecs = resolve_dependencies(process_easyconfig(test_ec), self.modtool, retain_all_deps=True)
+        mod_names = [ec['full_mod_name'] for ec in ecs]
+        self.assertEqual(mod_names, ['GCC/4.6.3', 'intel/2018a', 'toy/.0.0-deps', 'gzip/1.4-GCC-4.6.3'])
+
+        builds_log = os.path.join(self.test_prefix, 'builds.log')
+
+        def mocked_build_and_install_one(ec, init_env):
+            """Mocked version of build_and_install_one, which only logs which easyconfigs were built."""
+            parallel = config.build_option('parallel')
+            with open(builds_log, 'a') as fp:
+                fp.write("%s (parallel: %s)\n" % (ec['full_mod_name'], parallel))
+            if ec['full_mod_name'] == fail_mod_name:
+                return (False, None, "build failed")
+            return (True, os.path.join(self.test_prefix, ec['full_mod_name'] + '.log'), None)
+
+        orig_build_and_install_one = parallelbuild.build_and_install_one
+        parallelbuild.build_and_install_one = mocked_build_and_install_one
+
+        fail_mod_name = None
+        res = list(build_easyconfigs_in_parallel_locally(ecs, os.environ.copy(), 2, poll_interval=0.1))
+        self.assertEqual(sorted(ec['full_mod_name'] for (ec, _) in res), sorted(mod_names))
+        self.assertTrue(all(ec_res['success'] for (_, ec_res) in res))
+
+        # dependencies must be built before the easyconfigs that depend on them
+        built = [line.split(' ')[0] for line in read_file(builds_log).splitlines()]
+        self.assertEqual(sorted(built), sorted(mod_names))
+        self.assertTrue(built.index('intel/2018a') < built.index('toy/.0.0-deps'))
+        self.assertTrue(built.index('toy/.0.0-deps') < built.index('gzip/1.4-GCC-4.6.3'))
+        self.assertTrue(built.index('GCC/4.6.3') < built.index('gzip/1.4-GCC-4.6.3'))
+
+        # available cores are split across builds
+        self.assertTrue(all(line.endswith('(parallel: 2)') for line in read_file(builds_log).splitlines()))
+
+        # failing build is propagated to easyconfigs that depend on it,
+        # builds for easyconfigs that do not depend on it are still performed
+        remove_file(builds_log)
+        fail_mod_name = 'intel/2018a'
+        res = dict((ec['full_mod_name'], ec_res) for (ec, ec_res) in
+                   build_easyconfigs_in_parallel_locally(ecs, os.environ.copy(), 2, poll_interval=0.1))
+        self.assertEqual(sorted(res.keys()), sorted(mod_names))
+        self.assertTrue(res['GCC/4.6.3']['success'])
+        self.assertFalse(res['intel/2018a']['success'])
+        self.assertEqual(res['intel/2018a']['err'].msg, "build failed")
+        for mod_name in ['toy/.0.0-deps', 'gzip/1.4-GCC-4.6.3']:
+            self.assertFalse(res[mod_name]['success'])
+            self.assertTrue(res[mod_name]['err'].msg.startswith("dependencies failed to build: "))
+
+        built = sorted(line.split(' ')[0] for line in read_file(builds_log).splitlines())
+        self.assertEqual(built, ['GCC/4.6.3', 'intel/2018a'])
+
+        parallelbuild.build_and_install_one = orig_build_and_install_one
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -611,6 +611,35 @@ class RobotTest(EnhancedTestCase):
         self.assertEqual(res[1]['full_mod_name'], 'test/123')
         self.assertEqual(res[0]['full_mod_name'], 'somedep/4.5.6')
 
+    def test_resolve_dependencies_robot_stats(self):
+        """Test reporting of statistics on dependency resolution via --robot-stats."""
+        self.install_mock_module()
+        MockModule.avail_modules = []
+
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ecs = process_easyconfig(os.path.join(test_easyconfigs, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb'))
+
+        # gzip-1.4-GCC-4.6.3.eb has toy/.0.0-deps as hidden dependency, which depends on intel/2018a
+        expected = ['GCC/4.6.3', 'intel/2018a', 'toy/.0.0-deps', 'gzip/1.4-GCC-4.6.3']
+
+        init_config(build_options={'robot_path': [test_easyconfigs]})
+        self.mock_stdout(True)
+        res = resolve_dependencies(ecs, self.modtool, retain_all_deps=True)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertEqual([x['full_mod_name'] for x in res], expected)
+        self.assertEqual(stdout, '')
+
+        init_config(build_options={'robot_path': [test_easyconfigs], 'robot_stats': True})
+        self.mock_stdout(True)
+        res = resolve_dependencies(ecs, self.modtool, retain_all_deps=True)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertEqual([x['full_mod_name'] for x in res], expected)
+        regex = re.compile(r"^== dependency resolution completed in [0-9.]+ sec: "
+                           r"4 nodes & 3 edges in dependency graph, 3 easyconfig files parsed$", re.M)
+        self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+
     def test_det_easyconfig_paths(self):
         """Test det_easyconfig_paths function (without --from-pr)."""
         fd, dummylogfn = tempfile.mkstemp(prefix='easybuild-dummy', suffix='.log')
@@ -968,6 +997,118 @@ class RobotTest(EnhancedTestCase):
         error_msg = "Multiple versions of GCC found in dependencies of toolchain gompi: 4.6.4, 6.4.0-2.28"
         self.assertErrorRegex(EasyBuildError, error_msg, get_toolchain_hierarchy, tc)
 
+    def test_persistent_toolchain_hierarchy_cache(self):
+        """Test use of persistent cache for toolchain hierarchies."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ecs_dir = os.path.join(self.test_prefix, 'ecs')
+        mkdir(test_ecs_dir)
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        build_options = {
+            'robot_path': [test_ecs_dir, test_easyconfigs],
+            'toolchain_hierarchy_cache': True,
+            'toolchain_hierarchy_cache_dir': cache_dir,
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+        get_toolchain_hierarchy.clear()
+
+        foss_tc = {'name': 'foss', 'version': '2018a'}
+        expected = [
+            {'name': 'GCC', 'version': '6.4.0-2.28'},
+            {'name': 'golf', 'version': '2018a'},
+            {'name': 'gompi', 'version': '2018a'},
+            {'name': 'foss', 'version': '2018a'},
+        ]
+        self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+        self.assertTrue(os.path.exists(cache_dir))
+        self.assertEqual(len(get_toolchain_hierarchy(foss_tc, incl_capabilities=True)), 4)
+
+        def reset_caches():
+            """Reset in-memory caches, so persistent cache is checked."""
+            get_toolchain_hierarchy.clear()
+            ecec._easyconfig_files_cache.clear()
+            ecec._path_indexes.clear()
+
+        # make sure easyconfig files are not processed, so we know results are served from persistent cache
+        orig_process_easyconfig = ecec.process_easyconfig
+
+        def fail_process_easyconfig(*args, **kwargs):
+            raise EasyBuildError("Processing easyconfig files is not allowed!")
+
+        ecec.process_easyconfig = fail_process_easyconfig
+        try:
+            reset_caches()
+            self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+            res = get_toolchain_hierarchy(foss_tc, incl_capabilities=True)
+            self.assertEqual([tc['name'] for tc in res], ['GCC', 'golf', 'gompi', 'foss'])
+            self.assertEqual(res[-1]['mpi_family'], 'OpenMPI')
+
+            # cache entry is invalidated when an involved easyconfig file is found in another location...
+            reset_caches()
+            gompi_ec = os.path.join(test_ecs_dir, 'gompi-2018a.eb')
+            copy_file(os.path.join(test_easyconfigs, 'g', 'gompi', 'gompi-2018a.eb'), gompi_ec)
+            error_pattern = "Processing easyconfig files is not allowed"
+            self.assertErrorRegex(EasyBuildError, error_pattern, get_toolchain_hierarchy, foss_tc)
+        finally:
+            ecec.process_easyconfig = orig_process_easyconfig
+
+        self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+
+        ecec.process_easyconfig = fail_process_easyconfig
+        try:
+            reset_caches()
+            self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+
+            # ... or when the contents of an involved easyconfig file changes
+            reset_caches()
+            write_file(gompi_ec, "\n# just a comment", append=True)
+            error_pattern = "Processing easyconfig files is not allowed"
+            self.assertErrorRegex(EasyBuildError, error_pattern, get_toolchain_hierarchy, foss_tc)
+
+            # build options that affect toolchain hierarchies are taken into account
+            build_options['add_system_to_minimal_toolchains'] = True
+            init_config(build_options=build_options)
+            reset_caches()
+            self.assertErrorRegex(EasyBuildError, error_pattern, get_toolchain_hierarchy, foss_tc)
+        finally:
+            ecec.process_easyconfig = orig_process_easyconfig
+
+        # persistent cache is neither used nor updated when existing modules are taken into account
+        build_options['add_system_to_minimal_toolchains'] = False
+        build_options['use_existing_modules'] = True
+        init_config(build_options=build_options)
+        reset_caches()
+        ecec.clear_persistent_toolchain_hierarchy_cache()
+        self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+        self.assertFalse(os.path.exists(cache_dir))
+
+        build_options['use_existing_modules'] = False
+        init_config(build_options=build_options)
+        reset_caches()
+        self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+        self.assertTrue(os.path.exists(cache_dir))
+
+        build_options['use_existing_modules'] = True
+        init_config(build_options=build_options)
+        ecec.process_easyconfig = fail_process_easyconfig
+        try:
+            reset_caches()
+            self.assertErrorRegex(EasyBuildError, error_pattern, get_toolchain_hierarchy, foss_tc)
+        finally:
+            ecec.process_easyconfig = orig_process_easyconfig
+
+        # clearing persistent cache
+        self.assertEqual(ecec.clear_persistent_toolchain_hierarchy_cache(), cache_dir)
+        self.assertFalse(os.path.exists(cache_dir))
+
+        # persistent cache is not used unless it is enabled
+        build_options['toolchain_hierarchy_cache'] = False
+        build_options['use_existing_modules'] = False
+        init_config(build_options=build_options)
+        reset_caches()
+        self.assertEqual(get_toolchain_hierarchy(foss_tc), expected)
+        self.assertFalse(os.path.exists(cache_dir))
+
     def test_find_resolved_modules(self):
         """Test find_resolved_modules function."""
         nodeps = {
@@ -1088,6 +1229,59 @@ class RobotTest(EnhancedTestCase):
         untweaked_hwloc = os.path.join(test_easyconfigs, 'h', 'hwloc', 'hwloc-1.11.8-GCC-6.4.0-2.28.eb')
         self.assertTrue(untweaked_hwloc in specs)
 
+    def test_robot_find_easyconfig(self):
+        """Test robot_find_easyconfig function, incl. use of index for robot search paths."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        init_config(build_options={'robot_path': [test_ecs]})
+
+        for name, version, expected in [
+            ('GCC', '4.6.3', os.path.join(test_ecs, 'g', 'GCC', 'GCC-4.6.3.eb')),
+            ('gzip', '1.4-GCC-4.6.3', os.path.join(test_ecs, 'g', 'gzip', 'gzip-1.4-GCC-4.6.3.eb')),
+            ('toy', '0.0-gompi-2018a-test', os.path.join(test_ecs, 't', 'toy', 'toy-0.0-gompi-2018a-test.eb')),
+            ('nosuchsoftware', '1.0', None),
+        ]:
+            self.assertEqual(robot.robot_find_easyconfig(name, version), expected)
+
+        # index for robot search path is created on the fly, and is used to find easyconfig files
+        path_index = ecec._path_indexes[test_ecs]
+        self.assertFalse(path_index['complete'])
+        self.assertEqual(path_index['by_name_version'][('GCC', '4.6.3')], [os.path.join('g', 'GCC', 'GCC-4.6.3.eb')])
+        self.assertTrue(os.path.join('g', 'GCC', 'GCC-4.6.3.eb') in path_index['by_name']['GCC'])
+
+        # all candidate locations for easyconfig files are supported, in order of preference
+        test_robot_path = os.path.join(self.test_prefix, 'test_robot_path')
+        for rel_path in ['foo-bar/1.0.eb', 'foo-bar/foo-bar-1.0.eb', 'f/foo-bar/foo-bar-1.0.eb', 'foo-bar-1.0.eb',
+                         'f/foo-bar/foo-bar-2.0.eb', 'foo-bar-3.0.eb']:
+            write_file(os.path.join(test_robot_path, rel_path), '')
+
+        init_config(build_options={'robot_path': [test_robot_path]})
+        for version, expected in [('1.0', 'foo-bar/1.0.eb'), ('2.0', 'f/foo-bar/foo-bar-2.0.eb'),
+                                  ('3.0', 'foo-bar-3.0.eb')]:
+            res = robot.robot_find_easyconfig('foo-bar', version)
+            self.assertEqual(res, os.path.join(test_robot_path, expected))
+
+        # easyconfig files that are added after the index was created on the fly are still found
+        write_file(os.path.join(test_robot_path, 'foo-bar-4.0.eb'), '')
+        res = robot.robot_find_easyconfig('foo-bar', '4.0')
+        self.assertEqual(res, os.path.join(test_robot_path, 'foo-bar-4.0.eb'))
+
+        # if an index file is available for a robot search path, it is trusted: the filesystem is not checked
+        write_file(os.path.join(test_robot_path, '.eb-path-index'), '\n'.join(['foo-bar-1.0.eb', 'foo-bar-5.0.eb']))
+        init_config(build_options={'robot_path': [test_robot_path]})
+        self.mock_stdout(True)
+        res = robot.robot_find_easyconfig('foo-bar', '5.0')
+        self.mock_stdout(False)
+        self.assertTrue(ecec._path_indexes[test_robot_path]['complete'])
+        self.assertEqual(res, os.path.join(test_robot_path, 'foo-bar-5.0.eb'))
+        self.assertEqual(robot.robot_find_easyconfig('foo-bar', '1.0'), os.path.join(test_robot_path, 'foo-bar-1.0.eb'))
+        self.assertEqual(robot.robot_find_easyconfig('foo-bar', '2.0'), None)
+
+        # index is not used with --ignore-index
+        init_config(build_options={'robot_path': [test_robot_path], 'ignore_index': True})
+        self.assertEqual(robot.robot_find_easyconfig('foo-bar', '5.0'), None)
+        res = robot.robot_find_easyconfig('foo-bar', '2.0')
+        self.assertEqual(res, os.path.join(test_robot_path, 'f', 'foo-bar', 'foo-bar-2.0.eb'))
+
     def test_robot_find_subtoolchain_for_dep(self):
         """Test robot_find_subtoolchain_for_dep."""
 
@@ -1367,6 +1561,13 @@ class RobotTest(EnhancedTestCase):
 
         self.assertTrue(conflicts)
         self.assertTrue("Conflict found for dependencies of foss-2018a: GCC-4.6.4 vs GCC-6.4.0-2.28" in stderr)
+        self.assertEqual(len(re.findall('^Conflict', stderr, re.M)), 10)
+
+        # all (direct and indirect) reverse dependencies are reported for conflicting dependencies
+        dep_of_txt = ', '.join(['FFTW-3.3.7-gompi-2018a', 'OpenMPI-2.1.2-GCC-4.6.4',
+                                'ScaLAPACK-2.0.2-gompi-2018a-OpenBLAS-0.2.20', 'foss-2018a', 'gompi-2018a',
+                                'gzip-1.5-foss-2018a', 'hwloc-1.11.8-GCC-4.6.4'])
+        self.assertTrue("\n\tGCC-4.6.4 as dep of: %s\n" % dep_of_txt in stderr)
 
         # conflicts between specified easyconfigs are also detected
 
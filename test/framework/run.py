@@ -38,6 +38,7 @@ import stat
 import subprocess
 import sys
 import tempfile
+import time
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 from easybuild.base.fancylogger import setLogLevelDebug
@@ -47,6 +48,7 @@ import easybuild.tools.utilities
 from easybuild.tools.build_log import EasyBuildError, init_logging, stop_logging
 from easybuild.tools.filetools import adjust_permissions, read_file, write_file
 from easybuild.tools.run import (
+    CmdOutput,
     check_log_for_errors,
     get_output_from_process,
     run_cmd,
@@ -54,6 +56,7 @@ from easybuild.tools.run import (
     parse_log_for_error,
 )
 from easybuild.tools.config import ERROR, IGNORE, WARN
+from easybuild.tools.profiling import StepProfiler
 
 
 class RunTest(EnhancedTestCase):
@@ -228,6 +231,44 @@ class RunTest(EnhancedTestCase):
             signal.signal(signal.SIGALRM, orig_sigalrm_handler)
             signal.alarm(0)
 
+    def test_run_cmd_profile(self):
+        """Test profiling of commands run via run_cmd."""
+        profiler = StepProfiler()
+
+        # commands are only profiled with --profile
+        init_config(build_options={'profile': False})
+        with profiler.step('build'):
+            run_cmd("echo hello")
+        self.assertEqual(profiler.cmds, [])
+
+        init_config(build_options={'profile': True})
+        with profiler.step('build'):
+            (out, ec) = run_cmd("echo hello; kill -9 $$", log_ok=False)
+            self.assertEqual(ec, -9)
+            (out, ec) = run_cmd([sys.executable, '-c', 'x = [0] * (10 * 1024 ** 2); print(len(x))'], shell=False)
+            self.assertEqual((out, ec), ('10485760\n', 0))
+        # command run outside of a step is not profiled
+        run_cmd("echo hello")
+
+        self.assertEqual(len(profiler.cmds), 2)
+        self.assertEqual(profiler.cmds[0]['cmd'], "echo hello; kill -9 $$")
+        self.assertEqual(profiler.cmds[1]['cmd'], "%s -c x = [0] * (10 * 1024 ** 2); print(len(x))" % sys.executable)
+        for cmd in profiler.cmds:
+            self.assertEqual(cmd['step'], 'build')
+            self.assertTrue(cmd['wall_time'] > 0)
+            self.assertTrue(cmd['cpu_time'] >= 0)
+        # list of 10M elements implies a peak RSS of at least 80MB
+        self.assertTrue(profiler.cmds[1]['peak_rss'] > 80 * 1024 ** 2)
+
+        self.assertEqual([step['name'] for step in profiler.steps], ['build', 'build'])
+        self.assertEqual(profiler.steps[1]['cmds'], 2)
+        self.assertTrue(profiler.steps[1]['peak_rss'] >= profiler.cmds[1]['peak_rss'])
+        self.assertTrue(profiler.steps[1]['cpu_time'] >= profiler.cmds[1]['cpu_time'])
+
+        summary = profiler.summary()
+        self.assertEqual(list(summary.keys()), ['build'])
+        self.assertEqual(summary['build']['cmds'], 2)
+
     def test_run_cmd_bis(self):
         """More 'complex' test for run_cmd function."""
         # a more 'complex' command to run, make sure all required output is there
@@ -266,6 +307,87 @@ class RunTest(EnhancedTestCase):
             self.assertTrue(out.startswith('foo ') and out.endswith(' bar'))
             self.assertEqual(type(out), str)
 
+    def test_run_cmd_output_handle(self):
+        """Test run_cmd with bounded memory for command output."""
+        cmd = "seq 1 10000"
+        expected_out = ''.join('%d\n' % i for i in range(1, 10001))
+
+        # keep (at most) 1KiB of output in memory
+        init_config(build_options={'cmd_output_buffer_size': 1})
+
+        (out, ec) = run_cmd(cmd)
+        self.assertEqual(ec, 0)
+        self.assertEqual(out, expected_out)
+
+        (out, ec) = run_cmd(cmd, output_handle=True)
+        self.assertEqual(ec, 0)
+        self.assertTrue(isinstance(out, CmdOutput))
+        self.assertFalse(out.in_memory)
+        self.assertEqual(out.size, len(expected_out))
+        self.assertEqual(out.read(), expected_out)
+        self.assertEqual(''.join(out), expected_out)
+
+        # only last part of output is kept in memory
+        tail = out.tail()
+        self.assertTrue(1024 <= len(tail) < 1024 + 8192)
+        self.assertTrue(expected_out.endswith(tail))
+        self.assertTrue(str(out).startswith("[... only last %d bytes of 48894 bytes of output are shown ...]\n" %
+                                            len(tail)))
+        self.assertTrue(str(out).endswith("9999\n10000\n"))
+        out.close()
+
+        # small output is fully kept in memory
+        (out, ec) = run_cmd("echo hello", output_handle=True)
+        self.assertTrue(out.in_memory)
+        self.assertEqual(str(out), "hello\n")
+        self.assertEqual(out.tail(), "hello\n")
+
+        # CmdOutput instance can be used as context manager, which closes it on exit
+        with out:
+            self.assertEqual(out.read(), "hello\n")
+        self.assertTrue(out._spool.closed)
+
+        # output is only spooled to a temporary file once it exceeds the buffer size
+        cmd_output = CmdOutput(1024)
+        cmd_output.write('x' * 1024)
+        self.assertTrue(cmd_output.in_memory)
+        cmd_output.write('x')
+        self.assertFalse(cmd_output.in_memory)
+        self.assertEqual(len(cmd_output.read()), 1025)
+        cmd_output.close()
+
+    def test_cmd_output(self):
+        """Test CmdOutput class."""
+        cmd_output = CmdOutput(1024, regexp=True)
+        # lines are checked for errors, also when they are split across chunks of output
+        for output in ["foo\nan err", "or occurred\n", "all is fine\nsomething fai", "led"]:
+            cmd_output.write(output)
+        self.assertEqual(cmd_output.errors, [["an error occurred", ()]])
+        cmd_output.finalize()
+        self.assertEqual(cmd_output.errors, [["an error occurred", ()], ["something failed", ()]])
+        self.assertEqual(cmd_output.read(), "foo\nan error occurred\nall is fine\nsomething failed")
+        self.assertEqual(cmd_output.tail(), cmd_output.read())
+
+        # errors found are the same as with parse_log_for_error
+        self.assertEqual(cmd_output.errors, parse_log_for_error(cmd_output.read(), True))
+
+        cmd_output = CmdOutput(1024, regexp=r'^ERROR: (.*)$')
+        cmd_output.write("ERROR: oops\nerror: not an error\n")
+        self.assertEqual(cmd_output.errors, [["ERROR: oops", ('oops',)], ["error: not an error", ('not an error',)]])
+
+        # no checking for errors if no regular expression is specified
+        cmd_output = CmdOutput(1024)
+        cmd_output.write("error\n")
+        cmd_output.finalize()
+        self.assertEqual(cmd_output.errors, [])
+
+        # only most recent chunks of output are retained in tail (up to buffer size)
+        cmd_output = CmdOutput(10)
+        for output in ["12345", "67890", "abcde", "fghij", "k"]:
+            cmd_output.write(output)
+        self.assertEqual(cmd_output.tail(), "abcdefghijk")
+        self.assertEqual(cmd_output.read(), "1234567890abcdefghijk")
+
     def test_run_cmd_trace(self):
         """Test run_cmd under --trace"""
         # replace log.experimental with log.warning to allow experimental code
@@ -354,6 +476,23 @@ class RunTest(EnhancedTestCase):
         regex = re.compile("Picked number: 42$")
         self.assertTrue(regex.search(out), "Pattern '%s' found in: %s" % (regex.pattern, out))
 
+    def test_run_cmd_qa_lots_of_output(self):
+        """Test run_cmd_qa with command that produces lots of output before asking a question."""
+        # way more output than what is retained to check for questions
+        cmd = "seq 1 200000; echo 'Pick a number: '; read number; echo \"Picked number: $number\"; seq 1 100000"
+        (out, ec) = run_cmd_qa(cmd, {'Pick a number: ': '42'}, maxhits=10)
+        self.assertEqual(ec, 0)
+
+        expected = '\n'.join(str(i) for i in range(1, 200001))
+        expected += "\nPick a number: \nPicked number: 42\n"
+        expected += '\n'.join(str(i) for i in range(1, 100001)) + '\n'
+        self.assertEqual(out, expected)
+
+        # question that was asked long before running into timeout is still reported
+        cmd = "seq 1 200000; echo 'Unknown question?'; read x"
+        error_pattern = r"Max nohits 1 reached: end of output [0-9\n]*\nUnknown question\?"
+        self.assertErrorRegex(EasyBuildError, error_pattern, run_cmd_qa, cmd, {'question': 'answer'}, maxhits=1)
+
     def test_run_cmd_qa_log_all(self):
         """Test run_cmd_qa with log_output enabled"""
         (out, ec) = run_cmd_qa("echo 'n: '; read n; seq 1 $n", {'n: ': '5'}, log_all=True)
@@ -421,6 +560,46 @@ class RunTest(EnhancedTestCase):
         self.assertEqual(out, "question\nanswer1\nquestion\nanswer2\n" * 2)
         self.assertEqual(ec, 0)
 
+    def test_run_cmd_qa_many_questions(self):
+        """Test run_cmd_qa with command that asks many questions."""
+        cmd = 'for i in $(seq 1 100); do echo "Question $i?"; read x; echo "answer $i: $x"; done'
+        qa = {'Question 42?': 'the answer'}
+        std_qa = {r'Question (?P<nr>[0-9]+)\?': 'nr %(nr)s'}
+
+        start = time.time()
+        (out, ec) = run_cmd_qa(cmd, qa, std_qa=std_qa, maxhits=10)
+        self.assertEqual(ec, 0)
+        # questions are answered as soon as they are asked
+        self.assertTrue(time.time() - start < 10)
+
+        self.assertTrue(out.startswith("Question 1?\nanswer 1: nr 1\nQuestion 2?\nanswer 2: nr 2\n"))
+        self.assertTrue("Question 42?\nanswer 42: the answer\nQuestion 43?\nanswer 43: nr 43\n" in out)
+        self.assertTrue(out.endswith("Question 100?\nanswer 100: nr 100\n"))
+
+        # question with same name for group in different patterns can still be answered
+        std_qa['Another (?P<nr>[0-9]+)'] = 'another %(nr)s'
+        (out, ec) = run_cmd_qa("echo 'Question 1?'; read x; echo $x", {}, std_qa=std_qa)
+        self.assertEqual(out, "Question 1?\nnr 1\n")
+
+    def test_run_cmd_qa_maxhits(self):
+        """Test inactivity timeout for run_cmd_qa (maxhits)."""
+        cmd = "echo 'Unknown question?'; read x; echo $x"
+        start = time.time()
+        error_pattern = r"Max nohits 1 reached: end of output Unknown question\?"
+        self.assertErrorRegex(EasyBuildError, error_pattern, run_cmd_qa, cmd, {'question': 'answer'}, maxhits=1)
+        self.assertTrue(time.time() - start < 5)
+
+        # output that matches a 'no Q&A' pattern prevents running into timeout
+        cmd = "echo 'Working...'; sleep 3; echo done"
+        (out, ec) = run_cmd_qa(cmd, {}, no_qa=['Working...'], maxhits=1)
+        self.assertEqual(out, "Working...\ndone\n")
+        self.assertEqual(ec, 0)
+
+        # timeout only applies when there is no new output
+        cmd = "for i in 1 2 3 4; do echo $i; sleep 0.5; done"
+        (out, ec) = run_cmd_qa(cmd, {}, maxhits=1)
+        self.assertEqual(out, "1\n2\n3\n4\n")
+
     def test_run_cmd_simple(self):
         """Test return value for run_cmd in 'simple' mode."""
         self.assertEqual(True, run_cmd("echo hello", simple=True))
@@ -0,0 +1,197 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for source_store.py
+"""
+import json
+import os
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
+from unittest import TextTestRunner
+
+import easybuild.tools.source_store as source_store
+from easybuild.framework.easyblock import EasyBlock
+from easybuild.framework.easyconfig.easyconfig import EasyConfig
+from easybuild.tools.filetools import compute_checksum, copy_file, read_file, write_file
+from easybuild.tools.source_store import SOURCE_STORE_INDEX, SOURCE_STORE_SUBDIR, SourceStore
+from easybuild.tools.source_store import det_sha256_checksums, get_source_store
+
+
+class SourceStoreTest(EnhancedTestCase):
+    """Tests for content-addressed source store."""
+
+    def setUp(self):
+        """Test setup."""
+        super(SourceStoreTest, self).setUp()
+        self.srcpath = os.path.join(self.test_prefix, 'sources')
+        self.store = SourceStore(self.srcpath)
+
+    def test_det_sha256_checksums(self):
+        """Test det_sha256_checksums function."""
+        sha256_a = 'a' * 64
+        sha256_b = 'b' * 64
+        md5 = 'c' * 32
+
+        self.assertEqual(det_sha256_checksums(None), [])
+        self.assertEqual(det_sha256_checksums(sha256_a), [sha256_a])
+        self.assertEqual(det_sha256_checksums(md5), [])
+        self.assertEqual(det_sha256_checksums(('sha256', sha256_a)), [sha256_a])
+        self.assertEqual(det_sha256_checksums(('md5', md5)), [])
+        # alternative checksums
+        self.assertEqual(det_sha256_checksums((sha256_a, sha256_b)), [sha256_a, sha256_b])
+        self.assertEqual(det_sha256_checksums([md5, ('sha256', sha256_b), sha256_a]), [sha256_b, sha256_a])
+
+    def test_get_source_store(self):
+        """Test get_source_store function."""
+        store = get_source_store(self.srcpath)
+        self.assertEqual(store.topdir, os.path.join(self.srcpath, SOURCE_STORE_SUBDIR))
+        self.assertTrue(get_source_store(os.path.join(self.srcpath, '.')) is store)
+
+    def test_add_provide(self):
+        """Test adding files to source store, and providing them via store."""
+        txt = 'this is a test source tarball'
+        test_txt = os.path.join(self.test_prefix, 'test.txt')
+        write_file(test_txt, txt)
+        digest = compute_checksum(test_txt, checksum_type='sha256')
+
+        # files outside of source path are not added
+        self.assertFalse(self.store.add(test_txt))
+        self.assertFalse(os.path.exists(self.store.topdir))
+
+        path_foo = os.path.join(self.srcpath, 'f', 'foo', 'foo-1.0.tar.gz')
+        write_file(path_foo, txt)
+        self.assertTrue(self.store.add(path_foo))
+
+        stored_path = self.store.path_for(digest)
+        self.assertEqual(stored_path, os.path.join(self.store.topdir, 'sha256', digest[:2], digest))
+        self.assertTrue(os.path.isfile(stored_path))
+        self.assertTrue(os.path.samefile(path_foo, stored_path))
+        self.assertEqual(read_file(path_foo), txt)
+
+        index = json.loads(read_file(os.path.join(self.store.topdir, SOURCE_STORE_INDEX)))
+        st = os.stat(path_foo)
+        expected_entry = {'sha256': digest, 'mtime': st.st_mtime, 'size': st.st_size}
+        self.assertEqual(index, {os.path.join('f', 'foo', 'foo-1.0.tar.gz'): expected_entry})
+
+        # files with same contents are deduplicated
+        path_bar = os.path.join(self.srcpath, 'b', 'bar', 'extensions', 'foo-1.0.tar.gz')
+        write_file(path_bar, txt)
+        self.assertFalse(os.path.samefile(path_bar, stored_path))
+        self.assertTrue(self.store.add(path_bar))
+        self.assertTrue(os.path.samefile(path_bar, stored_path))
+        self.assertEqual(len(os.listdir(os.path.dirname(stored_path))), 1)
+
+        # removed files are provided again via index (also by another instance that reads index from disk)
+        os.remove(path_foo)
+        store = SourceStore(self.srcpath)
+        self.assertTrue(store.provide(path_foo))
+        self.assertTrue(os.path.samefile(path_foo, stored_path))
+
+        # unknown files can be provided via expected checksum
+        path_baz = os.path.join(self.srcpath, 'b', 'baz', 'baz-2.0.tar.gz')
+        self.assertFalse(store.provide(path_baz))
+        self.assertFalse(store.provide(path_baz, checksum='0' * 64))
+        self.assertTrue(store.provide(path_baz, checksum=[('md5', '0' * 32), ('sha256', digest)]))
+        self.assertTrue(os.path.samefile(path_baz, stored_path))
+        self.assertEqual(store.indexed_digest(os.path.join('b', 'baz', 'baz-2.0.tar.gz')), digest)
+
+        # existing files that are not provided by store are not replaced
+        path_other = os.path.join(self.srcpath, 'o', 'other', 'other.tar.gz')
+        write_file(path_other, 'something else')
+        self.assertFalse(store.provide(path_other, checksum=digest))
+        self.assertEqual(read_file(path_other), 'something else')
+
+        # files in store itself are never added to it
+        self.assertFalse(store.add(stored_path))
+
+    def test_add_unchanged(self):
+        """Test that SHA256 digest is only computed when adding new or changed files to source store."""
+        orig_compute_checksum = source_store.compute_checksum
+        calls = []
+
+        def mocked_compute_checksum(path, checksum_type=None):
+            """Mocked version of compute_checksum, which keeps track of calls."""
+            calls.append(path)
+            return orig_compute_checksum(path, checksum_type=checksum_type)
+
+        source_store.compute_checksum = mocked_compute_checksum
+        try:
+            path = os.path.join(self.srcpath, 'f', 'foo', 'foo-1.0.tar.gz')
+            write_file(path, 'foo')
+            self.assertTrue(self.store.add(path))
+            self.assertEqual(calls, [path])
+
+            # unchanged file is not hashed again (also not by another instance that reads index from disk)
+            self.assertTrue(self.store.add(path))
+            self.assertTrue(SourceStore(self.srcpath).add(path))
+            self.assertEqual(calls, [path])
+
+            # changed file is hashed again
+            os.remove(path)
+            write_file(path, 'foobar')
+            self.assertTrue(self.store.add(path))
+            self.assertEqual(calls, [path, path])
+            digest = compute_checksum(path, checksum_type='sha256')
+            self.assertEqual(self.store.indexed_digest(os.path.join('f', 'foo', 'foo-1.0.tar.gz')), digest)
+            self.assertTrue(os.path.samefile(path, self.store.path_for(digest)))
+        finally:
+            source_store.compute_checksum = orig_compute_checksum
+
+    def test_obtain_file_source_store(self):
+        """Test use of source store in EasyBlock.obtain_file."""
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        toy_ec = os.path.join(test_dir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+        toy_tarball = os.path.join(test_dir, 'sandbox', 'sources', 'toy', 'toy-0.0.tar.gz')
+
+        init_config(args=['--sourcepath=%s' % self.srcpath], build_options={'use_source_store': True})
+
+        app = EasyBlock(EasyConfig(toy_ec))
+        path = os.path.join(self.srcpath, 't', 'toy', 'toy-0.0.tar.gz')
+        copy_file(toy_tarball, path)
+
+        # file that is found in source path is added to source store
+        self.assertEqual(app.obtain_file('toy-0.0.tar.gz'), path)
+        digest = compute_checksum(path, checksum_type='sha256')
+        self.assertTrue(os.path.samefile(path, get_source_store(self.srcpath).path_for(digest)))
+
+        # file is provided via source store when it's no longer available in source path
+        os.remove(path)
+        self.assertEqual(app.obtain_file('toy-0.0.tar.gz'), path)
+        self.assertTrue(os.path.exists(path))
+
+        # other file with same contents can be provided via expected checksum
+        path = os.path.join(self.srcpath, 't', 'toy', 'extensions', 'toy-copy.tar.gz')
+        self.assertEqual(app.obtain_file('toy-copy.tar.gz', extension=True, urls=[], checksum=digest), path)
+        self.assertTrue(os.path.samefile(path, get_source_store(self.srcpath).path_for(digest)))
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(SourceStoreTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
@@ -43,6 +43,8 @@ from easybuild.tools.options import set_tmpdir
 
 import test.framework.asyncprocess as a
 import test.framework.build_log as bl
+import test.framework.build_cache as bc
+import test.framework.cache as cache
 import test.framework.config as c
 import test.framework.containers as ct
 import test.framework.easyblock as b
@@ -51,6 +53,7 @@ import test.framework.easyconfigparser as ep
 import test.framework.easyconfigformat as ef
 import test.framework.ebconfigobj as ebco
 import test.framework.easyconfigversion as ev
+import test.framework.elf as elf
 import test.framework.environment as env
 import test.framework.docs as d
 import test.framework.filetools as f
@@ -70,6 +73,7 @@ import test.framework.package as pkg
 import test.framework.repository as r
 import test.framework.robot as robot
 import test.framework.run as run
+import test.framework.source_store as ss
 import test.framework.style as st
 import test.framework.systemtools as s
 import test.framework.toolchain as tc
@@ -118,7 +122,7 @@ log = fancylogger.getLogger()
 # call suite() for each module and then run them all
 # note: make sure the options unit tests run first, to avoid running some of them with a readily initialized config
 tests = [gen, bl, o, r, ef, ev, ebco, ep, e, mg, m, mt, f, run, a, robot, b, v, g, tcv, tc, t, c, s, lic, f_c,
-         tw, p, i, pkg, d, env, et, y, st, h, ct, lib]
+         tw, p, i, pkg, d, env, et, y, st, h, ct, lib, cache, elf, bc, ss]
 
 SUITE = unittest.TestSuite([x.suite() for x in tests])
 res = unittest.TextTestRunner().run(SUITE)
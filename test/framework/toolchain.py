@@ -2220,6 +2220,97 @@ class ToolchainTest(EnhancedTestCase):
         self.assertTrue(os.path.samefile(res[1], fake_gxx))
         self.assertFalse(any(os.path.samefile(x, fake_gxx) for x in res[2:]))
 
+    def test_rpath_wrappers_bash_vs_python(self):
+        """Test whether RPATH wrappers yield same result with rpath_args bash function and rpath_args.py script."""
+
+        # put fake 'g++' command in place that just prints its arguments, one per line
+        fake_gxx = os.path.join(self.test_prefix, 'fake', 'g++')
+        write_file(fake_gxx, '#!/bin/bash\nfor arg in "$@"; do echo "$arg"; done')
+        adjust_permissions(fake_gxx, stat.S_IXUSR)
+        os.environ['PATH'] = '%s:%s' % (os.path.join(self.test_prefix, 'fake'), os.getenv('PATH', ''))
+        os.environ['LIBRARY_PATH'] = '/foo:/lib/path::/bar/lib:relative/lib:/foo'
+        orig_path = os.getenv('PATH')
+
+        cmds = [
+            "g++ -c foo.c",
+            "g++ foo.c -L/foo -L /bar -L'$FOO' -Lrelative -L/bar/lib -DX='\"\"' -o 'test with spaces'",
+            "g++ -L/prefix/CUDA/lib64/stubs/ -L/prefix/stubs/lib -Wl,--enable-new-dtags foo.o",
+            "g++ --version",
+            "g++ -x c++-header foo.h -L/foo",
+        ]
+
+        def run_cmds(rpath_filter):
+            """Run commands using RPATH wrapper installed with specified RPATH filter, and return outputs."""
+            os.environ['PATH'] = orig_path
+            init_config(build_options={'rpath': True, 'rpath_filter': rpath_filter, 'silent': True})
+            tc = self.get_toolchain('system', version='system')
+            tc.compilers = lambda: (['g++'], [])
+            tc.prepare_rpath_wrappers(rpath_include_dirs=['$ORIGIN/../lib', os.path.join(self.test_prefix, 'lib')])
+
+            wrapper = which('g++')
+            self.assertTrue(tc.is_rpath_wrapper(wrapper))
+            use_rpath_args_py = any('\\' in x for x in rpath_filter)
+            regex = re.compile(r'^if \[ %d -eq 1 \]; then$' % int(use_rpath_args_py), re.M)
+            self.assertTrue(regex.search(read_file(wrapper)), "Pattern '%s' found in wrapper" % regex.pattern)
+
+            res = []
+            for cmd in cmds:
+                out, ec = run_cmd(cmd, simple=False)
+                self.assertEqual(ec, 0)
+                res.append(out)
+            return res
+
+        # '/ba.*' can be evaluated by bash, '/ba\w*' can not (uses Python-specific syntax)
+        outputs = {}
+        for rpath_filter in [r'/ba.*', r'/ba\w*']:
+            outputs[rpath_filter] = run_cmds([rpath_filter])
+
+        self.assertEqual(outputs[r'/ba.*'], outputs[r'/ba\w*'])
+
+        expected = '\n'.join([
+            '-Wl,-rpath=$ORIGIN/../lib',
+            '-Wl,-rpath=%s/lib' % self.test_prefix,
+            '-Wl,--disable-new-dtags',
+            '-Wl,-rpath=/foo',
+            '-Wl,-rpath=/lib/path',
+            'foo.c',
+            '-L/foo',
+            '-L/bar',
+            '-L$FOO',
+            '-Lrelative',
+            '-L/bar/lib',
+            '-DX=""',
+            '-o',
+            'test with spaces',
+        ])
+        self.assertEqual(outputs[r'/ba.*'][1].strip(), expected)
+        self.assertEqual(outputs[r'/ba.*'][3].strip(), '--version')
+        self.assertEqual(outputs[r'/ba.*'][4].strip(), '\n'.join(['-x', 'c++-header', 'foo.h', '-L/foo']))
+
+        # with multiple entries in RPATH filter, only the last one is anchored at the end (like in rpath_args.py);
+        # since the pattern for stubs libraries is added at the end, the other entries are matched as prefixes,
+        # so '/fo' filters out '/foo', '/lib/pat' filters out '/lib/path', and '/bar/' filters out '/bar/lib'
+        out_bash = run_cmds([r'/fo', r'/lib/pat', r'/bar/'])
+        out_py = run_cmds([r'/fo', r'/lib/pa\w', r'/bar/'])
+        self.assertEqual(out_bash, out_py)
+
+        expected = '\n'.join([
+            '-Wl,-rpath=$ORIGIN/../lib',
+            '-Wl,-rpath=%s/lib' % self.test_prefix,
+            '-Wl,--disable-new-dtags',
+            '-Wl,-rpath=/bar',
+            'foo.c',
+            '-L/foo',
+            '-L/bar',
+            '-L$FOO',
+            '-Lrelative',
+            '-L/bar/lib',
+            '-DX=""',
+            '-o',
+            'test with spaces',
+        ])
+        self.assertEqual(out_bash[1].strip(), expected)
+
     def test_prepare_openmpi_tmpdir(self):
         """Test handling of long $TMPDIR path for OpenMPI 2.x"""
 
@@ -32,6 +32,7 @@ Toy build unit test
 import copy
 import glob
 import grp
+import json
 import os
 import re
 import shutil
@@ -2497,6 +2498,172 @@ class ToyBuildTest(EnhancedTestCase):
             regex = re.compile(pattern, re.M)
             self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
 
+    def test_toy_build_profile(self):
+        """Test use of --profile."""
+        repositorypath = os.path.join(self.test_installpath, 'easyconfigs_archive')
+        extra_args = [
+            '--profile',
+            '--repository=FileRepository',
+            '--repositorypath=%s' % repositorypath,
+        ]
+        self.test_toy_build(raise_error=True, extra_args=extra_args, verify=False)
+
+        toy_logdir = os.path.join(self.test_installpath, 'software', 'toy', '0.0', 'easybuild')
+        profiles = glob.glob(os.path.join(toy_logdir, 'easybuild-toy-0.0-*-profile.json'))
+        self.assertEqual(len(profiles), 1)
+        profile = json.loads(read_file(profiles[0]))
+
+        step_names = [step['name'] for step in profile['steps']]
+        for step_name in ['fetch', 'source', 'configure', 'build', 'install', 'sanitycheck', 'module']:
+            self.assertTrue(step_name in step_names, "Step %s found in %s" % (step_name, step_names))
+        for step in profile['steps']:
+            for key in ['start_time', 'wall_time', 'cpu_time', 'peak_rss', 'cmds']:
+                self.assertTrue(key in step)
+            self.assertTrue(step['wall_time'] >= 0)
+
+        # command to compile toy is run as part of build step
+        build_cmds = [cmd for cmd in profile['cmds'] if cmd['step'] == 'build']
+        self.assertEqual(len(build_cmds), 1)
+        self.assertTrue(build_cmds[0]['cmd'].startswith('gcc '))
+        self.assertTrue(build_cmds[0]['peak_rss'] > 0)
+        build_step = [step for step in profile['steps'] if step['name'] == 'build'][0]
+        self.assertEqual(build_step['cmds'], 1)
+        self.assertTrue(build_step['peak_rss'] >= build_cmds[0]['peak_rss'])
+
+        # profile per step is included in archived build stats
+        archived_ec = os.path.join(repositorypath, 'toy', 'toy-0.0.eb')
+        buildstats = EasyConfigParser(archived_ec).get_config_dict()['buildstats']
+        step_profile = buildstats[-1]['step_profile']
+        self.assertEqual(sorted(step_profile.keys()), sorted(set(step_names)))
+        self.assertEqual(step_profile['build']['cmds'], 1)
+
+        # profile can also be dumped in Chrome trace event format
+        extra_args = ['--profile', '--profile-format=trace']
+        self.test_toy_build(raise_error=True, extra_args=extra_args, verify=False)
+        traces = glob.glob(os.path.join(toy_logdir, 'easybuild-toy-0.0-*-trace.json'))
+        self.assertEqual(len(traces), 1)
+        trace = json.loads(read_file(traces[0]))
+        events = trace['traceEvents']
+        self.assertTrue(all(ev['ph'] == 'X' for ev in events))
+        self.assertTrue(any(ev['cat'] == 'step' and ev['name'] == 'build' for ev in events))
+        self.assertTrue(any(ev['cat'] == 'cmd' and ev['name'].startswith('gcc ') for ev in events))
+
+    def test_toy_build_cache(self):
+        """Test use of --use-build-cache."""
+        build_cache_dir = os.path.join(self.test_prefix, 'build-cache')
+        extra_args = [
+            '--use-build-cache',
+            '--build-cache-dir=%s' % build_cache_dir,
+        ]
+        outtxt = self.test_toy_build(raise_error=True, extra_args=extra_args)
+        self.assertFalse(re.search("restored from build cache", outtxt))
+
+        tarballs = glob.glob(os.path.join(build_cache_dir, '*', '*.tar.gz'))
+        self.assertEqual(len(tarballs), 1)
+        metadata = json.loads(read_file(tarballs[0][:-len('.tar.gz')] + '.json'))
+        self.assertEqual(metadata['full_mod_name'], 'toy/0.0')
+        toy_installdir = os.path.join(self.test_installpath, 'software', 'toy', '0.0')
+        self.assertEqual(metadata['installdir'], toy_installdir)
+
+        # remove installation, rebuild without sources being available: installation is restored from build cache
+        remove_dir(toy_installdir)
+        toy_mod = os.path.join(self.test_installpath, 'modules', 'all', 'toy', '0.0')
+        if get_module_syntax() == 'Lua':
+            toy_mod += '.lua'
+        remove_file(toy_mod)
+
+        empty_sourcepath = os.path.join(self.test_prefix, 'empty_sourcepath')
+        mkdir(empty_sourcepath)
+        extra_args.append('--sourcepath=%s' % empty_sourcepath)
+        outtxt = self.test_toy_build(raise_error=True, extra_args=extra_args)
+        regex = re.compile("Installation of toy/0.0 restored from build cache: %s" % tarballs[0], re.M)
+        self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        self.assertTrue(os.path.exists(toy_mod))
+
+        # without --use-build-cache, build cache is not used, so installation fails since sources are not available
+        error_pattern = "Couldn't find file toy-0.0.tar.gz anywhere"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.test_toy_build, raise_error=True,
+                              extra_args=extra_args[1:], verify=False)
+
+    def test_toy_build_resume(self):
+        """Test use of --resume."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')
+        toy_installdir = os.path.join(self.test_installpath, 'software', 'toy', '0.0')
+        checkpoints_dir = os.path.join(self.test_buildpath, '.checkpoints')
+
+        # checkpoints are only recorded when --resume is used
+        self.test_toy_build(ec_file=toy_ec, extra_args=['--stop=build'], verify=False, raise_error=True)
+        self.assertFalse(os.path.exists(os.path.join(toy_installdir, 'bin')))
+        self.assertEqual(glob.glob(os.path.join(checkpoints_dir, '*')), [])
+
+        # stop installation after build step, checkpoint is retained
+        self.test_toy_build(ec_file=toy_ec, extra_args=['--stop=build', '--resume'], verify=False, raise_error=True)
+        self.assertFalse(os.path.exists(os.path.join(toy_installdir, 'bin')))
+        checkpoints = glob.glob(os.path.join(checkpoints_dir, 'toy_0.0_*.json'))
+        self.assertEqual(len(checkpoints), 1)
+        checkpoint = json.loads(read_file(checkpoints[0]))
+        done_steps = ['fetch', 'ready', 'source', 'patch', 'prepare', 'configure', 'build']
+        self.assertEqual([step['name'] for step in checkpoint['steps']], done_steps)
+
+        # resume installation, sources are no longer required since they were already unpacked
+        empty_sourcepath = os.path.join(self.test_prefix, 'empty_sourcepath')
+        mkdir(empty_sourcepath)
+        extra_args = ['--resume', '--sourcepath=%s' % empty_sourcepath]
+        outtxt = self.test_toy_build(ec_file=toy_ec, extra_args=extra_args, raise_error=True)
+
+        regex = re.compile(r"resuming installation, 7 steps were completed before \(last step: build\)", re.M)
+        self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        for descr in ['fetching files', 'unpacking', 'configuring', 'building']:
+            regex = re.compile(r"%s \[completed before\]" % descr, re.M)
+            self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        # checkpoint is removed once installation is completed
+        self.assertEqual(glob.glob(os.path.join(checkpoints_dir, '*')), [])
+
+        # installation that fails in sanity check step can be resumed too
+        fail_marker = os.path.join(self.test_prefix, 'fail')
+        write_file(fail_marker, '')
+        hooks_file = os.path.join(self.test_prefix, 'my_hooks.py')
+        write_file(hooks_file, '\n'.join([
+            "import os",
+            "from easybuild.tools.build_log import EasyBuildError",
+            '',
+            "def pre_sanitycheck_hook(self):",
+            "    if os.path.exists('%s'):" % fail_marker,
+            "        raise EasyBuildError('sanity check failed')",
+        ]))
+        extra_args = ['--hooks=%s' % hooks_file, '--resume']
+        self.assertErrorRegex(EasyBuildError, 'sanity check failed', self.test_toy_build, ec_file=toy_ec,
+                              extra_args=extra_args, verify=False, raise_error=True)
+        checkpoints = glob.glob(os.path.join(checkpoints_dir, 'toy_0.0_*.json'))
+        self.assertEqual(len(checkpoints), 1)
+        checkpoint = json.loads(read_file(checkpoints[0]))
+        self.assertEqual(checkpoint['steps'][-1]['name'], 'postproc')
+
+        remove_file(fail_marker)
+        extra_args.append('--sourcepath=%s' % empty_sourcepath)
+        outtxt = self.test_toy_build(ec_file=toy_ec, extra_args=extra_args, raise_error=True)
+        for descr in ['building', 'installing', 'postprocessing']:
+            regex = re.compile(r"%s \[completed before\]" % descr, re.M)
+            self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        regex = re.compile(r"sanity checking\.\.\.", re.M)
+        self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+
+        # checkpoint is not used if easyconfig was changed
+        self.test_toy_build(ec_file=toy_ec, extra_args=['--stop=build', '--resume'], verify=False, raise_error=True)
+        extra_args = ['--resume', '--try-amend=preconfigopts=echo foo && ']
+        outtxt = self.test_toy_build(ec_file=toy_ec, extra_args=extra_args, raise_error=True)
+        regex = re.compile(r"Not resuming installation from checkpoint .*: easyconfig or easyblock changed")
+        self.assertTrue(regex.search(outtxt), "Pattern '%s' found in: %s" % (regex.pattern, outtxt))
+        self.assertFalse(re.search(r"\[completed before\]", outtxt))
+        self.assertEqual(glob.glob(os.path.join(checkpoints_dir, '*')), [])
+
+        # stale checkpoint is removed when installation is not resumed
+        self.test_toy_build(ec_file=toy_ec, extra_args=['--stop=build', '--resume'], verify=False, raise_error=True)
+        self.assertEqual(len(glob.glob(os.path.join(checkpoints_dir, 'toy_0.0_*.json'))), 1)
+        self.test_toy_build(ec_file=toy_ec, extra_args=['--stop=build'], verify=False, raise_error=True)
+        self.assertEqual(glob.glob(os.path.join(checkpoints_dir, '*')), [])
+
     def test_toy_build_hooks(self):
         """Test use of --hooks."""
         hooks_file = os.path.join(self.test_prefix, 'my_hooks.py')
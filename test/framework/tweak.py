@@ -43,7 +43,7 @@ from easybuild.framework.easyconfig.tweak import map_easyconfig_to_target_tc_hie
 from easybuild.framework.easyconfig.tweak import list_deps_versionsuffixes
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import module_classes
-from easybuild.tools.filetools import change_dir, write_file
+from easybuild.tools.filetools import change_dir, copy_dir, dump_index, remove_file, write_file
 
 
 class TweakTest(EnhancedTestCase):
@@ -87,6 +87,31 @@ class TweakTest(EnhancedTestCase):
             gcc_ec = 'GCC-%s.eb' % gccver
             self.assertTrue(gcc_ec in ecs_basename, "%s is included in %s" % (gcc_ec, ecs_basename))
 
+        # if a (valid) index is available, it is used rather than checking the filesystem
+        test_ecs = os.path.join(self.test_prefix, 'test_ecs')
+        copy_dir(test_easyconfigs_path, test_ecs)
+        init_config(build_options={'ignore_index': True})
+        queries = [('GCC', '4.8.2'), ('GCC', '*'), ('gzip', '1.5-foss-2018a'), ('toy', '*'), ('*', '*'),
+                   ('intel', '2018a'), ('foss', '2018[ab]'), ('g*', '1.*'), ('nosuchsoftware', '*')]
+        expected = [find_matching_easyconfigs(name, ver, [test_ecs]) for (name, ver) in queries]
+
+        dump_index(test_ecs)
+        init_config(build_options={'ignore_index': False})
+        self.mock_stdout(True)
+        for (name, ver), expected_ecs in zip(queries, expected):
+            self.assertEqual(find_matching_easyconfigs(name, ver, [test_ecs]), expected_ecs)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertTrue(stdout.startswith("== found valid index for %s" % test_ecs))
+
+        # files that are not listed in the index are not found
+        write_file(os.path.join(test_ecs, 'GCC-1.2.3.eb'), '')
+        self.assertFalse(any(ec.endswith('GCC-1.2.3.eb') for ec in find_matching_easyconfigs('GCC', '*', [test_ecs])))
+
+        # files listed in the index are found, even though they don't exist
+        remove_file(os.path.join(test_ecs, 'g', 'GCC', 'GCC-4.8.2.eb'))
+        self.assertEqual(find_matching_easyconfigs('GCC', '4.8.2', [test_ecs]), expected[0])
+
     def test_obtain_ec_for(self):
         """Test obtain_ec_for function."""
         init_config(build_options={'silent': True})
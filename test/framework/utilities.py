@@ -40,6 +40,7 @@ import unittest
 from easybuild.base import fancylogger
 from easybuild.base.testing import TestCase
 import easybuild.tools.build_log as eb_build_log
+import easybuild.tools.filetools as filetools
 import easybuild.tools.options as eboptions
 import easybuild.tools.toolchain.utilities as tc_utils
 import easybuild.tools.module_naming_scheme.toolchain as mns_toolchain
@@ -415,8 +416,11 @@ def cleanup():
     tc_utils._initial_toolchain_instances.clear()
     easyconfig._easyconfigs_cache.clear()
     easyconfig._easyconfig_files_cache.clear()
+    easyconfig._path_indexes.clear()
     easyconfig.get_toolchain_hierarchy.clear()
     mns_toolchain._toolchain_details_cache.clear()
+    filetools._checksums_cache.clear()
+    filetools._persistent_checksums_caches.clear()
 
     # reset to make sure tempfile picks up new temporary directory to use
     tempfile.tempdir = None